@@ -71,6 +71,21 @@ def create_app(config_name='production'):
         # Inicializar sistema de IA
         initialize_ai_system(app)
     
+    # Workers de la bandeja de salida (emails post-venta)
+    initialize_outbox_workers(app)
+    
+    # Invalidación del cache de reportes al confirmar escrituras
+    initialize_report_cache(app)
+    
+    # Pool de procesos para reportes asíncronos
+    initialize_report_jobs(app)
+    
+    # Planificador de reportes programados
+    initialize_report_scheduler(app)
+    
+    # Actualización incremental del modelo de IA al cambiar el catálogo
+    initialize_ai_index_updater(app)
+    
     return app
 
 def configure_app(app, config_name):
@@ -179,14 +194,14 @@ def configure_di_container(app):
 def initialize_ai_system(app):
     """Inicializar sistema de IA al arrancar la aplicación"""
     try:
-        from app.services.ai_service import AIService
+        from app.services.ai_service import ai_service
         from app.models.product import Product
         
         # Verificar si hay productos para entrenar
         product_count = Product.query.filter(Product.is_active == True).count()
         
         if product_count > 0:
-            ai_service = AIService()
+            # Publica el modelo en el registro del proceso (los workers lo heredan al hacer fork)
             success = ai_service.initialize_ai_system()
             
             if success:
@@ -198,3 +213,58 @@ def initialize_ai_system(app):
             
     except Exception as e:
         app.logger.error(f"Error initializing AI system: {e}")
+
+
+def initialize_report_cache(app):
+    """Registrar los eventos de sesión que versionan el cache de reportes"""
+    try:
+        from app.services.report_cache_service import register_invalidation_listeners
+        
+        register_invalidation_listeners()
+    except Exception as e:
+        app.logger.error(f"Error initializing report cache: {e}")
+
+def initialize_report_jobs(app):
+    """Preparar el directorio de artefactos, cerrar trabajos huérfanos y detener el pool al salir"""
+    try:
+        import atexit
+        from app.services.report_job_service import report_job_service
+        
+        os.makedirs(report_job_service.artifact_dir, exist_ok=True)
+        atexit.register(report_job_service.shutdown)
+        
+        with app.app_context():
+            report_job_service.fail_orphaned()
+            db.session.remove()
+    except Exception as e:
+        app.logger.error(f"Error initializing report jobs: {e}")
+
+def initialize_report_scheduler(app):
+    """Iniciar el thread que ejecuta los reportes programados"""
+    try:
+        from app.services.report_scheduler_service import start_report_scheduler
+        
+        app.report_scheduler = start_report_scheduler(app)
+    except Exception as e:
+        app.logger.error(f"Error starting report scheduler: {e}")
+        app.report_scheduler = None
+
+def initialize_ai_index_updater(app):
+    """Iniciar el thread que parcha el modelo TF-IDF con los productos modificados"""
+    try:
+        from app.services.ai_index_updater import start_ai_index_updater
+        
+        app.ai_index_updater = start_ai_index_updater(app)
+    except Exception as e:
+        app.logger.error(f"Error starting AI index updater: {e}")
+        app.ai_index_updater = None
+
+def initialize_outbox_workers(app):
+    """Iniciar el pool de workers que drena la bandeja de salida transaccional"""
+    try:
+        from app.services.outbox_service import start_outbox_workers
+        
+        app.outbox_workers = start_outbox_workers(app)
+    except Exception as e:
+        app.logger.error(f"Error starting outbox workers: {e}")
+        app.outbox_workers = None
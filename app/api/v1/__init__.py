@@ -9,7 +9,7 @@ from flask import Blueprint  # type: ignore[reportMissingImports]
 api_bp = Blueprint('api_v1', __name__, url_prefix='/api/v1')
 
 # Importar endpoints
-from . import sales, products, users, health, simple_users, simple_products, auth, inventory, electronic_invoice, support_document, digital_certificate, payroll, accounts_receivable, quotation, dashboard, debug, roles, analytics, simple_reports, reports_final, reports_enhanced, qr_payments, system_stats, multi_payment, monitoring, products_enhanced, users_enhanced
+from . import sales, products, users, health, simple_users, simple_products, auth, inventory, electronic_invoice, support_document, digital_certificate, payroll, accounts_receivable, quotation, dashboard, debug, roles, analytics, simple_reports, reports_final, reports_enhanced, qr_payments, system_stats, multi_payment, monitoring, products_enhanced, users_enhanced, report_jobs, report_schedules
 
 # Registrar blueprints
 api_bp.register_blueprint(sales.sales_bp)
@@ -61,6 +61,10 @@ api_bp.register_blueprint(reports_final.reports_final_bp)
 # Registrar Reports Enhanced endpoints (MÓDULO MEJORADO CON EXCEL)
 api_bp.register_blueprint(reports_enhanced.reports_enhanced_bp)
 
+# Registrar trabajos de reporte asíncronos
+api_bp.register_blueprint(report_jobs.report_jobs_bp)
+api_bp.register_blueprint(report_schedules.report_schedules_bp)
+
 # Registrar Reports Professional endpoints (MÓDULO PROFESIONAL CON PDF)
 # Comentado temporalmente - se implementó en reports_enhanced
 
@@ -341,6 +341,47 @@ def get_aging_report():
         logger.error(f"Error generando reporte de antigüedad: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
 
+@accounts_receivable_bp.route('/reports/aging/customers', methods=['GET'])
+@jwt_required()
+def get_customer_aging():
+    """Obtener matriz de antigüedad por cliente (paginada, por saldo descendente)"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        overdue_only = request.args.get('overdue_only', 'false').lower() == 'true'
+        
+        report = ar_service.get_customer_aging(limit=limit, offset=offset, overdue_only=overdue_only)
+        
+        return jsonify(report), 200
+        
+    except Exception as e:
+        logger.error(f"Error generando antigüedad por cliente: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+@accounts_receivable_bp.route('/reports/aging/trend', methods=['GET'])
+@jwt_required()
+def get_aging_trend():
+    """Obtener tendencia de antigüedad desde las fotos diarias"""
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
+        
+        trend = ar_service.get_aging_trend(start_date, end_date)
+        
+        return jsonify({
+            'snapshots': trend,
+            'total': len(trend)
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Formato de fecha inválido (YYYY-MM-DD)'}), 400
+    except Exception as e:
+        logger.error(f"Error obteniendo tendencia de antigüedad: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
 @accounts_receivable_bp.route('/reports/customer-statement/<int:customer_id>', methods=['GET'])
 @jwt_required()
 def get_customer_statement(customer_id):
@@ -396,37 +437,32 @@ def get_collection_efficiency():
 def get_dashboard_summary():
     """Obtener resumen del dashboard de cartera"""
     try:
-        # Resumen general
+        # Resumen general (incluye facturas vencidas)
         general_summary = ar_service.get_invoices_summary()
         
-        # Facturas vencidas
-        overdue_invoices = ar_service.get_overdue_invoices()
-        overdue_amount = sum(float(inv.balance_amount) for inv in overdue_invoices)
-        
         # Reporte de antigüedad
         aging_report = ar_service.get_aging_report()
         
-        # Clientes con saldo pendiente
-        customers_with_balance = ar_service.get_customers(active_only=True)
-        customers_with_balance = [c for c in customers_with_balance if c.current_balance > 0]
+        # Clientes con saldo pendiente (los 10 de mayor saldo)
+        customer_aging = ar_service.get_customer_aging(limit=10)
         
         summary = {
             'general': general_summary,
             'overdue': {
-                'count': len(overdue_invoices),
-                'amount': overdue_amount
+                'count': general_summary['overdue_count'],
+                'amount': general_summary['overdue_amount']
             },
             'aging': aging_report,
-            'customers_with_balance': len(customers_with_balance),
+            'customers_with_balance': customer_aging['total_customers'],
             'top_customers': [
                 {
-                    'id': c.id,
-                    'name': c.name,
-                    'customer_code': c.customer_code,
-                    'balance': float(c.current_balance),
-                    'is_overdue': c.is_overdue
+                    'id': c['customer_id'],
+                    'name': c['name'],
+                    'customer_code': c['customer_code'],
+                    'balance': c['total_outstanding'],
+                    'is_overdue': c['is_overdue']
                 }
-                for c in sorted(customers_with_balance, key=lambda x: x.current_balance, reverse=True)[:10]
+                for c in customer_aging['customers']
             ]
         }
         
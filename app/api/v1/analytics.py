@@ -9,6 +9,7 @@ import logging
 from datetime import datetime, timedelta
 
 from app.services.analytics_service import analytics_service
+from app.services.report_cache_service import report_cache_service
 from app.middleware.rbac_middleware import require_permission
 from app.models.user import User
 
@@ -16,6 +17,14 @@ logger = logging.getLogger(__name__)
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/v1/analytics')
 
+# Cacheable y precalculable por nombre (el precálculo usa el período por defecto)
+report_cache_service.register_report(
+    'analytics.dashboard',
+    lambda period_days=7: analytics_service.get_dashboard_metrics(period_days),
+    params=lambda period_days=7: {'period_days': period_days, 'day': datetime.now().date().isoformat()},
+    domains=('sales', 'inventory')
+)
+
 @analytics_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 @require_permission('analytics:read')
@@ -36,8 +45,8 @@ def get_dashboard_metrics():
                 'error': 'El período debe estar entre 1 y 365 días'
             }), 400
         
-        # Obtener métricas
-        metrics = analytics_service.get_dashboard_metrics(period_days)
+        # Obtener métricas (cache versionado por escrituras de ventas e inventario)
+        metrics = report_cache_service.get_report('analytics.dashboard', period_days=period_days)
         
         logger.info(f"Dashboard metrics requested for {period_days} days")
         
@@ -14,6 +14,7 @@ from app.repositories.product_repository import ProductRepository
 from app.repositories.user_repository import UserRepository
 from app.exceptions import ValidationError, BusinessLogicError
 from app.services.auth_service import token_required, get_current_user
+from app.services.sales_rollup_service import sales_rollup_service
 import logging
 from datetime import datetime, timedelta
 
@@ -39,16 +40,20 @@ def get_dashboard_summary():
         product_repository = container.get(ProductRepository)
         user_repository = container.get(UserRepository)
         
-        # Temporalmente usar datos mock mientras se corrige el servicio
+        # Métricas de ventas desde los agregados: O(días), no O(ventas)
+        today = datetime.now().date()
+        month_start = today.replace(day=1)
+        period_start = today - timedelta(days=days)
+        
         dashboard_data = {
-            'sales_today': 0,
-            'sales_this_month': 0,
+            'sales_today': sales_rollup_service.get_totals(today, today, store_id)['revenue'],
+            'sales_this_month': sales_rollup_service.get_totals(month_start, today, store_id)['revenue'],
             'total_products': product_repository.count(),
             'total_users': user_repository.count(),
-            'low_stock_products': 0,
+            'low_stock_products': product_repository.get_low_stock_products(per_page=1)['pagination']['total'],
             'recent_sales': [],
-            'top_products': [],
-            'sales_trend': []
+            'top_products': sales_rollup_service.get_top_products(period_start, today, 5, store_id),
+            'sales_trend': sales_rollup_service.get_daily_series(period_start, today, store_id)
         }
         
         logger.info(f"Dashboard data retrieved for {days} days", extra={
@@ -90,12 +95,16 @@ def get_sales_summary():
         product_repository = container.get(ProductRepository)
         user_repository = container.get(UserRepository)
         
-        # Temporalmente usar datos mock
+        today = datetime.now().date()
+        totals = sales_rollup_service.get_totals()
+        
         sales_summary = {
-            'total_sales': 0,
-            'sales_today': 0,
-            'average_sale': 0,
-            'top_selling_products': []
+            'total_sales': totals['sales'],
+            'sales_today': sales_rollup_service.get_totals(today, today)['sales'],
+            'average_sale': totals['average_sale'],
+            'top_selling_products': sales_rollup_service.get_top_products(
+                today - timedelta(days=30), today, limit=5
+            )
         }
         
         return jsonify({
@@ -125,8 +134,10 @@ def get_top_products():
         product_repository = container.get(ProductRepository)
         user_repository = container.get(UserRepository)
         
-        # Temporalmente usar datos mock
-        top_products = []
+        today = datetime.now().date()
+        top_products = sales_rollup_service.get_top_products(
+            today - timedelta(days=days), today, limit=min(limit, 100)
+        )
         
         return jsonify({
             'status': 'success',
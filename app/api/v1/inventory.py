@@ -101,8 +101,7 @@ def get_low_stock_items():
         ai_suggestions = []
         try:
             if low_stock_items:
-                from app.services.ai_service import AIService
-                ai_service = AIService()
+                from app.services.ai_service import ai_service
                 first_product = low_stock_items[0]
                 ai_suggestions = ai_service.get_recommendations(first_product['id'], limit=3) or []
         except Exception as e:  # pragma: no cover - IA opcional
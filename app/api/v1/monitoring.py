@@ -240,6 +240,19 @@ def get_redis_info():
         logger.error(f"Error getting Redis info: {e}")
         raise APIError("Error al obtener información de Redis", 500)
 
+@monitoring_bp.route('/metrics/report-cache', methods=['GET'])
+@error_handler
+def get_report_cache_metrics():
+    """
+    Endpoint para obtener aciertos/fallos del cache de reportes
+    """
+    from app.services.report_cache_service import report_cache_service
+    
+    return jsonify({
+        "success": True,
+        "data": report_cache_service.get_stats()
+    })
+
 @monitoring_bp.route('/rate-limit/info', methods=['GET'])
 @error_handler
 def get_rate_limit_info():
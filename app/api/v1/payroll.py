@@ -404,6 +404,35 @@ def get_payroll_summary(period_id):
         logger.error(f"Error generando resumen: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
 
+@payroll_bp.route('/reports/period/<int:period_id>/simulate', methods=['POST'])
+@jwt_required()
+def simulate_payroll_period(period_id):
+    """Simular el período con aumentos salariales y/o variaciones de configuración
+
+    Body: salary_increase_pct, department_increases ({departamento: %}),
+    config_id, config (health_percentage, pension_percentage,
+    overtime_multiplier, tax_free_annual_amount) y department. No modifica
+    las nóminas registradas.
+    """
+    try:
+        data = request.get_json() or {}
+
+        simulation = payroll_service.simulate_period(
+            period_id,
+            salary_increase_pct=data.get('salary_increase_pct', 0),
+            department_increases=data.get('department_increases'),
+            config_id=data.get('config_id'),
+            config_overrides=data.get('config'),
+            department=data.get('department')
+        )
+        return jsonify(simulation), 200
+
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error simulando nómina: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
 @payroll_bp.route('/reports/employee/<int:employee_id>/history', methods=['GET'])
 @jwt_required()
 def get_employee_payroll_history(employee_id):
@@ -434,12 +463,9 @@ def calculate_payroll_batch():
             return jsonify({'error': 'Datos requeridos'}), 400
         
         period_id = data.get('period_id')
-        employee_ids = data.get('employee_ids', [])
-        
         if not period_id:
             return jsonify({'error': 'ID de período es requerido'}), 400
         
-        # Obtener período
         period = payroll_service.get_payroll_period(period_id)
         if not period:
             return jsonify({'error': 'Período no encontrado'}), 404
@@ -447,56 +473,25 @@ def calculate_payroll_batch():
         if period.is_locked:
             return jsonify({'error': 'Período bloqueado'}), 400
         
-        # Obtener empleados activos
-        if employee_ids:
-            employees = [payroll_service.get_employee(eid) for eid in employee_ids]
-            employees = [e for e in employees if e and e.is_currently_active]
-        else:
-            employees = payroll_service.get_employees(active_only=True)
-        
-        results = []
-        errors = []
-        
-        for employee in employees:
-            try:
-                # Crear nómina si no existe
-                existing_payroll = payroll_service.get_payrolls_by_period(period_id)
-                existing_payroll = next((p for p in existing_payroll if p.employee_id == employee.id), None)
-                
-                if not existing_payroll:
-                    # Crear nómina básica
-                    payroll_data = {
-                        'days_worked': 30,  # Días del mes
-                        'hours_worked': employee.work_hours_per_day * 30,
-                        'overtime_hours': 0,
-                        'bonuses': 0,
-                        'commissions': 0,
-                        'other_deductions': 0
-                    }
-                    
-                    payroll = payroll_service.create_payroll(employee.id, period_id, payroll_data)
-                else:
-                    payroll = existing_payroll
-                
-                # Calcular nómina
-                payroll = payroll_service.calculate_payroll(payroll.id)
-                results.append(payroll.to_dict())
-                
-            except Exception as e:
-                errors.append({
-                    'employee_id': employee.id,
-                    'employee_code': employee.employee_code,
-                    'error': str(e)
-                })
+        # Liquidación masiva: una pasada vectorizada y escrituras por lotes
+        run = payroll_service.run_period(
+            period_id,
+            employee_ids=data.get('employee_ids') or None,
+            inputs=data.get('inputs'),
+            chunk_size=data.get('chunk_size')
+        )
         
         return jsonify({
-            'message': f'Nómina calculada para {len(results)} empleados',
-            'results': results,
-            'errors': errors,
-            'total_processed': len(results),
-            'total_errors': len(errors)
+            'message': f'Nómina calculada para {run["total_processed"]} empleados',
+            'results': run['results'],
+            'errors': run['errors'],
+            'skipped': run['skipped'],
+            'total_processed': run['total_processed'],
+            'total_errors': run['total_errors']
         }), 200
         
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error calculando nómina en lote: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
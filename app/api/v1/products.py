@@ -83,11 +83,16 @@ def get_products():
         # Obtener parámetros de paginación
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+        # Paginación por cursor: ?cursor= (vacío) inicia, luego next_cursor/prev_cursor
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'true').lower() != 'false'
         
         # Obtener filtros
         category = request.args.get('category')
         is_active = request.args.get('is_active', type=bool)
         search = request.args.get('search')
+        # Campos dispersos: ?fields=id,name,price
+        fields = request.args.get('fields')
         
         # Obtener servicio
         product_repository = container.get(ProductRepository)
@@ -102,11 +107,17 @@ def get_products():
         
         # Obtener productos
         if search:
-            result = product_repository.search_products(search, page=page, per_page=per_page)
-            products = [product.to_dict() for product in result['items']]
+            result = product_service.search_products(
+                search, page=page, per_page=per_page, fields=fields,
+                cursor=cursor, include_total=include_total
+            )
+            products = result['products']
             pagination = result['pagination']
         else:
-            result = product_service.get_products(page=page, per_page=per_page, **filters)
+            result = product_service.get_products(
+                page=page, per_page=per_page, fields=fields, cursor=cursor,
+                include_total=include_total, **filters
+            )
             products = result['products']
             pagination = result['pagination']
         
@@ -118,6 +129,9 @@ def get_products():
             }
         })
         
+    except ValidationError as e:
+        return jsonify(e.to_dict()), e.status_code
+    
     except Exception as e:
         logger.error(f"Error in get_products: {str(e)}")
         return jsonify({
@@ -161,19 +175,27 @@ def get_low_stock_products():
         # Obtener parámetros de paginación
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+        # Paginación por cursor: ?cursor= (vacío) inicia, luego next_cursor/prev_cursor
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'true').lower() != 'false'
         
         # Obtener servicio
         product_repository = container.get(ProductRepository)
         product_service = ProductService(product_repository)
         
         # Obtener productos con stock bajo
-        result = product_service.get_low_stock_products(page=page, per_page=per_page)
+        result = product_service.get_low_stock_products(
+            page=page, per_page=per_page, cursor=cursor, include_total=include_total
+        )
         
         return jsonify({
             'status': 'success',
             'data': result
         })
         
+    except ValidationError as e:
+        return jsonify(e.to_dict()), e.status_code
+    
     except Exception as e:
         logger.error(f"Error in get_low_stock_products: {str(e)}")
         return jsonify({
@@ -0,0 +1,119 @@
+"""
+API de Trabajos de Reporte - Sistema POS O'Data
+==============================================
+Generación asíncrona de reportes pesados: se encola el trabajo, se consulta
+su estado/progreso y se descarga el artefacto cuando termina.
+"""
+
+from flask import Blueprint, request, jsonify, send_file, g
+from app.middleware.rbac_middleware import require_permission
+from app.exceptions import ValidationError, BusinessLogicError, NotFoundError
+from app.services.report_job_service import report_job_service, REPORT_JOB_TYPES
+import logging
+
+logger = logging.getLogger(__name__)
+
+report_jobs_bp = Blueprint('report_jobs', __name__, url_prefix='/reports/jobs')
+
+
+@report_jobs_bp.route('', methods=['POST'])
+@require_permission('reports:read')
+def create_report_job():
+    """Encolar un reporte; responde 202 con el id del trabajo"""
+    try:
+        data = request.get_json() or {}
+        job = report_job_service.submit(
+            data.get('report_type'),
+            data.get('params'),
+            created_by=g.get('current_user_id')
+        )
+
+        return jsonify({
+            'status': 'success',
+            'data': job.to_dict(),
+            'message': 'Report job queued'
+        }), 202
+
+    except (ValidationError, BusinessLogicError) as e:
+        logger.warning(f"Report job rejected: {e.message}", extra={'context': e.context})
+        return jsonify(e.to_dict()), e.status_code
+
+    except Exception as e:
+        logger.error(f"Unexpected error in create_report_job: {str(e)}")
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': 'An internal error occurred'
+            }
+        }), 500
+
+
+@report_jobs_bp.route('/types', methods=['GET'])
+@require_permission('reports:read')
+def list_report_job_types():
+    """Tipos de reporte disponibles como trabajo"""
+    return jsonify({
+        'status': 'success',
+        'data': sorted(REPORT_JOB_TYPES)
+    }), 200
+
+
+@report_jobs_bp.route('/<string:job_id>', methods=['GET'])
+@require_permission('reports:read')
+def get_report_job(job_id):
+    """Estado y progreso de un trabajo"""
+    try:
+        job = report_job_service.get(job_id)
+        data = job.to_dict()
+        if job.status == 'completed':
+            data['download_url'] = f'/api/v1/reports/jobs/{job.id}/download'
+
+        return jsonify({
+            'status': 'success',
+            'data': data
+        }), 200
+
+    except NotFoundError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+
+@report_jobs_bp.route('/<string:job_id>/cancel', methods=['POST'])
+@require_permission('reports:read')
+def cancel_report_job(job_id):
+    """Solicitar la cancelación de un trabajo en cola o en ejecución"""
+    try:
+        job = report_job_service.cancel(job_id)
+
+        return jsonify({
+            'status': 'success',
+            'data': job.to_dict(),
+            'message': 'Cancellation requested' if not job.is_finished else f'Job {job.status}'
+        }), 200
+
+    except NotFoundError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+
+@report_jobs_bp.route('/<string:job_id>/download', methods=['GET'])
+@require_permission('reports:read')
+def download_report_job(job_id):
+    """Descargar el artefacto de un trabajo completado"""
+    try:
+        job = report_job_service.artifact(job_id)
+
+        response = send_file(
+            job.artifact_path,
+            mimetype=job.content_type,
+            as_attachment=True,
+            download_name=job.artifact_name
+        )
+        response.headers['Access-Control-Expose-Headers'] = 'Content-Disposition'
+        return response
+
+    except NotFoundError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+    except BusinessLogicError as e:
+        # 409 mientras el trabajo no termina; 410 si terminó sin artefacto disponible
+        status_code = 410 if report_job_service.get(job_id).is_finished else 409
+        return jsonify(e.to_dict()), status_code
@@ -0,0 +1,125 @@
+"""
+API de Reportes Programados - Sistema POS O'Data
+===============================================
+Alta y administración de programaciones de reportes: generación recurrente
+con envío por email y precálculo de dashboards fuera de horario.
+"""
+
+from flask import Blueprint, request, jsonify, g
+from app.middleware.rbac_middleware import require_permission
+from app.exceptions import ValidationError, BusinessLogicError, NotFoundError
+from app.models.report_job import ReportJob
+from app.services.report_scheduler_service import report_scheduler_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+report_schedules_bp = Blueprint('report_schedules', __name__, url_prefix='/reports/schedules')
+
+
+@report_schedules_bp.route('', methods=['POST'])
+@require_permission('reports:write')
+def create_report_schedule():
+    """Crear una programación
+
+    Body: name, report_type (tipo de trabajo de reporte, cache_warmup o
+    ar_aging_snapshot), params (admite period relativo, p. ej.
+    previous_day), recipients, catch_up y cron o
+    frequency/time/day_of_week/day_of_month.
+    """
+    try:
+        data = request.get_json() or {}
+        schedule = report_scheduler_service.create_schedule(
+            name=data.get('name'),
+            report_type=data.get('report_type'),
+            schedule_config=data,
+            params=data.get('params'),
+            recipients=data.get('recipients'),
+            created_by=g.get('current_user_id'),
+            catch_up=bool(data.get('catch_up', True))
+        )
+
+        return jsonify({
+            'status': 'success',
+            'data': schedule.to_dict(),
+            'message': 'Report schedule created'
+        }), 201
+
+    except ValidationError as e:
+        logger.warning(f"Validation error in create_report_schedule: {e.message}", extra={'context': e.context})
+        return jsonify(e.to_dict()), e.status_code
+
+    except Exception as e:
+        logger.error(f"Unexpected error in create_report_schedule: {str(e)}")
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': 'An internal error occurred'
+            }
+        }), 500
+
+
+@report_schedules_bp.route('', methods=['GET'])
+@require_permission('reports:read')
+def list_report_schedules():
+    """Listar programaciones (include_inactive=true para incluir las desactivadas)"""
+    include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
+    schedules = report_scheduler_service.list_schedules(include_inactive)
+
+    return jsonify({
+        'status': 'success',
+        'data': [schedule.to_dict() for schedule in schedules]
+    }), 200
+
+
+@report_schedules_bp.route('/<int:schedule_id>', methods=['GET'])
+@require_permission('reports:read')
+def get_report_schedule(schedule_id):
+    """Detalle de una programación con sus últimos trabajos"""
+    try:
+        schedule = report_scheduler_service.get_schedule(schedule_id)
+        recent_jobs = ReportJob.query.filter_by(schedule_id=schedule.id).order_by(
+            ReportJob.created_at.desc()
+        ).limit(10).all()
+
+        data = schedule.to_dict()
+        data['recent_jobs'] = [job.to_dict() for job in recent_jobs]
+        return jsonify({
+            'status': 'success',
+            'data': data
+        }), 200
+
+    except NotFoundError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+
+@report_schedules_bp.route('/<int:schedule_id>', methods=['DELETE'])
+@require_permission('reports:write')
+def deactivate_report_schedule(schedule_id):
+    """Desactivar una programación"""
+    try:
+        schedule = report_scheduler_service.deactivate(schedule_id)
+        return jsonify({
+            'status': 'success',
+            'data': schedule.to_dict(),
+            'message': 'Report schedule deactivated'
+        }), 200
+
+    except NotFoundError as e:
+        return jsonify(e.to_dict()), e.status_code
+
+
+@report_schedules_bp.route('/<int:schedule_id>/run', methods=['POST'])
+@require_permission('reports:write')
+def run_report_schedule(schedule_id):
+    """Ejecutar una programación en el próximo sondeo del planificador"""
+    try:
+        schedule = report_scheduler_service.run_now(schedule_id)
+        return jsonify({
+            'status': 'success',
+            'data': schedule.to_dict(),
+            'message': 'Report schedule will run shortly'
+        }), 202
+
+    except (NotFoundError, BusinessLogicError) as e:
+        return jsonify(e.to_dict()), e.status_code
@@ -7,21 +7,15 @@ Módulo robusto con exportación a Excel y visualización clara de datos
 from flask import Blueprint, request, jsonify, send_file
 from app.middleware.rbac_middleware import require_permission
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, desc, text
+from sqlalchemy import func, and_, text
 import logging
 import traceback
 import io
-import tempfile
-import os
 
-# Importar openpyxl para Excel
-try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
+# Exportación a Excel en streaming (openpyxl write-only)
+from app.utils.streaming_export import EXCEL_AVAILABLE, StreamingWorkbook, iter_query_rows
+
+if not EXCEL_AVAILABLE:
     logging.warning("openpyxl no disponible. Exportación a Excel deshabilitada.")
 
 # Importar reportlab para PDF
@@ -41,6 +35,11 @@ from app import db
 from app.models.sale import Sale, SaleItem
 from app.models.product import Product
 from app.models.user import User
+from app.services.sales_rollup_service import sales_rollup_service
+from app.services.report_cache_service import report_cache_service
+from app.services.report_engine import (
+    report_engine, safe_execute_query, format_currency, get_date_range, percentage
+)
 
 logger = logging.getLogger(__name__)
 
@@ -52,61 +51,6 @@ reports_enhanced_bp = Blueprint('reports_enhanced', __name__, url_prefix='/repor
 # ===============================================
 
 
-def safe_execute_query(query_func, default_value=None):
-    """Ejecutar consulta de forma segura con manejo de errores"""
-    try:
-        return query_func()
-    except Exception as e:
-        logger.error(f"Error en consulta: {str(e)}")
-        return default_value
-
-
-def format_currency(amount):
-    """Formatear cantidad como moneda"""
-    return float(amount) if amount is not None else 0.0
-
-
-def get_date_range(start_date_str=None, end_date_str=None, default_days=30):
-    """Obtener rango de fechas con valores por defecto"""
-    if not start_date_str:
-        start_date = datetime.now() - timedelta(days=default_days)
-    else:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-
-    if not end_date_str:
-        end_date = datetime.now()
-    else:
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1)
-
-    return start_date, end_date
-
-
-def create_excel_workbook():
-    """Crear workbook de Excel con estilos profesionales"""
-    if not EXCEL_AVAILABLE:
-        raise Exception("openpyxl no está disponible")
-
-    wb = Workbook()
-
-    # Estilos profesionales
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    center_alignment = Alignment(horizontal="center", vertical="center")
-
-    return wb, {
-        'header_font': header_font,
-        'header_fill': header_fill,
-        'border': border,
-        'center_alignment': center_alignment
-    }
-
-
 def create_pdf_report(report_data, report_type, filename):
     """Crear reporte PDF profesional"""
     if not PDF_AVAILABLE:
@@ -218,36 +162,6 @@ def create_pdf_report(report_data, report_type, filename):
         return None
 
 
-def apply_excel_styles(ws, styles, start_row=1, end_row=None, start_col=1, end_col=None):
-    """Aplicar estilos profesionales a una hoja de Excel"""
-    if end_row is None:
-        end_row = ws.max_row
-    if end_col is None:
-        end_col = ws.max_column
-
-    # Aplicar estilos a headers
-    for col in range(start_col, end_col + 1):
-        cell = ws.cell(row=start_row, column=col)
-        cell.font = styles['header_font']
-        cell.fill = styles['header_fill']
-        cell.alignment = styles['center_alignment']
-        cell.border = styles['border']
-
-    # Aplicar bordes a todas las celdas
-    for row in range(start_row, end_row + 1):
-        for col in range(start_col, end_col + 1):
-            ws.cell(row=row, column=col).border = styles['border']
-
-    # Autoajustar columnas
-    for col in range(start_col, end_col + 1):
-        column_letter = get_column_letter(col)
-        max_length = 0
-        for row in range(start_row, end_row + 1):
-            cell_value = ws.cell(row=row, column=col).value
-            if cell_value:
-                max_length = max(max_length, len(str(cell_value)))
-        ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
-
 # ===============================================
 # ENDPOINTS PRINCIPALES MEJORADOS
 # ===============================================
@@ -298,68 +212,31 @@ def sales_analytics():
 
         start_date, end_date = get_date_range(start_date_str, end_date_str)
 
-        # Consulta principal de ventas con información del vendedor
-        sales_query = db.session.query(
-            Sale.id,
-            Sale.created_at,
-            Sale.total_amount,
-            Sale.payment_method,
-            Sale.status,
-            User.username.label('seller')
-        ).join(User, Sale.user_id == User.id).filter(
-            and_(
-                Sale.created_at >= start_date,
-                Sale.created_at < end_date
-            )
-        ).order_by(desc(Sale.created_at))
-
-        sales = safe_execute_query(lambda: sales_query.all(), [])
-
-        # Procesar estadísticas avanzadas
-        total_sales = len(sales)
-        total_revenue = sum(format_currency(sale.total_amount) for sale in sales)
-        average_sale = total_revenue / total_sales if total_sales > 0 else 0
-
-        # Análisis temporal
-        temporal_analysis = {}
-        payment_analysis = {}
-        seller_analysis = {}
-
-        for sale in sales:
-            # Análisis temporal
-            if group_by == 'day':
-                key = sale.created_at.strftime('%Y-%m-%d')
-            elif group_by == 'hour':
-                key = sale.created_at.strftime('%H:00')
-            elif group_by == 'week':
-                key = sale.created_at.strftime('%Y-W%U')
-            else:  # month
-                key = sale.created_at.strftime('%Y-%m')
-
-            if key not in temporal_analysis:
-                temporal_analysis[key] = {'sales': 0, 'revenue': 0}
-            temporal_analysis[key]['sales'] += 1
-            temporal_analysis[key]['revenue'] += format_currency(sale.total_amount)
-
-            # Análisis por método de pago
-            method = sale.payment_method or 'Efectivo'
-            if method not in payment_analysis:
-                payment_analysis[method] = {'count': 0, 'total': 0}
-            payment_analysis[method]['count'] += 1
-            payment_analysis[method]['total'] += format_currency(sale.total_amount)
-
-            # Análisis por vendedor
-            seller = sale.seller or 'Desconocido'
-            if seller not in seller_analysis:
-                seller_analysis[seller] = {'sales': 0, 'revenue': 0}
-            seller_analysis[seller]['sales'] += 1
-            seller_analysis[seller]['revenue'] += format_currency(sale.total_amount)
+        # Resumen y desgloses (período, método de pago, vendedor) en una sola sentencia
+        temporal_dimension = group_by if group_by in ('day', 'hour', 'week') else 'month'
+        report = safe_execute_query(
+            lambda: report_engine.aggregate(
+                'sales', ['sales', 'revenue', 'average_sale'],
+                [temporal_dimension, 'payment_method', 'seller'],
+                {'start': start_date, 'end': end_date}
+            ),
+            {'summary': {'sales': 0, 'revenue': 0.0, 'average_sale': 0.0},
+             'breakdowns': {temporal_dimension: [], 'payment_method': [], 'seller': []}}
+        )
+
+        summary = report['summary']
+        total_sales = summary['sales']
+        total_revenue = summary['revenue']
+        average_sale = summary['average_sale']
+
+        sorted_temporal = report['breakdowns'][temporal_dimension]
+        payment_analysis = report['breakdowns']['payment_method']
+        sellers_by_revenue = sorted(report['breakdowns']['seller'], key=lambda x: x['revenue'], reverse=True)
 
         # Calcular tendencias
-        sorted_temporal = sorted(temporal_analysis.items())
         if len(sorted_temporal) >= 2:
-            recent_period = sorted_temporal[-1][1]['revenue']
-            previous_period = sorted_temporal[-2][1]['revenue']
+            recent_period = sorted_temporal[-1]['revenue']
+            previous_period = sorted_temporal[-2]['revenue']
             growth_rate = ((recent_period - previous_period) / previous_period * 100) if previous_period > 0 else 0
         else:
             growth_rate = 0
@@ -369,20 +246,18 @@ def sales_analytics():
         if include_charts:
             chart_data = {
                 'temporal_chart': {
-                    'labels': [item[0] for item in sorted_temporal],
-                    'sales_data': [item[1]['sales'] for item in sorted_temporal],
-                    'revenue_data': [item[1]['revenue'] for item in sorted_temporal]
+                    'labels': [item['key'] for item in sorted_temporal],
+                    'sales_data': [item['sales'] for item in sorted_temporal],
+                    'revenue_data': [item['revenue'] for item in sorted_temporal]
                 },
                 'payment_chart': {
-                    'labels': list(payment_analysis.keys()),
-                    'data': [payment_analysis[method]['total'] for method in payment_analysis.keys()]
+                    'labels': [item['key'] for item in payment_analysis],
+                    'data': [item['revenue'] for item in payment_analysis]
                 },
-                'top_sellers': sorted(
-                    [{'name': seller, 'sales': data['sales'], 'revenue': data['revenue']}
-                     for seller, data in seller_analysis.items()],
-                    key=lambda x: x['revenue'],
-                    reverse=True
-                )[:5]
+                'top_sellers': [
+                    {'name': item['key'], 'sales': item['sales'], 'revenue': item['revenue']}
+                    for item in sellers_by_revenue[:5]
+                ]
             }
 
         response_data = {
@@ -403,28 +278,26 @@ def sales_analytics():
                 'analytics': {
                     'temporal_breakdown': [
                         {
-                            'period': period,
-                            'sales': data['sales'],
-                            'revenue': round(data['revenue'], 2),
-                            'percentage': round((data['revenue'] / total_revenue * 100) if total_revenue > 0 else 0, 1)
+                            'period': item['key'],
+                            'sales': item['sales'],
+                            'revenue': round(item['revenue'], 2),
+                            'percentage': percentage(item['revenue'], total_revenue)
                         }
-                        for period, data in sorted_temporal
+                        for item in sorted_temporal
                     ],
                     'payment_methods': [
                         {
-                            'method': method,
-                            'count': data['count'],
-                            'total': round(data['total'], 2),
-                            'percentage': round((data['total'] / total_revenue * 100) if total_revenue > 0 else 0, 1)
+                            'method': item['key'],
+                            'count': item['sales'],
+                            'total': round(item['revenue'], 2),
+                            'percentage': percentage(item['revenue'], total_revenue)
                         }
-                        for method, data in payment_analysis.items()
+                        for item in payment_analysis
                     ],
-                    'top_sellers': sorted(
-                        [{'seller': seller, 'sales': data['sales'], 'revenue': round(data['revenue'], 2)}
-                         for seller, data in seller_analysis.items()],
-                        key=lambda x: x['revenue'],
-                        reverse=True
-                    )[:10]
+                    'top_sellers': [
+                        {'seller': item['key'], 'sales': item['sales'], 'revenue': round(item['revenue'], 2)}
+                        for item in sellers_by_revenue[:10]
+                    ]
                 },
                 'charts': chart_data if include_charts else None
             },
@@ -451,90 +324,59 @@ def inventory_analytics():
         include_details = request.args.get('details', 'false').lower() == 'true'
         category_filter = request.args.get('category')
 
-        # Query base con información completa
-        query = db.session.query(Product).filter(Product.is_active.is_(True))
-
-        # Aplicar filtros
-        if category_filter:
-            query = query.filter(Product.category == category_filter)
+        filters = {'category': category_filter}
 
-        products = safe_execute_query(lambda: query.order_by(Product.category, Product.name).all(), [])
+        # Resumen y categorías en una sentencia; los productos en alerta en otra
+        report = safe_execute_query(
+            lambda: report_engine.aggregate(
+                'inventory',
+                ['product_count', 'stock_units', 'inventory_value', 'low_stock_in_stock', 'out_of_stock', 'overstock'],
+                ['category'], filters
+            ),
+            None
+        )
+        if report is None:
+            report = {'summary': {'product_count': 0, 'stock_units': 0, 'inventory_value': 0.0},
+                      'breakdowns': {'category': []}}
+        alert_rows = safe_execute_query(
+            lambda: report_engine.rows(
+                'inventory', ['id', 'name', 'category', 'price', 'stock', 'min_stock', 'stock_status'],
+                dict(filters, stock_status=['out_of_stock', 'low_stock', 'overstock']),
+                order_by=[('category', False), ('name', False)]
+            ),
+            []
+        )
 
-        # Análisis avanzado
-        total_products = len(products)
-        total_stock_units = sum(getattr(product, 'stock', 0) for product in products)
-        total_value = sum(format_currency(getattr(product, 'price', 0) * getattr(product, 'stock', 0)) for product in products)
+        summary = report['summary']
+        total_products = summary['product_count']
+        total_value = summary['inventory_value']
 
-        # Análisis por categoría
-        categories = {}
         stock_alerts = {
             'low_stock': [],
             'out_of_stock': [],
             'overstock': []
         }
-
-        for product in products:
-            stock = getattr(product, 'stock', 0)
-            min_stock = getattr(product, 'min_stock', 5)
-            price = format_currency(getattr(product, 'price', 0))
-
-            # Análisis por categoría
-            category = product.category or 'Sin categoría'
-            if category not in categories:
-                categories[category] = {
-                    'product_count': 0,
-                    'total_stock': 0,
-                    'total_value': 0,
-                    'low_stock_items': 0,
-                    'out_of_stock_items': 0
-                }
-
-            categories[category]['product_count'] += 1
-            categories[category]['total_stock'] += stock
-            categories[category]['total_value'] += price * stock
-
-            # Clasificar estado del stock
-            if stock == 0:
-                stock_alerts['out_of_stock'].append({
-                    'id': product.id,
-                    'name': product.name,
-                    'category': category,
-                    'current_stock': stock,
-                    'min_stock': min_stock,
-                    'price': price
-                })
-                categories[category]['out_of_stock_items'] += 1
-            elif stock <= min_stock:
-                stock_alerts['low_stock'].append({
-                    'id': product.id,
-                    'name': product.name,
-                    'category': category,
-                    'current_stock': stock,
-                    'min_stock': min_stock,
-                    'price': price,
-                    'days_remaining': stock  # Estimación simple
-                })
-                categories[category]['low_stock_items'] += 1
-
-            # Detectar overstock (más de 3x el mínimo)
-            if stock > (min_stock * 3):
-                stock_alerts['overstock'].append({
-                    'id': product.id,
-                    'name': product.name,
-                    'category': category,
-                    'current_stock': stock,
-                    'min_stock': min_stock,
-                    'price': price
-                })
+        for product in alert_rows:
+            alert = {
+                'id': product['id'],
+                'name': product['name'],
+                'category': product['category'] or 'Sin categoría',
+                'current_stock': product['stock'],
+                'min_stock': product['min_stock'],
+                'price': format_currency(product['price'])
+            }
+            if product['stock_status'] == 'low_stock':
+                alert['days_remaining'] = product['stock']  # Estimación simple
+            stock_alerts[product['stock_status']].append(alert)
 
         response_data = {
             'success': True,
             'data': {
                 'summary': {
                     'total_products': total_products,
-                    'total_stock_units': total_stock_units,
+                    'total_stock_units': summary['stock_units'],
                     'total_inventory_value': round(total_value, 2),
-                    'categories_count': len(categories),
+                    'categories_count': len(report['breakdowns']['category']),
                     'alerts_count': {
                         'low_stock': len(stock_alerts['low_stock']),
                         'out_of_stock': len(stock_alerts['out_of_stock']),
@@ -543,15 +385,15 @@ def inventory_analytics():
                 },
                 'categories_analysis': [
                     {
-                        'category': cat,
-                        'product_count': data['product_count'],
-                        'total_stock': data['total_stock'],
-                        'total_value': round(data['total_value'], 2),
-                        'low_stock_items': data['low_stock_items'],
-                        'out_of_stock_items': data['out_of_stock_items'],
-                        'percentage_of_total': round((data['total_value'] / total_value * 100) if total_value > 0 else 0, 1)
+                        'category': item['key'],
+                        'product_count': item['product_count'],
+                        'total_stock': item['stock_units'],
+                        'total_value': round(item['inventory_value'], 2),
+                        'low_stock_items': item['low_stock_in_stock'],
+                        'out_of_stock_items': item['out_of_stock'],
+                        'percentage_of_total': percentage(item['inventory_value'], total_value)
                     }
-                    for cat, data in categories.items()
+                    for item in report['breakdowns']['category']
                 ],
                 'stock_alerts': stock_alerts,
                 'recommendations': [
@@ -572,41 +414,30 @@ def inventory_analytics():
 
         # Incluir detalles si se solicita
         if include_details:
-            products_details = []
-            for product in products[:100]:  # Limitar para rendimiento
-                stock = getattr(product, 'stock', 0)
-                min_stock = getattr(product, 'min_stock', 5)
-                price = format_currency(getattr(product, 'price', 0))
-
-                # Determinar estado del stock
-                if stock == 0:
-                    status = 'out_of_stock'
-                    urgency = 'high'
-                elif stock <= min_stock:
-                    status = 'low_stock'
-                    urgency = 'medium'
-                elif stock > (min_stock * 3):
-                    status = 'overstock'
-                    urgency = 'low'
-                else:
-                    status = 'normal'
-                    urgency = 'low'
-
-                products_details.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'sku': getattr(product, 'sku', ''),
-                    'category': product.category or 'Sin categoría',
-                    'price': price,
-                    'current_stock': stock,
-                    'min_stock': min_stock,
-                    'stock_value': round(price * stock, 2),
-                    'status': status,
-                    'urgency': urgency,
-                    'needs_reorder': stock <= min_stock
-                })
-
-            response_data['data']['products_details'] = products_details
+            urgency = {'out_of_stock': 'high', 'low_stock': 'medium', 'overstock': 'low', 'normal': 'low'}
+            products = safe_execute_query(
+                lambda: report_engine.rows(
+                    'inventory', ['id', 'name', 'sku', 'category', 'price', 'stock', 'min_stock', 'stock_status'],
+                    filters, order_by=[('category', False), ('name', False)], limit=100
+                ),
+                []
+            )
+            response_data['data']['products_details'] = [
+                {
+                    'id': product['id'],
+                    'name': product['name'],
+                    'sku': product['sku'] or '',
+                    'category': product['category'] or 'Sin categoría',
+                    'price': format_currency(product['price']),
+                    'current_stock': product['stock'],
+                    'min_stock': product['min_stock'],
+                    'stock_value': round(format_currency(product['price']) * product['stock'], 2),
+                    'status': product['stock_status'],
+                    'urgency': urgency[product['stock_status']],
+                    'needs_reorder': product['stock'] <= product['min_stock']
+                }
+                for product in products
+            ]
 
         return jsonify(response_data), 200
 
@@ -620,6 +451,192 @@ def inventory_analytics():
         }), 500
 
 
+def _untracked(rows, total):
+    return rows
+
+
+def build_sales_workbook(start_date, end_date, track=_untracked):
+    """Workbook de ventas del rango [start_date, end_date) y nombre de archivo sugerido
+
+    El detalle se escribe en streaming (yield_per + openpyxl write-only) y el
+    resumen y el análisis por método de pago salen de agregados SQL. track
+    envuelve las filas del detalle (p. ej. para reportar progreso de un job).
+    """
+    sales_filter = and_(
+        Sale.created_at >= start_date,
+        Sale.created_at < end_date
+    )
+
+    # Resumen por método de pago (agregado SQL, sin cargar ventas)
+    method = func.coalesce(Sale.payment_method, 'Efectivo')
+    payment_analysis = db.session.query(
+        method, func.count(Sale.id), func.coalesce(func.sum(Sale.total_amount), 0)
+    ).filter(sales_filter).group_by(method).all()
+
+    total_sales = sum(count for _, count, _ in payment_analysis)
+    total_revenue = sum(format_currency(total) for _, _, total in payment_analysis)
+    average_sale = total_revenue / total_sales if total_sales > 0 else 0
+
+    workbook = StreamingWorkbook()
+
+    # Hoja 1: Resumen
+    workbook.add_summary_sheet('Resumen de Ventas', 'REPORTE DE VENTAS - SISTEMA POS SABROSITAS', [
+        ('Período:', f'{start_date.strftime("%Y-%m-%d")} a {(end_date - timedelta(days=1)).strftime("%Y-%m-%d")}'),
+        ('Total de Ventas:', total_sales),
+        ('Ingresos Totales:', f'${total_revenue:,.2f}'),
+        ('Venta Promedio:', f'${average_sale:,.2f}'),
+        ('Generado:', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    ])
+
+    # Hoja 2: Detalle de Ventas (streaming desde la base)
+    sales_query = db.session.query(
+        Sale.id,
+        Sale.created_at,
+        Sale.total_amount,
+        Sale.payment_method,
+        Sale.status,
+        User.username.label('seller')
+    ).join(User, Sale.user_id == User.id).filter(sales_filter).order_by(Sale.created_at)
+
+    workbook.add_table_sheet(
+        'Detalle de Ventas',
+        ['ID Venta', 'Fecha', 'Hora', 'Total', 'Método de Pago', 'Estado', 'Vendedor'],
+        track((
+            (
+                sale.id,
+                sale.created_at.strftime('%Y-%m-%d'),
+                sale.created_at.strftime('%H:%M:%S'),
+                format_currency(sale.total_amount),
+                sale.payment_method or 'Efectivo',
+                sale.status,
+                sale.seller
+            )
+            for sale in iter_query_rows(sales_query)
+        ), total_sales),
+        widths=[10, 12, 10, 15, 18, 12, 20],
+        money_columns=(3,)
+    )
+
+    # Hoja 3: Análisis por Método de Pago
+    workbook.add_table_sheet(
+        'Análisis por Pago',
+        ['Método de Pago', 'Cantidad', 'Total', 'Porcentaje'],
+        [
+            (
+                method_name,
+                count,
+                format_currency(total),
+                f"{(format_currency(total) / total_revenue * 100) if total_revenue else 0:.1f}%"
+            )
+            for method_name, count, total in payment_analysis
+        ],
+        widths=[20, 12, 18, 12],
+        money_columns=(2,)
+    )
+
+    filename = f'ventas_{start_date.strftime("%Y%m%d")}_to_{(end_date - timedelta(days=1)).strftime("%Y%m%d")}.xlsx'
+    return workbook, filename
+
+
+def build_inventory_workbook(category_filter=None, track=_untracked):
+    """Workbook de inventario (opcionalmente de una categoría) y nombre de archivo sugerido
+
+    El detalle de productos se escribe en streaming; resumen y categorías
+    salen de agregados SQL.
+    """
+    filters = [Product.is_active.is_(True)]
+    if category_filter:
+        filters.append(Product.category == category_filter)
+
+    min_stock = func.coalesce(Product.min_stock, 5)
+    stock = func.coalesce(Product.stock, 0)
+    value = Product.price * stock
+    category = func.coalesce(Product.category, 'Sin categoría')
+
+    # Análisis por categoría (agregado SQL); el resumen se deriva de él
+    categories = db.session.query(
+        category,
+        func.count(Product.id),
+        func.coalesce(func.sum(stock), 0),
+        func.coalesce(func.sum(value), 0),
+        func.count(Product.id).filter(stock <= min_stock),
+        func.count(Product.id).filter(stock == 0)
+    ).filter(*filters).group_by(category).order_by(category).all()
+
+    total_products = sum(row[1] for row in categories)
+    total_stock = sum(int(row[2]) for row in categories)
+    total_value = sum(format_currency(row[3]) for row in categories)
+    low_stock_count = sum(row[4] for row in categories)
+    out_of_stock_count = sum(row[5] for row in categories)
+
+    workbook = StreamingWorkbook()
+
+    # Hoja 1: Resumen
+    workbook.add_summary_sheet('Resumen de Inventario', 'REPORTE DE INVENTARIO - SISTEMA POS SABROSITAS', [
+        ('Total de Productos:', total_products),
+        ('Unidades en Stock:', total_stock),
+        ('Valor Total del Inventario:', f'${total_value:,.2f}'),
+        ('Productos con Stock Bajo:', low_stock_count),
+        ('Productos Sin Stock:', out_of_stock_count),
+        ('Generado:', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    ])
+
+    # Hoja 2: Detalle de Productos (streaming desde la base)
+    products_query = db.session.query(
+        Product.id, Product.name, Product.sku, Product.category, Product.price,
+        stock.label('stock'), min_stock.label('min_stock')
+    ).filter(*filters).order_by(Product.category, Product.name)
+
+    def product_row(product):
+        price = format_currency(product.price)
+        if product.stock == 0:
+            status = 'Sin Stock'
+        elif product.stock <= product.min_stock:
+            status = 'Stock Bajo'
+        else:
+            status = 'Normal'
+        return (
+            product.id,
+            product.name,
+            product.sku or '',
+            product.category or 'Sin categoría',
+            price,
+            product.stock,
+            product.min_stock,
+            price * product.stock,
+            status
+        )
+
+    workbook.add_table_sheet(
+        'Detalle de Productos',
+        ['ID', 'Nombre', 'SKU', 'Categoría', 'Precio', 'Stock Actual', 'Stock Mínimo', 'Valor en Stock', 'Estado'],
+        track((product_row(product) for product in iter_query_rows(products_query)), total_products),
+        widths=[8, 35, 16, 20, 14, 12, 12, 16, 12],
+        money_columns=(4, 7)
+    )
+
+    # Hoja 3: Análisis por Categoría
+    workbook.add_table_sheet(
+        'Análisis por Categoría',
+        ['Categoría', 'Productos', 'Stock Total', 'Valor Total', '% del Total'],
+        [
+            (
+                name,
+                count,
+                int(units),
+                format_currency(category_value),
+                f'{(format_currency(category_value) / total_value * 100) if total_value > 0 else 0:.1f}%'
+            )
+            for name, count, units, category_value, _, _ in categories
+        ],
+        widths=[25, 12, 14, 18, 12],
+        money_columns=(3,)
+    )
+
+    filename = f'inventario_{datetime.now().strftime("%Y%m%d")}.xlsx'
+    return workbook, filename
+
+
 @reports_enhanced_bp.route('/export/sales/excel', methods=['GET'])
 def export_sales_excel():
     """Exportar ventas a Excel con formato profesional"""
@@ -634,124 +651,8 @@ def export_sales_excel():
         end_date_str = request.args.get('end_date')
 
         start_date, end_date = get_date_range(start_date_str, end_date_str)
-
-        # Obtener datos de ventas
-        sales_data = safe_execute_query(
-            lambda: db.session.query(
-                Sale.id,
-                Sale.created_at,
-                Sale.total_amount,
-                Sale.payment_method,
-                Sale.status,
-                User.username.label('seller')
-            ).join(User, Sale.user_id == User.id).filter(
-                and_(
-                    Sale.created_at >= start_date,
-                    Sale.created_at < end_date
-                )
-            ).order_by(Sale.created_at).all(),
-            []
-        )
-
-        # Crear workbook
-        wb, styles = create_excel_workbook()
-
-        # Hoja 1: Resumen
-        ws_summary = wb.active
-        ws_summary.title = "Resumen de Ventas"
-
-        # Datos del resumen
-        total_sales = len(sales_data)
-        total_revenue = sum(format_currency(sale.total_amount) for sale in sales_data)
-        average_sale = total_revenue / total_sales if total_sales > 0 else 0
-
-        # Escribir resumen
-        ws_summary['A1'] = 'REPORTE DE VENTAS - SISTEMA POS SABROSITAS'
-        ws_summary['A1'].font = Font(bold=True, size=16)
-        ws_summary.merge_cells('A1:D1')
-
-        ws_summary['A3'] = 'Período:'
-        ws_summary['B3'] = f'{start_date.strftime("%Y-%m-%d")} a {(end_date - timedelta(days=1)).strftime("%Y-%m-%d")}'
-        ws_summary['A4'] = 'Total de Ventas:'
-        ws_summary['B4'] = total_sales
-        ws_summary['A5'] = 'Ingresos Totales:'
-        ws_summary['B5'] = f'${total_revenue:,.2f}'
-        ws_summary['A6'] = 'Venta Promedio:'
-        ws_summary['B6'] = f'${average_sale:,.2f}'
-        ws_summary['A7'] = 'Generado:'
-        ws_summary['B7'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Hoja 2: Detalle de Ventas
-        ws_details = wb.create_sheet("Detalle de Ventas")
-
-        # Headers
-        headers = ['ID Venta', 'Fecha', 'Hora', 'Total', 'Método de Pago', 'Estado', 'Vendedor']
-        for col, header in enumerate(headers, 1):
-            ws_details.cell(row=1, column=col, value=header)
-
-        # Datos
-        for row, sale in enumerate(sales_data, 2):
-            ws_details.cell(row=row, column=1, value=sale.id)
-            ws_details.cell(row=row, column=2, value=sale.created_at.strftime('%Y-%m-%d'))
-            ws_details.cell(row=row, column=3, value=sale.created_at.strftime('%H:%M:%S'))
-            ws_details.cell(row=row, column=4, value=format_currency(sale.total_amount))
-            ws_details.cell(row=row, column=5, value=sale.payment_method or 'Efectivo')
-            ws_details.cell(row=row, column=6, value=sale.status)
-            ws_details.cell(row=row, column=7, value=sale.seller)
-
-        # Aplicar estilos
-        apply_excel_styles(ws_details, styles)
-
-        # Hoja 3: Análisis por Método de Pago
-        payment_analysis = {}
-        for sale in sales_data:
-            method = sale.payment_method or 'Efectivo'
-            if method not in payment_analysis:
-                payment_analysis[method] = {'count': 0, 'total': 0}
-            payment_analysis[method]['count'] += 1
-            payment_analysis[method]['total'] += format_currency(sale.total_amount)
-
-        ws_payments = wb.create_sheet("Análisis por Pago")
-        ws_payments['A1'] = 'Método de Pago'
-        ws_payments['B1'] = 'Cantidad'
-        ws_payments['C1'] = 'Total'
-        ws_payments['D1'] = 'Porcentaje'
-
-        row = 2
-        for method, data in payment_analysis.items():
-            ws_payments.cell(row=row, column=1, value=method)
-            ws_payments.cell(row=row, column=2, value=data['count'])
-            ws_payments.cell(row=row, column=3, value=data['total'])
-            ws_payments.cell(row=row, column=4, value=f"{(data['total'] / total_revenue * 100):.1f}%")
-            row += 1
-
-        apply_excel_styles(ws_payments, styles)
-
-        # Guardar archivo temporal
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            wb.save(tmp_file.name)
-
-            # Leer archivo y enviar
-            with open(tmp_file.name, 'rb') as f:
-                file_data = f.read()
-
-            # Limpiar archivo temporal
-            os.unlink(tmp_file.name)
-
-        # Crear respuesta
-        filename = f'ventas_{start_date.strftime("%Y%m%d")}_to_{(end_date - timedelta(days=1)).strftime("%Y%m%d")}.xlsx'
-
-        return jsonify({
-            'success': True,
-            'data': {
-                'filename': filename,
-                'file_size': len(file_data),
-                'records_count': len(sales_data),
-                'sheets': ['Resumen de Ventas', 'Detalle de Ventas', 'Análisis por Pago'],
-                'generated_at': datetime.now().isoformat()
-            },
-            'message': f'Archivo Excel generado: {len(sales_data)} registros'
-        }), 200
+        workbook, filename = build_sales_workbook(start_date, end_date)
+        return workbook.response(filename)
 
     except Exception as e:
         logger.error(f"Error en export_sales_excel: {str(e)}")
@@ -773,133 +674,8 @@ def export_inventory_excel():
                 'error': 'Exportación a Excel no disponible. Instale openpyxl.'
             }), 400
 
-        category_filter = request.args.get('category')
-
-        # Query base
-        query = db.session.query(Product).filter(Product.is_active.is_(True))
-        if category_filter:
-            query = query.filter(Product.category == category_filter)
-
-        products = safe_execute_query(lambda: query.order_by(Product.category, Product.name).all(), [])
-
-        # Crear workbook
-        wb, styles = create_excel_workbook()
-
-        # Hoja 1: Resumen
-        ws_summary = wb.active
-        ws_summary.title = "Resumen de Inventario"
-
-        # Calcular estadísticas
-        total_products = len(products)
-        total_stock = sum(getattr(p, 'stock', 0) for p in products)
-        total_value = sum(format_currency(getattr(p, 'price', 0) * getattr(p, 'stock', 0)) for p in products)
-        low_stock_count = sum(1 for p in products if getattr(p, 'stock', 0) <= getattr(p, 'min_stock', 5))
-        out_of_stock_count = sum(1 for p in products if getattr(p, 'stock', 0) == 0)
-
-        # Escribir resumen
-        ws_summary['A1'] = 'REPORTE DE INVENTARIO - SISTEMA POS SABROSITAS'
-        ws_summary['A1'].font = Font(bold=True, size=16)
-        ws_summary.merge_cells('A1:D1')
-
-        ws_summary['A3'] = 'Total de Productos:'
-        ws_summary['B3'] = total_products
-        ws_summary['A4'] = 'Unidades en Stock:'
-        ws_summary['B4'] = total_stock
-        ws_summary['A5'] = 'Valor Total del Inventario:'
-        ws_summary['B5'] = f'${total_value:,.2f}'
-        ws_summary['A6'] = 'Productos con Stock Bajo:'
-        ws_summary['B6'] = low_stock_count
-        ws_summary['A7'] = 'Productos Sin Stock:'
-        ws_summary['B7'] = out_of_stock_count
-        ws_summary['A8'] = 'Generado:'
-        ws_summary['B8'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # Hoja 2: Detalle de Productos
-        ws_details = wb.create_sheet("Detalle de Productos")
-
-        # Headers
-        headers = ['ID', 'Nombre', 'SKU', 'Categoría', 'Precio', 'Stock Actual', 'Stock Mínimo', 'Valor en Stock', 'Estado']
-        for col, header in enumerate(headers, 1):
-            ws_details.cell(row=1, column=col, value=header)
-
-        # Datos
-        for row, product in enumerate(products, 2):
-            stock = getattr(product, 'stock', 0)
-            min_stock = getattr(product, 'min_stock', 5)
-            price = format_currency(getattr(product, 'price', 0))
-
-            # Determinar estado
-            if stock == 0:
-                status = 'Sin Stock'
-            elif stock <= min_stock:
-                status = 'Stock Bajo'
-            else:
-                status = 'Normal'
-
-            ws_details.cell(row=row, column=1, value=product.id)
-            ws_details.cell(row=row, column=2, value=product.name)
-            ws_details.cell(row=row, column=3, value=getattr(product, 'sku', ''))
-            ws_details.cell(row=row, column=4, value=product.category or 'Sin categoría')
-            ws_details.cell(row=row, column=5, value=price)
-            ws_details.cell(row=row, column=6, value=stock)
-            ws_details.cell(row=row, column=7, value=min_stock)
-            ws_details.cell(row=row, column=8, value=price * stock)
-            ws_details.cell(row=row, column=9, value=status)
-
-        # Aplicar estilos
-        apply_excel_styles(ws_details, styles)
-
-        # Hoja 3: Análisis por Categoría
-        categories = {}
-        for product in products:
-            category = product.category or 'Sin categoría'
-            if category not in categories:
-                categories[category] = {'count': 0, 'stock': 0, 'value': 0}
-            categories[category]['count'] += 1
-            categories[category]['stock'] += getattr(product, 'stock', 0)
-            categories[category]['value'] += format_currency(getattr(product, 'price', 0) * getattr(product, 'stock', 0))
-
-        ws_categories = wb.create_sheet("Análisis por Categoría")
-        ws_categories['A1'] = 'Categoría'
-        ws_categories['B1'] = 'Productos'
-        ws_categories['C1'] = 'Stock Total'
-        ws_categories['D1'] = 'Valor Total'
-        ws_categories['E1'] = '% del Total'
-
-        row = 2
-        for category, data in categories.items():
-            percentage = (data['value'] / total_value * 100) if total_value > 0 else 0
-            ws_categories.cell(row=row, column=1, value=category)
-            ws_categories.cell(row=row, column=2, value=data['count'])
-            ws_categories.cell(row=row, column=3, value=data['stock'])
-            ws_categories.cell(row=row, column=4, value=data['value'])
-            ws_categories.cell(row=row, column=5, value=f'{percentage:.1f}%')
-            row += 1
-
-        apply_excel_styles(ws_categories, styles)
-
-        # Guardar archivo temporal
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            wb.save(tmp_file.name)
-
-            with open(tmp_file.name, 'rb') as f:
-                file_data = f.read()
-
-            os.unlink(tmp_file.name)
-
-        filename = f'inventario_{datetime.now().strftime("%Y%m%d")}.xlsx'
-
-        return jsonify({
-            'success': True,
-            'data': {
-                'filename': filename,
-                'file_size': len(file_data),
-                'products_count': len(products),
-                'sheets': ['Resumen de Inventario', 'Detalle de Productos', 'Análisis por Categoría'],
-                'generated_at': datetime.now().isoformat()
-            },
-            'message': f'Archivo Excel de inventario generado: {len(products)} productos'
-        }), 200
+        workbook, filename = build_inventory_workbook(request.args.get('category'))
+        return workbook.response(filename)
 
     except Exception as e:
         logger.error(f"Error en export_inventory_excel: {str(e)}")
@@ -911,160 +687,156 @@ def export_inventory_excel():
         }), 500
 
 
-@reports_enhanced_bp.route('/dashboard/comprehensive', methods=['GET'])
-def comprehensive_dashboard():
-    """Dashboard comprensivo con todas las métricas clave"""
-    try:
-        # Fechas de referencia
-        now = datetime.now()
-        today = now.date()
-        yesterday = today - timedelta(days=1)
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-
-        # Métricas de ventas
-        def get_sales_metrics(date_filter):
-            return safe_execute_query(
-                lambda: db.session.query(
-                    func.count(Sale.id),
-                    func.coalesce(func.sum(Sale.total_amount), 0),
-                    func.avg(Sale.total_amount)
-                ).filter(date_filter).first(),
-                (0, 0, 0)
-            )
-
-        today_metrics = get_sales_metrics(func.date(Sale.created_at) == today)
-        yesterday_metrics = get_sales_metrics(func.date(Sale.created_at) == yesterday)
-        week_metrics = get_sales_metrics(Sale.created_at >= week_ago)
-        month_metrics = get_sales_metrics(Sale.created_at >= month_ago)
-
-        # Calcular tendencias
-        def calculate_trend(current, previous):
-            if previous > 0:
-                return round(((current - previous) / previous) * 100, 1)
-            return 0 if current == 0 else 100
-
-        sales_trend = calculate_trend(format_currency(today_metrics[1]), format_currency(yesterday_metrics[1]))
-
-        # Métricas de inventario
-        inventory_stats = safe_execute_query(
-            lambda: db.session.query(
-                func.count(Product.id),
-                func.sum(Product.stock),
-                func.sum(Product.price * Product.stock),
-                func.count(Product.id).filter(Product.stock <= func.coalesce(Product.min_stock, 5))
-            ).filter(Product.is_active.is_(True)).first(),
-            (0, 0, 0, 0)
-        )
+def _build_comprehensive_dashboard(now):
+    """Calcular el dashboard comprensivo (sin contexto de petición)"""
+    today = now.date()
+    yesterday = today - timedelta(days=1)
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    # Métricas de ventas desde los agregados: las cuatro ventanas en una consulta
+    empty_metrics = {'sales': 0, 'revenue': 0.0, 'average_sale': 0.0}
+    period_metrics = safe_execute_query(
+        lambda: sales_rollup_service.get_window_totals({
+            'today': (today, today),
+            'yesterday': (yesterday, yesterday),
+            'week': (week_ago, today),
+            'month': (month_ago, today)
+        }),
+        {}
+    )
 
-        # Productos más vendidos del mes
-        top_products = safe_execute_query(
-            lambda: db.session.query(
-                Product.name,
-                func.sum(SaleItem.quantity).label('total_sold'),
-                func.sum(SaleItem.total_price).label('revenue')
-            ).select_from(Product).join(SaleItem).join(Sale).filter(
-                Sale.created_at >= month_ago
-            ).group_by(Product.id, Product.name).order_by(
-                desc(func.sum(SaleItem.quantity))
-            ).limit(5).all(),
-            []
-        )
+    today_metrics = period_metrics.get('today', empty_metrics)
+    yesterday_metrics = period_metrics.get('yesterday', empty_metrics)
+    week_metrics = period_metrics.get('week', empty_metrics)
+    month_metrics = period_metrics.get('month', empty_metrics)
+
+    # Calcular tendencias
+    def calculate_trend(current, previous):
+        if previous > 0:
+            return round(((current - previous) / previous) * 100, 1)
+        return 0 if current == 0 else 100
+
+    sales_trend = calculate_trend(format_currency(today_metrics['revenue']), format_currency(yesterday_metrics['revenue']))
+
+    # Métricas de inventario
+    inventory_stats = safe_execute_query(
+        lambda: report_engine.aggregate(
+            'inventory', ['product_count', 'stock_units', 'inventory_value', 'low_stock']
+        )['summary'],
+        {'product_count': 0, 'stock_units': 0, 'inventory_value': 0.0, 'low_stock': 0}
+    )
 
-        # Análisis por método de pago (hoy)
-        payment_today = safe_execute_query(
-            lambda: db.session.query(
-                Sale.payment_method,
-                func.count(Sale.id),
-                func.sum(Sale.total_amount)
-            ).filter(func.date(Sale.created_at) == today).group_by(Sale.payment_method).all(),
-            []
-        )
+    # Productos más vendidos del mes
+    top_products = safe_execute_query(
+        lambda: sales_rollup_service.get_top_products(month_ago, today, limit=5),
+        []
+    )
 
-        # Vendedores del día
-        sellers_today = safe_execute_query(
-            lambda: db.session.query(
-                User.username,
-                func.count(Sale.id),
-                func.sum(Sale.total_amount)
-            ).join(Sale, User.id == Sale.user_id).filter(
-                func.date(Sale.created_at) == today
-            ).group_by(User.id, User.username).order_by(
-                desc(func.sum(Sale.total_amount))
-            ).all(),
-            []
-        )
+    # Análisis por método de pago (hoy)
+    payment_today = safe_execute_query(
+        lambda: sales_rollup_service.get_breakdown('payment_method', today, today),
+        []
+    )
 
-        response_data = {
-            'success': True,
-            'data': {
-                'period_comparison': {
-                    'today': {
-                        'sales': today_metrics[0] or 0,
-                        'revenue': round(format_currency(today_metrics[1]), 2),
-                        'average': round(format_currency(today_metrics[2]), 2)
-                    },
-                    'yesterday': {
-                        'sales': yesterday_metrics[0] or 0,
-                        'revenue': round(format_currency(yesterday_metrics[1]), 2),
-                        'average': round(format_currency(yesterday_metrics[2]), 2)
-                    },
-                    'week': {
-                        'sales': week_metrics[0] or 0,
-                        'revenue': round(format_currency(week_metrics[1]), 2),
-                        'average': round(format_currency(week_metrics[2]), 2)
-                    },
-                    'month': {
-                        'sales': month_metrics[0] or 0,
-                        'revenue': round(format_currency(month_metrics[1]), 2),
-                        'average': round(format_currency(month_metrics[2]), 2)
-                    }
+    # Vendedores del día: agregados por vendedor y nombres en una sola consulta
+    def top_sellers_today():
+        breakdown = sales_rollup_service.get_breakdown('seller_id', today, today)
+        names = dict(db.session.query(User.id, User.username).filter(
+            User.id.in_([row['key'] for row in breakdown])
+        ).all()) if breakdown else {}
+        return [dict(row, seller=names.get(row['key'])) for row in breakdown]
+
+    sellers_today = safe_execute_query(top_sellers_today, [])
+
+    response_data = {
+        'success': True,
+        'data': {
+            'period_comparison': {
+                'today': {
+                    'sales': today_metrics['sales'],
+                    'revenue': round(format_currency(today_metrics['revenue']), 2),
+                    'average': round(format_currency(today_metrics['average_sale']), 2)
                 },
-                'trends': {
-                    'sales_growth': sales_trend,
-                    'performance': 'excellent' if sales_trend > 10 else 'good' if sales_trend > 0 else 'needs_attention'
+                'yesterday': {
+                    'sales': yesterday_metrics['sales'],
+                    'revenue': round(format_currency(yesterday_metrics['revenue']), 2),
+                    'average': round(format_currency(yesterday_metrics['average_sale']), 2)
                 },
-                'inventory_overview': {
-                    'total_products': inventory_stats[0] or 0,
-                    'total_stock_units': inventory_stats[1] or 0,
-                    'total_value': round(format_currency(inventory_stats[2]), 2),
-                    'low_stock_alerts': inventory_stats[3] or 0
+                'week': {
+                    'sales': week_metrics['sales'],
+                    'revenue': round(format_currency(week_metrics['revenue']), 2),
+                    'average': round(format_currency(week_metrics['average_sale']), 2)
                 },
-                'top_products_month': [
-                    {
-                        'name': product[0],
-                        'quantity_sold': int(product[1] or 0),
-                        'revenue': round(format_currency(product[2]), 2)
-                    }
-                    for product in top_products
-                ],
-                'payment_methods_today': [
-                    {
-                        'method': payment[0] or 'Efectivo',
-                        'transactions': payment[1] or 0,
-                        'total': round(format_currency(payment[2]), 2)
-                    }
-                    for payment in payment_today
-                ],
-                'top_sellers_today': [
-                    {
-                        'seller': seller[0],
-                        'sales': seller[1] or 0,
-                        'revenue': round(format_currency(seller[2]), 2)
-                    }
-                    for seller in sellers_today
-                ],
-                'alerts': [
-                    {
-                        'type': 'inventory',
-                        'message': f'{inventory_stats[3] or 0} productos con stock bajo',
-                        'priority': 'medium' if (inventory_stats[3] or 0) > 0 else 'low'
-                    }
-                ],
-                'generated_at': now.isoformat()
+                'month': {
+                    'sales': month_metrics['sales'],
+                    'revenue': round(format_currency(month_metrics['revenue']), 2),
+                    'average': round(format_currency(month_metrics['average_sale']), 2)
+                }
             },
-            'message': 'Dashboard comprensivo generado exitosamente'
-        }
+            'trends': {
+                'sales_growth': sales_trend,
+                'performance': 'excellent' if sales_trend > 10 else 'good' if sales_trend > 0 else 'needs_attention'
+            },
+            'inventory_overview': {
+                'total_products': inventory_stats['product_count'],
+                'total_stock_units': inventory_stats['stock_units'],
+                'total_value': round(inventory_stats['inventory_value'], 2),
+                'low_stock_alerts': inventory_stats['low_stock']
+            },
+            'top_products_month': [
+                {
+                    'name': product['name'],
+                    'quantity_sold': product['quantity_sold'],
+                    'revenue': round(format_currency(product['revenue']), 2)
+                }
+                for product in top_products
+            ],
+            'payment_methods_today': [
+                {
+                    'method': payment['key'] or 'Efectivo',
+                    'transactions': payment['sales'],
+                    'total': round(format_currency(payment['revenue']), 2)
+                }
+                for payment in payment_today
+            ],
+            'top_sellers_today': [
+                {
+                    'seller': seller['seller'],
+                    'sales': seller['sales'],
+                    'revenue': round(format_currency(seller['revenue']), 2)
+                }
+                for seller in sellers_today
+            ],
+            'alerts': [
+                {
+                    'type': 'inventory',
+                    'message': f"{inventory_stats['low_stock']} productos con stock bajo",
+                    'priority': 'medium' if inventory_stats['low_stock'] > 0 else 'low'
+                }
+            ],
+            'generated_at': now.isoformat()
+        },
+        'message': 'Dashboard comprensivo generado exitosamente'
+    }
+
+    return response_data
+
+
+# Cacheable y precalculable por nombre (planificador de reportes)
+report_cache_service.register_report(
+    'reports_enhanced.comprehensive_dashboard',
+    lambda: _build_comprehensive_dashboard(datetime.now()),
+    params=lambda: {'day': datetime.now().date().isoformat()},
+    domains=('sales', 'inventory')
+)
+
+
+@reports_enhanced_bp.route('/dashboard/comprehensive', methods=['GET'])
+def comprehensive_dashboard():
+    """Dashboard comprensivo con todas las métricas clave"""
+    try:
+        response_data = report_cache_service.get_report('reports_enhanced.comprehensive_dashboard')
 
         return jsonify(response_data), 200
 
@@ -1078,6 +850,13 @@ def comprehensive_dashboard():
         }), 500
 
 
+def build_dashboard_pdf(report_type='dashboard'):
+    """PDF del dashboard comprensivo (buffer) y nombre de archivo sugerido"""
+    dashboard_data = _build_comprehensive_dashboard(datetime.now())
+    filename = f'reporte_profesional_{report_type}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+    return create_pdf_report(dashboard_data, report_type, filename), filename
+
+
 @reports_enhanced_bp.route('/export/pdf', methods=['GET'])
 def export_pdf():
     """Exportar reporte completo a PDF"""
@@ -8,55 +8,26 @@ SIN dependencias problemáticas de JWT o autenticación compleja
 from flask import Blueprint, request, jsonify
 from app.middleware.rbac_middleware import require_permission
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, desc, text
+from sqlalchemy import func, and_, text
 import logging
-import csv
-import io
 import traceback
 
 from app import db
-from app.models.sale import Sale, SaleItem
+from app.models.sale import Sale
 from app.models.product import Product
 from app.models.user import User
+from app.services.sales_rollup_service import sales_rollup_service
+from app.services.report_cache_service import report_cache_service
+from app.services.report_engine import (
+    report_engine, safe_execute_query, format_currency, get_date_range
+)
+from app.utils.streaming_export import csv_response, iter_query_rows
 
 logger = logging.getLogger(__name__)
 
 # Blueprint final
 reports_final_bp = Blueprint('reports_final', __name__, url_prefix='/reports-final')
 
-# ===============================================
-# UTILIDADES COMUNES
-# ===============================================
-
-
-def safe_execute_query(query_func, default_value=None):
-    """Ejecutar consulta de forma segura con manejo de errores"""
-    try:
-        return query_func()
-    except Exception as e:
-        logger.error(f"Error en consulta: {str(e)}")
-        return default_value
-
-
-def format_currency(amount):
-    """Formatear cantidad como moneda"""
-    return float(amount) if amount is not None else 0.0
-
-
-def get_date_range(start_date_str=None, end_date_str=None, default_days=30):
-    """Obtener rango de fechas con valores por defecto"""
-    if not start_date_str:
-        start_date = datetime.now() - timedelta(days=default_days)
-    else:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-
-    if not end_date_str:
-        end_date = datetime.now()
-    else:
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1)
-
-    return start_date, end_date
-
 # ===============================================
 # ENDPOINTS PRINCIPALES
 # ===============================================
@@ -101,47 +72,18 @@ def sales_report():
 
         start_date, end_date = get_date_range(start_date_str, end_date_str)
 
-        # Consulta principal de ventas
-        sales_query = db.session.query(Sale).filter(
-            and_(
-                Sale.created_at >= start_date,
-                Sale.created_at < end_date
-            )
-        ).order_by(desc(Sale.created_at))
-
-        sales = safe_execute_query(lambda: sales_query.all(), [])
-
-        # Procesar estadísticas
-        total_sales = len(sales)
-        total_revenue = sum(format_currency(sale.total_amount) for sale in sales)
-        average_sale = total_revenue / total_sales if total_sales > 0 else 0
-
-        # Estadísticas por método de pago
-        payment_methods = {}
-        daily_sales = {}
-        hourly_sales = {}
-
-        for sale in sales:
-            # Por método de pago
-            method = sale.payment_method or 'Efectivo'
-            if method not in payment_methods:
-                payment_methods[method] = {'count': 0, 'total': 0}
-            payment_methods[method]['count'] += 1
-            payment_methods[method]['total'] += format_currency(sale.total_amount)
-
-            # Por día
-            day = sale.created_at.strftime('%Y-%m-%d')
-            if day not in daily_sales:
-                daily_sales[day] = {'count': 0, 'total': 0}
-            daily_sales[day]['count'] += 1
-            daily_sales[day]['total'] += format_currency(sale.total_amount)
-
-            # Por hora
-            hour = sale.created_at.strftime('%H:00')
-            if hour not in hourly_sales:
-                hourly_sales[hour] = {'count': 0, 'total': 0}
-            hourly_sales[hour]['count'] += 1
-            hourly_sales[hour]['total'] += format_currency(sale.total_amount)
+        filters = {'start': start_date, 'end': end_date}
+
+        # Resumen y desgloses (método de pago, día y hora) en una sola sentencia
+        report = report_engine.aggregate('sales', ['sales', 'revenue', 'average_sale'],
+                                         ['payment_method', 'day', 'hour'], filters)
+        summary = report['summary']
+        breakdowns = report['breakdowns']
+        total_sales = summary['sales']
+        total_revenue = summary['revenue']
+
+        def by_key(rows):
+            return {row['key']: {'count': row['sales'], 'total': row['revenue']} for row in rows}
 
         # Preparar respuesta
         response_data = {
@@ -150,7 +92,7 @@ def sales_report():
                 'summary': {
                     'total_sales': total_sales,
                     'total_revenue': total_revenue,
-                    'average_sale': average_sale,
+                    'average_sale': summary['average_sale'],
                     'period': {
                         'start': start_date.strftime('%Y-%m-%d'),
                         'end': (end_date - timedelta(days=1)).strftime('%Y-%m-%d'),
@@ -158,40 +100,31 @@ def sales_report():
                     }
                 },
                 'analytics': {
-                    'payment_methods': payment_methods,
-                    'daily_breakdown': daily_sales,
-                    'hourly_breakdown': hourly_sales
+                    'payment_methods': by_key(breakdowns['payment_method']),
+                    'daily_breakdown': by_key(breakdowns['day']),
+                    'hourly_breakdown': by_key(breakdowns['hour'])
                 }
             },
             'message': f'Reporte de ventas generado: {total_sales} ventas, ${total_revenue:,.2f}'
         }
 
-        # Incluir detalles si se solicita
-        if include_details and sales:
-            sales_details = []
-            for sale in sales[:100]:  # Limitar a 100 para rendimiento
-                try:
-                    # Obtener usuario de forma segura
-                    user = safe_execute_query(
-                        lambda: User.query.get(sale.user_id),
-                        None
-                    )
-
-                    sale_detail = {
-                        'id': sale.id,
-                        'date': sale.created_at.isoformat(),
-                        'total': format_currency(sale.total_amount),
-                        'payment_method': sale.payment_method or 'Efectivo',
-                        'seller': user.username if user else 'Desconocido',
-                        'status': sale.status
-                    }
-                    sales_details.append(sale_detail)
-
-                except Exception as e:
-                    logger.warning(f"Error procesando venta {sale.id}: {e}")
-                    continue
-
-            response_data['data']['sales_details'] = sales_details
+        # Incluir detalles si se solicita (vendedor en la misma consulta)
+        if include_details and total_sales:
+            sales = report_engine.rows(
+                'sales', ['id', 'created_at', 'total_amount', 'payment_method', 'seller', 'status'],
+                filters, order_by=[('created_at', True)], limit=100
+            )
+            response_data['data']['sales_details'] = [
+                {
+                    'id': sale['id'],
+                    'date': sale['created_at'].isoformat(),
+                    'total': format_currency(sale['total_amount']),
+                    'payment_method': sale['payment_method'] or 'Efectivo',
+                    'seller': sale['seller'] or 'Desconocido',
+                    'status': sale['status']
+                }
+                for sale in sales
+            ]
 
         return jsonify(response_data), 200
 
@@ -214,58 +147,42 @@ def inventory_report():
         category_filter = request.args.get('category')
         stock_filter = request.args.get('stock_status')  # 'low', 'out', 'normal'
 
-        # Query base
-        query = db.session.query(Product).filter(Product.is_active.is_(True))
-
-        # Aplicar filtros
-        if category_filter:
-            query = query.filter(Product.category == category_filter)
-
-        if stock_filter == 'low':
-            query = query.filter(Product.stock <= func.coalesce(Product.min_stock, 5))
-        elif stock_filter == 'out':
-            query = query.filter(Product.stock <= 0)
-        elif stock_filter == 'normal':
-            query = query.filter(Product.stock > func.coalesce(Product.min_stock, 5))
-
-        products = safe_execute_query(lambda: query.order_by(Product.category, Product.name).all(), [])
-
-        # Procesar estadísticas
-        total_products = len(products)
-        total_stock_units = sum(product.stock for product in products)
-        total_value = sum(format_currency(product.price * product.stock) for product in products)
-
-        low_stock_count = sum(1 for p in products if p.stock <= (p.min_stock or 5))
-        out_of_stock_count = sum(1 for p in products if p.stock <= 0)
-
-        # Estadísticas por categoría
-        categories = {}
-        for product in products:
-            category = product.category or 'Sin categoría'
-            if category not in categories:
-                categories[category] = {
-                    'product_count': 0,
-                    'total_stock': 0,
-                    'total_value': 0,
-                    'low_stock_items': 0
-                }
-
-            categories[category]['product_count'] += 1
-            categories[category]['total_stock'] += product.stock
-            categories[category]['total_value'] += format_currency(product.price * product.stock)
+        # Filtros: stock bajo incluye agotados y normal incluye sobre-stock
+        stock_statuses = {
+            'low': ['out_of_stock', 'low_stock'],
+            'out': ['out_of_stock'],
+            'normal': ['normal', 'overstock']
+        }
+        filters = {'category': category_filter, 'stock_status': stock_statuses.get(stock_filter)}
 
-            if product.stock <= (product.min_stock or 5):
-                categories[category]['low_stock_items'] += 1
+        # Resumen y categorías en una sola sentencia
+        report = report_engine.aggregate(
+            'inventory', ['product_count', 'stock_units', 'inventory_value', 'low_stock', 'out_of_stock'],
+            ['category'], filters
+        )
+        summary = report['summary']
+        total_products = summary['product_count']
+        total_value = summary['inventory_value']
+
+        categories = {
+            row['key']: {
+                'product_count': row['product_count'],
+                'total_stock': row['stock_units'],
+                'total_value': row['inventory_value'],
+                'low_stock_items': row['low_stock']
+            }
+            for row in report['breakdowns']['category']
+        }
 
         response_data = {
             'success': True,
             'data': {
                 'summary': {
                     'total_products': total_products,
-                    'total_stock_units': total_stock_units,
+                    'total_stock_units': summary['stock_units'],
                     'total_inventory_value': total_value,
-                    'low_stock_count': low_stock_count,
-                    'out_of_stock_count': out_of_stock_count,
+                    'low_stock_count': summary['low_stock'],
+                    'out_of_stock_count': summary['out_of_stock'],
                     'categories_count': len(categories)
                 },
                 'categories': categories
@@ -275,33 +192,24 @@ def inventory_report():
 
         # Incluir detalles de productos si se solicita
         if include_details:
-            products_details = []
-            for product in products[:100]:  # Limitar para rendimiento
-                try:
-                    stock_status = 'normal'
-                    if product.stock <= 0:
-                        stock_status = 'out_of_stock'
-                    elif product.stock <= (product.min_stock or 5):
-                        stock_status = 'low_stock'
-
-                    product_detail = {
-                        'id': product.id,
-                        'name': product.name,
-                        'sku': product.sku or '',
-                        'category': product.category or 'Sin categoría',
-                        'price': format_currency(product.price),
-                        'stock': product.stock,
-                        'min_stock': product.min_stock or 5,
-                        'stock_value': format_currency(product.price * product.stock),
-                        'stock_status': stock_status
-                    }
-                    products_details.append(product_detail)
-
-                except Exception as e:
-                    logger.warning(f"Error procesando producto {product.id}: {e}")
-                    continue
-
-            response_data['data']['products_details'] = products_details
+            products = report_engine.rows(
+                'inventory', ['id', 'name', 'sku', 'category', 'price', 'stock', 'min_stock', 'stock_status'],
+                filters, order_by=[('category', False), ('name', False)], limit=100
+            )
+            response_data['data']['products_details'] = [
+                {
+                    'id': product['id'],
+                    'name': product['name'],
+                    'sku': product['sku'] or '',
+                    'category': product['category'] or 'Sin categoría',
+                    'price': format_currency(product['price']),
+                    'stock': product['stock'],
+                    'min_stock': product['min_stock'],
+                    'stock_value': format_currency(product['price'] * product['stock']),
+                    'stock_status': product['stock_status'] if product['stock_status'] != 'overstock' else 'normal'
+                }
+                for product in products
+            ]
 
         return jsonify(response_data), 200
 
@@ -315,118 +223,114 @@ def inventory_report():
         }), 500
 
 
-@reports_final_bp.route('/dashboard', methods=['GET'])
-def dashboard_summary():
-    """Dashboard con métricas clave"""
-    try:
-        # Fechas de referencia
-        now = datetime.now()
-        today = now.date()
-        yesterday = today - timedelta(days=1)
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-
-        # Métricas de ventas con manejo seguro
-        def get_sales_stats(date_filter):
-            return safe_execute_query(
-                lambda: db.session.query(
-                    func.count(Sale.id),
-                    func.coalesce(func.sum(Sale.total_amount), 0)
-                ).filter(date_filter).first(),
-                (0, 0)
-            )
-
-        today_stats = get_sales_stats(func.date(Sale.created_at) == today)
-        yesterday_stats = get_sales_stats(func.date(Sale.created_at) == yesterday)
-        week_stats = get_sales_stats(Sale.created_at >= week_ago)
-        month_stats = get_sales_stats(Sale.created_at >= month_ago)
-
-        # Productos más vendidos (con manejo seguro)
-        top_products_raw = safe_execute_query(
-            lambda: db.session.query(
-                Product.name,
-                func.sum(SaleItem.quantity).label('total_sold'),
-                func.sum(SaleItem.total_price).label('revenue')
-            ).select_from(Product).join(SaleItem).join(Sale).filter(
-                Sale.created_at >= month_ago
-            ).group_by(Product.id, Product.name).order_by(
-                desc(func.sum(SaleItem.quantity))
-            ).limit(5).all(),
-            []
-        )
+def _build_dashboard_summary(now):
+    """Calcular el dashboard de métricas clave (sin contexto de petición)"""
+    today = now.date()
+    yesterday = today - timedelta(days=1)
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    # Métricas de ventas desde los agregados: las cuatro ventanas en una consulta
+    empty_stats = {'sales': 0, 'revenue': 0.0}
+    period_stats = safe_execute_query(
+        lambda: sales_rollup_service.get_window_totals({
+            'today': (today, today),
+            'yesterday': (yesterday, yesterday),
+            'week': (week_ago, today),
+            'month': (month_ago, today)
+        }),
+        {}
+    )
+
+    today_stats = period_stats.get('today', empty_stats)
+    yesterday_stats = period_stats.get('yesterday', empty_stats)
+    week_stats = period_stats.get('week', empty_stats)
+    month_stats = period_stats.get('month', empty_stats)
+
+    # Productos más vendidos (con manejo seguro)
+    top_products_raw = safe_execute_query(
+        lambda: sales_rollup_service.get_top_products(month_ago, today, limit=5),
+        []
+    )
+
+    top_products = [
+        {
+            'name': product['name'],
+            'quantity_sold': product['quantity_sold'],
+            'revenue': format_currency(product['revenue'])
+        } for product in top_products_raw
+    ]
+
+    # Métricas de inventario (incluye alertas de stock bajo) en una consulta
+    inventory_stats = safe_execute_query(
+        lambda: report_engine.aggregate(
+            'inventory', ['product_count', 'stock_units', 'inventory_value', 'low_stock']
+        )['summary'],
+        {'product_count': 0, 'stock_units': 0, 'inventory_value': 0.0, 'low_stock': 0}
+    )
+
+    # Calcular tendencias
+    def calculate_trend(current, previous):
+        if previous > 0:
+            return ((current - previous) / previous) * 100
+        return 0 if current == 0 else 100
+
+    sales_trend = calculate_trend(
+        format_currency(today_stats['revenue']),
+        format_currency(yesterday_stats['revenue'])
+    )
+
+    response_data = {
+        'success': True,
+        'data': {
+            'sales_metrics': {
+                'today': {
+                    'count': today_stats['sales'],
+                    'total': format_currency(today_stats['revenue']),
+                    'trend': sales_trend
+                },
+                'yesterday': {
+                    'count': yesterday_stats['sales'],
+                    'total': format_currency(yesterday_stats['revenue'])
+                },
+                'week': {
+                    'count': week_stats['sales'],
+                    'total': format_currency(week_stats['revenue'])
+                },
+                'month': {
+                    'count': month_stats['sales'],
+                    'total': format_currency(month_stats['revenue'])
+                }
+            },
+            'inventory_metrics': {
+                'total_products': inventory_stats['product_count'],
+                'total_stock_units': inventory_stats['stock_units'],
+                'total_value': inventory_stats['inventory_value'],
+                'low_stock_alerts': inventory_stats['low_stock']
+            },
+            'top_products': top_products,
+            'generated_at': now.isoformat()
+        },
+        'message': 'Dashboard generado exitosamente'
+    }
 
-        top_products = [
-            {
-                'name': product[0],
-                'quantity_sold': int(product[1] or 0),
-                'revenue': format_currency(product[2])
-            } for product in top_products_raw
-        ]
-
-        # Métricas de inventario
-        inventory_stats = safe_execute_query(
-            lambda: db.session.query(
-                func.count(Product.id),
-                func.sum(Product.stock),
-                func.sum(Product.price * Product.stock)
-            ).filter(Product.is_active.is_(True)).first(),
-            (0, 0, 0)
-        )
+    return response_data
 
-        low_stock_count = safe_execute_query(
-            lambda: db.session.query(func.count(Product.id)).filter(
-                and_(
-                    Product.is_active.is_(True),
-                    Product.stock <= func.coalesce(Product.min_stock, 5)
-                )
-            ).scalar(),
-            0
-        )
 
-        # Calcular tendencias
-        def calculate_trend(current, previous):
-            if previous > 0:
-                return ((current - previous) / previous) * 100
-            return 0 if current == 0 else 100
+# Cacheable y precalculable por nombre (planificador de reportes)
+report_cache_service.register_report(
+    'reports_final.dashboard',
+    lambda: _build_dashboard_summary(datetime.now()),
+    params=lambda: {'day': datetime.now().date().isoformat()},
+    domains=('sales', 'inventory')
+)
 
-        sales_trend = calculate_trend(
-            format_currency(today_stats[1]),
-            format_currency(yesterday_stats[1])
-        )
 
-        response_data = {
-            'success': True,
-            'data': {
-                'sales_metrics': {
-                    'today': {
-                        'count': today_stats[0] or 0,
-                        'total': format_currency(today_stats[1]),
-                        'trend': sales_trend
-                    },
-                    'yesterday': {
-                        'count': yesterday_stats[0] or 0,
-                        'total': format_currency(yesterday_stats[1])
-                    },
-                    'week': {
-                        'count': week_stats[0] or 0,
-                        'total': format_currency(week_stats[1])
-                    },
-                    'month': {
-                        'count': month_stats[0] or 0,
-                        'total': format_currency(month_stats[1])
-                    }
-                },
-                'inventory_metrics': {
-                    'total_products': inventory_stats[0] or 0,
-                    'total_stock_units': inventory_stats[1] or 0,
-                    'total_value': format_currency(inventory_stats[2]),
-                    'low_stock_alerts': low_stock_count or 0
-                },
-                'top_products': top_products,
-                'generated_at': now.isoformat()
-            },
-            'message': 'Dashboard generado exitosamente'
-        }
+@reports_final_bp.route('/dashboard', methods=['GET'])
+def dashboard_summary():
+    """Dashboard con métricas clave"""
+    try:
+        response_data = report_cache_service.get_report('reports_final.dashboard')
 
         return jsonify(response_data), 200
 
@@ -448,62 +352,37 @@ def product_performance():
         limit = int(request.args.get('limit', 20))
         category = request.args.get('category')
 
-        start_date = datetime.now() - timedelta(days=days)
-
-        # Query base para productos con ventas
-        base_query = db.session.query(
-            Product.id,
-            Product.name,
-            Product.category,
-            Product.price,
-            Product.stock,
-            func.coalesce(func.sum(SaleItem.quantity), 0).label('total_sold'),
-            func.coalesce(func.sum(SaleItem.total_price), 0).label('total_revenue'),
-            func.count(Sale.id).label('transaction_count')
-        ).select_from(Product).outerjoin(SaleItem).outerjoin(Sale).filter(
-            Product.is_active.is_(True)
-        )
-
-        # Filtrar por período de ventas
-        base_query = base_query.filter(
-            and_(
-                Sale.created_at >= start_date,
-                Sale.created_at <= datetime.now()
-            )
-        )
-
-        # Filtrar por categoría si se especifica
-        if category:
-            base_query = base_query.filter(Product.category == category)
+        start_date, end_date = get_date_range(default_days=days)
 
-        # Agrupar y ordenar
+        # Ranking de productos activos con ventas en el período (una consulta)
         products_raw = safe_execute_query(
-            lambda: base_query.group_by(
-                Product.id, Product.name, Product.category, Product.price, Product.stock
-            ).order_by(
-                desc(func.coalesce(func.sum(SaleItem.quantity), 0))
-            ).limit(limit).all(),
+            lambda: report_engine.ranking(
+                'sale_lines', 'product', ['quantity_sold', 'revenue', 'transactions'], 'quantity_sold',
+                {'start': start_date, 'end': end_date, 'category': category, 'active_products': True},
+                limit=limit
+            ),
             []
         )
 
         # Procesar resultados
         products_performance = []
         for product in products_raw:
-            total_sold = int(product.total_sold or 0)
-            revenue = format_currency(product.total_revenue)
-            transactions = int(product.transaction_count or 0)
+            total_sold = product['quantity_sold']
+            revenue = product['revenue']
+            transactions = product['transactions']
+            stock = product['stock'] or 0
 
             # Calcular métricas adicionales
             avg_per_transaction = total_sold / transactions if transactions > 0 else 0
             revenue_per_unit = revenue / total_sold if total_sold > 0 else 0
-            stock_turnover = total_sold / product.stock if product.stock > 0 else 0
+            stock_turnover = total_sold / stock if stock > 0 else 0
 
             product_data = {
-                'id': product.id,
-                'name': product.name,
-                'category': product.category or 'Sin categoría',
-                'price': format_currency(product.price),
-                'current_stock': product.stock,
+                'id': product['key'],
+                'name': product['name'],
+                'category': product['category'] or 'Sin categoría',
+                'price': format_currency(product['price']),
+                'current_stock': product['stock'],
                 'quantity_sold': total_sold,
                 'revenue': revenue,
                 'transactions': transactions,
@@ -548,44 +427,30 @@ def product_performance():
 
 @reports_final_bp.route('/export/sales', methods=['GET'])
 def export_sales():
-    """Exportar ventas en formato CSV"""
+    """Exportar ventas en formato CSV (streaming, memoria constante)"""
     try:
         start_date_str = request.args.get('start_date')
         end_date_str = request.args.get('end_date')
 
         start_date, end_date = get_date_range(start_date_str, end_date_str)
 
-        # Obtener ventas con información del vendedor
-        sales_data = safe_execute_query(
-            lambda: db.session.query(
-                Sale.id,
-                Sale.created_at,
-                Sale.total_amount,
-                Sale.payment_method,
-                Sale.status,
-                User.username
-            ).join(User, Sale.user_id == User.id).filter(
-                and_(
-                    Sale.created_at >= start_date,
-                    Sale.created_at < end_date
-                )
-            ).order_by(Sale.created_at).all(),
-            []
-        )
-
-        # Generar CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Headers
-        writer.writerow([
-            'ID Venta', 'Fecha', 'Hora', 'Total', 'Método de pago',
-            'Estado', 'Vendedor'
-        ])
+        # Ventas con información del vendedor, leídas por bloques
+        sales_query = db.session.query(
+            Sale.id,
+            Sale.created_at,
+            Sale.total_amount,
+            Sale.payment_method,
+            Sale.status,
+            User.username
+        ).join(User, Sale.user_id == User.id).filter(
+            and_(
+                Sale.created_at >= start_date,
+                Sale.created_at < end_date
+            )
+        ).order_by(Sale.created_at)
 
-        # Datos
-        for sale in sales_data:
-            writer.writerow([
+        rows = (
+            (
                 sale.id,
                 sale.created_at.strftime('%Y-%m-%d'),
                 sale.created_at.strftime('%H:%M:%S'),
@@ -593,23 +458,16 @@ def export_sales():
                 sale.payment_method or 'Efectivo',
                 sale.status,
                 sale.username
-            ])
-
-        csv_content = output.getvalue()
-        output.close()
+            )
+            for sale in iter_query_rows(sales_query)
+        )
 
         filename = f'ventas_{start_date.strftime("%Y%m%d")}_to_{(end_date - timedelta(days=1)).strftime("%Y%m%d")}.csv'
 
-        return jsonify({
-            'success': True,
-            'data': {
-                'csv_content': csv_content,
-                'filename': filename,
-                'records_count': len(sales_data),
-                'generated_at': datetime.now().isoformat()
-            },
-            'message': f'Exportación CSV generada: {len(sales_data)} registros'
-        }), 200
+        return csv_response(filename, [
+            'ID Venta', 'Fecha', 'Hora', 'Total', 'Método de pago',
+            'Estado', 'Vendedor'
+        ], rows)
 
     except Exception as e:
         logger.error(f"Error en export_sales: {str(e)}")
@@ -7,6 +7,7 @@ Endpoints de ventas con validaciones enterprise.
 from flask import Blueprint, request, jsonify, current_app
 from app.container import container
 from app.services.sale_service import SaleService
+from app.services.sale_batch_service import SaleBatchService
 from app.repositories.sale_repository import SaleRepository
 from app.repositories.product_repository import ProductRepository
 from app.repositories.user_repository import UserRepository
@@ -20,6 +21,34 @@ logger = logging.getLogger(__name__)
 # Crear blueprint
 sales_bp = Blueprint('sales', __name__)
 
+def _resolve_user_id(data, user_repository):
+    """Obtener user_id del payload o, si no se proporciona, del token JWT"""
+    user_id = data.get('user_id')
+    if user_id:
+        return user_id
+    
+    auth_header = request.headers.get('Authorization')
+    if not (auth_header and auth_header.startswith('Bearer ')):
+        raise ValidationError("user_id is required or valid Authorization header must be provided", field="user_id")
+    
+    token = auth_header.split(' ')[1]
+    try:
+        # Decodificar token para obtener username
+        payload = decode_token(token)
+        username = payload.get('sub')  # 'sub' contiene el username
+        
+        if username:
+            # Buscar usuario por username para obtener ID
+            user = user_repository.get_by_username(username)
+            if user:
+                logger.info(f"User ID extraído del token: {user.id} para username: {username}")
+                return user.id
+            raise ValidationError(f"User not found: {username}", field="user_id")
+        raise ValidationError("Invalid token: no username found", field="user_id")
+    except Exception as e:
+        logger.error(f"Error decoding JWT token: {e}")
+        raise ValidationError("Invalid or expired token", field="authorization")
+
 @sales_bp.route('/sales', methods=['POST'])
 @require_permission('sales:write')
 def create_sale():
@@ -39,33 +68,7 @@ def create_sale():
         sale_service = SaleService(sale_repository, product_repository, user_repository)
         
         # Solución Senior: Extraer user_id del token JWT si no se proporciona
-        user_id = data.get('user_id')
-        
-        # Si no hay user_id, extraerlo del token JWT
-        if not user_id:
-            auth_header = request.headers.get('Authorization')
-            if auth_header and auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-                try:
-                    # Decodificar token para obtener username
-                    payload = decode_token(token)
-                    username = payload.get('sub')  # 'sub' contiene el username
-                    
-                    if username:
-                        # Buscar usuario por username para obtener ID
-                        user = user_repository.get_by_username(username)
-                        if user:
-                            user_id = user.id
-                            logger.info(f"User ID extraído del token: {user_id} para username: {username}")
-                        else:
-                            raise ValidationError(f"User not found: {username}", field="user_id")
-                    else:
-                        raise ValidationError("Invalid token: no username found", field="user_id")
-                except Exception as e:
-                    logger.error(f"Error decoding JWT token: {e}")
-                    raise ValidationError("Invalid or expired token", field="authorization")
-            else:
-                raise ValidationError("user_id is required or valid Authorization header must be provided", field="user_id")
+        user_id = _resolve_user_id(data, user_repository)
         
         # Verificar si es un pago múltiple
         multi_payments = data.get('multi_payments')
@@ -153,6 +156,63 @@ def create_sale():
             }
         }), 500
 
+@sales_bp.route('/sales/batch', methods=['POST'])
+@require_permission('sales:write')
+def create_sales_batch():
+    """Registrar en bloque las ventas acumuladas por un terminal offline"""
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('sales'), list):
+            raise ValidationError("Request body must include a 'sales' list", field="sales")
+        
+        # Obtener servicios del container
+        sale_repository = container.get(SaleRepository)
+        product_repository = container.get(ProductRepository)
+        user_repository = container.get(UserRepository)
+        
+        batch_service = SaleBatchService(sale_repository, product_repository, user_repository)
+        user_id = _resolve_user_id(data, user_repository)
+        
+        try:
+            chunk_size = min(max(int(data.get('chunk_size', SaleBatchService.DEFAULT_CHUNK_SIZE)), 1), 1000)
+        except (TypeError, ValueError):
+            raise ValidationError("chunk_size must be an integer", field="chunk_size")
+        
+        result = batch_service.ingest(
+            user_id,
+            data['sales'],
+            terminal_id=data.get('terminal_id'),
+            chunk_size=chunk_size
+        )
+        
+        logger.info("Sales batch ingested", extra={
+            'user_id': user_id,
+            'terminal_id': data.get('terminal_id'),
+            'summary': result['summary']
+        })
+        
+        return jsonify({
+            'status': 'success',
+            'data': result,
+            'message': 'Sales batch processed'
+        }), 200
+        
+    except ValidationError as e:
+        logger.warning(f"Validation error in create_sales_batch: {e.message}", extra={
+            'context': e.context
+        })
+        return jsonify(e.to_dict()), e.status_code
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in create_sales_batch: {str(e)}")
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_SERVER_ERROR',
+                'message': 'An internal error occurred'
+            }
+        }), 500
+
 @sales_bp.route('/sales', methods=['GET'])
 @require_permission('sales:read')
 def get_sales():
@@ -161,10 +221,15 @@ def get_sales():
         # Obtener parámetros de paginación
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+        # Paginación por cursor: ?cursor= (vacío) inicia, luego next_cursor/prev_cursor
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'true').lower() != 'false'
         
         # Obtener filtros
         user_id = request.args.get('user_id', type=int)
         status = request.args.get('status')
+        # Campos dispersos: ?fields=id,total_amount,items.quantity
+        fields = request.args.get('fields')
         
         # Obtener servicios
         sale_repository = container.get(SaleRepository)
@@ -181,16 +246,19 @@ def get_sales():
             filters['status'] = status
         
         # Obtener ventas
-        result = sale_service.get_sales(page=page, per_page=per_page, **filters)
+        result = sale_service.get_sales_listing(
+            fields=fields, page=page, per_page=per_page, cursor=cursor,
+            include_total=include_total, **filters
+        )
         
         return jsonify({
             'status': 'success',
-            'data': {
-                'sales': [sale.to_dict() for sale in result['items']],
-                'pagination': result['pagination']
-            }
+            'data': result
         })
         
+    except ValidationError as e:
+        return jsonify(e.to_dict()), e.status_code
+    
     except Exception as e:
         logger.error(f"Error in get_sales: {str(e)}")
         return jsonify({
@@ -6,17 +6,18 @@ Endpoints para generar reportes de ventas, inventario y analytics
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, desc, text
+from sqlalchemy import and_, text
 import logging
-import csv
-import io
 from typing import Dict, Any, List
 
 from app import db
-from app.models.sale import Sale, SaleItem
+from app.models.sale import Sale
 from app.models.product import Product
 from app.models.user import User
 from app.middleware.rbac_middleware import require_permission
+from app.services.sales_rollup_service import sales_rollup_service
+from app.services.report_engine import report_engine, get_date_range
+from app.utils.streaming_export import csv_response, iter_query_rows
 
 logger = logging.getLogger(__name__)
 
@@ -40,75 +41,52 @@ def get_sales_report():
             end_date = datetime.now().strftime('%Y-%m-%d')
             
         # Convertir a datetime
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-        end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+        start_dt, end_dt = get_date_range(start_date, end_date)
+        filters = {'start': start_dt, 'end': end_dt}
         
-        # Consulta de ventas
-        sales_query = db.session.query(
-            Sale.id,
-            Sale.created_at,
-            Sale.total_amount,
-            Sale.payment_method,
-            User.username.label('seller_name')
-        ).join(User, Sale.user_id == User.id).filter(
-            and_(
-                Sale.created_at >= start_dt,
-                Sale.created_at < end_dt
-            )
-        ).order_by(desc(Sale.created_at))
-        
-        sales = sales_query.all()
-        
-        # Estadísticas
-        total_sales = len(sales)
-        total_revenue = sum(sale.total_amount for sale in sales)
-        avg_sale = total_revenue / total_sales if total_sales > 0 else 0
+        # Resumen y desgloses en una sentencia; el listado en otra
+        report = report_engine.aggregate('sales', ['sales', 'revenue', 'average_sale'],
+                                         ['payment_method', 'day'], filters)
+        sales = report_engine.rows('sales', ['id', 'created_at', 'total_amount', 'payment_method', 'seller'],
+                                   filters, order_by=[('created_at', True)])
         
-        # Ventas por método de pago
-        payment_methods = {}
-        for sale in sales:
-            method = sale.payment_method or 'Efectivo'
-            if method not in payment_methods:
-                payment_methods[method] = {'count': 0, 'total': 0}
-            payment_methods[method]['count'] += 1
-            payment_methods[method]['total'] += float(sale.total_amount)
-        
-        # Ventas por día
-        daily_sales = {}
-        for sale in sales:
-            day = sale.created_at.strftime('%Y-%m-%d')
-            if day not in daily_sales:
-                daily_sales[day] = {'count': 0, 'total': 0}
-            daily_sales[day]['count'] += 1
-            daily_sales[day]['total'] += float(sale.total_amount)
+        summary = report['summary']
+        breakdowns = report['breakdowns']
         
         # Formatear respuesta
-        sales_data = []
-        for sale in sales:
-            sales_data.append({
-                'id': sale.id,
-                'date': sale.created_at.isoformat(),
-                'total': float(sale.total_amount),
-                'payment_method': sale.payment_method,
-                'seller': sale.seller_name
-            })
+        sales_data = [
+            {
+                'id': sale['id'],
+                'date': sale['created_at'].isoformat(),
+                'total': float(sale['total_amount']),
+                'payment_method': sale['payment_method'],
+                'seller': sale['seller']
+            }
+            for sale in sales
+        ]
         
         response_data = {
             'success': True,
             'data': {
                 'sales': sales_data,
                 'summary': {
-                    'total_sales': total_sales,
-                    'total_revenue': float(total_revenue),
-                    'average_sale': float(avg_sale),
+                    'total_sales': summary['sales'],
+                    'total_revenue': summary['revenue'],
+                    'average_sale': summary['average_sale'],
                     'date_range': {
                         'start': start_date,
                         'end': end_date
                     }
                 },
                 'analytics': {
-                    'payment_methods': payment_methods,
-                    'daily_sales': daily_sales
+                    'payment_methods': {
+                        row['key']: {'count': row['sales'], 'total': row['revenue']}
+                        for row in breakdowns['payment_method']
+                    },
+                    'daily_sales': {
+                        row['key']: {'count': row['sales'], 'total': row['revenue']}
+                        for row in breakdowns['day']
+                    }
                 }
             }
         }
@@ -131,68 +109,52 @@ def get_inventory_report():
     try:
         format_type = request.args.get('format', 'json')
         
-        # Consulta de productos con stock
-        products_query = db.session.query(Product).filter(
-            Product.is_active == True
-        ).order_by(Product.category, Product.name)
-        
-        products = products_query.all()
-        
-        # Estadísticas
-        total_products = len(products)
-        low_stock_products = [p for p in products if p.stock <= (p.min_stock or 5)]
-        out_of_stock_products = [p for p in products if p.stock <= 0]
+        # Resumen y categorías en una sentencia; el listado en otra
+        report = report_engine.aggregate(
+            'inventory', ['product_count', 'stock_units', 'inventory_value', 'low_stock', 'out_of_stock'],
+            ['category']
+        )
+        products = report_engine.rows(
+            'inventory', ['id', 'name', 'sku', 'category', 'price', 'stock', 'min_stock', 'stock_status'],
+            order_by=[('category', False), ('name', False)]
+        )
         
-        # Productos por categoría
-        categories = {}
-        total_value = 0
-        
-        for product in products:
-            category = product.category or 'Sin categoría'
-            if category not in categories:
-                categories[category] = {
-                    'count': 0,
-                    'total_stock': 0,
-                    'total_value': 0
-                }
-            
-            categories[category]['count'] += 1
-            categories[category]['total_stock'] += product.stock
-            categories[category]['total_value'] += float(product.price * product.stock)
-            total_value += float(product.price * product.stock)
+        summary = report['summary']
         
         # Formatear productos
-        products_data = []
-        for product in products:
-            stock_status = 'normal'
-            if product.stock <= 0:
-                stock_status = 'out_of_stock'
-            elif product.stock <= (product.min_stock or 5):
-                stock_status = 'low_stock'
-                
-            products_data.append({
-                'id': product.id,
-                'name': product.name,
-                'sku': product.sku,
-                'category': product.category,
-                'price': float(product.price),
-                'stock': product.stock,
-                'min_stock': product.min_stock or 5,
-                'stock_value': float(product.price * product.stock),
-                'stock_status': stock_status
-            })
+        products_data = [
+            {
+                'id': product['id'],
+                'name': product['name'],
+                'sku': product['sku'],
+                'category': product['category'],
+                'price': float(product['price']),
+                'stock': product['stock'],
+                'min_stock': product['min_stock'],
+                'stock_value': float(product['price'] * product['stock']),
+                'stock_status': product['stock_status'] if product['stock_status'] != 'overstock' else 'normal'
+            }
+            for product in products
+        ]
         
         response_data = {
             'success': True,
             'data': {
                 'products': products_data,
                 'summary': {
-                    'total_products': total_products,
-                    'low_stock_count': len(low_stock_products),
-                    'out_of_stock_count': len(out_of_stock_products),
-                    'total_inventory_value': float(total_value)
+                    'total_products': summary['product_count'],
+                    'low_stock_count': summary['low_stock'],
+                    'out_of_stock_count': summary['out_of_stock'],
+                    'total_inventory_value': summary['inventory_value']
                 },
-                'categories': categories
+                'categories': {
+                    row['key']: {
+                        'count': row['product_count'],
+                        'total_stock': row['stock_units'],
+                        'total_value': row['inventory_value']
+                    }
+                    for row in report['breakdowns']['category']
+                }
             }
         }
         
@@ -218,73 +180,48 @@ def get_dashboard_summary():
         week_ago = today - timedelta(days=7)
         month_ago = today - timedelta(days=30)
         
-        # Ventas de hoy
-        today_sales = db.session.query(func.count(Sale.id), func.coalesce(func.sum(Sale.total_amount), 0)).filter(
-            func.date(Sale.created_at) == today
-        ).first()
-        
-        # Ventas de ayer
-        yesterday_sales = db.session.query(func.count(Sale.id), func.coalesce(func.sum(Sale.total_amount), 0)).filter(
-            func.date(Sale.created_at) == yesterday
-        ).first()
-        
-        # Ventas de la semana
-        week_sales = db.session.query(func.count(Sale.id), func.coalesce(func.sum(Sale.total_amount), 0)).filter(
-            Sale.created_at >= week_ago
-        ).first()
-        
-        # Ventas del mes
-        month_sales = db.session.query(func.count(Sale.id), func.coalesce(func.sum(Sale.total_amount), 0)).filter(
-            Sale.created_at >= month_ago
-        ).first()
+        # Ventas por período desde los agregados: las cuatro ventanas en una consulta
+        windows = sales_rollup_service.get_window_totals({
+            'today': (today, today),
+            'yesterday': (yesterday, yesterday),
+            'week': (week_ago, today),
+            'month': (month_ago, today)
+        })
         
         # Productos más vendidos (último mes)
-        top_products = db.session.query(
-            Product.name,
-            func.sum(SaleItem.quantity).label('total_sold'),
-            func.sum(SaleItem.subtotal).label('total_revenue')
-        ).join(SaleItem).join(Sale).filter(
-            Sale.created_at >= month_ago
-        ).group_by(Product.id, Product.name).order_by(
-            desc(func.sum(SaleItem.quantity))
-        ).limit(5).all()
+        top_products = sales_rollup_service.get_top_products(month_ago, today, limit=5)
         
         # Productos con stock bajo
-        low_stock = db.session.query(Product).filter(
-            and_(
-                Product.is_active == True,
-                Product.stock <= func.coalesce(Product.min_stock, 5)
-            )
-        ).count()
+        inventory = report_engine.aggregate('inventory', ['low_stock'])['summary']
         
         response_data = {
             'success': True,
             'data': {
                 'sales_today': {
-                    'count': today_sales[0] or 0,
-                    'total': float(today_sales[1] or 0)
+                    'count': windows['today']['sales'],
+                    'total': windows['today']['revenue']
                 },
                 'sales_yesterday': {
-                    'count': yesterday_sales[0] or 0,
-                    'total': float(yesterday_sales[1] or 0)
+                    'count': windows['yesterday']['sales'],
+                    'total': windows['yesterday']['revenue']
                 },
                 'sales_week': {
-                    'count': week_sales[0] or 0,
-                    'total': float(week_sales[1] or 0)
+                    'count': windows['week']['sales'],
+                    'total': windows['week']['revenue']
                 },
                 'sales_month': {
-                    'count': month_sales[0] or 0,
-                    'total': float(month_sales[1] or 0)
+                    'count': windows['month']['sales'],
+                    'total': windows['month']['revenue']
                 },
                 'top_products': [
                     {
-                        'name': product[0],
-                        'quantity_sold': int(product[1]),
-                        'revenue': float(product[2])
+                        'name': product['name'],
+                        'quantity_sold': product['quantity_sold'],
+                        'revenue': product['revenue']
                     } for product in top_products
                 ],
                 'alerts': {
-                    'low_stock_count': low_stock
+                    'low_stock_count': inventory['low_stock']
                 }
             }
         }
@@ -309,36 +246,25 @@ def get_product_performance():
         limit = int(request.args.get('limit', 20))
         
         # Fecha de inicio
-        start_date = datetime.now() - timedelta(days=days)
+        start_date, _ = get_date_range(default_days=days)
         
         # Productos más vendidos
-        top_products = db.session.query(
-            Product.id,
-            Product.name,
-            Product.category,
-            Product.price,
-            func.sum(SaleItem.quantity).label('total_sold'),
-            func.sum(SaleItem.subtotal).label('total_revenue'),
-            func.count(Sale.id).label('sale_count')
-        ).join(SaleItem).join(Sale).filter(
-            Sale.created_at >= start_date
-        ).group_by(
-            Product.id, Product.name, Product.category, Product.price
-        ).order_by(
-            desc(func.sum(SaleItem.quantity))
-        ).limit(limit).all()
+        top_products = report_engine.ranking(
+            'sale_lines', 'product', ['quantity_sold', 'revenue', 'transactions'], 'quantity_sold',
+            {'start': start_date}, limit=limit
+        )
         
         products_data = []
         for product in top_products:
             products_data.append({
-                'id': product.id,
-                'name': product.name,
-                'category': product.category,
-                'price': float(product.price),
-                'quantity_sold': int(product.total_sold),
-                'revenue': float(product.total_revenue),
-                'sale_count': int(product.sale_count),
-                'avg_per_sale': float(product.total_sold) / int(product.sale_count) if product.sale_count > 0 else 0
+                'id': product['key'],
+                'name': product['name'],
+                'category': product['category'],
+                'price': product['price'],
+                'quantity_sold': product['quantity_sold'],
+                'revenue': product['revenue'],
+                'sale_count': product['transactions'],
+                'avg_per_sale': product['quantity_sold'] / product['transactions'] if product['transactions'] > 0 else 0
             })
         
         response_data = {
@@ -364,9 +290,9 @@ def get_product_performance():
 @jwt_required()
 @require_permission('report_export')
 def export_report(report_type):
-    """Exportar reportes en formato CSV"""
+    """Exportar reportes en formato CSV (descarga en streaming)"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         
         if report_type == 'sales':
             # Exportar ventas
@@ -381,7 +307,7 @@ def export_report(report_type):
             start_dt = datetime.strptime(start_date, '%Y-%m-%d')
             end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
             
-            sales = db.session.query(
+            sales_query = db.session.query(
                 Sale.id,
                 Sale.created_at,
                 Sale.total_amount,
@@ -389,44 +315,43 @@ def export_report(report_type):
                 User.username
             ).join(User).filter(
                 and_(Sale.created_at >= start_dt, Sale.created_at < end_dt)
-            ).all()
+            ).order_by(Sale.created_at)
             
-            # Crear CSV
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['ID', 'Fecha', 'Total', 'Método Pago', 'Cliente', 'Vendedor'])
-            
-            for sale in sales:
-                writer.writerow([
+            # CSV en streaming: filas leídas por bloques
+            rows = (
+                (
                     sale.id,
                     sale.created_at.strftime('%Y-%m-%d %H:%M'),
                     sale.total_amount,
                     sale.payment_method or 'Efectivo',
                     '',  # customer_name no está disponible en este modelo
                     sale.username
-                ])
-            
-            csv_data = output.getvalue()
-            output.close()
+                )
+                for sale in iter_query_rows(sales_query)
+            )
             
-            return jsonify({
-                'success': True,
-                'data': csv_data,
-                'filename': f'ventas_{start_date}_to_{end_date}.csv'
-            }), 200
+            return csv_response(
+                f'ventas_{start_date}_to_{end_date}.csv',
+                ['ID', 'Fecha', 'Total', 'Método Pago', 'Cliente', 'Vendedor'],
+                rows
+            )
             
         elif report_type == 'inventory':
             # Exportar inventario
-            products = db.session.query(Product).filter(
+            products_query = db.session.query(
+                Product.id,
+                Product.name,
+                Product.sku,
+                Product.category,
+                Product.price,
+                Product.stock,
+                Product.min_stock
+            ).filter(
                 Product.is_active == True
-            ).order_by(Product.category, Product.name).all()
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['ID', 'Nombre', 'SKU', 'Categoría', 'Precio', 'Stock', 'Stock Mínimo', 'Valor Total'])
+            ).order_by(Product.category, Product.name)
             
-            for product in products:
-                writer.writerow([
+            rows = (
+                (
                     product.id,
                     product.name,
                     product.sku or '',
@@ -435,16 +360,15 @@ def export_report(report_type):
                     product.stock,
                     product.min_stock or 5,
                     product.price * product.stock
-                ])
-            
-            csv_data = output.getvalue()
-            output.close()
+                )
+                for product in iter_query_rows(products_query)
+            )
             
-            return jsonify({
-                'success': True,
-                'data': csv_data,
-                'filename': f'inventario_{datetime.now().strftime("%Y%m%d")}.csv'
-            }), 200
+            return csv_response(
+                f'inventario_{datetime.now().strftime("%Y%m%d")}.csv',
+                ['ID', 'Nombre', 'SKU', 'Categoría', 'Precio', 'Stock', 'Stock Mínimo', 'Valor Total'],
+                rows
+            )
             
         else:
             return jsonify({
@@ -55,6 +55,7 @@ def get_users():
     per_page = request.args.get('per_page', 20, type=int)
     search = request.args.get('search', '')
     role = request.args.get('role', '')
+    fields = request.args.get('fields')
     
     # Obtener servicio del container
     user_repository = container.get(UserRepository)
@@ -65,7 +66,8 @@ def get_users():
         page=page, 
         per_page=per_page, 
         search=search, 
-        role=role
+        role=role,
+        fields=fields
     )
     
     return paginated_response(
@@ -5,7 +5,7 @@ Endpoints para funcionalidades de inteligencia artificial con arquitectura enter
 """
 
 from flask import Blueprint, request, jsonify, current_app
-from app.services.ai_service import AIService
+from app.services.ai_service import ai_service as process_ai_service
 from app.models.product import Product
 from app.models.ai_models import AIModelStatus
 from app.utils.response_helpers import success_response, error_response, created_response
@@ -21,15 +21,9 @@ logger = logging.getLogger(__name__)
 # Crear blueprint
 ai_bp = Blueprint('ai', __name__, url_prefix='/ai')
 
-# Instancia global del servicio de IA
-ai_service = None
-
 def get_ai_service():
-    """Obtener instancia del servicio de IA"""
-    global ai_service
-    if ai_service is None:
-        ai_service = AIService()
-    return ai_service
+    """Servicio de IA del proceso (el modelo entrenado vive en el registro compartido)"""
+    return process_ai_service
 
 @ai_bp.route('/health', methods=['GET'])
 @apply_rate_limit('moderate')
@@ -184,16 +178,27 @@ def get_ai_stats():
 @apply_rate_limit('strict')
 @error_handler
 def update_embeddings():
-    """Actualizar embeddings del sistema de IA"""
+    """Actualizar embeddings del sistema de IA
+
+    force=true reentrena aunque el catálogo no haya cambiado; incremental=true
+    solo parcha las filas de los productos modificados (sujeto a deriva).
+    """
     try:
+        force = request.args.get('force', 'false').lower() == 'true'
+        incremental = request.args.get('incremental', 'false').lower() == 'true'
         ai_service = get_ai_service()
-        success = ai_service.initialize_ai_system()
+        if incremental and not force and ai_service.model is not None:
+            ai_service.refresh_index()
+            success = True
+        else:
+            success = ai_service.initialize_ai_system(force=force)
         
         if success:
             return success_response(
                 data={
                     'timestamp': datetime.utcnow().isoformat(),
-                    'status': 'completed'
+                    'status': 'completed',
+                    'model': ai_service.registry.get_stats()
                 },
                 message='Embeddings actualizados correctamente'
             )
@@ -204,6 +209,30 @@ def update_embeddings():
         logger.error(f"Error updating embeddings: {e}")
         raise APIError("Error actualizando embeddings", 500)
 
+@ai_bp.route('/recommendations/rebuild', methods=['POST'])
+@apply_rate_limit('strict')
+@error_handler
+def rebuild_recommendations():
+    """Recalcular la tabla de recomendaciones precalculadas (?top_k= vecinos por producto)"""
+    from app.exceptions import BusinessLogicError, ValidationError
+    from app.services.ai_recommendation_service import ai_recommendation_service
+    
+    try:
+        result = ai_recommendation_service.rebuild(top_k=request.args.get('top_k', type=int))
+        
+        return success_response(
+            data=result,
+            message=f"Recomendaciones recalculadas: {result['recommendations']} filas"
+        )
+        
+    except ValidationError as e:
+        raise APIError(e.message, 400)
+    except BusinessLogicError as e:
+        raise APIError(e.message, 409)
+    except Exception as e:
+        logger.error(f"Error rebuilding recommendations: {e}")
+        raise APIError("Error recalculando recomendaciones", 500)
+
 @ai_bp.route('/models/status', methods=['GET'])
 @apply_rate_limit('moderate')
 @error_handler
@@ -6,7 +6,7 @@ Modelos de base de datos del sistema.
 
 from .user import User
 from .product import Product
-from .sale import Sale, SaleItem
+from .sale import Sale, SaleItem, SaleClientKey
 from .inventory import InventoryMovement
 from .ai_models import ProductEmbedding, DocumentEmbedding
 from .electronic_invoice import ElectronicInvoice, ElectronicInvoiceItem
@@ -16,9 +16,13 @@ from .digital_certificate import DigitalCertificate, CertificateUsage
 from .support import SupportTicket, SupportMessage, SupportChat, ChatMessage
 from .help import HelpArticle, FAQ
 from .payroll import Employee, PayrollPeriod, Payroll, PayrollItem, PayrollConfig
-from .accounts_receivable import Customer, Invoice, AccountsReceivableInvoiceItem, Payment, PaymentAllocation
+from .accounts_receivable import Customer, Invoice, AccountsReceivableInvoiceItem, Payment, PaymentAllocation, ARAgingSnapshot
 from .multi_payment import MultiPayment, PaymentDetail
 from .quotation import Quotation, QuotationItem, QuotationApproval, QuotationTemplate
+from .outbox import OutboxEvent
+from .sales_rollup import SalesHourlyRollup, ProductDailyRollup
+from .report_job import ReportJob
+from .report_schedule import ReportSchedule
 
 # Importar db al final para evitar importaciones circulares
 from app import db
@@ -29,6 +33,7 @@ __all__ = [
     'Product', 
     'Sale',
     'SaleItem',
+    'SaleClientKey',
     'InventoryMovement',
     'ProductEmbedding',
     'DocumentEmbedding',
@@ -56,10 +61,16 @@ __all__ = [
     'AccountsReceivableInvoiceItem',
     'Payment',
     'PaymentAllocation',
+    'ARAgingSnapshot',
     'MultiPayment',
     'PaymentDetail',
     'Quotation',
     'QuotationItem',
     'QuotationApproval',
-    'QuotationTemplate'
+    'QuotationTemplate',
+    'OutboxEvent',
+    'SalesHourlyRollup',
+    'ProductDailyRollup',
+    'ReportJob',
+    'ReportSchedule'
 ]
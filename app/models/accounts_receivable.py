@@ -5,6 +5,7 @@ Modelos para gestión de cartera y cuentas por cobrar.
 """
 
 from app import db
+from sqlalchemy import and_
 from datetime import datetime, date, timedelta
 from typing import Dict, Any, Optional, List
 from decimal import Decimal
@@ -164,6 +165,13 @@ class Invoice(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     paid_at = db.Column(db.DateTime, nullable=True)
     
+    # Índices para antigüedad de cartera y eficiencia de cobranza (agregados en SQL)
+    __table_args__ = (
+        db.Index('idx_ar_invoices_customer_due', 'customer_id', 'due_date'),
+        db.Index('idx_ar_invoices_due_date', 'due_date'),
+        db.Index('idx_ar_invoices_invoice_date', 'invoice_date'),
+    )
+    
     # Relaciones
     items = db.relationship('AccountsReceivableInvoiceItem', backref='invoice', lazy=True, cascade='all, delete-orphan')
     payments = db.relationship('Payment', backref='invoice', lazy=True, cascade='all, delete-orphan')
@@ -202,10 +210,17 @@ class Invoice(db.Model):
         
         return f"{prefix}{new_number:04d}"
     
+    OPEN_STATUSES = ('pending', 'partial')
+    
     @property
     def is_overdue(self) -> bool:
         """Verificar si la factura está vencida"""
-        return self.due_date < date.today() and self.status in ['pending', 'partial']
+        return self.due_date < date.today() and self.status in self.OPEN_STATUSES
+    
+    @classmethod
+    def overdue_condition(cls, today: date) -> Any:
+        """Equivalente SQL de is_overdue para consultas agregadas"""
+        return and_(cls.due_date < today, cls.status.in_(cls.OPEN_STATUSES))
     
     @property
     def days_overdue(self) -> int:
@@ -439,3 +454,58 @@ class PaymentAllocation(db.Model):
     
     def __repr__(self) -> str:
         return f'<PaymentAllocation {self.id}: {self.allocated_amount}>'
+
+class ARAgingSnapshot(db.Model):
+    """Foto diaria de la antigüedad de cartera (para gráficos de tendencia)"""
+    
+    __tablename__ = 'ar_aging_snapshots'
+    
+    # Campos principales
+    id = db.Column(db.Integer, primary_key=True)
+    snapshot_date = db.Column(db.Date, unique=True, nullable=False, index=True)
+    
+    # Saldos por antigüedad (días desde el vencimiento)
+    current_amount = db.Column(db.Numeric(15, 2), default=0.0)   # 0-30 días (incluye no vencidas)
+    days_31_60 = db.Column(db.Numeric(15, 2), default=0.0)
+    days_61_90 = db.Column(db.Numeric(15, 2), default=0.0)
+    over_90 = db.Column(db.Numeric(15, 2), default=0.0)
+    total_outstanding = db.Column(db.Numeric(15, 2), default=0.0)
+    
+    # Vencido y volumen
+    overdue_amount = db.Column(db.Numeric(15, 2), default=0.0)
+    open_invoices = db.Column(db.Integer, default=0)
+    overdue_invoices = db.Column(db.Integer, default=0)
+    customers_with_balance = db.Column(db.Integer, default=0)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __init__(self, snapshot_date: date, **kwargs):
+        """Constructor con validaciones"""
+        self.snapshot_date = snapshot_date
+        
+        # Asignar otros campos
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario para serialización"""
+        return {
+            'snapshot_date': self.snapshot_date.isoformat() if self.snapshot_date else None,
+            'aging_buckets': {
+                'current': float(self.current_amount or 0),
+                '31_60': float(self.days_31_60 or 0),
+                '61_90': float(self.days_61_90 or 0),
+                'over_90': float(self.over_90 or 0)
+            },
+            'total_outstanding': float(self.total_outstanding or 0),
+            'overdue_amount': float(self.overdue_amount or 0),
+            'open_invoices': self.open_invoices or 0,
+            'overdue_invoices': self.overdue_invoices or 0,
+            'customers_with_balance': self.customers_with_balance or 0,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self) -> str:
+        return f'<ARAgingSnapshot {self.snapshot_date}: {self.total_outstanding}>'
@@ -6,7 +6,7 @@ Gestión de transferencias de productos entre tiendas Sabrositas.
 
 from datetime import datetime
 from app import db
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Decimal, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Numeric, ForeignKey, Enum
 from sqlalchemy.orm import relationship
 from dataclasses import dataclass
 from typing import List, Optional
@@ -58,8 +58,8 @@ class InventoryTransfer(db.Model):
     
     # Costos y totales
     total_items: int = Column(Integer, default=0)
-    total_cost: float = Column(Decimal(12,2), default=0.00)
-    shipping_cost: float = Column(Decimal(10,2), default=0.00)
+    total_cost: float = Column(Numeric(12,2), default=0.00)
+    shipping_cost: float = Column(Numeric(10,2), default=0.00)
     
     # Timestamps críticos
     created_at: datetime = Column(DateTime, default=datetime.utcnow)
@@ -232,8 +232,8 @@ class InventoryTransferItem(db.Model):
     received_quantity: int = Column(Integer, nullable=True)  # Puede diferir de quantity
     
     # Precios y costos
-    unit_cost: float = Column(Decimal(10,2), nullable=False)
-    total_cost: float = Column(Decimal(12,2), nullable=False)
+    unit_cost: float = Column(Numeric(10,2), nullable=False)
+    total_cost: float = Column(Numeric(12,2), nullable=False)
     
     # Estado del item
     condition: str = Column(String(20), default='good')  # good, damaged, expired
@@ -0,0 +1,72 @@
+"""
+Outbox Model - Sistema POS O'Data
+================================
+Eventos pendientes de efectos secundarios (emails, notificaciones) escritos
+en la misma transacción que la operación de negocio que los origina.
+"""
+
+from app import db
+from datetime import datetime
+from typing import Dict, Any
+
+class OutboxEvent(db.Model):
+    """Evento de la bandeja de salida transaccional"""
+
+    __tablename__ = 'outbox_events'
+
+    # Campos principales
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False, index=True)  # sale.invoice_email, ...
+    payload = db.Column(db.JSON, nullable=False)
+
+    # Estado de entrega
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, processing, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+
+    # Reclamación por workers
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    # Índice para el sondeo de eventos listos
+    __table_args__ = (
+        db.Index('idx_outbox_ready', 'status', 'next_attempt_at'),
+    )
+
+    def __init__(self, event_type: str, payload: Dict[str, Any], **kwargs):
+        """Constructor con validaciones"""
+        self.event_type = event_type
+        self.payload = payload
+        self.status = 'pending'
+        self.attempts = 0
+        self.next_attempt_at = datetime.utcnow()
+
+        # Asignar otros campos
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario para serialización"""
+        return {
+            'id': self.id,
+            'event_type': self.event_type,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'locked_by': self.locked_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+
+    def __repr__(self) -> str:
+        return f'<OutboxEvent {self.id}: {self.event_type} {self.status}>'
@@ -0,0 +1,98 @@
+"""
+Report Job Model - Sistema POS O'Data
+====================================
+Trabajos de generación de reportes en segundo plano: estado, progreso,
+solicitud de cancelación y artefacto generado en disco.
+"""
+
+from app import db
+from datetime import datetime
+from typing import Dict, Any
+import uuid
+
+class ReportJob(db.Model):
+    """Trabajo asíncrono de generación de reporte"""
+
+    __tablename__ = 'report_jobs'
+
+    STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled', 'expired')
+    FINAL_STATUSES = ('completed', 'failed', 'cancelled', 'expired')
+
+    # Campos principales
+    id = db.Column(db.String(36), primary_key=True)
+    report_type = db.Column(db.String(50), nullable=False, index=True)  # consolidated_sales, sales_excel, ...
+    params = db.Column(db.JSON, nullable=False)
+    created_by = db.Column(db.Integer, nullable=True)
+    schedule_id = db.Column(db.Integer, nullable=True, index=True)  # report_schedules.id si es programado
+
+    # Estado y progreso
+    status = db.Column(db.String(20), default='queued', nullable=False)
+    progress = db.Column(db.Integer, default=0, nullable=False)  # 0-100
+    message = db.Column(db.String(200), nullable=True)
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+
+    # Artefacto generado
+    artifact_path = db.Column(db.String(500), nullable=True)
+    artifact_name = db.Column(db.String(200), nullable=True)
+    content_type = db.Column(db.String(100), nullable=True)
+    artifact_size = db.Column(db.BigInteger, nullable=True)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    delivered_at = db.Column(db.DateTime, nullable=True)  # envío a destinatarios de la programación
+
+    # Índices para la cola y la limpieza de artefactos vencidos
+    __table_args__ = (
+        db.Index('idx_report_jobs_status', 'status', 'created_at'),
+        db.Index('idx_report_jobs_expires', 'expires_at'),
+    )
+
+    def __init__(self, report_type: str, params: Dict[str, Any], **kwargs):
+        """Constructor con validaciones"""
+        self.id = str(uuid.uuid4())
+        self.report_type = report_type
+        self.params = params
+        self.status = 'queued'
+        self.progress = 0
+        self.cancel_requested = False
+        self.created_at = datetime.utcnow()
+
+        # Asignar otros campos
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    @property
+    def is_finished(self) -> bool:
+        """El trabajo ya no avanzará"""
+        return self.status in self.FINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario para serialización (sin la ruta en disco)"""
+        return {
+            'id': self.id,
+            'report_type': self.report_type,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'cancel_requested': self.cancel_requested,
+            'error': self.error,
+            'artifact_name': self.artifact_name,
+            'content_type': self.content_type,
+            'artifact_size': self.artifact_size,
+            'created_by': self.created_by,
+            'schedule_id': self.schedule_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None
+        }
+
+    def __repr__(self) -> str:
+        return f'<ReportJob {self.id}: {self.report_type} {self.status}>'
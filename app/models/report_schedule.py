@@ -0,0 +1,92 @@
+"""
+Report Schedule Model - Sistema POS O'Data
+=========================================
+Reportes programados: qué generar (tipo y parámetros), cuándo (expresión
+cron en hora local del servidor), a quién enviarlo y el estado de la
+última ejecución.
+"""
+
+from app import db
+from datetime import datetime
+from typing import Dict, Any, List
+
+class ReportSchedule(db.Model):
+    """Programación recurrente de un reporte"""
+
+    __tablename__ = 'report_schedules'
+
+    # Campos principales
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    report_type = db.Column(db.String(50), nullable=False)  # tipo de ReportJob, cache_warmup o ar_aging_snapshot
+    params = db.Column(db.JSON, nullable=False)
+    cron = db.Column(db.String(100), nullable=False)
+    recipients = db.Column(db.JSON, nullable=True)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    catch_up = db.Column(db.Boolean, default=True, nullable=False)  # ejecutar una vez lo perdido por caída
+    created_by = db.Column(db.Integer, nullable=True)
+
+    # Próxima y última ejecución
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    last_status = db.Column(db.String(20), nullable=True)  # queued, completed, failed, skipped, ...
+    last_error = db.Column(db.Text, nullable=True)
+    last_job_id = db.Column(db.String(36), nullable=True)
+
+    # Reclamación por el planificador (una instancia ejecuta cada disparo)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Índice para el sondeo de programaciones vencidas
+    __table_args__ = (
+        db.Index('idx_report_schedules_due', 'is_active', 'next_run_at'),
+    )
+
+    def __init__(self, name: str, report_type: str, cron: str, next_run_at: datetime, **kwargs):
+        """Constructor con validaciones"""
+        self.name = name
+        self.report_type = report_type
+        self.cron = cron
+        self.next_run_at = next_run_at
+        self.params = kwargs.pop('params', None) or {}
+        self.recipients = kwargs.pop('recipients', None) or []
+        self.is_active = True
+        self.catch_up = True
+
+        # Asignar otros campos
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    @property
+    def recipient_list(self) -> List[str]:
+        """Destinatarios como lista (vacía si no hay)"""
+        return list(self.recipients or [])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario para serialización"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'report_type': self.report_type,
+            'params': self.params,
+            'cron': self.cron,
+            'recipients': self.recipient_list,
+            'is_active': self.is_active,
+            'catch_up': self.catch_up,
+            'created_by': self.created_by,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_status': self.last_status,
+            'last_error': self.last_error,
+            'last_job_id': self.last_job_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self) -> str:
+        return f'<ReportSchedule {self.id}: {self.name} ({self.cron})>'
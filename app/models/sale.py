@@ -43,6 +43,11 @@ class Sale(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Índice para la paginación por cursor (created_at, id)
+    __table_args__ = (
+        db.Index('idx_sales_created_id', 'created_at', 'id'),
+    )
+    
     # Relaciones
     items = db.relationship('SaleItem', backref='sale', lazy=True, cascade='all, delete-orphan')
     multi_payment = db.relationship('MultiPayment', backref='sale', lazy=True, foreign_keys=[multi_payment_id])
@@ -194,3 +199,30 @@ class SaleItem(db.Model):
     
     def __repr__(self) -> str:
         return f'<SaleItem {self.id}: {self.quantity}x {self.product_id}>'
+
+class SaleClientKey(db.Model):
+    """Clave idempotente de una venta enviada por un terminal (UUID generado en el cliente)"""
+    
+    __tablename__ = 'sale_client_keys'
+    
+    # Campos principales
+    id = db.Column(db.Integer, primary_key=True)
+    client_uuid = db.Column(db.String(36), unique=True, nullable=False, index=True)
+    sale_id = db.Column(db.Integer, db.ForeignKey('sales.id'), nullable=False, index=True)
+    terminal_id = db.Column(db.String(50), nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario para serialización"""
+        return {
+            'id': self.id,
+            'client_uuid': self.client_uuid,
+            'sale_id': self.sale_id,
+            'terminal_id': self.terminal_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self) -> str:
+        return f'<SaleClientKey {self.client_uuid} -> {self.sale_id}>'
@@ -0,0 +1,94 @@
+"""
+Sales Rollup Models - Sistema POS O'Data
+=======================================
+Agregados incrementales de ventas mantenidos en la misma transacción que la
+venta: dashboards y reportes leen O(días) filas en lugar de O(ventas).
+"""
+
+from app import db
+from datetime import datetime
+from typing import Dict, Any
+
+class SalesHourlyRollup(db.Model):
+    """Totales de ventas por hora, tienda, vendedor y método de pago"""
+
+    __tablename__ = 'sales_rollup_hourly'
+
+    # Dimensiones (store_id 0 = vendedor sin tienda asignada)
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_date = db.Column(db.Date, nullable=False)
+    bucket_hour = db.Column(db.SmallInteger, nullable=False)
+    store_id = db.Column(db.Integer, nullable=False, default=0)
+    seller_id = db.Column(db.Integer, nullable=False)
+    payment_method = db.Column(db.String(20), nullable=False, default='')
+
+    # Medidas aditivas
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    items_sold = db.Column(db.Integer, nullable=False, default=0)
+    subtotal = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    tax_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    discount_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'bucket_date', 'bucket_hour', 'store_id', 'seller_id', 'payment_method',
+            name='uq_sales_rollup_hourly_key'
+        ),
+        db.Index('idx_sales_rollup_hourly_store', 'store_id', 'bucket_date'),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario para serialización"""
+        return {
+            'bucket_date': self.bucket_date.isoformat() if self.bucket_date else None,
+            'bucket_hour': self.bucket_hour,
+            'store_id': self.store_id,
+            'seller_id': self.seller_id,
+            'payment_method': self.payment_method,
+            'sale_count': self.sale_count,
+            'items_sold': self.items_sold,
+            'subtotal': float(self.subtotal or 0),
+            'tax_amount': float(self.tax_amount or 0),
+            'discount_amount': float(self.discount_amount or 0),
+            'total_amount': float(self.total_amount or 0)
+        }
+
+    def __repr__(self) -> str:
+        return f'<SalesHourlyRollup {self.bucket_date} {self.bucket_hour}h seller={self.seller_id}>'
+
+class ProductDailyRollup(db.Model):
+    """Unidades e ingresos por producto, día y tienda"""
+
+    __tablename__ = 'sales_rollup_product_daily'
+
+    id = db.Column(db.Integer, primary_key=True)
+    bucket_date = db.Column(db.Date, nullable=False)
+    store_id = db.Column(db.Integer, nullable=False, default=0)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('bucket_date', 'store_id', 'product_id', name='uq_sales_rollup_product_key'),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario para serialización"""
+        return {
+            'bucket_date': self.bucket_date.isoformat() if self.bucket_date else None,
+            'store_id': self.store_id,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'revenue': float(self.revenue or 0),
+            'line_count': self.line_count
+        }
+
+    def __repr__(self) -> str:
+        return f'<ProductDailyRollup {self.bucket_date} product={self.product_id}>'
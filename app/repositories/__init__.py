@@ -4,7 +4,7 @@ Repositories Enterprise - Sistema POS O'Data
 Patrón Repository con interfaces y CRUD operations.
 """
 
-from .base_repository import BaseRepository
+from .base_repository import BaseRepository, unit_of_work, in_unit_of_work
 from .user_repository import UserRepository
 from .product_repository import ProductRepository
 from .sale_repository import SaleRepository
@@ -12,6 +12,8 @@ from .inventory_repository import InventoryRepository
 
 __all__ = [
     'BaseRepository',
+    'unit_of_work',
+    'in_unit_of_work',
     'UserRepository', 
     'ProductRepository',
     'SaleRepository',
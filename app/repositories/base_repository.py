@@ -4,16 +4,77 @@ Base Repository - Sistema POS O'Data
 Repository base con operaciones CRUD genéricas.
 """
 
-from typing import TypeVar, Generic, List, Optional, Dict, Any
+from typing import TypeVar, Generic, List, Optional, Dict, Any, Iterator, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+import base64
+import json
+from flask import g
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Query
 from app import db
-from app.exceptions import NotFoundError, DatabaseError
+from app.exceptions import NotFoundError, DatabaseError, ValidationError
 
 T = TypeVar('T')
 
+@contextmanager
+def unit_of_work() -> Iterator[Any]:
+    """Agrupar operaciones de repositorios del request en una sola transacción.
+    
+    Dentro del bloque los repositorios solo hacen flush; el commit (o rollback)
+    ocurre una única vez al salir del bloque más externo.
+    """
+    depth = g.get('_unit_of_work_depth', 0)
+    g._unit_of_work_depth = depth + 1
+    try:
+        yield db.session
+        if depth == 0:
+            db.session.commit()
+    except Exception:
+        if depth == 0:
+            db.session.rollback()
+        raise
+    finally:
+        g._unit_of_work_depth = depth
+
+def in_unit_of_work() -> bool:
+    """Verificar si hay una unidad de trabajo activa en el request"""
+    return g.get('_unit_of_work_depth', 0) > 0
+
+def encode_cursor(values: List[Any], direction: str) -> str:
+    """Codificar la clave de la última/primera fila como token opaco"""
+    payload = {
+        'k': [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        'd': direction
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token: str, columns: List[Any]) -> Tuple[List[Any], str]:
+    """Decodificar un token de cursor validando su forma"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        values, direction = payload['k'], payload['d']
+        if direction not in ('next', 'prev') or len(values) != len(columns):
+            raise ValueError(direction)
+        
+        decoded = []
+        for column, value in zip(columns, values):
+            if value is not None and column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            decoded.append(value)
+        return decoded, direction
+    except (ValueError, KeyError, TypeError):
+        raise ValidationError("Invalid pagination cursor", field="cursor", value=token)
+
 class BaseRepository(Generic[T]):
     """Repository base con operaciones CRUD genéricas"""
     
+    # Columnas que definen el orden estable de la paginación por cursor
+    cursor_columns: Tuple[str, ...] = ('id',)
+    cursor_descending: bool = False
+    
     def __init__(self, model_class: type):
         self.model_class = model_class
         self.db = db
@@ -23,10 +84,10 @@ class BaseRepository(Generic[T]):
         try:
             entity = self.model_class(**kwargs)
             db.session.add(entity)
-            db.session.commit()
+            self._commit()
             return entity
         except Exception as e:
-            db.session.rollback()
+            self._rollback()
             raise DatabaseError(f"Error creating {self.model_class.__name__}: {str(e)}")
     
     def get_by_id(self, entity_id: int) -> Optional[T]:
@@ -40,27 +101,18 @@ class BaseRepository(Generic[T]):
             raise NotFoundError(self.model_class.__name__, entity_id)
         return entity
     
-    def get_all(self, page: int = 1, per_page: int = 20, **filters) -> Dict[str, Any]:
-        """Obtener todas las entidades con paginación"""
-        query = self._apply_filters(self.model_class.query, **filters)
-        
-        pagination = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+    def get_all(self, page: int = 1, per_page: int = 20, cursor: Optional[str] = None,
+                include_total: bool = True, plan: Any = None, **filters) -> Dict[str, Any]:
+        """Obtener todas las entidades con paginación
         
-        return {
-            'items': pagination.items,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
-        }
+        Con ``cursor`` (cadena vacía para la primera página) se usa paginación
+        por clave en lugar de OFFSET; ``include_total=False`` omite el COUNT(*).
+        Con ``plan`` (RowPlan) se devuelven filas con solo sus columnas.
+        """
+        query = self._apply_filters(self.model_class.query, **filters)
+        if plan is not None:
+            query = query.with_entities(*plan.columns)
+        return self._paginate(query, page, per_page, cursor, include_total)
     
     def update(self, entity_id: int, **kwargs) -> T:
         """Actualizar entidad"""
@@ -71,10 +123,10 @@ class BaseRepository(Generic[T]):
                 if hasattr(entity, key):
                     setattr(entity, key, value)
             
-            db.session.commit()
+            self._commit()
             return entity
         except Exception as e:
-            db.session.rollback()
+            self._rollback()
             raise DatabaseError(f"Error updating {self.model_class.__name__}: {str(e)}")
     
     def delete(self, entity_id: int) -> bool:
@@ -82,12 +134,24 @@ class BaseRepository(Generic[T]):
         try:
             entity = self.get_by_id_or_404(entity_id)
             db.session.delete(entity)
-            db.session.commit()
+            self._commit()
             return True
         except Exception as e:
-            db.session.rollback()
+            self._rollback()
             raise DatabaseError(f"Error deleting {self.model_class.__name__}: {str(e)}")
     
+    def _commit(self) -> None:
+        """Confirmar cambios, o solo hacer flush dentro de una unidad de trabajo"""
+        if in_unit_of_work():
+            db.session.flush()
+        else:
+            db.session.commit()
+    
+    def _rollback(self) -> None:
+        """Revertir cambios salvo que la unidad de trabajo externa se encargue"""
+        if not in_unit_of_work():
+            db.session.rollback()
+    
     def count(self, **filters) -> int:
         """Contar entidades con filtros"""
         query = self._apply_filters(self.model_class.query, **filters)
@@ -110,7 +174,8 @@ class BaseRepository(Generic[T]):
         
         return query
     
-    def search(self, search_term: str, search_fields: List[str], page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def search(self, search_term: str, search_fields: List[str], page: int = 1, per_page: int = 20,
+               cursor: Optional[str] = None, include_total: bool = True, plan: Any = None) -> Dict[str, Any]:
         """Búsqueda en múltiples campos"""
         query = self.model_class.query
         
@@ -126,6 +191,33 @@ class BaseRepository(Generic[T]):
             from sqlalchemy import or_
             query = query.filter(or_(*search_conditions))
         
+        if plan is not None:
+            query = query.with_entities(*plan.columns)
+        
+        return self._paginate(query, page, per_page, cursor, include_total)
+    
+    def _paginate(self, query: Query, page: int, per_page: int, cursor: Optional[str] = None,
+                  include_total: bool = True) -> Dict[str, Any]:
+        """Paginar una consulta por OFFSET o, si hay cursor, por clave"""
+        if cursor is not None:
+            return self._paginate_keyset(query, per_page, cursor, include_total)
+        
+        if not include_total:
+            # Sin COUNT(*): una fila extra indica si hay página siguiente
+            page = max(page, 1)
+            rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+            return {
+                'items': rows[:per_page],
+                'pagination': {
+                    'page': page,
+                    'per_page': per_page,
+                    'total': None,
+                    'pages': None,
+                    'has_next': len(rows) > per_page,
+                    'has_prev': page > 1
+                }
+            }
+        
         pagination = query.paginate(
             page=page, 
             per_page=per_page, 
@@ -143,3 +235,49 @@ class BaseRepository(Generic[T]):
                 'has_prev': pagination.has_prev
             }
         }
+    
+    def _paginate_keyset(self, query: Query, per_page: int, cursor: str,
+                         include_total: bool = True) -> Dict[str, Any]:
+        """Paginación por clave sobre cursor_columns: el costo no depende de la profundidad"""
+        columns = [getattr(self.model_class, name) for name in self.cursor_columns]
+        total = query.order_by(None).count() if include_total else None
+        
+        direction = 'next'
+        page_query = query
+        if cursor:
+            values, direction = decode_cursor(cursor, columns)
+            key = tuple_(*columns) if len(columns) > 1 else columns[0]
+            bound = tuple_(*values) if len(values) > 1 else values[0]
+            # 'next' avanza en el orden natural; 'prev' retrocede
+            forward = (direction == 'next') != self.cursor_descending
+            page_query = page_query.filter(key > bound if forward else key < bound)
+        
+        descending = self.cursor_descending != (direction == 'prev')
+        page_query = page_query.order_by(None).order_by(
+            *[column.desc() if descending else column.asc() for column in columns]
+        )
+        rows = page_query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        
+        if direction == 'prev':
+            items.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = bool(cursor), has_more
+        
+        def key_of(entity):
+            return [getattr(entity, name) for name in self.cursor_columns]
+        
+        return {
+            'items': items,
+            'pagination': {
+                'mode': 'cursor',
+                'per_page': per_page,
+                'total': total,
+                'has_next': has_next and bool(items),
+                'has_prev': has_prev and bool(items),
+                'next_cursor': encode_cursor(key_of(items[-1]), 'next') if has_next and items else None,
+                'prev_cursor': encode_cursor(key_of(items[0]), 'prev') if has_prev and items else None
+            }
+        }
@@ -24,6 +24,81 @@ class ProductRepository(BaseRepository[Product]):
         """Obtener producto por código de barras"""
         return Product.query.filter_by(barcode=barcode).first()
     
+    def get_many_for_update(self, product_ids: List[int]) -> Dict[int, Product]:
+        """Obtener varios productos en una sola consulta IN (...) con bloqueo de fila"""
+        ids = {product_id for product_id in product_ids if product_id is not None}
+        if not ids:
+            return {}
+
+        # FOR UPDATE bloquea las filas en PostgreSQL/MySQL; SQLite lo ignora.
+        # Orden por id: dos ventas con productos en común toman los bloqueos
+        # en el mismo orden y no se bloquean mutuamente
+        products = Product.query.filter(Product.id.in_(ids)).order_by(Product.id).with_for_update().all()
+        return {product.id: product for product in products}
+
+    def decrement_stock_if_available(self, product: Product, quantity: int) -> bool:
+        """Descontar stock con UPDATE condicional (stock >= cantidad) sin carreras entre terminales"""
+        from sqlalchemy import update
+        from sqlalchemy.orm.attributes import set_committed_value
+
+        stmt = update(Product).where(
+            Product.id == product.id,
+            Product.stock >= quantity
+        ).values(stock=Product.stock - quantity)
+        options = {'synchronize_session': False}
+
+        if db.session.get_bind().dialect.update_returning:
+            new_stock = db.session.execute(
+                stmt.returning(Product.stock), execution_options=options
+            ).scalar()
+            if new_stock is None:
+                return False
+        else:
+            # Sin RETURNING (MySQL) la fila ya está bloqueada por get_many_for_update
+            if db.session.execute(stmt, execution_options=options).rowcount == 0:
+                return False
+            new_stock = product.stock - quantity
+
+        # Reflejar el nuevo stock en la identidad sin marcarla como modificada
+        set_committed_value(product, 'stock', new_stock)
+        return True
+
+    def decrement_stock_many(self, products: Dict[int, Product], deltas: Dict[int, int]) -> bool:
+        """Descontar stock de varios productos con un solo UPDATE condicional (todo o nada)
+
+        Cada fila se actualiza solo si su stock cubre la cantidad (CASE por id);
+        si alguna no alcanza se devuelve False y el llamador revierte la transacción.
+        """
+        from sqlalchemy import case, update
+        from sqlalchemy.orm.attributes import set_committed_value
+
+        if not deltas:
+            return True
+
+        quantity = case(deltas, value=Product.id)
+        stmt = update(Product).where(
+            Product.id.in_(sorted(deltas)),
+            Product.stock >= quantity
+        ).values(stock=Product.stock - quantity)
+        options = {'synchronize_session': False}
+
+        if db.session.get_bind().dialect.update_returning:
+            new_stocks = dict(db.session.execute(
+                stmt.returning(Product.id, Product.stock), execution_options=options
+            ).all())
+            if len(new_stocks) != len(deltas):
+                return False
+        else:
+            # Sin RETURNING (MySQL) las filas ya están bloqueadas por get_many_for_update
+            if db.session.execute(stmt, execution_options=options).rowcount != len(deltas):
+                return False
+            new_stocks = {product_id: products[product_id].stock - delta for product_id, delta in deltas.items()}
+
+        # Reflejar el nuevo stock en las identidades sin marcarlas como modificadas
+        for product_id, new_stock in new_stocks.items():
+            set_committed_value(products[product_id], 'stock', new_stock)
+        return True
+
     def get_by_sku_or_404(self, sku: str) -> Product:
         """Obtener producto por SKU o lanzar 404"""
         product = self.get_by_sku(sku)
@@ -60,39 +135,26 @@ class ProductRepository(BaseRepository[Product]):
         """Obtener productos por categoría"""
         return self.get_all(page=page, per_page=per_page, category=category, is_active=True)
     
-    def get_low_stock_products(self, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def get_low_stock_products(self, page: int = 1, per_page: int = 20, cursor: Optional[str] = None,
+                               include_total: bool = True) -> Dict[str, Any]:
         """Obtener productos con stock bajo"""
         query = Product.query.filter(
             Product.stock <= Product.min_stock,
             Product.is_active == True
         )
         
-        pagination = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        return {
-            'items': pagination.items,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
-        }
+        return self._paginate(query, page, per_page, cursor, include_total)
     
     def get_out_of_stock_products(self, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
         """Obtener productos agotados"""
         return self.get_all(page=page, per_page=per_page, stock=0, is_active=True)
     
-    def search_products(self, search_term: str, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def search_products(self, search_term: str, page: int = 1, per_page: int = 20,
+                        cursor: Optional[str] = None, include_total: bool = True,
+                        plan: Any = None) -> Dict[str, Any]:
         """Buscar productos en múltiples campos"""
         search_fields = ['name', 'description', 'sku', 'barcode', 'category', 'brand']
-        return self.search(search_term, search_fields, page, per_page)
+        return self.search(search_term, search_fields, page, per_page, cursor, include_total, plan)
     
     def update_stock(self, product_id: int, new_stock: int, reason: str = "manual_adjustment") -> Product:
         """Actualizar stock del producto"""
@@ -115,9 +177,8 @@ class ProductRepository(BaseRepository[Product]):
             new_stock=new_stock
         )
         
-        from app import db
         db.session.add(movement)
-        db.session.commit()
+        self._commit()
         
         return product
     
@@ -149,30 +210,15 @@ class ProductRepository(BaseRepository[Product]):
         
         return [product for product, _ in top_products]
     
-    def get_products_needing_reorder(self, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def get_products_needing_reorder(self, page: int = 1, per_page: int = 20, cursor: Optional[str] = None,
+                                     include_total: bool = True) -> Dict[str, Any]:
         """Obtener productos que necesitan reorden"""
         query = Product.query.filter(
             Product.stock <= Product.reorder_point,
             Product.is_active == True
         )
         
-        pagination = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        return {
-            'items': pagination.items,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
-        }
+        return self._paginate(query, page, per_page, cursor, include_total)
     
     def get_product_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas de productos"""
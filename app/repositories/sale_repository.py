@@ -13,64 +13,61 @@ from app import db
 class SaleRepository(BaseRepository[Sale]):
     """Repository para ventas con operaciones especializadas"""
     
+    # El historial se recorre de la venta más reciente a la más antigua
+    cursor_columns = ('created_at', 'id')
+    cursor_descending = True
+    
     def __init__(self):
         super().__init__(Sale)
     
-    def get_sales_by_user(self, user_id: int, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def get_sales_by_user(self, user_id: int, page: int = 1, per_page: int = 20,
+                          cursor: Optional[str] = None, include_total: bool = True) -> Dict[str, Any]:
         """Obtener ventas por usuario"""
-        return self.get_all(page=page, per_page=per_page, user_id=user_id)
+        return self.get_all(page=page, per_page=per_page, cursor=cursor,
+                            include_total=include_total, user_id=user_id)
     
-    def get_sales_by_date_range(self, start_date, end_date, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def get_sales_by_date_range(self, start_date, end_date, page: int = 1, per_page: int = 20,
+                                cursor: Optional[str] = None, include_total: bool = True) -> Dict[str, Any]:
         """Obtener ventas por rango de fechas"""
         query = Sale.query.filter(
             Sale.created_at >= start_date,
             Sale.created_at <= end_date
         )
         
-        pagination = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        return self._paginate(query, page, per_page, cursor, include_total)
+    
+    def get_item_rows(self, sale_ids: List[int], plan: Any) -> Dict[int, List[Any]]:
+        """Cargar los items de varias ventas en una sola consulta, agrupados por venta"""
+        from app.models.sale import SaleItem
         
-        return {
-            'items': pagination.items,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
-        }
+        grouped: Dict[int, List[Any]] = {sale_id: [] for sale_id in sale_ids}
+        if not sale_ids:
+            return grouped
+        
+        rows = db.session.query(*plan.columns).filter(
+            SaleItem.sale_id.in_(sale_ids)
+        ).order_by(SaleItem.sale_id, SaleItem.id).all()
+        
+        for row in rows:
+            grouped[plan.value(row, 'sale_id')].append(row)
+        
+        return grouped
     
     def get_sales_stats(self) -> Dict[str, Any]:
-        """Obtener estadísticas de ventas"""
-        from sqlalchemy import func
-        from datetime import datetime, date
+        """Obtener estadísticas de ventas (desde los agregados de ventas)"""
+        from datetime import date
+        from app.services.sales_rollup_service import sales_rollup_service
         
-        # Estadísticas generales
-        total_sales = self.count()
-        total_amount = db.session.query(func.sum(Sale.total_amount)).scalar() or 0
+        totals = sales_rollup_service.get_totals()
         
         # Ventas del día
         today = date.today()
-        today_sales = Sale.query.filter(
-            func.date(Sale.created_at) == today
-        ).count()
-        
-        today_amount = Sale.query.filter(
-            func.date(Sale.created_at) == today
-        ).with_entities(func.sum(Sale.total_amount)).scalar() or 0
-        
-        # Promedio por venta
-        avg_sale_amount = float(total_amount / total_sales) if total_sales > 0 else 0
+        today_totals = sales_rollup_service.get_totals(today, today)
         
         return {
-            'total_sales': total_sales,
-            'total_amount': float(total_amount),
-            'today_sales': today_sales,
-            'today_amount': float(today_amount),
-            'average_sale_amount': avg_sale_amount
+            'total_sales': totals['sales'],
+            'total_amount': totals['revenue'],
+            'today_sales': today_totals['sales'],
+            'today_amount': today_totals['revenue'],
+            'average_sale_amount': totals['average_sale']
         }
@@ -0,0 +1,195 @@
+"""
+Serializadores por Filas - Sistema POS O'Data
+=============================================
+Serialización de listados sin hidratar objetos ORM: se seleccionan solo las
+columnas de los campos pedidos (?fields=) y cada fila se convierte a dict en
+una sola pasada.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from app.exceptions import ValidationError
+from app.models.sale import Sale, SaleItem
+from app.models.product import Product
+from app.models.user import User
+
+def _as_float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+def _as_iso(value: Any) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+class RowField:
+    """Campo serializable: columnas que requiere y cómo calcular su valor"""
+
+    __slots__ = ('columns', 'render')
+
+    def __init__(self, *columns, render: Optional[Callable[..., Any]] = None):
+        self.columns = columns
+        self.render = render
+
+def constant(value: Any) -> RowField:
+    """Campo sin columnas con valor fijo (compatibilidad con to_dict)"""
+    return RowField(render=lambda: value)
+
+class RowPlan:
+    """Columnas a seleccionar y getters precompilados para un conjunto de campos"""
+
+    def __init__(self, fields: Dict[str, RowField], names: Sequence[str], extra_columns: Sequence[Any] = ()):
+        self.columns: List[Any] = []
+        self._positions: Dict[str, int] = {}
+
+        for column in extra_columns:
+            self._add_column(column)
+
+        self.getters: List[Tuple[str, Callable]] = []
+        for name in names:
+            field = fields[name]
+            positions = tuple(self._add_column(column) for column in field.columns)
+            self.getters.append((name, self._compile(field, positions)))
+
+    def _add_column(self, column: Any) -> int:
+        if column.key not in self._positions:
+            self._positions[column.key] = len(self.columns)
+            self.columns.append(column)
+        return self._positions[column.key]
+
+    @staticmethod
+    def _compile(field: RowField, positions: Tuple[int, ...]) -> Callable:
+        render = field.render
+        if not positions:
+            return lambda row: render()
+        if len(positions) == 1:
+            index = positions[0]
+            if render is None:
+                return lambda row: row[index]
+            return lambda row: render(row[index])
+        return lambda row: render(*[row[index] for index in positions])
+
+    def value(self, row: Sequence[Any], key: str) -> Any:
+        """Leer una columna seleccionada (p. ej. la clave para cargar hijos)"""
+        return row[self._positions[key]]
+
+    def dump(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        """Convertir filas a dicts en una sola pasada"""
+        getters = self.getters
+        return [{name: getter(row) for name, getter in getters} for row in rows]
+
+class RowSerializer:
+    """Catálogo de campos de un listado con soporte de campos dispersos"""
+
+    def __init__(self, fields: Dict[str, RowField], nested: Optional[Dict[str, 'RowSerializer']] = None):
+        self.fields = fields
+        self.nested = nested or {}
+
+    def parse_fields(self, fields: Union[str, Iterable[str], None]) -> Tuple[List[str], Dict[str, List[str]]]:
+        """Resolver ?fields= en campos propios y campos de relaciones anidadas
+
+        Sin ``fields`` se devuelven todos los campos, incluidas las relaciones.
+        Se admite ``items`` (todos los campos del hijo) o ``items.quantity``.
+        """
+        if fields is None:
+            return list(self.fields), {name: list(child.fields) for name, child in self.nested.items()}
+
+        if isinstance(fields, str):
+            fields = fields.split(',')
+
+        names: List[str] = []
+        nested: Dict[str, List[str]] = {}
+        for raw in fields:
+            name = raw.strip()
+            if not name:
+                continue
+
+            relation, _, child_name = name.partition('.')
+            if relation in self.nested:
+                child = self.nested[relation]
+                selected = nested.setdefault(relation, [])
+                for candidate in ([child_name] if child_name else list(child.fields)):
+                    if candidate not in child.fields:
+                        raise ValidationError(f"Unknown field '{name}'", field='fields', value=name)
+                    if candidate not in selected:
+                        selected.append(candidate)
+            elif name in self.fields:
+                if name not in names:
+                    names.append(name)
+            else:
+                raise ValidationError(f"Unknown field '{name}'", field='fields', value=name)
+
+        return names, nested
+
+    def plan(self, names: Sequence[str], extra_columns: Sequence[Any] = ()) -> RowPlan:
+        """Crear el plan de columnas para los campos pedidos"""
+        return RowPlan(self.fields, names, extra_columns)
+
+SALE_ITEM_SERIALIZER = RowSerializer({
+    'id': RowField(SaleItem.id),
+    'sale_id': RowField(SaleItem.sale_id),
+    'product_id': RowField(SaleItem.product_id),
+    'quantity': RowField(SaleItem.quantity),
+    'unit_price': RowField(SaleItem.unit_price, render=_as_float),
+    'total_price': RowField(SaleItem.total_price, render=_as_float),
+    'discount_amount': RowField(SaleItem.discount_amount, render=_as_float),
+    'discount_reason': RowField(SaleItem.discount_reason),
+    'created_at': RowField(SaleItem.created_at, render=_as_iso)
+})
+
+SALE_SERIALIZER = RowSerializer({
+    'id': RowField(Sale.id),
+    'user_id': RowField(Sale.user_id),
+    'customer_id': RowField(Sale.customer_id),
+    'subtotal': RowField(Sale.subtotal, render=_as_float),
+    'tax_amount': RowField(Sale.tax_amount, render=_as_float),
+    'discount_amount': RowField(Sale.discount_amount, render=_as_float),
+    'total_amount': RowField(Sale.total_amount, render=_as_float),
+    'payment_method': RowField(Sale.payment_method),
+    'payment_reference': RowField(Sale.payment_reference),
+    'change_amount': RowField(Sale.change_amount, render=_as_float),
+    'status': RowField(Sale.status),
+    'notes': RowField(Sale.notes),
+    'created_at': RowField(Sale.created_at, render=_as_iso),
+    'updated_at': RowField(Sale.updated_at, render=_as_iso)
+}, nested={'items': SALE_ITEM_SERIALIZER})
+
+PRODUCT_SERIALIZER = RowSerializer({
+    'id': RowField(Product.id),
+    'name': RowField(Product.name),
+    'description': RowField(Product.description),
+    'sku': RowField(Product.sku),
+    'barcode': RowField(Product.barcode),
+    'price': RowField(Product.price, render=_as_float),
+    # Campos sensibles: null en listados, igual que Product.to_dict()
+    'cost': constant(None),
+    'margin': RowField(Product.margin, render=lambda margin: float(margin) if margin else None),
+    'stock': RowField(Product.stock),
+    'min_stock': RowField(Product.min_stock),
+    'max_stock': RowField(Product.max_stock),
+    'reorder_point': RowField(Product.reorder_point),
+    'category': RowField(Product.category),
+    'brand': RowField(Product.brand),
+    'supplier': constant(None),
+    'is_active': RowField(Product.is_active),
+    'is_digital': RowField(Product.is_digital),
+    'is_low_stock': RowField(Product.stock, Product.min_stock, render=lambda stock, minimum: stock <= minimum),
+    'is_out_of_stock': RowField(Product.stock, render=lambda stock: stock <= 0),
+    'needs_reorder': RowField(Product.stock, Product.reorder_point, render=lambda stock, point: stock <= point),
+    'created_at': RowField(Product.created_at, render=_as_iso),
+    'updated_at': RowField(Product.updated_at, render=_as_iso)
+})
+
+USER_SERIALIZER = RowSerializer({
+    'id': RowField(User.id),
+    'username': RowField(User.username),
+    'email': RowField(User.email),
+    'first_name': RowField(User.first_name),
+    'last_name': RowField(User.last_name),
+    'is_active': RowField(User.is_active),
+    'is_admin': RowField(User.is_admin),
+    'role': RowField(User.role),
+    'assigned_store_id': RowField(User.assigned_store_id),
+    'assigned_store_name': constant(None),
+    'can_access_all_stores': RowField(User.can_access_all_stores),
+    'managed_stores_count': constant(0),
+    'created_at': RowField(User.created_at, render=_as_iso),
+    'updated_at': RowField(User.updated_at, render=_as_iso),
+    'last_login': RowField(User.last_login, render=_as_iso)
+})
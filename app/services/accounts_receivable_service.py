@@ -9,12 +9,45 @@ from datetime import datetime, date, timedelta
 from decimal import Decimal
 import logging
 
+from sqlalchemy import func, case, desc, and_
+
 from app import db
-from app.models.accounts_receivable import Customer, Invoice, AccountsReceivableInvoiceItem, Payment, PaymentAllocation
+from app.models.accounts_receivable import (
+    Customer, Invoice, AccountsReceivableInvoiceItem, Payment, PaymentAllocation, ARAgingSnapshot
+)
 from app.exceptions import BusinessLogicError, ValidationError
 
 logger = logging.getLogger(__name__)
 
+# Tramos de antigüedad: días desde el vencimiento (las no vencidas van en 'current')
+AGING_BUCKETS = (
+    ('current', 30),   # 0-30 días
+    ('31_60', 60),     # 31-60 días
+    ('61_90', 90),     # 61-90 días
+    ('over_90', None)  # Más de 90 días
+)
+
+
+def _sum_if(condition: Any, value: Any) -> Any:
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+def _aging_columns(today: date) -> List[Any]:
+    """SUM(CASE ...) del saldo por tramo; los límites se traducen a fechas de vencimiento"""
+    columns = []
+    lower = None
+    for name, max_days in AGING_BUCKETS:
+        conditions = []
+        if max_days is not None:
+            conditions.append(Invoice.due_date >= today - timedelta(days=max_days))
+        if lower is not None:
+            conditions.append(Invoice.due_date < today - timedelta(days=lower))
+        condition = and_(*conditions) if len(conditions) > 1 else conditions[0]
+        columns.append(_sum_if(condition, Invoice.balance_amount).label(name))
+        lower = max_days
+    return columns
+
+
 class AccountsReceivableService:
     """Servicio para gestión de cartera"""
     
@@ -222,21 +255,29 @@ class AccountsReceivableService:
         ).order_by(Invoice.due_date.asc()).all()
     
     def get_invoices_summary(self, customer_id: int = None) -> Dict[str, Any]:
-        """Obtener resumen de facturas"""
-        query = Invoice.query
+        """Obtener resumen de facturas (una consulta agregada)"""
+        overdue = Invoice.overdue_condition(date.today())
+        query = db.session.query(
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_amount), 0),
+            func.coalesce(func.sum(Invoice.paid_amount), 0),
+            func.coalesce(func.sum(Invoice.balance_amount), 0),
+            _sum_if(overdue, 1),
+            _sum_if(overdue, Invoice.balance_amount)
+        )
         
         if customer_id:
-            query = query.filter_by(customer_id=customer_id)
+            query = query.filter(Invoice.customer_id == customer_id)
         
-        invoices = query.all()
+        total, total_amount, paid_amount, pending_amount, overdue_count, overdue_amount = query.one()
         
         summary = {
-            'total_invoices': len(invoices),
-            'total_amount': sum(float(inv.total_amount) for inv in invoices),
-            'paid_amount': sum(float(inv.paid_amount) for inv in invoices),
-            'pending_amount': sum(float(inv.balance_amount) for inv in invoices),
-            'overdue_count': len([inv for inv in invoices if inv.is_overdue]),
-            'overdue_amount': sum(float(inv.balance_amount) for inv in invoices if inv.is_overdue)
+            'total_invoices': int(total or 0),
+            'total_amount': float(total_amount),
+            'paid_amount': float(paid_amount),
+            'pending_amount': float(pending_amount),
+            'overdue_count': int(overdue_count),
+            'overdue_amount': float(overdue_amount)
         }
         
         return summary
@@ -373,40 +414,131 @@ class AccountsReceivableService:
     # ==================== REPORTES ====================
     
     def get_aging_report(self, customer_id: int = None) -> Dict[str, Any]:
-        """Obtener reporte de antigüedad de cartera"""
-        query = Invoice.query.filter(Invoice.balance_amount > 0)
+        """Obtener reporte de antigüedad de cartera (una consulta con tramos CASE)"""
+        today = date.today()
+        query = db.session.query(
+            *_aging_columns(today), func.count(Invoice.id)
+        ).filter(Invoice.balance_amount > 0)
         
         if customer_id:
-            query = query.filter_by(customer_id=customer_id)
+            query = query.filter(Invoice.customer_id == customer_id)
         
-        invoices = query.all()
-        today = date.today()
+        row = query.one()
+        aging_buckets = {name: float(row[index]) for index, (name, _) in enumerate(AGING_BUCKETS)}
         
-        aging_buckets = {
-            'current': 0,      # 0-30 días
-            '31_60': 0,        # 31-60 días
-            '61_90': 0,        # 61-90 días
-            'over_90': 0       # Más de 90 días
+        return {
+            'aging_buckets': aging_buckets,
+            'total_outstanding': sum(aging_buckets.values()),
+            'total_invoices': int(row[-1] or 0)
         }
+    
+    def get_customer_aging(self, limit: int = 50, offset: int = 0, overdue_only: bool = False) -> Dict[str, Any]:
+        """Matriz de antigüedad por cliente (clientes × tramos), por saldo descendente
         
-        for invoice in invoices:
-            days_overdue = (today - invoice.due_date).days
-            
-            if days_overdue <= 30:
-                aging_buckets['current'] += float(invoice.balance_amount)
-            elif days_overdue <= 60:
-                aging_buckets['31_60'] += float(invoice.balance_amount)
-            elif days_overdue <= 90:
-                aging_buckets['61_90'] += float(invoice.balance_amount)
-            else:
-                aging_buckets['over_90'] += float(invoice.balance_amount)
+        Una consulta GROUP BY customer_id para la página y otra para el total
+        de clientes con saldo.
+        """
+        today = date.today()
+        overdue = Invoice.overdue_condition(today)
+        outstanding = func.sum(Invoice.balance_amount)
+        overdue_amount = _sum_if(overdue, Invoice.balance_amount)
+        
+        query = db.session.query(
+            Customer.id, Customer.customer_code, Customer.name,
+            *_aging_columns(today),
+            outstanding.label('total_outstanding'),
+            overdue_amount.label('overdue_amount'),
+            func.count(Invoice.id).label('invoice_count')
+        ).join(Customer, Customer.id == Invoice.customer_id).filter(
+            Invoice.balance_amount > 0
+        ).group_by(Customer.id, Customer.customer_code, Customer.name)
+        
+        count_query = db.session.query(func.count(func.distinct(Invoice.customer_id))).filter(
+            Invoice.balance_amount > 0
+        )
+        if overdue_only:
+            query = query.having(overdue_amount > 0)
+            count_query = count_query.filter(overdue)
+        
+        rows = query.order_by(desc(outstanding), Customer.id).offset(offset).limit(limit).all()
+        
+        customers = []
+        for row in rows:
+            customers.append({
+                'customer_id': row.id,
+                'customer_code': row.customer_code,
+                'name': row.name,
+                'aging_buckets': {name: float(getattr(row, name)) for name, _ in AGING_BUCKETS},
+                'total_outstanding': float(row.total_outstanding or 0),
+                'overdue_amount': float(row.overdue_amount or 0),
+                'invoice_count': int(row.invoice_count or 0),
+                'is_overdue': float(row.overdue_amount or 0) > 0
+            })
         
         return {
-            'aging_buckets': aging_buckets,
-            'total_outstanding': sum(aging_buckets.values()),
-            'total_invoices': len(invoices)
+            'customers': customers,
+            'total_customers': int(count_query.scalar() or 0),
+            'limit': limit,
+            'offset': offset,
+            'as_of': today.isoformat()
         }
     
+    def take_aging_snapshot(self, snapshot_date: date = None) -> ARAgingSnapshot:
+        """Guardar la foto de antigüedad del día (reemplaza la del mismo día)
+        
+        La antigüedad es la del estado actual de la cartera: se ejecuta al
+        cierre del día desde el planificador de reportes (ar_aging_snapshot).
+        """
+        snapshot_date = snapshot_date or date.today()
+        overdue = Invoice.overdue_condition(snapshot_date)
+        row = db.session.query(
+            *_aging_columns(snapshot_date),
+            _sum_if(overdue, Invoice.balance_amount),
+            func.count(Invoice.id),
+            _sum_if(overdue, 1),
+            func.count(func.distinct(Invoice.customer_id))
+        ).filter(Invoice.balance_amount > 0).one()
+        
+        current, days_31_60, days_61_90, over_90, overdue_amount, open_invoices, overdue_invoices, customers = row
+        
+        try:
+            snapshot = ARAgingSnapshot.query.filter_by(snapshot_date=snapshot_date).first()
+            if snapshot is None:
+                snapshot = ARAgingSnapshot(snapshot_date=snapshot_date)
+                db.session.add(snapshot)
+            
+            snapshot.current_amount = current
+            snapshot.days_31_60 = days_31_60
+            snapshot.days_61_90 = days_61_90
+            snapshot.over_90 = over_90
+            snapshot.total_outstanding = current + days_31_60 + days_61_90 + over_90
+            snapshot.overdue_amount = overdue_amount
+            snapshot.open_invoices = int(open_invoices or 0)
+            snapshot.overdue_invoices = int(overdue_invoices or 0)
+            snapshot.customers_with_balance = int(customers or 0)
+            snapshot.created_at = datetime.utcnow()
+            db.session.commit()
+            
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error guardando foto de antigüedad de cartera: {str(e)}")
+            raise BusinessLogicError(f"Error guardando foto de antigüedad: {str(e)}", operation='ar_aging_snapshot')
+        
+        self.logger.info(f"Foto de antigüedad de cartera {snapshot_date}: {snapshot.total_outstanding}")
+        return snapshot
+    
+    def get_aging_trend(self, start_date: date = None, end_date: date = None) -> List[Dict[str, Any]]:
+        """Serie de fotos diarias de antigüedad (por defecto los últimos 90 días)"""
+        end_date = end_date or date.today()
+        start_date = start_date or end_date - timedelta(days=90)
+        
+        snapshots = ARAgingSnapshot.query.filter(
+            ARAgingSnapshot.snapshot_date >= start_date,
+            ARAgingSnapshot.snapshot_date <= end_date
+        ).order_by(ARAgingSnapshot.snapshot_date).all()
+        
+        return [snapshot.to_dict() for snapshot in snapshots]
+    
     def get_customer_statement(self, customer_id: int, start_date: date = None, end_date: date = None) -> Dict[str, Any]:
         """Obtener estado de cuenta del cliente"""
         customer = self.get_customer(customer_id)
@@ -439,19 +571,24 @@ class AccountsReceivableService:
         }
     
     def get_collection_efficiency(self, start_date: date, end_date: date) -> Dict[str, Any]:
-        """Obtener eficiencia de cobranza"""
-        # Facturas emitidas en el período
-        invoices_issued = Invoice.query.filter(
+        """Obtener eficiencia de cobranza (una consulta agregada)"""
+        # Facturas emitidas en el período y, de ellas, las vencidas
+        overdue = Invoice.overdue_condition(date.today())
+        row = db.session.query(
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_amount), 0),
+            func.coalesce(func.sum(Invoice.paid_amount), 0),
+            _sum_if(overdue, Invoice.balance_amount),
+            _sum_if(overdue, 1)
+        ).filter(
             Invoice.invoice_date >= start_date,
             Invoice.invoice_date <= end_date
-        ).all()
-        
-        total_issued = sum(float(inv.total_amount) for inv in invoices_issued)
-        total_collected = sum(float(inv.paid_amount) for inv in invoices_issued)
+        ).one()
         
-        # Facturas vencidas
-        overdue_invoices = [inv for inv in invoices_issued if inv.is_overdue]
-        overdue_amount = sum(float(inv.balance_amount) for inv in overdue_invoices)
+        invoices_count = int(row[0] or 0)
+        total_issued = float(row[1])
+        total_collected = float(row[2])
+        overdue_amount = float(row[3])
         
         # Calcular métricas
         collection_rate = (total_collected / total_issued * 100) if total_issued > 0 else 0
@@ -468,6 +605,6 @@ class AccountsReceivableService:
             'overdue_amount': overdue_amount,
             'collection_rate': collection_rate,
             'overdue_rate': overdue_rate,
-            'invoices_count': len(invoices_issued),
-            'overdue_count': len(overdue_invoices)
+            'invoices_count': invoices_count,
+            'overdue_count': int(row[4] or 0)
         }
@@ -0,0 +1,157 @@
+"""
+AI Index Updater - Sistema POS O'Data
+====================================
+Actualización incremental del modelo TF-IDF cuando cambia el catálogo.
+
+Un thread por proceso sondea la huella del catálogo (AI_INDEX_POLL_INTERVAL)
+y se despierta al confirmarse una transacción que tocó el texto indexado de
+productos (altas, bajas o ediciones de nombre, descripción, categoría o
+is_active); las ventas y ajustes de stock o precio no lo despiertan. Cada
+ciclo llama a AIService.refresh_index: las filas modificadas se parchan en
+una instantánea nueva que se publica con intercambio atómico, así que las
+búsquedas nunca esperan y los cambios aparecen en segundos. Otros procesos
+abren el artefacto ya guardado en lugar de repetir el trabajo.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+_INFO_KEY = 'ai_index_products_touched'
+# Columnas de products que cambian el índice TF-IDF (texto y visibilidad)
+INDEXED_COLUMNS = frozenset(('name', 'description', 'category', 'is_active'))
+_listeners_registered = False
+_wakeup = threading.Event()
+
+
+class AIIndexUpdaterThread:
+    """Thread que mantiene el modelo publicado al día con el catálogo"""
+
+    def __init__(self, app, poll_interval: float = 30.0, debounce: float = 1.0):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Iniciar el thread daemon"""
+        self._thread = threading.Thread(target=self._run, name='ai-index-updater', daemon=True)
+        self._thread.start()
+        logger.info(f"AI index updater started (poll every {self.poll_interval}s)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detener el thread"""
+        self._stop.set()
+        _wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        from app.services.ai_service import ai_service
+
+        while not self._stop.is_set():
+            if _wakeup.wait(self.poll_interval):
+                # Agrupar ráfagas de ediciones en una sola actualización
+                self._stop.wait(self.debounce)
+                _wakeup.clear()
+            if self._stop.is_set():
+                break
+            try:
+                with self.app.app_context():
+                    ai_service.refresh_index()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"AI index updater error: {e}")
+
+
+def notify() -> None:
+    """Pedir una actualización del índice (el thread del proceso la atiende)"""
+    _wakeup.set()
+
+
+# ----------------------------------------------------------------------
+# Aviso por escritura (eventos de sesión SQLAlchemy)
+# ----------------------------------------------------------------------
+
+def _is_product(obj: Any) -> bool:
+    return getattr(getattr(obj, '__table__', None), 'name', None) == 'products'
+
+
+def _on_after_flush(session: Session, flush_context: Any) -> None:
+    for obj in (*session.new, *session.deleted):
+        if _is_product(obj):
+            session.info[_INFO_KEY] = True
+            return
+    for obj in session.dirty:
+        # Solo ediciones de columnas indexadas (no stock, precio ni updated_at)
+        if _is_product(obj):
+            attrs = inspect(obj).attrs
+            if any(attrs[column].history.has_changes() for column in INDEXED_COLUMNS):
+                session.info[_INFO_KEY] = True
+                return
+
+
+def _updated_columns(state: Any) -> Set[str]:
+    """Columnas que asigna un UPDATE masivo (values()/query.update() o parámetros por clave primaria)"""
+    statement = state.statement
+    keys = list(statement._values or ()) + [key for key, _ in statement._ordered_values or ()]
+    parameters = state.parameters
+    for params in (parameters if isinstance(parameters, (list, tuple)) else [parameters or {}]):
+        keys.extend(params)
+    return {getattr(key, 'key', key) for key in keys}
+
+
+def _on_orm_execute(state: Any) -> None:
+    # INSERT/UPDATE/DELETE masivos (insert(Product), query.update()) no pasan por el flush
+    if state.is_insert or state.is_update or state.is_delete:
+        if getattr(getattr(state.statement, 'table', None), 'name', None) != 'products':
+            return
+        if state.is_update and INDEXED_COLUMNS.isdisjoint(_updated_columns(state)):
+            return
+        state.session.info[_INFO_KEY] = True
+
+
+def _on_after_commit(session: Session) -> None:
+    if session.info.pop(_INFO_KEY, None):
+        notify()
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_INFO_KEY, None)
+
+
+def register_index_listeners() -> None:
+    """Registrar (una vez por proceso) los eventos que despiertan al actualizador"""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(Session, 'after_flush', _on_after_flush)
+    event.listen(Session, 'do_orm_execute', _on_orm_execute)
+    event.listen(Session, 'after_commit', _on_after_commit)
+    event.listen(Session, 'after_rollback', _on_after_rollback)
+    _listeners_registered = True
+
+
+def start_ai_index_updater(app) -> Optional[AIIndexUpdaterThread]:
+    """Iniciar el actualizador según configuración (AI_INDEX_UPDATER_ENABLED=false lo desactiva)"""
+    if os.getenv('AI_INDEX_UPDATER_ENABLED', 'true').lower() != 'true':
+        app.logger.info("AI index updater disabled")
+        return None
+
+    register_index_listeners()
+    updater = AIIndexUpdaterThread(
+        app,
+        poll_interval=float(os.getenv('AI_INDEX_POLL_INTERVAL', '30')),
+        debounce=float(os.getenv('AI_INDEX_DEBOUNCE_SECONDS', '1'))
+    )
+    updater.start()
+    return updater
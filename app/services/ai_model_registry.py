@@ -0,0 +1,146 @@
+"""
+AI Model Registry - Sistema POS O'Data
+=====================================
+Registro de modelos de IA por proceso. Guarda una única instantánea
+inmutable del modelo TF-IDF entrenado (vectorizador, matriz, índice
+fila → product_id) que todas las instancias de AIService comparten.
+
+Estilo RCU: las lecturas toman la referencia actual sin bloqueo y trabajan
+sobre ella aunque en paralelo se publique otra; los reentrenamientos
+construyen la instantánea nueva completa fuera del camino de lectura y la
+publican con una sola asignación. El lock solo serializa a los escritores.
+
+Las actualizaciones incrementales (filas re-vectorizadas con el vocabulario
+e IDF del último ajuste completo) acumulan deriva: changes / fitted_size.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from app.services.ai_suggestion_index import SuggestionIndex
+
+logger = logging.getLogger(__name__)
+
+
+class ModelSnapshot(NamedTuple):
+    """Modelo TF-IDF publicado (no se modifica después de publicarse)"""
+    version: str
+    catalog_version: Optional[str]
+    vectorizer: Any
+    matrix: Any
+    product_ids: np.ndarray
+    row_index: Dict[int, int]  # product_id -> fila de la matriz
+    published_at: datetime
+    indexed_at: Optional[datetime] = None  # mayor updated_at de productos ya indexados
+    fitted_size: int = 0  # productos del último ajuste completo
+    changes: int = 0  # filas agregadas, re-vectorizadas o quitadas desde ese ajuste
+    suggestions: Optional[SuggestionIndex] = None  # índice de sugerencias del vocabulario
+
+    @property
+    def size(self) -> int:
+        return len(self.product_ids)
+
+    @property
+    def drift(self) -> float:
+        return self.changes / self.fitted_size if self.fitted_size else 0.0
+
+
+def build_snapshot(
+    version: str,
+    catalog_version: Optional[str],
+    vectorizer: Any,
+    matrix: Any,
+    product_ids: Any,
+    indexed_at: Optional[datetime] = None,
+    fitted_size: Optional[int] = None,
+    changes: int = 0,
+    suggestions: Optional[SuggestionIndex] = None
+) -> ModelSnapshot:
+    """Armar una instantánea de solo lectura a partir de un modelo entrenado o cargado
+
+    El índice de sugerencias se construye del vocabulario salvo que se
+    reutilice el de una instantánea con el mismo vectorizador.
+    """
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    if product_ids.flags.writeable:
+        product_ids = product_ids.copy()
+        product_ids.flags.writeable = False
+
+    return ModelSnapshot(
+        version=version,
+        catalog_version=catalog_version,
+        vectorizer=vectorizer,
+        matrix=matrix.tocsr(),
+        product_ids=product_ids,
+        row_index={int(product_id): row for row, product_id in enumerate(product_ids.tolist())},
+        published_at=datetime.utcnow(),
+        indexed_at=indexed_at,
+        fitted_size=len(product_ids) if fitted_size is None else int(fitted_size),
+        changes=int(changes),
+        suggestions=suggestions if suggestions is not None else SuggestionIndex.from_vectorizer(vectorizer)
+    )
+
+
+class AIModelRegistry:
+    """Instantánea actual del modelo por proceso con intercambio atómico"""
+
+    def __init__(self):
+        self._snapshot: Optional[ModelSnapshot] = None
+        self._write_lock = threading.Lock()
+        self._swaps = 0
+
+    def current(self) -> Optional[ModelSnapshot]:
+        """Instantánea vigente (lectura sin bloqueo; None si no hay modelo)"""
+        return self._snapshot
+
+    def publish(self, snapshot: ModelSnapshot) -> ModelSnapshot:
+        """Publicar una instantánea ya construida"""
+        with self._write_lock:
+            return self._swap(snapshot)
+
+    def reload(self, loader: Callable[[], Optional[ModelSnapshot]]) -> Optional[ModelSnapshot]:
+        """Construir y publicar una instantánea nueva; un solo escritor a la vez
+
+        Si el loader no produce modelo se conserva la instantánea vigente.
+        """
+        with self._write_lock:
+            snapshot = loader()
+            if snapshot is None:
+                return self._snapshot
+            return self._swap(snapshot)
+
+    def _swap(self, snapshot: ModelSnapshot) -> ModelSnapshot:
+        previous = self._snapshot
+        self._snapshot = snapshot
+        self._swaps += 1
+        logger.info(
+            f"AI model {snapshot.version} published ({snapshot.size} products)"
+            + (f", replacing {previous.version}" if previous is not None else '')
+        )
+        return snapshot
+
+    def clear(self) -> None:
+        with self._write_lock:
+            self._snapshot = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            'loaded': snapshot is not None,
+            'version': snapshot.version if snapshot else None,
+            'catalog_version': snapshot.catalog_version if snapshot else None,
+            'products': snapshot.size if snapshot else 0,
+            'published_at': snapshot.published_at.isoformat() if snapshot else None,
+            'indexed_at': snapshot.indexed_at.isoformat() if snapshot and snapshot.indexed_at else None,
+            'drift': round(snapshot.drift, 4) if snapshot else 0.0,
+            'suggestion_terms': len(snapshot.suggestions.terms) if snapshot and snapshot.suggestions else 0,
+            'swaps': self._swaps
+        }
+
+
+# Instancia global del registro (una por proceso)
+ai_model_registry = AIModelRegistry()
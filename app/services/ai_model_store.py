@@ -0,0 +1,204 @@
+"""
+AI Model Store - Sistema POS O'Data
+==================================
+Artefactos versionados de los modelos de IA en disco. Cada versión
+corresponde a una huella del texto indexado del catálogo de productos
+activos: mientras ese texto no cambie (las ventas y ajustes de stock o
+precio no lo tocan), los procesos cargan el modelo entrenado en lugar de
+reentrenarlo al arrancar.
+
+Los arrays (matriz TF-IDF dispersa e índice fila → product_id) se guardan
+como .npy y se abren con memory mapping, de modo que los workers comparten
+las páginas del cache del sistema operativo. La escritura es atómica: se
+genera en un directorio temporal y se renombra al nombre de la versión.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import uuid
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Arrays de la matriz CSR y del índice de productos (uno por archivo .npy)
+MATRIX_ARRAYS = ('data', 'indices', 'indptr')
+ARTIFACT_FORMAT = 1
+
+
+class ModelArtifact(NamedTuple):
+    """Modelo TF-IDF cargado desde disco"""
+    version: str
+    catalog_version: str
+    vectorizer: Any
+    matrix: Any
+    product_ids: np.ndarray
+    metadata: Dict[str, Any]
+
+
+def _sklearn_version() -> Optional[str]:
+    try:
+        import sklearn  # type: ignore[import]
+        return sklearn.__version__
+    except Exception:
+        return None
+
+
+class AIModelStore:
+    """Almacén de artefactos de modelos por versión de catálogo"""
+
+    def __init__(self):
+        self.model_dir = os.path.abspath(os.getenv('AI_MODEL_DIR', os.path.join('instance', 'ai_models')))
+        self.keep_versions = max(int(os.getenv('AI_MODEL_KEEP_VERSIONS', '3')), 1)
+
+    def catalog_version(self) -> str:
+        """Huella de (id, nombre, descripción, categoría) de los productos activos
+
+        Son los campos que entran al TF-IDF: cambia con altas, bajas y
+        ediciones de texto, no con escrituras que solo mueven updated_at.
+        """
+        from sqlalchemy import select
+        from app import db
+        from app.models.product import Product
+
+        rows = db.session.connection().execute(
+            select(Product.id, Product.name, Product.description, Product.category)
+            .where(Product.is_active == True)
+            .order_by(Product.id)
+        )
+        digest = hashlib.sha1()
+        for row in rows:
+            digest.update('\x1f'.join('' if value is None else str(value) for value in row).encode('utf-8'))
+            digest.update(b'\x1e')
+        return digest.hexdigest()[:16]
+
+    def version_name(self, model_name: str, catalog_version: str) -> str:
+        return f'{model_name}-{catalog_version}'
+
+    def _path(self, model_name: str, catalog_version: str) -> str:
+        return os.path.join(self.model_dir, self.version_name(model_name, catalog_version))
+
+    def load(self, model_name: str, catalog_version: str) -> Optional[ModelArtifact]:
+        """Cargar la versión del catálogo si existe en disco (arrays con memory mapping)"""
+        path = self._path(model_name, catalog_version)
+        if not os.path.isdir(path):
+            return None
+
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as handle:
+                metadata = json.load(handle)
+
+            # Un artefacto de otra versión de sklearn o de formato no se reutiliza
+            if metadata.get('format') != ARTIFACT_FORMAT or metadata.get('sklearn_version') != _sklearn_version():
+                logger.info(f"AI model artifact {os.path.basename(path)} is stale; retraining")
+                return None
+
+            from scipy.sparse import csr_matrix  # type: ignore[import]
+
+            arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in MATRIX_ARRAYS}
+            matrix = csr_matrix(
+                (arrays['data'], arrays['indices'], arrays['indptr']),
+                shape=tuple(metadata['shape']), copy=False
+            )
+            product_ids = np.load(os.path.join(path, 'product_ids.npy'), mmap_mode='r')
+
+            with open(os.path.join(path, 'vectorizer.pkl'), 'rb') as handle:
+                vectorizer = pickle.load(handle)
+
+            return ModelArtifact(
+                version=metadata['version'],
+                catalog_version=catalog_version,
+                vectorizer=vectorizer,
+                matrix=matrix,
+                product_ids=product_ids,
+                metadata=metadata
+            )
+        except Exception as e:
+            logger.error(f"Error loading AI model artifact {path}: {e}")
+            return None
+
+    def save(
+        self,
+        model_name: str,
+        catalog_version: str,
+        vectorizer: Any,
+        matrix: Any,
+        product_ids: np.ndarray,
+        metadata: Optional[Dict[str, Any]] = None,
+        replace: bool = False
+    ) -> str:
+        """Guardar una versión de forma atómica y devolver su ruta
+
+        Si otro proceso publicó la misma versión primero se conserva la suya,
+        salvo con replace (reentrenamiento forzado).
+        """
+        os.makedirs(self.model_dir, exist_ok=True)
+        path = self._path(model_name, catalog_version)
+        staging = os.path.join(self.model_dir, f'.{os.path.basename(path)}.{uuid.uuid4().hex}.tmp')
+        os.makedirs(staging)
+
+        try:
+            matrix = matrix.tocsr()
+            matrix.sort_indices()
+            for name in MATRIX_ARRAYS:
+                np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(getattr(matrix, name)))
+            np.save(os.path.join(staging, 'product_ids.npy'), np.asarray(product_ids, dtype=np.int64))
+
+            with open(os.path.join(staging, 'vectorizer.pkl'), 'wb') as handle:
+                pickle.dump(vectorizer, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+            meta = dict(metadata or {})
+            meta.update({
+                'format': ARTIFACT_FORMAT,
+                'version': self.version_name(model_name, catalog_version),
+                'model_name': model_name,
+                'catalog_version': catalog_version,
+                'shape': list(matrix.shape),
+                'sklearn_version': _sklearn_version(),
+                'created_at': datetime.utcnow().isoformat()
+            })
+            with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as handle:
+                json.dump(meta, handle)
+
+            if replace and os.path.isdir(path):
+                # Los procesos con la versión anterior abierta conservan sus mapeos
+                retired = f'{staging}.old'
+                os.rename(path, retired)
+                shutil.rmtree(retired, ignore_errors=True)
+
+            try:
+                os.rename(staging, path)
+            except OSError:
+                if not os.path.isdir(path):
+                    raise
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._prune(model_name)
+        return path
+
+    def _prune(self, model_name: str) -> None:
+        """Conservar solo las versiones más recientes del modelo"""
+        try:
+            prefix = f'{model_name}-'
+            versions = [
+                os.path.join(self.model_dir, name) for name in os.listdir(self.model_dir)
+                if name.startswith(prefix) and os.path.isdir(os.path.join(self.model_dir, name))
+            ]
+            versions.sort(key=os.path.getmtime, reverse=True)
+            for path in versions[self.keep_versions:]:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError as e:
+            logger.warning(f"Error pruning AI model artifacts: {e}")
+
+
+# Instancia global del almacén
+ai_model_store = AIModelStore()
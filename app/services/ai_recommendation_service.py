@@ -0,0 +1,258 @@
+"""
+AI Recommendation Service - Sistema POS O'Data
+=============================================
+Recomendaciones precalculadas por contenido (tabla ai_recommendations).
+
+Un trabajo por lotes (programación ai_recommendations del planificador o
+POST /ai/recommendations/rebuild) calcula los K vecinos de todo el catálogo
+con una multiplicación dispersa por bloques de filas de la matriz TF-IDF y
+recién con todos los vecinos calculados reemplaza las filas content_based
+(DELETE más inserciones masivas) en una transacción corta. Las consultas (checkout, API) leen la tabla a través de un
+cache en proceso, de modo que una recomendación es una búsqueda en
+diccionario más la hidratación desde el cache de productos.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert
+
+from app import db
+from app.exceptions import BusinessLogicError, ValidationError
+from app.models.ai_models import AIRecommendation
+from app.models.product import Product
+from app.services.product_cache import product_cache
+
+logger = logging.getLogger(__name__)
+
+CONTENT_BASED = 'content_based'
+MAX_TOP_K = 50
+WRITE_CHUNK = 5000
+
+# (recommended_product_id, similarity_score, recommendation_reason)
+Neighbour = Tuple[int, float, Optional[str]]
+
+
+class AIRecommendationService:
+    """Vecinos precalculados por producto con cache en proceso"""
+
+    def __init__(self):
+        self.top_k = int(os.getenv('AI_RECOMMENDATIONS_TOP_K', '10'))
+        self.block_size = int(os.getenv('AI_RECOMMENDATIONS_BLOCK_SIZE', '512'))
+        self.cache_ttl = float(os.getenv('AI_RECOMMENDATIONS_CACHE_TTL_SECONDS', '300'))
+        self.cache_max_entries = int(os.getenv('AI_RECOMMENDATIONS_CACHE_MAX_ENTRIES', '20000'))
+
+        self._cache: 'OrderedDict[int, Tuple[float, List[Neighbour]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._last_rebuild: Optional[Dict[str, Any]] = None
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def get_neighbours(self, product_id: int) -> List[Neighbour]:
+        """Vecinos precalculados de un producto, ordenados por similitud"""
+        product_id = int(product_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(product_id)
+            if entry is not None and now - entry[0] < self.cache_ttl:
+                self._cache.move_to_end(product_id)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        # Lectura indexada (idx_ai_recommendation_source); sin filas se cachea la lista vacía
+        neighbours = [
+            (recommended_id, float(score), reason)
+            for recommended_id, score, reason in db.session.query(
+                AIRecommendation.recommended_product_id,
+                AIRecommendation.similarity_score,
+                AIRecommendation.recommendation_reason
+            ).filter(
+                AIRecommendation.source_product_id == product_id,
+                AIRecommendation.is_active == True
+            ).order_by(AIRecommendation.similarity_score.desc()).all()
+        ]
+
+        with self._lock:
+            self._cache[product_id] = (now, neighbours)
+            self._cache.move_to_end(product_id)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+        return neighbours
+
+    def get_recommendations(self, product_id: int, limit: int = 5) -> List[Dict[str, Any]]:
+        """Recomendaciones hidratadas (se omiten productos desactivados después del lote)"""
+        neighbours = self.get_neighbours(product_id)
+        if not neighbours:
+            return []
+
+        products = product_cache.get_many(recommended_id for recommended_id, _, _ in neighbours)
+        recommendations = []
+        for recommended_id, score, reason in neighbours:
+            product = products.get(recommended_id)
+            if product is None:
+                continue
+            recommendations.append({
+                'product': product,
+                'similarity_score': score,
+                'recommendation_reason': reason
+            })
+            if len(recommendations) >= limit:
+                break
+        return recommendations
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'cached_products': len(self._cache),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'last_rebuild': self._last_rebuild
+            }
+
+    # ------------------------------------------------------------------
+    # Trabajo por lotes
+    # ------------------------------------------------------------------
+
+    def rebuild(self, top_k: Optional[int] = None, block_size: Optional[int] = None) -> Dict[str, Any]:
+        """Recalcular los K vecinos de todo el catálogo y reemplazar la tabla
+
+        Cada bloque de filas se multiplica contra la matriz completa (las
+        filas TF-IDF están normalizadas, el producto es el coseno) y de cada
+        fila se eligen los K mejores con np.argpartition. La tabla solo se
+        escribe al final, así el cálculo no retiene una transacción abierta.
+        """
+        from app.services.ai_service import MIN_SIMILARITY, ai_service, recommendation_reason, top_k_rows
+
+        top_k = int(top_k or self.top_k)
+        block_size = max(int(block_size or self.block_size), 1)
+        if not 1 <= top_k <= MAX_TOP_K:
+            raise ValidationError(f"top_k debe estar entre 1 y {MAX_TOP_K}", field='top_k', value=top_k)
+
+        with self._rebuild_lock:
+            started = time.perf_counter()
+            if not ai_service.load_or_train():
+                raise BusinessLogicError("Modelo TF-IDF no disponible", operation='rebuild_recommendations')
+            model = ai_service.registry.current()
+
+            # Solo productos activos hoy, aunque el modelo sea anterior a una baja
+            info = {
+                product_id: {'category': category, 'price': float(price or 0)}
+                for product_id, category, price in db.session.query(
+                    Product.id, Product.category, Product.price
+                ).filter(Product.is_active == True).all()
+            }
+            # Sin transacción abierta durante el cálculo
+            db.session.commit()
+            product_ids = model.product_ids
+            active = np.fromiter((product_id in info for product_id in product_ids.tolist()),
+                                 dtype=bool, count=model.size)
+
+            # Transpuesta en CSR una sola vez (scipy la convertiría en cada bloque)
+            matrix = model.matrix
+            transposed = matrix.T.tocsr()
+            sources = 0
+            # Vecinos en columnas (source, recommended, score, reason) hasta la escritura
+            source_ids: List[int] = []
+            recommended_ids: List[int] = []
+            similarity_scores: List[float] = []
+            reasons: List[Optional[str]] = []
+
+            for start in range(0, model.size, block_size):
+                end = min(start + block_size, model.size)
+                block = (matrix[start:end] @ transposed).tocsr()
+                block.sort_indices()
+
+                for offset in range(end - start):
+                    row = start + offset
+                    if not active[row]:
+                        continue
+                    lo, hi = block.indptr[offset], block.indptr[offset + 1]
+                    columns = block.indices[lo:hi]
+                    scores = block.data[lo:hi]
+                    keep = (columns != row) & active[columns]
+                    columns, scores = columns[keep], scores[keep]
+
+                    picked, picked_scores = top_k_rows(scores, top_k, MIN_SIMILARITY)
+                    if picked.size == 0:
+                        continue
+                    sources += 1
+                    source_id = int(product_ids[row])
+                    for recommended_id, score in zip(product_ids[columns[picked]].tolist(),
+                                                     picked_scores.tolist()):
+                        source_ids.append(source_id)
+                        recommended_ids.append(recommended_id)
+                        similarity_scores.append(score)
+                        reasons.append(recommendation_reason(info[source_id], info[recommended_id], score))
+
+            computed = time.perf_counter()
+            written = self._replace_rows(source_ids, recommended_ids, similarity_scores, reasons)
+            write_ms = round((time.perf_counter() - computed) * 1000, 1)
+
+            self.invalidate()
+            ai_service._update_model_status('recommendations', model.version, True, sources)
+
+            self._last_rebuild = {
+                'model_version': model.version,
+                'products': int(active.sum()),
+                'source_products': sources,
+                'recommendations': written,
+                'top_k': top_k,
+                'block_size': block_size,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+                'write_ms': write_ms,
+                'completed_at': datetime.utcnow().isoformat()
+            }
+            logger.info(f"AI recommendations rebuilt: {written} rows for {sources} products "
+                        f"in {self._last_rebuild['elapsed_ms']} ms")
+            return self._last_rebuild
+
+    @staticmethod
+    def _replace_rows(source_ids: List[int], recommended_ids: List[int], scores: List[float],
+                      reasons: List[Optional[str]]) -> int:
+        """Reemplazar las filas content_based en una transacción (DELETE e inserciones masivas)"""
+        try:
+            db.session.execute(delete(AIRecommendation).where(
+                AIRecommendation.recommendation_type == CONTENT_BASED
+            ))
+            for start in range(0, len(source_ids), WRITE_CHUNK):
+                end = start + WRITE_CHUNK
+                db.session.execute(insert(AIRecommendation), [
+                    {
+                        'source_product_id': source_id,
+                        'recommended_product_id': recommended_id,
+                        'similarity_score': score,
+                        'recommendation_type': CONTENT_BASED,
+                        'recommendation_reason': reason,
+                        'is_active': True
+                    }
+                    for source_id, recommended_id, score, reason in zip(
+                        source_ids[start:end], recommended_ids[start:end], scores[start:end], reasons[start:end]
+                    )
+                ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(source_ids)
+
+
+# Instancia global del servicio
+ai_recommendation_service = AIRecommendationService()
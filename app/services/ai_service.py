@@ -8,12 +8,9 @@ import numpy as np
 import json
 import logging
 from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
-import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import SnowballStemmer
+from datetime import datetime, timedelta
+import os
+import time
 
 # sklearn es opcional en entornos locales (ej. Python 3.13 sin wheel)
 SKLEARN_AVAILABLE = True
@@ -36,101 +33,167 @@ from app.models.ai_models import (
     AIRecommendation, AIVocabulary, AIModelStatus
 )
 from app.models.product import Product
+from app.services.ai_model_store import ai_model_store
+from app.services.ai_model_registry import AIModelRegistry, ModelSnapshot, ai_model_registry, build_snapshot
+from app.services.ai_text_pipeline import load_nltk_resources, text_pipeline
+from app.services.product_cache import product_cache
 
 logger = logging.getLogger(__name__)
 
+# Umbral mínimo de similitud y candidatos extra por búsqueda
+MIN_SIMILARITY = 0.1
+SEARCH_CANDIDATE_MARGIN = 5
+
+# Actualización incremental: deriva máxima (filas cambiadas / productos del
+# último ajuste completo) y margen en segundos sobre la marca de agua
+INDEX_MAX_DRIFT = float(os.getenv('AI_INDEX_MAX_DRIFT', '0.2'))
+INDEX_WATERMARK_OVERLAP = float(os.getenv('AI_INDEX_WATERMARK_OVERLAP_SECONDS', '5'))
+# Diferencia L1 bajo la cual una fila re-vectorizada es la publicada (texto sin cambios)
+TEXT_VECTOR_TOLERANCE = 1e-9
+
+def top_k_rows(scores: np.ndarray, k: int, min_score: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Filas con los k puntajes más altos por encima de min_score, en orden descendente
+
+    np.argpartition selecciona en O(n); solo los k ganadores se ordenan.
+    """
+    candidates = np.flatnonzero(scores > min_score)
+    if k <= 0 or candidates.size == 0:
+        return candidates[:0], scores[candidates[:0]]
+    if candidates.size > k:
+        top = np.argpartition(scores[candidates], -k)[-k:]
+        candidates = np.sort(candidates[top])
+    rows = candidates[np.argsort(-scores[candidates], kind='stable')]
+    return rows, scores[rows]
+
+
+def recommendation_reason(source: Dict[str, Any], recommended: Dict[str, Any], similarity: float) -> str:
+    """Generar razón para la recomendación (productos como dicts con category y price)"""
+    reasons = []
+    
+    # Misma categoría
+    if source.get('category') and source.get('category') == recommended.get('category'):
+        reasons.append("misma categoría")
+    
+    # Precio similar
+    source_price = source.get('price') or 0
+    if source_price and recommended.get('price') is not None:
+        price_diff = abs(source_price - recommended['price']) / source_price
+        if price_diff < 0.3:
+            reasons.append("precio similar")
+    
+    # Similitud alta
+    if similarity > 0.5:
+        reasons.append("productos muy similares")
+    elif similarity > 0.3:
+        reasons.append("productos relacionados")
+    
+    return ", ".join(reasons) if reasons else "producto relacionado"
+
 class AIService:
     """Servicio principal de IA para el sistema POS"""
     
-    def __init__(self):
-        self.tfidf_vectorizer = None
-        self.tfidf_matrix = None
+    def __init__(self, registry: AIModelRegistry = None):
+        # El modelo vive en el registro del proceso; construir el servicio no
+        # entrena, no descarga recursos de NLTK ni accede a la red
+        self.registry = registry or ai_model_registry
         self.svd_transformer = None
         self.vocabulary = {}
-        self.stop_words_es = set()
-        self.stemmer = None
-        self._initialize_nltk()
     
     def _initialize_nltk(self):
-        """Inicializar recursos de NLTK"""
-        try:
-            # Descargar recursos necesarios
-            nltk.download('punkt', quiet=True)
-            nltk.download('stopwords', quiet=True)
-            nltk.download('punkt_tab', quiet=True)
-            
-            # Configurar stop words en español
-            self.stop_words_es = set(stopwords.words('spanish'))
-            
-            # Configurar stemmer
-            self.stemmer = SnowballStemmer('spanish')
-            
-            logger.info("NLTK resources initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing NLTK: {e}")
-            self.stop_words_es = set()
-            self.stemmer = None
+        """Inicializar recursos de NLTK (descarga solo si faltan en disco)"""
+        load_nltk_resources(download=True)
+    
+    @property
+    def stop_words_es(self) -> frozenset:
+        return load_nltk_resources()[0]
+    
+    @property
+    def stemmer(self) -> Any:
+        return load_nltk_resources()[1]
+    
+    @property
+    def model(self) -> Optional[ModelSnapshot]:
+        """Instantánea vigente del modelo (lectura sin bloqueo)"""
+        return self.registry.current()
+    
+    @property
+    def tfidf_vectorizer(self) -> Any:
+        snapshot = self.registry.current()
+        return snapshot.vectorizer if snapshot else None
+    
+    @property
+    def tfidf_matrix(self) -> Any:
+        snapshot = self.registry.current()
+        return snapshot.matrix if snapshot else None
+    
+    @property
+    def product_ids(self) -> Optional[np.ndarray]:
+        snapshot = self.registry.current()
+        return snapshot.product_ids if snapshot else None
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        snapshot = self.registry.current()
+        return snapshot.version if snapshot else None
     
     def preprocess_text(self, text: str) -> str:
-        """Preprocesar texto para análisis de IA"""
-        if not text:
-            return ""
-        
-        # Convertir a minúsculas
-        text = text.lower()
-        
-        # Limpiar caracteres especiales
-        text = re.sub(r'[^\w\s]', ' ', text)
-        
-        # Tokenizar
-        tokens = word_tokenize(text, language='spanish')
+        """Preprocesar texto para análisis de IA (raíces memoizadas por token)"""
+        return text_pipeline.process(text)
+    
+    @staticmethod
+    def _product_text_item(product: Any) -> Tuple[Any, str]:
+        """Clave de versión (id, updated_at) y texto crudo de un producto (modelo o dict)"""
+        if isinstance(product, dict):
+            get = product.get
+            updated_at = get('updated_at')
+        else:
+            get = lambda field: getattr(product, field, None)
+            updated_at = product.updated_at.isoformat() if product.updated_at else None
         
-        # Filtrar stop words y palabras muy cortas
-        tokens = [token for token in tokens 
-                 if token not in self.stop_words_es and len(token) > 2]
+        # Combinar nombre, descripción y categoría
+        text = ' '.join(str(get(field)) for field in ('name', 'description', 'category') if get(field))
+        return ((get('id'), updated_at) if get('id') is not None else None), text
+    
+    def _product_text(self, product: Any) -> str:
+        """Texto preprocesado de un producto (memoizado por versión)"""
+        return text_pipeline.product_text(*self._product_text_item(product))
+    
+    def _fit_tfidf(self, products: List[Product]) -> Tuple[Any, Any, np.ndarray]:
+        """Ajustar vectorizador y matriz TF-IDF (filas en el orden de products)"""
+        # Textos de todo el catálogo en una sola pasada
+        product_texts = text_pipeline.product_texts([self._product_text_item(product) for product in products])
         
-        # Aplicar stemming
-        if self.stemmer:
-            tokens = [self.stemmer.stem(token) for token in tokens]
+        # Configurar TF-IDF
+        vectorizer = TfidfVectorizer(
+            max_features=1000,
+            ngram_range=(1, 2),
+            stop_words=list(self.stop_words_es),
+            min_df=1,
+            max_df=0.95
+        )
         
-        return ' '.join(tokens)
+        # Entrenar modelo
+        matrix = vectorizer.fit_transform(product_texts)
+        product_ids = np.array([product.id for product in products], dtype=np.int64)
+        return vectorizer, matrix, product_ids
     
     def train_tfidf_model(self, products: List[Product]) -> bool:
-        """Entrenar modelo TF-IDF con productos"""
+        """Entrenar modelo TF-IDF con productos y publicarlo en el registro del proceso"""
         if not SKLEARN_AVAILABLE:
             logger.warning("TF-IDF no entrenado: sklearn no está disponible en este entorno")
             return False
         try:
-            # Preparar textos de productos
-            product_texts = []
-            for product in products:
-                # Combinar nombre, descripción y categoría
-                text_parts = []
-                if product.name:
-                    text_parts.append(product.name)
-                if hasattr(product, 'description') and product.description:
-                    text_parts.append(product.description)
-                if hasattr(product, 'category') and product.category:
-                    text_parts.append(product.category)
-                
-                combined_text = ' '.join(text_parts)
-                processed_text = self.preprocess_text(combined_text)
-                product_texts.append(processed_text)
-            
-            # Configurar TF-IDF
-            self.tfidf_vectorizer = TfidfVectorizer(
-                max_features=1000,
-                ngram_range=(1, 2),
-                stop_words=list(self.stop_words_es),
-                min_df=1,
-                max_df=0.95
-            )
+            vectorizer, matrix, product_ids = self._fit_tfidf(products)
             
-            # Entrenar modelo
-            self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(product_texts)
+            # Intercambio atómico: las búsquedas en curso terminan con el modelo anterior
+            indexed_at = max((product.updated_at for product in products if product.updated_at), default=None)
+            self.registry.publish(build_snapshot(
+                f"tfidf-local-{datetime.utcnow():%Y%m%d%H%M%S}", None, vectorizer, matrix, product_ids,
+                indexed_at=indexed_at
+            ))
             
             # Guardar vocabulario en base de datos
-            self._save_vocabulary()
+            self._save_vocabulary(vectorizer)
             
             # Actualizar estado del modelo
             self._update_model_status('tfidf', '1.0.0', True, len(products))
@@ -142,41 +205,100 @@ class AIService:
             logger.error(f"Error training TF-IDF model: {e}")
             return False
     
-    def _save_vocabulary(self):
-        """Guardar vocabulario en base de datos"""
+    def _save_vocabulary(self, vectorizer: Any):
+        """Guardar vocabulario en base de datos (upsert masivo en una sola transacción)"""
         try:
-            if not self.tfidf_vectorizer:
+            if not vectorizer:
                 return
             
-            vocabulary = self.tfidf_vectorizer.vocabulary_
-            idf_scores = self.tfidf_vectorizer.idf_
-            
-            for term, term_id in vocabulary.items():
-                # Verificar si el término ya existe
-                existing = AIVocabulary.query.filter_by(term=term).first()
-                
-                if existing:
-                    existing.term_frequency += 1
-                    existing.tfidf_score = float(idf_scores[term_id])
-                    existing.updated_at = datetime.utcnow()
-                else:
-                    new_term = AIVocabulary(
-                        term=term,
-                        term_frequency=1,
-                        document_frequency=1,
-                        tfidf_score=float(idf_scores[term_id]),
-                        term_type='word' if ' ' not in term else 'bigram',
-                        language='es'
-                    )
-                    db.session.add(new_term)
+            vocabulary = vectorizer.vocabulary_
+            idf_scores = vectorizer.idf_
+            now = datetime.utcnow()
+            
+            rows = [
+                {
+                    'term': term,
+                    'term_frequency': 1,
+                    'document_frequency': 1,
+                    'tfidf_score': float(idf_scores[term_id]),
+                    'term_type': 'word' if ' ' not in term else 'bigram',
+                    'language': 'es',
+                    'created_at': now,
+                    'updated_at': now
+                }
+                for term, term_id in vocabulary.items()
+            ]
+            self._upsert_vocabulary(rows)
             
             db.session.commit()
-            logger.info("Vocabulary saved to database")
+            logger.info(f"Vocabulary saved to database ({len(rows)} terms)")
             
         except Exception as e:
             logger.error(f"Error saving vocabulary: {e}")
             db.session.rollback()
     
+    def _upsert_vocabulary(self, rows: List[Dict[str, Any]]) -> None:
+        """Insertar términos nuevos y, si ya existen, sumar frecuencia y actualizar el puntaje"""
+        if not rows:
+            return
+        
+        table = AIVocabulary.__table__
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            
+            statement = dialect_insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=['term'],
+                set_={
+                    'term_frequency': table.c.term_frequency + 1,
+                    'tfidf_score': statement.excluded.tfidf_score,
+                    'updated_at': statement.excluded.updated_at
+                }
+            )
+            db.session.execute(statement, rows)
+        elif dialect in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import insert as dialect_insert
+            
+            statement = dialect_insert(table)
+            statement = statement.on_duplicate_key_update({
+                'term_frequency': table.c.term_frequency + 1,
+                'tfidf_score': statement.inserted.tfidf_score,
+                'updated_at': statement.inserted.updated_at
+            })
+            db.session.execute(statement, rows)
+        else:
+            # Sin upsert nativo: términos existentes en una consulta, luego executemany
+            from sqlalchemy import bindparam
+            
+            terms = [row['term'] for row in rows]
+            existing = {}
+            for start in range(0, len(terms), 500):
+                existing.update(db.session.query(AIVocabulary.term, AIVocabulary.id).filter(
+                    AIVocabulary.term.in_(terms[start:start + 500])
+                ).all())
+            
+            updates = [
+                {'_id': existing[row['term']], '_score': row['tfidf_score'], '_now': row['updated_at']}
+                for row in rows if row['term'] in existing
+            ]
+            if updates:
+                db.session.execute(
+                    table.update().where(table.c.id == bindparam('_id')).values(
+                        term_frequency=table.c.term_frequency + 1,
+                        tfidf_score=bindparam('_score'),
+                        updated_at=bindparam('_now')
+                    ),
+                    updates
+                )
+            new_rows = [row for row in rows if row['term'] not in existing]
+            if new_rows:
+                db.session.execute(table.insert(), new_rows)
+    
     def _update_model_status(self, model_name: str, version: str, is_trained: bool, data_count: int):
         """Actualizar estado del modelo en base de datos"""
         try:
@@ -206,11 +328,17 @@ class AIService:
             db.session.rollback()
     
     def semantic_search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Realizar búsqueda semántica de productos"""
-        start_time = datetime.utcnow()
+        """Realizar búsqueda semántica de productos
+
+        Solo se hidratan los K productos ganadores (desde el cache de
+        productos); el resto del catálogo no se consulta ni se serializa.
+        """
+        start_time = time.perf_counter()
         
         try:
-            if not SKLEARN_AVAILABLE or not self.tfidf_vectorizer or self.tfidf_matrix is None:
+            # Una sola lectura de la instantánea para toda la búsqueda
+            model = self.registry.current()
+            if not SKLEARN_AVAILABLE or model is None:
                 logger.warning("TF-IDF model not trained")
                 return []
             
@@ -218,34 +346,32 @@ class AIService:
             processed_query = self.preprocess_text(query)
             
             # Transformar consulta
-            query_vector = self.tfidf_vectorizer.transform([processed_query])
+            query_vector = model.vectorizer.transform([processed_query])
             
-            # Calcular similitudes
-            similarities = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
+            # Filas TF-IDF normalizadas (L2): el coseno es el producto punto
+            similarities = np.asarray(model.matrix.dot(query_vector.T).todense()).ravel()
             
-            # Obtener productos
-            products = Product.query.filter(Product.is_active == True).all()
+            # Margen para productos desactivados después del entrenamiento
+            rows, scores = top_k_rows(similarities, limit + SEARCH_CANDIDATE_MARGIN, MIN_SIMILARITY)
+            candidate_ids = model.product_ids[rows].tolist()
+            products = product_cache.get_many(candidate_ids)
             
-            # Crear resultados con similitudes
+            query_terms = set(processed_query.split())
             results = []
-            for i, product in enumerate(products):
-                if i < len(similarities):
-                    similarity_score = float(similarities[i])
-                    if similarity_score > 0.1:  # Umbral mínimo
-                        results.append({
-                            'product': product.to_dict(),
-                            'similarity_score': similarity_score,
-                            'matched_terms': self._get_matched_terms(query, product)
-                        })
-            
-            # Ordenar por similitud
-            results.sort(key=lambda x: x['similarity_score'], reverse=True)
-            
-            # Limitar resultados
-            results = results[:limit]
+            for product_id, similarity_score in zip(candidate_ids, scores.tolist()):
+                product = products.get(product_id)
+                if product is None:
+                    continue
+                results.append({
+                    'product': product,
+                    'similarity_score': similarity_score,
+                    'matched_terms': self._get_matched_terms(query_terms, product)
+                })
+                if len(results) >= limit:
+                    break
             
             # Registrar búsqueda
-            response_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            response_time = (time.perf_counter() - start_time) * 1000
             self._log_search(query, 'semantic', len(results), response_time)
             
             return results
@@ -254,59 +380,62 @@ class AIService:
             logger.error(f"Error in semantic search: {e}")
             return []
     
-    def _get_matched_terms(self, query: str, product: Product) -> List[str]:
-        """Obtener términos que coincidieron en la búsqueda"""
+    def _get_matched_terms(self, query_terms: set, product: Dict[str, Any]) -> List[str]:
+        """Obtener términos que coincidieron en la búsqueda (texto indexado del producto)"""
         try:
-            query_terms = set(self.preprocess_text(query).split())
-            product_text = self.preprocess_text(f"{product.name} {getattr(product, 'description', '')}")
-            product_terms = set(product_text.split())
+            product_terms = set(self._product_text(product).split())
             
             return list(query_terms.intersection(product_terms))
         except:
             return []
     
     def get_recommendations(self, product_id: int, limit: int = 5) -> List[Dict[str, Any]]:
-        """Obtener recomendaciones para un producto"""
+        """Obtener recomendaciones para un producto
+
+        Se sirven de la tabla precalculada (cache en proceso); solo los
+        productos que aún no pasaron por el lote se calculan en línea con la
+        fila del modelo.
+        """
         try:
-            if not SKLEARN_AVAILABLE or not self.tfidf_vectorizer or self.tfidf_matrix is None:
-                return []
+            from app.services.ai_recommendation_service import ai_recommendation_service
             
-            # Obtener producto
-            product = Product.query.get(product_id)
-            if not product:
-                return []
+            recommendations = ai_recommendation_service.get_recommendations(product_id, limit)
+            if recommendations:
+                return recommendations
             
-            # Obtener índice del producto en la matriz
-            products = Product.query.filter(Product.is_active == True).all()
-            product_index = None
-            for i, p in enumerate(products):
-                if p.id == product_id:
-                    product_index = i
-                    break
+            model = self.registry.current()
+            if not SKLEARN_AVAILABLE or model is None:
+                return []
             
+            # Fila del producto en la matriz del modelo
+            product_index = model.row_index.get(int(product_id))
             if product_index is None:
                 return []
             
-            # Calcular similitudes
-            product_vector = self.tfidf_matrix[product_index:product_index+1]
-            similarities = cosine_similarity(product_vector, self.tfidf_matrix).flatten()
-            
-            # Crear recomendaciones
-            recommendations = []
-            for i, similarity_score in enumerate(similarities):
-                if i != product_index and similarity_score > 0.1:
-                    recommended_product = products[i]
-                    recommendations.append({
-                        'product': recommended_product.to_dict(),
-                        'similarity_score': float(similarity_score),
-                        'recommendation_reason': self._get_recommendation_reason(product, recommended_product, similarity_score)
-                    })
+            # Filas normalizadas: similitudes = fila · matriz
+            product_vector = model.matrix[product_index:product_index+1]
+            similarities = np.asarray(model.matrix.dot(product_vector.T).todense()).ravel()
+            similarities[product_index] = 0.0
             
-            # Ordenar por similitud
-            recommendations.sort(key=lambda x: x['similarity_score'], reverse=True)
+            rows, scores = top_k_rows(similarities, limit + SEARCH_CANDIDATE_MARGIN, MIN_SIMILARITY)
+            candidate_ids = model.product_ids[rows].tolist()
+            products = product_cache.get_many([int(product_id)] + candidate_ids)
+            source = products.get(int(product_id))
+            if source is None:
+                return []
             
-            # Limitar resultados
-            recommendations = recommendations[:limit]
+            recommendations = []
+            for recommended_id, similarity_score in zip(candidate_ids, scores.tolist()):
+                recommended_product = products.get(recommended_id)
+                if recommended_product is None:
+                    continue
+                recommendations.append({
+                    'product': recommended_product,
+                    'similarity_score': similarity_score,
+                    'recommendation_reason': recommendation_reason(source, recommended_product, similarity_score)
+                })
+                if len(recommendations) >= limit:
+                    break
             
             return recommendations
             
@@ -314,41 +443,17 @@ class AIService:
             logger.error(f"Error getting recommendations: {e}")
             return []
     
-    def _get_recommendation_reason(self, source_product: Product, recommended_product: Product, similarity: float) -> str:
-        """Generar razón para la recomendación"""
-        reasons = []
-        
-        # Misma categoría
-        if (hasattr(source_product, 'category') and hasattr(recommended_product, 'category') and 
-            source_product.category == recommended_product.category):
-            reasons.append("misma categoría")
-        
-        # Precio similar
-        if (hasattr(source_product, 'price') and hasattr(recommended_product, 'price')):
-            price_diff = abs(source_product.price - recommended_product.price) / source_product.price
-            if price_diff < 0.3:
-                reasons.append("precio similar")
-        
-        # Similitud alta
-        if similarity > 0.5:
-            reasons.append("productos muy similares")
-        elif similarity > 0.3:
-            reasons.append("productos relacionados")
-        
-        return ", ".join(reasons) if reasons else "producto relacionado"
-    
     def get_search_suggestions(self, query: str, limit: int = 10) -> List[str]:
-        """Obtener sugerencias de búsqueda"""
+        """Obtener sugerencias de búsqueda (índice en memoria del modelo publicado)"""
         try:
             if not query or len(query) < 2:
                 return []
             
-            # Buscar términos en vocabulario
-            suggestions = AIVocabulary.query.filter(
-                AIVocabulary.term.like(f"%{query.lower()}%")
-            ).order_by(AIVocabulary.tfidf_score.desc()).limit(limit).all()
+            model = self.registry.current()
+            if model is None or model.suggestions is None:
+                return []
             
-            return [s.term for s in suggestions]
+            return model.suggestions.suggest(query, limit)
             
         except Exception as e:
             logger.error(f"Error getting search suggestions: {e}")
@@ -372,12 +477,18 @@ class AIService:
     
     def get_ai_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del sistema de IA"""
+        from app.services.ai_recommendation_service import ai_recommendation_service
+        
         try:
             stats = {
                 'models': {},
                 'vocabulary_size': AIVocabulary.query.count(),
                 'total_searches': AISearchLog.query.count(),
-                'total_recommendations': AIRecommendation.query.count()
+                'total_recommendations': AIRecommendation.query.count(),
+                'registry': self.registry.get_stats(),
+                'recommendation_cache': ai_recommendation_service.get_stats(),
+                'product_cache': product_cache.get_stats(),
+                'text_pipeline': text_pipeline.get_stats()
             }
             
             # Estadísticas de modelos
@@ -396,24 +507,190 @@ class AIService:
             logger.error(f"Error getting AI stats: {e}")
             return {}
     
-    def initialize_ai_system(self) -> bool:
+    def load_or_train(self, force: bool = False) -> bool:
+        """Publicar el modelo de la versión actual del catálogo, entrenándolo si hace falta
+        
+        Solo se reentrena cuando cambia el catálogo de productos activos (o con
+        force); el resto de los arranques abre el artefacto en disco con
+        memory mapping. La instantánea nueva se arma completa antes de
+        reemplazar a la vigente en el registro.
+        """
+        if not SKLEARN_AVAILABLE:
+            logger.warning("TF-IDF no cargado: sklearn no está disponible en este entorno")
+            return False
+        
+        try:
+            return self.registry.reload(lambda: self._build_snapshot(force)) is not None
+        except Exception as e:
+            logger.error(f"Error loading TF-IDF model: {e}")
+            return False
+    
+    def _build_snapshot(self, force: bool) -> Optional[ModelSnapshot]:
+        """Instantánea para la versión actual del catálogo (None si la vigente ya sirve)"""
+        catalog_version = ai_model_store.catalog_version()
+        current = self.registry.current()
+        if not force and current is not None and current.catalog_version == catalog_version:
+            return None
+        
+        artifact = None if force else ai_model_store.load('tfidf', catalog_version)
+        if artifact is None:
+            products = Product.query.filter(Product.is_active == True).order_by(Product.id).all()
+            if not products:
+                logger.warning("No products found for AI initialization")
+                return None
+            
+            vectorizer, matrix, product_ids = self._fit_tfidf(products)
+            self._save_vocabulary(vectorizer)
+            self._update_model_status('tfidf', '1.0.0', True, len(products))
+            logger.info(f"TF-IDF model trained with {len(products)} products")
+            
+            indexed_at = max((product.updated_at for product in products if product.updated_at), default=None)
+            snapshot = build_snapshot(ai_model_store.version_name('tfidf', catalog_version), catalog_version,
+                                      vectorizer, matrix, product_ids, indexed_at=indexed_at)
+            return self._store_snapshot(snapshot, replace=force)
+        
+        return self._artifact_snapshot(artifact)
+    
+    def _store_snapshot(self, snapshot: ModelSnapshot, replace: bool = False) -> ModelSnapshot:
+        """Guardar la instantánea como artefacto y devolverla abierta desde disco (memory mapping)"""
+        metadata = {
+            'training_data_count': snapshot.fitted_size,
+            'fitted_size': snapshot.fitted_size,
+            'changes': snapshot.changes,
+            'indexed_at': snapshot.indexed_at.isoformat() if snapshot.indexed_at else None
+        }
+        try:
+            ai_model_store.save('tfidf', snapshot.catalog_version, snapshot.vectorizer, snapshot.matrix,
+                                snapshot.product_ids, metadata, replace=replace)
+            artifact = ai_model_store.load('tfidf', snapshot.catalog_version)
+        except Exception as e:
+            # El modelo sigue sirviendo en este proceso
+            logger.error(f"Error saving TF-IDF artifact: {e}")
+            artifact = None
+        
+        return snapshot if artifact is None else self._artifact_snapshot(artifact)
+    
+    def _artifact_snapshot(self, artifact: Any) -> ModelSnapshot:
+        metadata = artifact.metadata
+        indexed_at = metadata.get('indexed_at')
+        return build_snapshot(
+            artifact.version, artifact.catalog_version, artifact.vectorizer, artifact.matrix, artifact.product_ids,
+            indexed_at=datetime.fromisoformat(indexed_at) if indexed_at else None,
+            fitted_size=metadata.get('fitted_size', metadata.get('training_data_count')),
+            changes=metadata.get('changes', 0)
+        )
+    
+    def refresh_index(self) -> Optional[ModelSnapshot]:
+        """Llevar el modelo publicado al catálogo actual sin bloquear las búsquedas
+
+        Si otro proceso ya guardó la versión del catálogo se abre su artefacto;
+        si no, se re-vectorizan solo los productos modificados y se parchan sus
+        filas, salvo que la deriva supere AI_INDEX_MAX_DRIFT (ajuste completo).
+        """
+        if not SKLEARN_AVAILABLE or self.registry.current() is None:
+            return None
+        return self.registry.reload(self._refresh_snapshot)
+    
+    def _refresh_snapshot(self) -> Optional[ModelSnapshot]:
+        current = self.registry.current()
+        catalog_version = ai_model_store.catalog_version()
+        if current is None or current.catalog_version == catalog_version:
+            return None
+        
+        artifact = ai_model_store.load('tfidf', catalog_version)
+        if artifact is not None:
+            return self._artifact_snapshot(artifact)
+        
+        if current.indexed_at is None or current.drift >= INDEX_MAX_DRIFT:
+            logger.info(f"TF-IDF drift {current.drift:.2%}: full retrain")
+            return self._build_snapshot(force=True)
+        
+        snapshot = self._patch_snapshot(current, catalog_version)
+        if snapshot.drift >= INDEX_MAX_DRIFT:
+            logger.info(f"TF-IDF drift {snapshot.drift:.2%} after incremental update: full retrain")
+            return self._build_snapshot(force=True)
+        return self._store_snapshot(snapshot)
+    
+    def _patch_snapshot(self, current: ModelSnapshot, catalog_version: str) -> ModelSnapshot:
+        """Instantánea con las filas de los productos modificados re-vectorizadas
+
+        El vocabulario y el IDF son los del último ajuste completo: los términos
+        nuevos no puntúan hasta el reentrenamiento, por eso la deriva lo dispara.
+        """
+        from scipy.sparse import vstack  # type: ignore[import]
+        
+        # Margen sobre la marca de agua por escrituras con reloj o commit tardíos
+        since = current.indexed_at - timedelta(seconds=INDEX_WATERMARK_OVERLAP)
+        changed = Product.query.filter(Product.updated_at >= since).order_by(Product.id).all()
+        active_ids = {product_id for (product_id,) in db.session.query(Product.id).filter(Product.is_active == True)}
+        
+        current_ids = current.product_ids.tolist()
+        changed_ids = {product.id for product in changed}
+        # Productos activos que el modelo no tiene y que no aparecen por fecha
+        missing_ids = active_ids - set(current_ids) - changed_ids
+        if missing_ids:
+            changed += Product.query.filter(Product.id.in_(missing_ids)).order_by(Product.id).all()
+            changed_ids |= missing_ids
+        
+        # updated_at también cambia con stock o precio: solo se reemplazan las
+        # filas cuyo vector difiere del publicado (texto nuevo o producto nuevo)
+        candidates = [product for product in changed if product.id in active_ids]
+        vectors = None
+        refreshed_positions = np.arange(len(candidates), dtype=np.int64)
+        if candidates:
+            texts = text_pipeline.product_texts([self._product_text_item(product) for product in candidates])
+            vectors = current.vectorizer.transform(texts).tocsr()
+            known = np.array([position for position, product in enumerate(candidates)
+                              if product.id in current.row_index], dtype=np.int64)
+            if known.size:
+                published = current.matrix[[current.row_index[candidates[position].id] for position in known]]
+                difference = np.asarray(abs(vectors[known] - published).sum(axis=1)).ravel()
+                unchanged = set(known[difference <= TEXT_VECTOR_TOLERANCE].tolist())
+                refreshed_positions = np.array([position for position in range(len(candidates))
+                                                if position not in unchanged], dtype=np.int64)
+        refreshed_ids = {candidates[position].id for position in refreshed_positions.tolist()}
+        
+        keep_rows = np.fromiter(
+            (row for row, product_id in enumerate(current_ids)
+             if product_id in active_ids and product_id not in refreshed_ids),
+            dtype=np.int64
+        )
+        removed = sum(1 for product_id in current_ids if product_id not in active_ids)
+        # Cuentan para la deriva las bajas y las filas nuevas o con texto distinto
+        touched = removed + len(refreshed_ids)
+        
+        blocks = [current.matrix[keep_rows]]
+        if refreshed_ids:
+            blocks.append(vectors[refreshed_positions])
+        matrix = vstack(blocks).tocsr()
+        product_ids = np.concatenate([
+            current.product_ids[keep_rows],
+            np.array([candidates[position].id for position in refreshed_positions.tolist()], dtype=np.int64)
+        ])
+        indexed_at = max([current.indexed_at] + [product.updated_at for product in changed if product.updated_at])
+        
+        product_cache.invalidate(*changed_ids)
+        logger.info(f"TF-IDF incremental update: {len(refreshed_ids)} rows refreshed, {removed} removed")
+        return build_snapshot(
+            ai_model_store.version_name('tfidf', catalog_version), catalog_version,
+            current.vectorizer, matrix, product_ids,
+            indexed_at=indexed_at, fitted_size=current.fitted_size, changes=current.changes + touched,
+            suggestions=current.suggestions
+        )
+    
+    def initialize_ai_system(self, force: bool = False) -> bool:
         """Inicializar sistema de IA con datos existentes"""
         try:
             if not SKLEARN_AVAILABLE:
                 logger.warning("AI system initialization skipped: sklearn no disponible")
                 return False
-            # Obtener productos activos
-            products = Product.query.filter(Product.is_active == True).all()
             
-            if not products:
-                logger.warning("No products found for AI initialization")
-                return False
-            
-            # Entrenar modelo TF-IDF
-            success = self.train_tfidf_model(products)
+            # Recursos de NLTK del proceso (única descarga) y modelo del catálogo actual
+            self._initialize_nltk()
+            success = self.load_or_train(force)
             
             if success:
-                logger.info(f"AI system initialized with {len(products)} products")
+                logger.info(f"AI system initialized with model {self.model_version}")
                 return True
             else:
                 logger.error("Failed to initialize AI system")
@@ -422,3 +699,7 @@ class AIService:
         except Exception as e:
             logger.error(f"Error initializing AI system: {e}")
             return False
+
+
+# Instancia global del servicio (el modelo se comparte a través del registro)
+ai_service = AIService()
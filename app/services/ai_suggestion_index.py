@@ -0,0 +1,99 @@
+"""
+AI Suggestion Index - Sistema POS O'Data
+=======================================
+Índice en memoria de sugerencias de búsqueda sobre el vocabulario del
+modelo TF-IDF publicado (mismos términos y puntajes IDF que ai_vocabulary).
+
+- Trie de prefijos: cada nodo guarda los mejores términos que empiezan con
+  ese prefijo (también por cada palabra de los bigramas), así que completar
+  lo que se está escribiendo cuesta O(largo de la consulta).
+- Postings de n-gramas de caracteres para coincidencias internas
+  (equivalente a LIKE '%q%'): se recorre la lista más corta de los n-gramas
+  de la consulta en orden de puntaje y se corta al llegar al límite.
+
+Se construye junto con cada instantánea del modelo (se reconstruye al
+reentrenar) y no consulta la base de datos.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+# Máximo de sugerencias por consulta (AISuggestionSchema limita a 20)
+MAX_SUGGESTIONS = 20
+NGRAM = 2
+MIN_QUERY_LENGTH = 2
+
+_TOP = None  # clave de la lista de mejores términos en cada nodo del trie
+
+
+class SuggestionIndex:
+    """Sugerencias top-K por puntaje con prefijos e infijos"""
+
+    def __init__(self, terms: Sequence[str], scores: Sequence[float], node_top: int = MAX_SUGGESTIONS):
+        order = sorted(range(len(terms)), key=lambda i: (-float(scores[i]), terms[i]))
+        # Posición en estas listas = rango por puntaje descendente
+        self.terms: List[str] = [terms[i] for i in order]
+        self.scores: List[float] = [float(scores[i]) for i in order]
+        self.node_top = node_top
+
+        self._trie: Dict[Any, Any] = {_TOP: []}
+        self._postings: Dict[str, List[int]] = {}
+        for rank, term in enumerate(self.terms):
+            self._insert_prefixes(rank, term)
+            for gram in {term[i:i + NGRAM] for i in range(len(term) - NGRAM + 1)}:
+                self._postings.setdefault(gram, []).append(rank)
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer: Any) -> Optional['SuggestionIndex']:
+        """Índice del vocabulario de un TfidfVectorizer ajustado (None si no lo es)"""
+        vocabulary = getattr(vectorizer, 'vocabulary_', None)
+        idf = getattr(vectorizer, 'idf_', None)
+        if not vocabulary or idf is None:
+            return None
+        terms = list(vocabulary)
+        return cls(terms, [idf[vocabulary[term]] for term in terms])
+
+    def _insert_prefixes(self, rank: int, term: str) -> None:
+        # El término completo y cada palabra interna como inicio de prefijo;
+        # un mismo nodo no repite el término
+        starts = [0] + [i + 1 for i, char in enumerate(term) if char == ' ']
+        visited = set()
+        for start in starts:
+            node = self._trie
+            for char in term[start:]:
+                node = node.setdefault(char, {_TOP: []})
+                if id(node) in visited:
+                    continue
+                visited.add(id(node))
+                if len(node[_TOP]) < self.node_top:
+                    node[_TOP].append(rank)
+
+    def _prefix_ranks(self, prefix: str) -> List[int]:
+        node = self._trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node[_TOP]
+
+    def suggest(self, query: str, limit: int = 10) -> List[str]:
+        """Términos que contienen la consulta: primero los que empiezan con ella, luego por puntaje"""
+        query = (query or '').lower().strip()
+        limit = min(max(int(limit), 0), self.node_top)
+        if len(query) < MIN_QUERY_LENGTH or limit == 0:
+            return []
+
+        ranks = self._prefix_ranks(query)[:limit]
+        if len(ranks) < limit:
+            postings = [self._postings.get(query[i:i + NGRAM]) for i in range(len(query) - NGRAM + 1)]
+            if all(postings):
+                seen = set(ranks)
+                ranks = list(ranks)
+                for rank in min(postings, key=len):
+                    if rank not in seen and query in self.terms[rank]:
+                        ranks.append(rank)
+                        if len(ranks) >= limit:
+                            break
+        return [self.terms[rank] for rank in ranks]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'terms': len(self.terms), 'ngrams': len(self._postings)}
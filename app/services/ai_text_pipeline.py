@@ -0,0 +1,214 @@
+"""
+AI Text Pipeline - Sistema POS O'Data
+====================================
+Preprocesamiento de texto en español para la IA (minúsculas, limpieza,
+tokens, stop words y stemming Snowball) con memoización:
+
+- Cache acotado token → raíz: el vocabulario de un catálogo es pequeño
+  frente a la cantidad de tokens, así que casi ningún token se vuelve a
+  pasar por el stemmer.
+- Texto procesado por versión de producto (id, updated_at): el
+  entrenamiento, los parches incrementales y los términos coincidentes de
+  cada búsqueda reutilizan el mismo resultado.
+- API por lotes para entrenar: todo el catálogo en una pasada, opcionalmente
+  repartido en un pool de procesos (AI_PREPROCESS_WORKERS).
+
+Tras limpiar con [^\\w\\s] el texto solo tiene palabras y espacios, y
+word_tokenize equivale a separar por espacios; se usa str.split().
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Hashable, List, Optional, Sequence, Tuple
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.stem import SnowballStemmer
+
+logger = logging.getLogger(__name__)
+
+# Paquete de NLTK → ruta con la que nltk.data.find lo ubica si ya está instalado
+NLTK_RESOURCES = {'punkt': 'tokenizers/punkt', 'stopwords': 'corpora/stopwords', 'punkt_tab': 'tokenizers/punkt_tab'}
+_NON_WORD = re.compile(r'[^\w\s]')
+
+# Recursos de NLTK compartidos por el proceso: se descargan una sola vez al
+# inicializar el sistema de IA, nunca en el camino de inferencia
+_nltk_lock = threading.Lock()
+_nltk_resources: Optional[Tuple[frozenset, Any]] = None
+_nltk_complete = False
+
+
+def load_nltk_resources(download: bool = False) -> Tuple[frozenset, Any]:
+    """Stop words en español y stemmer del proceso
+
+    Sin el corpus en disco se usa un conjunto vacío hasta la próxima llamada
+    con download=True (inicialización del sistema de IA).
+    """
+    global _nltk_resources, _nltk_complete
+    resources = _nltk_resources
+    if resources is not None and (_nltk_complete or not download):
+        return resources
+
+    with _nltk_lock:
+        if _nltk_resources is not None and (_nltk_complete or not download):
+            return _nltk_resources
+
+        if download:
+            _download_missing()
+
+        try:
+            _nltk_resources = (frozenset(stopwords.words('spanish')), SnowballStemmer('spanish'))
+            _nltk_complete = True
+            logger.info("NLTK resources initialized successfully")
+        except Exception as e:
+            logger.error(f"Error initializing NLTK: {e}")
+            _nltk_resources = (frozenset(), None)
+        return _nltk_resources
+
+
+def _download_missing() -> None:
+    """Descargar solo los paquetes de NLTK que no están en disco"""
+    for resource, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+            continue
+        except LookupError:
+            pass
+        try:
+            nltk.download(resource, quiet=True)
+        except Exception as e:
+            logger.error(f"Error downloading NLTK resource {resource}: {e}")
+
+
+# Clave de texto de producto: (product_id, updated_at en ISO); None no se memoiza
+TextKey = Optional[Hashable]
+
+
+class TextPipeline:
+    """Preprocesamiento memoizado y por lotes"""
+
+    def __init__(self):
+        self.stem_cache_size = int(os.getenv('AI_STEM_CACHE_SIZE', '50000'))
+        self.text_cache_size = int(os.getenv('AI_PRODUCT_TEXT_CACHE_SIZE', '100000'))
+        self.workers = int(os.getenv('AI_PREPROCESS_WORKERS', '0'))
+        self.parallel_min_texts = int(os.getenv('AI_PREPROCESS_PARALLEL_MIN', '20000'))
+
+        # (recursos de NLTK, stem memoizado) en una sola referencia
+        self._state: Optional[Tuple[Tuple[frozenset, Any], Callable[[str], str]]] = None
+        self._bind_lock = threading.Lock()
+        self._texts: 'OrderedDict[TextKey, str]' = OrderedDict()
+        self._texts_lock = threading.Lock()
+        self._text_hits = 0
+        self._text_misses = 0
+
+    def _bound(self) -> Tuple[frozenset, Callable[[str], str]]:
+        """Stop words y stem memoizado de los recursos vigentes del proceso"""
+        resources = load_nltk_resources()
+        state = self._state
+        if state is None or state[0] is not resources:
+            with self._bind_lock:
+                state = self._state
+                if state is None or state[0] is not resources:
+                    stemmer = resources[1]
+                    # Un cache nuevo por stemmer: el anterior puede ser el de respaldo
+                    stem = lru_cache(maxsize=self.stem_cache_size)(stemmer.stem) if stemmer else str
+                    state = self._state = (resources, stem)
+        return state[0][0], state[1]
+
+    def process(self, text: str) -> str:
+        """Texto listo para TF-IDF (raíces separadas por espacios)"""
+        if not text:
+            return ""
+        stop_words, stem = self._bound()
+        return _process(text, stop_words, stem)
+
+    def process_many(self, texts: Sequence[str], workers: Optional[int] = None) -> List[str]:
+        """Procesar un lote; con workers > 1 y lotes grandes se reparte en procesos"""
+        workers = self.workers if workers is None else workers
+        if workers > 1 and len(texts) >= self.parallel_min_texts:
+            try:
+                return _process_parallel(list(texts), workers)
+            except Exception as e:
+                logger.warning(f"Parallel preprocessing failed, continuing in-process: {e}")
+
+        stop_words, stem = self._bound()
+        return [_process(text, stop_words, stem) if text else "" for text in texts]
+
+    def product_text(self, key: TextKey, text: str) -> str:
+        """Texto procesado de una versión de producto (memoizado)"""
+        return self.product_texts([(key, text)])[0]
+
+    def product_texts(self, items: Sequence[Tuple[TextKey, str]], workers: Optional[int] = None) -> List[str]:
+        """Textos procesados por versión de producto; solo se procesan los que faltan"""
+        results: List[Optional[str]] = [None] * len(items)
+        pending: List[int] = []
+        with self._texts_lock:
+            for position, (key, _) in enumerate(items):
+                cached = self._texts.get(key) if key is not None else None
+                if cached is None:
+                    pending.append(position)
+                else:
+                    self._texts.move_to_end(key)
+                    results[position] = cached
+            self._text_hits += len(items) - len(pending)
+            self._text_misses += len(pending)
+
+        if pending:
+            processed = self.process_many([items[position][1] for position in pending], workers)
+            with self._texts_lock:
+                for position, text in zip(pending, processed):
+                    results[position] = text
+                    if items[position][0] is not None:
+                        self._texts[items[position][0]] = text
+                while len(self._texts) > self.text_cache_size:
+                    self._texts.popitem(last=False)
+        return results  # type: ignore[return-value]
+
+    def clear(self) -> None:
+        with self._texts_lock:
+            self._texts.clear()
+        with self._bind_lock:
+            self._state = None
+
+    def get_stats(self) -> dict:
+        state = self._state
+        stem_info = getattr(state[1], 'cache_info', None) if state else None
+        stem_stats = stem_info() if stem_info else None
+        with self._texts_lock:
+            lookups = self._text_hits + self._text_misses
+            return {
+                'stem_cache_size': stem_stats.currsize if stem_stats else 0,
+                'stem_cache_hits': stem_stats.hits if stem_stats else 0,
+                'stem_cache_misses': stem_stats.misses if stem_stats else 0,
+                'product_texts': len(self._texts),
+                'product_text_hit_rate': round(self._text_hits / lookups, 4) if lookups else 0.0,
+                'workers': self.workers
+            }
+
+
+def _process(text: str, stop_words: frozenset, stem: Callable[[str], str]) -> str:
+    # Minúsculas, sin caracteres especiales, sin stop words ni palabras muy cortas
+    tokens = _NON_WORD.sub(' ', text.lower()).split()
+    return ' '.join(stem(token) for token in tokens if len(token) > 2 and token not in stop_words)
+
+
+def _process_chunk(texts: List[str]) -> List[str]:
+    """Lote en un proceso del pool (recursos y cache propios del proceso)"""
+    return text_pipeline.process_many(texts, workers=0)
+
+
+def _process_parallel(texts: List[str], workers: int) -> List[str]:
+    chunk_size = -(-len(texts) // (workers * 4))
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return [text for processed in executor.map(_process_chunk, chunks) for text in processed]
+
+
+# Instancia global del pipeline (una por proceso)
+text_pipeline = TextPipeline()
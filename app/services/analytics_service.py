@@ -14,7 +14,8 @@ from app.models.sale import Sale
 from app.models.product import Product
 from app.models.user import User
 from app import db
-from app.services.ai_service import AIService
+from app.services.ai_service import ai_service
+from app.services.sales_rollup_service import sales_rollup_service
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +23,7 @@ class AnalyticsService:
     """Servicio de análisis avanzado con integración de IA"""
     
     def __init__(self):
-        self.ai_service = AIService()
+        self.ai_service = ai_service
     
     def get_dashboard_metrics(self, period_days: int = 7) -> Dict[str, Any]:
         """
@@ -74,46 +75,19 @@ class AnalyticsService:
             return self._get_empty_metrics()
     
     def _get_basic_metrics(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
-        """Métricas básicas de ventas"""
+        """Métricas básicas de ventas (desde los agregados de ventas)"""
         try:
-            # Ventas del período
-            current_sales = db.session.query(
-                func.count(Sale.id).label('total_sales'),
-                func.coalesce(func.sum(Sale.total_amount), 0).label('total_revenue'),
-                func.coalesce(func.avg(Sale.total_amount), 0).label('avg_sale')
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).first()
-            
-            # Período anterior para comparación
-            prev_start = start_date - timedelta(days=(end_date - start_date).days)
-            prev_end = start_date
-            
-            prev_sales = db.session.query(
-                func.count(Sale.id).label('total_sales'),
-                func.coalesce(func.sum(Sale.total_amount), 0).label('total_revenue')
-            ).filter(
-                and_(Sale.sale_date >= prev_start, Sale.sale_date < prev_end)
-            ).first()
-            
-            # Calcular cambios porcentuales
-            revenue_change = self._calculate_percentage_change(
-                float(prev_sales.total_revenue) if prev_sales.total_revenue else 0,
-                float(current_sales.total_revenue) if current_sales.total_revenue else 0
-            )
-            
-            sales_change = self._calculate_percentage_change(
-                prev_sales.total_sales if prev_sales.total_sales else 0,
-                current_sales.total_sales if current_sales.total_sales else 0
-            )
+            # Período actual y anterior en una sola consulta
+            comparison = sales_rollup_service.compare_periods(start_date, end_date)
+            current = comparison['current']
             
             return {
-                'total_sales': current_sales.total_sales or 0,
-                'total_revenue': float(current_sales.total_revenue or 0),
-                'average_sale': float(current_sales.avg_sale or 0),
-                'revenue_change': revenue_change,
-                'sales_change': sales_change,
-                'products_sold': self._get_total_products_sold(start_date, end_date)
+                'total_sales': current['sales'],
+                'total_revenue': current['revenue'],
+                'average_sale': current['average_sale'],
+                'revenue_change': comparison['changes']['revenue_change_percentage'],
+                'sales_change': comparison['changes']['sales_change_percentage'],
+                'products_sold': current['items_sold']
             }
             
         except Exception as e:
@@ -130,25 +104,13 @@ class AnalyticsService:
     def _get_sales_timeline(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """Timeline de ventas por día"""
         try:
-            sales_by_day = db.session.query(
-                func.date(Sale.sale_date).label('date'),
-                func.count(Sale.id).label('sales'),
-                func.coalesce(func.sum(Sale.total_amount), 0).label('revenue')
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).group_by(
-                func.date(Sale.sale_date)
-            ).order_by(
-                func.date(Sale.sale_date)
-            ).all()
-            
             timeline = []
-            for day_data in sales_by_day:
+            for day_data in sales_rollup_service.get_daily_series(start_date, end_date):
                 timeline.append({
-                    'date': day_data.date.isoformat(),
-                    'sales': day_data.sales,
-                    'revenue': float(day_data.revenue),
-                    'day_name': day_data.date.strftime('%A')
+                    'date': day_data['date'],
+                    'sales': day_data['sales'],
+                    'revenue': day_data['revenue'],
+                    'day_name': datetime.fromisoformat(day_data['date']).strftime('%A')
                 })
             
             return timeline
@@ -160,40 +122,17 @@ class AnalyticsService:
     def _get_top_products(self, start_date: datetime, end_date: datetime, limit: int = 10) -> List[Dict[str, Any]]:
         """Top productos más vendidos"""
         try:
-            # Consulta compleja para obtener productos con sus ventas
-            from app.models.sale import SaleItem
-            
-            top_products = db.session.query(
-                Product.id,
-                Product.name,
-                Product.category,
-                Product.price,
-                func.sum(SaleItem.quantity).label('total_sold'),
-                func.sum(SaleItem.quantity * SaleItem.unit_price).label('total_revenue'),
-                func.count(func.distinct(Sale.id)).label('times_sold')
-            ).join(
-                SaleItem, Product.id == SaleItem.product_id
-            ).join(
-                Sale, SaleItem.sale_id == Sale.id
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).group_by(
-                Product.id, Product.name, Product.category, Product.price
-            ).order_by(
-                desc(func.sum(SaleItem.quantity))
-            ).limit(limit).all()
-            
             products_data = []
-            for product in top_products:
+            for product in sales_rollup_service.get_top_products(start_date, end_date, limit):
                 products_data.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'category': product.category,
-                    'price': float(product.price),
-                    'total_sold': product.total_sold,
-                    'total_revenue': float(product.total_revenue),
-                    'times_sold': product.times_sold,
-                    'avg_per_sale': float(product.total_sold / product.times_sold) if product.times_sold > 0 else 0
+                    'id': product['product_id'],
+                    'name': product['name'],
+                    'category': product['category'],
+                    'price': product['price'],
+                    'total_sold': product['quantity_sold'],
+                    'total_revenue': product['revenue'],
+                    'times_sold': product['times_sold'],
+                    'avg_per_sale': float(product['quantity_sold'] / product['times_sold']) if product['times_sold'] > 0 else 0
                 })
             
             return products_data
@@ -205,18 +144,7 @@ class AnalyticsService:
     def _get_payment_method_analysis(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """Análisis por método de pago"""
         try:
-            payment_data = db.session.query(
-                Sale.payment_method,
-                func.count(Sale.id).label('total_sales'),
-                func.coalesce(func.sum(Sale.total_amount), 0).label('total_revenue'),
-                func.coalesce(func.avg(Sale.total_amount), 0).label('avg_amount')
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).group_by(
-                Sale.payment_method
-            ).order_by(
-                desc(func.sum(Sale.total_amount))
-            ).all()
+            payment_data = sales_rollup_service.get_breakdown('payment_method', start_date, end_date)
             
             # Mapeo de métodos de pago con emojis
             payment_icons = {
@@ -236,18 +164,19 @@ class AnalyticsService:
             }
             
             analysis = []
-            total_revenue = sum(float(p.total_revenue) for p in payment_data)
+            total_revenue = sum(p['revenue'] for p in payment_data)
             
             for payment in payment_data:
-                percentage = (float(payment.total_revenue) / total_revenue * 100) if total_revenue > 0 else 0
+                method = payment['key']
+                percentage = (payment['revenue'] / total_revenue * 100) if total_revenue > 0 else 0
                 
                 analysis.append({
-                    'method': payment.payment_method,
-                    'name': payment_names.get(payment.payment_method, payment.payment_method),
-                    'icon': payment_icons.get(payment.payment_method, '💰'),
-                    'total_sales': payment.total_sales,
-                    'total_revenue': float(payment.total_revenue),
-                    'average_amount': float(payment.avg_amount),
+                    'method': method,
+                    'name': payment_names.get(method, method),
+                    'icon': payment_icons.get(method, '💰'),
+                    'total_sales': payment['sales'],
+                    'total_revenue': payment['revenue'],
+                    'average_amount': payment['revenue'] / payment['sales'] if payment['sales'] else 0.0,
                     'percentage': round(percentage, 2)
                 })
             
@@ -260,24 +189,7 @@ class AnalyticsService:
     def _get_category_analysis(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         """Análisis por categoría de productos"""
         try:
-            from app.models.sale import SaleItem
-            
-            category_data = db.session.query(
-                Product.category,
-                func.sum(SaleItem.quantity).label('total_sold'),
-                func.sum(SaleItem.quantity * SaleItem.unit_price).label('total_revenue'),
-                func.count(func.distinct(Product.id)).label('unique_products')
-            ).join(
-                SaleItem, Product.id == SaleItem.product_id
-            ).join(
-                Sale, SaleItem.sale_id == Sale.id
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).group_by(
-                Product.category
-            ).order_by(
-                desc(func.sum(SaleItem.quantity * SaleItem.unit_price))
-            ).all()
+            category_data = sales_rollup_service.get_category_breakdown(start_date, end_date)
             
             # Mapeo de categorías con colores
             category_colors = {
@@ -289,18 +201,18 @@ class AnalyticsService:
             }
             
             analysis = []
-            total_revenue = sum(float(c.total_revenue) for c in category_data)
+            total_revenue = sum(c['revenue'] for c in category_data)
             
             for category in category_data:
-                percentage = (float(category.total_revenue) / total_revenue * 100) if total_revenue > 0 else 0
+                percentage = (category['revenue'] / total_revenue * 100) if total_revenue > 0 else 0
                 
                 analysis.append({
-                    'category': category.category,
-                    'total_sold': category.total_sold,
-                    'total_revenue': float(category.total_revenue),
-                    'unique_products': category.unique_products,
+                    'category': category['category'],
+                    'total_sold': category['quantity_sold'],
+                    'total_revenue': category['revenue'],
+                    'unique_products': category['unique_products'],
                     'percentage': round(percentage, 2),
-                    'color': category_colors.get(category.category, '#6b7280')
+                    'color': category_colors.get(category['category'], '#6b7280')
                 })
             
             return analysis
@@ -370,24 +282,12 @@ class AnalyticsService:
         """Métricas de rendimiento del sistema"""
         try:
             # Ventas por hora para identificar picos
-            hourly_sales = db.session.query(
-                func.extract('hour', Sale.sale_date).label('hour'),
-                func.count(Sale.id).label('sales'),
-                func.coalesce(func.avg(Sale.total_amount), 0).label('avg_amount')
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).group_by(
-                func.extract('hour', Sale.sale_date)
-            ).order_by(
-                func.extract('hour', Sale.sale_date)
-            ).all()
-            
             peak_hours = []
-            for hour_data in hourly_sales:
+            for hour_data in sales_rollup_service.get_hourly_series(start_date, end_date):
                 peak_hours.append({
-                    'hour': int(hour_data.hour),
-                    'sales': hour_data.sales,
-                    'avg_amount': float(hour_data.avg_amount)
+                    'hour': hour_data['hour'],
+                    'sales': hour_data['sales'],
+                    'avg_amount': hour_data['revenue'] / hour_data['sales'] if hour_data['sales'] else 0.0
                 })
             
             # Eficiencia de ventas
@@ -420,32 +320,15 @@ class AnalyticsService:
     def _get_total_products_sold(self, start_date: datetime, end_date: datetime) -> int:
         """Total de productos vendidos (cantidad)"""
         try:
-            from app.models.sale import SaleItem
-            result = db.session.query(
-                func.coalesce(func.sum(SaleItem.quantity), 0)
-            ).join(
-                Sale, SaleItem.sale_id == Sale.id
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).scalar()
-            
-            return int(result or 0)
+            return sales_rollup_service.get_totals(start_date, end_date)['items_sold']
         except:
             return 0
     
     def _get_avg_items_per_sale(self, start_date: datetime, end_date: datetime) -> float:
         """Promedio de items por venta"""
         try:
-            from app.models.sale import SaleItem
-            result = db.session.query(
-                func.coalesce(func.avg(func.sum(SaleItem.quantity)), 0)
-            ).join(
-                Sale, SaleItem.sale_id == Sale.id
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).group_by(Sale.id).scalar()
-            
-            return float(result or 0)
+            totals = sales_rollup_service.get_totals(start_date, end_date)
+            return float(totals['items_sold'] / totals['sales']) if totals['sales'] else 0.0
         except:
             return 0.0
     
@@ -456,21 +339,9 @@ class AnalyticsService:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=7)
             
-            avg_daily_sales = db.session.query(
-                func.coalesce(func.avg(func.count(Sale.id)), 0)
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).group_by(
-                func.date(Sale.sale_date)
-            ).scalar()
-            
-            avg_daily_revenue = db.session.query(
-                func.coalesce(func.avg(func.sum(Sale.total_amount)), 0)
-            ).filter(
-                and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-            ).group_by(
-                func.date(Sale.sale_date)
-            ).scalar()
+            daily = sales_rollup_service.get_daily_series(start_date, end_date)
+            avg_daily_sales = sum(day['sales'] for day in daily) / len(daily) if daily else 0
+            avg_daily_revenue = sum(day['revenue'] for day in daily) / len(daily) if daily else 0
             
             # Proyección simple (se puede mejorar con ML)
             return {
@@ -489,23 +360,10 @@ class AnalyticsService:
             current_start = current_end - timedelta(days=7)
             prev_start = current_start - timedelta(days=7)
             
-            from app.models.sale import SaleItem
-            
-            current_categories = db.session.query(
-                Product.category,
-                func.sum(SaleItem.quantity).label('current_sales')
-            ).join(
-                SaleItem, Product.id == SaleItem.product_id
-            ).join(
-                Sale, SaleItem.sale_id == Sale.id
-            ).filter(
-                and_(Sale.sale_date >= current_start, Sale.sale_date <= current_end)
-            ).group_by(Product.category).all()
-            
             trending = []
-            for cat in current_categories:
-                if cat.current_sales > 10:  # Umbral mínimo
-                    trending.append(cat.category)
+            for cat in sales_rollup_service.get_category_breakdown(current_start, current_end):
+                if cat['quantity_sold'] > 10:  # Umbral mínimo
+                    trending.append(cat['category'])
             
             return trending[:3]  # Top 3 categorías
         except:
@@ -518,29 +376,27 @@ class AnalyticsService:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=7)
             
-            from app.models.sale import SaleItem
+            from app.models.sales_rollup import ProductDailyRollup
             
+            # Demanda semanal desde los agregados diarios por producto
+            weekly_sales = func.coalesce(func.sum(ProductDailyRollup.quantity), 0)
             low_stock_products = db.session.query(
                 Product.id,
                 Product.name,
                 Product.stock,
                 Product.min_stock,
-                func.coalesce(func.sum(SaleItem.quantity), 0).label('weekly_sales')
-            ).outerjoin(
-                SaleItem, Product.id == SaleItem.product_id
-            ).outerjoin(
-                Sale, SaleItem.sale_id == Sale.id
+                weekly_sales.label('weekly_sales')
+            ).join(
+                ProductDailyRollup, Product.id == ProductDailyRollup.product_id
             ).filter(
-                or_(
-                    Sale.sale_date.is_(None),
-                    and_(Sale.sale_date >= start_date, Sale.sale_date <= end_date)
-                )
+                ProductDailyRollup.bucket_date >= start_date.date(),
+                ProductDailyRollup.bucket_date <= end_date.date()
             ).group_by(
                 Product.id, Product.name, Product.stock, Product.min_stock
             ).having(
                 and_(
                     Product.stock <= Product.min_stock * 2,
-                    func.coalesce(func.sum(SaleItem.quantity), 0) > 0
+                    weekly_sales > 0
                 )
             ).limit(5).all()
             
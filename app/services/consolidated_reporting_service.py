@@ -4,15 +4,20 @@ Consolidated Reporting Service - Sistema Multi-Sede Sabrositas
 Servicio para generación de reportes consolidados multi-tienda.
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple, Iterator
 from datetime import datetime, timedelta
 import logging
+import numpy as np
 from app import db
 from app.models.store import Store, StoreProduct
 from app.models.product import Product
-from app.models.sale import Sale, SaleItem
+from app.models.sale import Sale
 from app.models.inventory_transfer import InventoryTransfer
 from app.exceptions import ValidationError
+from app.services.sales_columnar_engine import SalesColumns, GROUP_BY_MODES
+from app.services.sales_rollup_service import sales_rollup_service
+from app.services.report_cache_service import report_cache_service
+from app.utils.streaming_export import StreamingWorkbook, iter_csv
 from sqlalchemy import func, or_
 import json
 
@@ -32,36 +37,51 @@ class ConsolidatedReportingService:
                               store_ids: List[int] = None,
                               group_by: str = 'store',
                               include_details: bool = False) -> Dict[str, Any]:
-        """Generar reporte consolidado de ventas"""
+        """Generar reporte consolidado de ventas (cacheado por versión de datos)
+
+        Con include_details el resultado no se cachea: su tamaño crece con
+        las ventas del período.
+        """
+        if include_details:
+            return self._build_sales_report(start_date, end_date, store_ids, group_by, include_details)
+
+        return report_cache_service.get_or_compute(
+            'consolidated.sales_report',
+            {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'store_ids': sorted(store_ids) if store_ids else None,
+                'group_by': group_by
+            },
+            lambda: self._build_sales_report(start_date, end_date, store_ids, group_by, False),
+            domains=('sales',)
+        )
+
+    def _build_sales_report(self,
+                            start_date: datetime,
+                            end_date: datetime,
+                            store_ids: List[int] = None,
+                            group_by: str = 'store',
+                            include_details: bool = False) -> Dict[str, Any]:
+        """Calcular el reporte consolidado de ventas
+
+        El período se carga una vez como arrays (SalesColumns) y todas las
+        agrupaciones se calculan vectorizadas; las ventas solo se
+        materializan como dicts cuando include_details es True.
+        """
         try:
             # Validar parámetros
             if start_date >= end_date:
                 raise ValidationError("start_date debe ser menor que end_date")
 
-            if group_by not in ['store', 'product', 'category', 'user', 'day', 'hour']:
+            if group_by not in GROUP_BY_MODES:
                 raise ValidationError("group_by debe ser uno de: store, product, category, user, day, hour")
 
-            # Base query
-            query = db.session.query(Sale).filter(
-                Sale.created_at >= start_date,
-                Sale.created_at <= end_date
-            )
-
-            # Filtrar por tiendas si se especifica
-            if store_ids:
-                query = query.filter(Sale.store_id.in_(store_ids))
-
-            # Obtener ventas base
-            sales = query.all()
-
-            # Calcular métricas principales
-            total_sales = len(sales)
-            total_revenue = sum(float(sale.total) for sale in sales)
-            total_tax = sum(float(sale.tax_amount or 0) for sale in sales)
-            average_sale = total_revenue / total_sales if total_sales > 0 else 0
+            columns = SalesColumns.load(start_date, end_date, store_ids)
+            summary = columns.summary()
 
             # Generar datos agrupados según group_by
-            grouped_data = self._group_sales_data(sales, group_by, include_details)
+            grouped_data = self._group_sales_data(columns, group_by, include_details)
 
             # Obtener comparación con período anterior
             previous_period_data = self._get_previous_period_comparison(
@@ -83,119 +103,80 @@ class ConsolidatedReportingService:
                     },
                     'generated_at': datetime.utcnow().isoformat()
                 },
-                'summary': {
-                    'total_sales': total_sales,
-                    'total_revenue': round(total_revenue, 2),
-                    'total_tax': round(total_tax, 2),
-                    'average_sale_value': round(average_sale, 2),
-                    'stores_involved': len(set(sale.store_id for sale in sales)),
-                    'unique_customers': len(set(sale.customer_name for sale in sales if sale.customer_name))
-                },
+                'summary': summary,
                 'grouped_data': grouped_data,
                 'comparison': previous_period_data,
-                'trends': self._calculate_sales_trends(sales, group_by)
+                'trends': self._calculate_sales_trends(columns, group_by)
             }
 
         except Exception as e:
             logger.error(f"Error generando reporte de ventas: {e}")
             raise
 
-    def _group_sales_data(self, sales: List[Sale], group_by: str, include_details: bool) -> List[Dict[str, Any]]:
+    def _group_sales_data(self, columns: SalesColumns, group_by: str, include_details: bool) -> List[Dict[str, Any]]:
         """Agrupar datos de ventas según criterio especificado"""
         try:
-            grouped = {}
-
-            for sale in sales:
-                # Determinar clave de agrupación
-                if group_by == 'store':
-                    key = f"store_{sale.store_id}"
-                    label = sale.store.name if sale.store else f"Tienda {sale.store_id}"
-                elif group_by == 'product':
-                    # Agrupar por productos vendidos
-                    for item in sale.sale_items:
-                        key = f"product_{item.product_id}"
-                        label = item.product.name if item.product else f"Producto {item.product_id}"
-                        self._add_to_group(grouped, key, label, sale, item)
-                    continue
-                elif group_by == 'category':
-                    # Agrupar por categorías de productos
-                    categories = set()
-                    for item in sale.sale_items:
-                        if item.product and item.product.category:
-                            categories.add(item.product.category)
-
-                    for category in categories:
-                        key = f"category_{category}"
-                        label = category
-                        self._add_to_group(grouped, key, label, sale)
-                    continue
-                elif group_by == 'user':
-                    key = f"user_{sale.user_id}"
-                    label = f"{sale.user.first_name} {sale.user.last_name}" if sale.user else f"Usuario {sale.user_id}"
-                elif group_by == 'day':
-                    key = sale.created_at.strftime('%Y-%m-%d')
-                    label = sale.created_at.strftime('%Y-%m-%d')
-                elif group_by == 'hour':
-                    key = sale.created_at.strftime('%Y-%m-%d %H:00')
-                    label = sale.created_at.strftime('%Y-%m-%d %H:00')
-
-                self._add_to_group(grouped, key, label, sale)
-
-            # Convertir a lista y ordenar
+            grouped = columns.group(group_by)
+            keys, labels = self._group_labels(columns, group_by, grouped['keys'])
+            positions = columns.group_sale_positions(group_by, grouped) if include_details else None
+
+            # Ordenar por revenue descendente
+            order = np.argsort(-grouped['revenue'], kind='stable')
+
             result = []
-            for key, data in grouped.items():
+            for i in order.tolist():
+                count = int(grouped['sales'][i])
+                revenue = float(grouped['revenue'][i])
                 group_info = {
-                    'group_key': key,
-                    'group_label': data['label'],
-                    'total_sales': data['count'],
-                    'total_revenue': round(data['revenue'], 2),
-                    'total_tax': round(data['tax'], 2),
-                    'average_sale': round(data['revenue'] / data['count'] if data['count'] > 0 else 0, 2),
-                    'total_items': data['items']
+                    'group_key': keys[i],
+                    'group_label': labels[i],
+                    'total_sales': count,
+                    'total_revenue': round(revenue, 2),
+                    'total_tax': round(float(grouped['tax'][i]), 2),
+                    'average_sale': round(revenue / count if count > 0 else 0, 2),
+                    'total_items': int(grouped['items'][i])
                 }
 
                 if include_details:
-                    group_info['sales_details'] = [
-                        {
-                            'sale_id': sale.id,
-                            'sale_number': sale.sale_number,
-                            'total': float(sale.total),
-                            'tax_amount': float(sale.tax_amount or 0),
-                            'created_at': sale.created_at.isoformat(),
-                            'customer_name': sale.customer_name,
-                            'payment_method': sale.payment_method
-                        }
-                        for sale in data['sales']
-                    ]
+                    group_info['sales_details'] = columns.sale_details(positions[i])
 
                 result.append(group_info)
 
-            # Ordenar por revenue descendente
-            result.sort(key=lambda x: x['total_revenue'], reverse=True)
-
             return result
 
         except Exception as e:
             logger.error(f"Error agrupando datos de ventas: {e}")
             raise
 
-    def _add_to_group(self, grouped: Dict, key: str, label: str, sale: Sale, item: SaleItem = None):
-        """Agregar venta a grupo específico"""
-        if key not in grouped:
-            grouped[key] = {
-                'label': label,
-                'count': 0,
-                'revenue': 0,
-                'tax': 0,
-                'items': 0,
-                'sales': []
-            }
-
-        grouped[key]['count'] += 1
-        grouped[key]['revenue'] += float(sale.total)
-        grouped[key]['tax'] += float(sale.tax_amount or 0)
-        grouped[key]['items'] += sum(item.quantity for item in sale.sale_items)
-        grouped[key]['sales'].append(sale)
+    def _group_labels(self, columns: SalesColumns, group_by: str, group_keys: np.ndarray) -> Tuple[List[str], List[str]]:
+        """Claves y etiquetas legibles de cada grupo (una consulta por dimensión)"""
+        if group_by == 'day':
+            keys = np.datetime_as_string(group_keys, unit='D').tolist()
+            return keys, keys
+        if group_by == 'hour':
+            keys = [f"{value.replace('T', ' ')}:00" for value in np.datetime_as_string(group_keys, unit='h').tolist()]
+            return keys, keys
+
+        ids = group_keys.tolist()
+        if group_by == 'category':
+            names = [columns.categories[code] for code in ids]
+            return [f"category_{name}" for name in names], [name or 'Sin categoría' for name in names]
+        if group_by == 'product':
+            return ([f"product_{product_id}" for product_id in ids],
+                    [columns.product_names.get(product_id, f"Producto {product_id}") for product_id in ids])
+        if group_by == 'store':
+            names = dict(db.session.query(Store.id, Store.name).filter(Store.id.in_(ids)).all())
+            return ([f"store_{store_id}" for store_id in ids],
+                    [names.get(store_id, f"Tienda {store_id}" if store_id else 'Sin tienda') for store_id in ids])
+
+        from app.models.user import User
+        names = {
+            user_id: f"{first_name or ''} {last_name or ''}".strip() or username
+            for user_id, first_name, last_name, username in db.session.query(
+                User.id, User.first_name, User.last_name, User.username
+            ).filter(User.id.in_(ids))
+        }
+        return [f"user_{user_id}" for user_id in ids], [names.get(user_id, f"Usuario {user_id}") for user_id in ids]
 
     def _get_previous_period_comparison(self,
                                         start_date: datetime,
@@ -207,32 +188,17 @@ class ConsolidatedReportingService:
             previous_start = start_date - period_length
             previous_end = start_date
 
-            # Query para período anterior
-            query = db.session.query(Sale).filter(
-                Sale.created_at >= previous_start,
-                Sale.created_at < previous_end
-            )
-
-            if store_ids:
-                query = query.filter(Sale.store_id.in_(store_ids))
-
-            previous_sales = query.all()
+            # Ambas ventanas en una sola sentencia con sumas condicionales;
+            # el período anterior termina justo antes de start_date
+            totals = sales_rollup_service.get_sales_window_totals({
+                'current': (start_date, end_date),
+                'previous': (previous_start, previous_end - timedelta(microseconds=1))
+            }, store_ids)
 
-            # Calcular métricas del período anterior
-            previous_total_sales = len(previous_sales)
-            previous_revenue = sum(float(sale.total) for sale in previous_sales)
-
-            # Calcular cambios porcentuales
-            current_query = db.session.query(Sale).filter(
-                Sale.created_at >= start_date,
-                Sale.created_at <= end_date
-            )
-            if store_ids:
-                current_query = current_query.filter(Sale.store_id.in_(store_ids))
-
-            current_sales = current_query.all()
-            current_total_sales = len(current_sales)
-            current_revenue = sum(float(sale.total) for sale in current_sales)
+            previous_total_sales = totals['previous']['sales']
+            previous_revenue = totals['previous']['revenue']
+            current_total_sales = totals['current']['sales']
+            current_revenue = totals['current']['revenue']
 
             # Calcular cambios
             sales_change = ((current_total_sales - previous_total_sales) /
@@ -258,39 +224,30 @@ class ConsolidatedReportingService:
             logger.warning(f"Error calculando comparación con período anterior: {e}")
             return {'error': 'No se pudo calcular comparación'}
 
-    def _calculate_sales_trends(self, sales: List[Sale], group_by: str) -> Dict[str, Any]:
+    def _calculate_sales_trends(self, columns: SalesColumns, group_by: str) -> Dict[str, Any]:
         """Calcular tendencias de ventas"""
         try:
-            if not sales:
+            if not len(columns):
                 return {'error': 'No hay datos para calcular tendencias'}
 
-            # Agrupar ventas por día para tendencias temporales
-            daily_sales = {}
-            for sale in sales:
-                day_key = sale.created_at.strftime('%Y-%m-%d')
-                if day_key not in daily_sales:
-                    daily_sales[day_key] = {'count': 0, 'revenue': 0}
-
-                daily_sales[day_key]['count'] += 1
-                daily_sales[day_key]['revenue'] += float(sale.total)
-
-            # Convertir a series temporales ordenadas
-            sorted_days = sorted(daily_sales.keys())
-            daily_counts = [daily_sales[day]['count'] for day in sorted_days]
-            daily_revenues = [daily_sales[day]['revenue'] for day in sorted_days]
+            # Serie diaria vectorizada para tendencias temporales
+            series = columns.daily_series()
+            sorted_days = np.datetime_as_string(series['days'], unit='D').tolist()
+            daily_counts = series['sales']
+            daily_revenues = series['revenue']
 
             # Calcular tendencias simples
             if len(daily_counts) >= 2:
                 # Tendencia de ventas (simple: comparar primera y última mitad)
                 mid_point = len(daily_counts) // 2
-                first_half_avg = sum(daily_counts[:mid_point]) / mid_point if mid_point > 0 else 0
-                second_half_avg = sum(daily_counts[mid_point:]) / (len(daily_counts) - mid_point)
+                first_half_avg = daily_counts[:mid_point].mean()
+                second_half_avg = daily_counts[mid_point:].mean()
 
                 sales_trend = 'increasing' if second_half_avg > first_half_avg else 'decreasing' if second_half_avg < first_half_avg else 'stable'
 
                 # Lo mismo para revenue
-                first_half_revenue = sum(daily_revenues[:mid_point]) / mid_point if mid_point > 0 else 0
-                second_half_revenue = sum(daily_revenues[mid_point:]) / (len(daily_revenues) - mid_point)
+                first_half_revenue = daily_revenues[:mid_point].mean()
+                second_half_revenue = daily_revenues[mid_point:].mean()
 
                 revenue_trend = 'increasing' if second_half_revenue > first_half_revenue else 'decreasing' if second_half_revenue < first_half_revenue else 'stable'
             else:
@@ -301,16 +258,16 @@ class ConsolidatedReportingService:
                 'daily_data': [
                     {
                         'date': day,
-                        'sales_count': daily_sales[day]['count'],
-                        'revenue': round(daily_sales[day]['revenue'], 2)
+                        'sales_count': int(count),
+                        'revenue': round(float(revenue), 2)
                     }
-                    for day in sorted_days
+                    for day, count, revenue in zip(sorted_days, daily_counts.tolist(), daily_revenues.tolist())
                 ],
                 'trends': {
                     'sales_trend': sales_trend,
                     'revenue_trend': revenue_trend,
-                    'peak_day': max(sorted_days, key=lambda d: daily_sales[d]['count']) if sorted_days else None,
-                    'peak_revenue_day': max(sorted_days, key=lambda d: daily_sales[d]['revenue']) if sorted_days else None
+                    'peak_day': sorted_days[int(np.argmax(daily_counts))],
+                    'peak_revenue_day': sorted_days[int(np.argmax(daily_revenues))]
                 }
             }
 
@@ -322,7 +279,23 @@ class ConsolidatedReportingService:
                                   store_ids: List[int] = None,
                                   include_transfers: bool = True,
                                   low_stock_only: bool = False) -> Dict[str, Any]:
-        """Generar reporte consolidado de inventario"""
+        """Generar reporte consolidado de inventario (cacheado por versión de datos)"""
+        return report_cache_service.get_or_compute(
+            'consolidated.inventory_report',
+            {
+                'store_ids': sorted(store_ids) if store_ids else None,
+                'include_transfers': include_transfers,
+                'low_stock_only': low_stock_only
+            },
+            lambda: self._build_inventory_report(store_ids, include_transfers, low_stock_only),
+            domains=('inventory', 'transfers')
+        )
+
+    def _build_inventory_report(self,
+                                store_ids: List[int] = None,
+                                include_transfers: bool = True,
+                                low_stock_only: bool = False) -> Dict[str, Any]:
+        """Calcular el reporte consolidado de inventario"""
         try:
             # Base query
             query = db.session.query(
@@ -492,7 +465,23 @@ class ConsolidatedReportingService:
                                     start_date: datetime,
                                     end_date: datetime,
                                     store_ids: List[int] = None) -> Dict[str, Any]:
-        """Generar reporte de performance multi-sede"""
+        """Generar reporte de performance multi-sede (cacheado por versión de datos)"""
+        return report_cache_service.get_or_compute(
+            'consolidated.performance_report',
+            {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'store_ids': sorted(store_ids) if store_ids else None
+            },
+            lambda: self._build_performance_report(start_date, end_date, store_ids),
+            domains=('sales',)
+        )
+
+    def _build_performance_report(self,
+                                  start_date: datetime,
+                                  end_date: datetime,
+                                  store_ids: List[int] = None) -> Dict[str, Any]:
+        """Calcular el reporte de performance multi-sede"""
         try:
             # Obtener datos de ventas por tienda
             sales_query = db.session.query(
@@ -586,7 +575,12 @@ class ConsolidatedReportingService:
             raise
 
     def export_report(self, report_data: Dict[str, Any], format_type: str = 'json') -> Any:
-        """Exportar reporte en formato especificado"""
+        """Exportar reporte en formato especificado
+
+        json devuelve un str; csv, un iterador de bloques de texto (apto para
+        una respuesta en streaming); excel, un archivo temporal binario
+        posicionado al inicio (write-only de openpyxl).
+        """
         try:
             if format_type not in self.supported_formats:
                 raise ValidationError(f"Formato no soportado: {format_type}. Soportados: {self.supported_formats}")
@@ -594,55 +588,79 @@ class ConsolidatedReportingService:
             if format_type == 'json':
                 return json.dumps(report_data, indent=2, default=str)
 
-            elif format_type == 'csv':
-                # Implementar conversión a CSV (simplificado)
-                import csv
-                import io
-
-                output = io.StringIO()
+            headers, rows = self._tabular_rows(report_data)
 
-                # Determinar tipo de reporte y extraer datos tabulares
-                if report_data.get('report_info', {}).get('type') == 'sales_report':
-                    writer = csv.writer(output)
-                    writer.writerow(['Group', 'Sales Count', 'Revenue', 'Tax', 'Average Sale'])
-
-                    for group in report_data.get('grouped_data', []):
-                        writer.writerow([
-                            group['group_label'],
-                            group['total_sales'],
-                            group['total_revenue'],
-                            group['total_tax'],
-                            group['average_sale']
-                        ])
-
-                return output.getvalue()
+            if format_type == 'csv':
+                return iter_csv(headers, rows)
 
             elif format_type == 'excel':
-                # Placeholder para implementación de Excel
-                # En producción, usar openpyxl o xlsxwriter
-                return "Excel export not implemented yet"
+                workbook = StreamingWorkbook()
+                workbook.add_table_sheet(
+                    report_data.get('report_info', {}).get('type', 'report'), headers, rows
+                )
+                return workbook.to_file()
 
         except Exception as e:
             logger.error(f"Error exportando reporte: {e}")
             raise
 
+    def _tabular_rows(self, report_data: Dict[str, Any]) -> Tuple[List[str], Iterator[List[Any]]]:
+        """Encabezados y filas (perezosas) de la parte tabular de un reporte"""
+        report_type = report_data.get('report_info', {}).get('type')
+
+        if report_type == 'sales_report':
+            return ['Group', 'Sales Count', 'Revenue', 'Tax', 'Average Sale'], (
+                [group['group_label'], group['total_sales'], group['total_revenue'],
+                 group['total_tax'], group['average_sale']]
+                for group in report_data.get('grouped_data', [])
+            )
+
+        if report_type == 'inventory_report':
+            return ['Product', 'SKU', 'Category', 'Total Stock', 'Stores', 'Stores Low Stock', 'Total Value'], (
+                [product['product_name'], product['sku'], product['category'], product['total_stock'],
+                 product['stores_count'], product['stores_low_stock'], round(product['total_value'], 2)]
+                for product in report_data.get('products_summary', [])
+            )
+
+        if report_type == 'performance_report':
+            return ['Ranking', 'Store', 'Sales Count', 'Revenue', 'Average Sale', 'Performance Score'], (
+                [store['ranking'], store['store_name'], store['total_sales'], store['total_revenue'],
+                 store['average_sale_value'], store['performance_score']]
+                for store in report_data.get('stores_performance', [])
+            )
+
+        return [], iter(())
+
     def schedule_report(self,
                         report_type: str,
                         schedule_config: Dict[str, Any],
                         recipients: List[str]) -> Dict[str, Any]:
-        """Programar generación automática de reportes"""
+        """Programar generación automática de reportes
+
+        Se registra en report_schedules y la ejecuta el planificador de
+        reportes. schedule_config acepta 'cron' o frequency/time/day_of_week/
+        day_of_month, además de 'params' (p. ej. period='previous_day'),
+        'name' y 'catch_up'. sales_report se genera como consolidated_sales.
+        """
+        from app.services.report_scheduler_service import report_scheduler_service
+
         try:
-            # Placeholder para implementación de reportes programados
-            # En producción, integrar con Celery o similar para tareas asíncronas
+            job_type = {'sales_report': 'consolidated_sales', 'sales': 'consolidated_sales'}.get(report_type, report_type)
+            schedule = report_scheduler_service.create_schedule(
+                name=schedule_config.get('name') or f"{report_type} ({schedule_config.get('frequency', 'cron')})",
+                report_type=job_type,
+                schedule_config=schedule_config,
+                params=schedule_config.get('params'),
+                recipients=recipients,
+                created_by=schedule_config.get('created_by'),
+                catch_up=bool(schedule_config.get('catch_up', True))
+            )
 
             scheduled_report = {
-                'report_id': f"scheduled_{report_type}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-                'report_type': report_type,
-                'schedule_config': schedule_config,
-                'recipients': recipients,
+                **schedule.to_dict(),
+                'report_id': f"schedule_{schedule.id}",
                 'status': 'scheduled',
-                'created_at': datetime.utcnow().isoformat(),
-                'next_execution': self._calculate_next_execution(schedule_config)
+                'next_execution': schedule.next_run_at.isoformat()
             }
 
             logger.info(f"Reporte programado creado: {scheduled_report['report_id']}")
@@ -654,21 +672,8 @@ class ConsolidatedReportingService:
             raise
 
     def _calculate_next_execution(self, schedule_config: Dict[str, Any]) -> str:
-        """Calcular próxima ejecución de reporte programado"""
-        try:
-            frequency = schedule_config.get('frequency', 'daily')
-
-            if frequency == 'daily':
-                next_execution = datetime.utcnow() + timedelta(days=1)
-            elif frequency == 'weekly':
-                next_execution = datetime.utcnow() + timedelta(weeks=1)
-            elif frequency == 'monthly':
-                next_execution = datetime.utcnow() + timedelta(days=30)
-            else:
-                next_execution = datetime.utcnow() + timedelta(days=1)
-
-            return next_execution.isoformat()
+        """Calcular próxima ejecución de reporte programado (hora local del servidor)"""
+        from app.services.report_scheduler_service import build_cron
+        from app.utils.cron import CronExpression
 
-        except Exception as e:
-            logger.warning(f"Error calculando próxima ejecución: {e}")
-            return (datetime.utcnow() + timedelta(days=1)).isoformat()
+        return CronExpression(build_cron(schedule_config)).next_after(datetime.now()).isoformat()
@@ -13,6 +13,8 @@ from email import encoders
 from typing import List, Optional, Dict, Any
 import logging
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from jinja2 import Template
 
@@ -27,10 +29,53 @@ class EmailService:
         self.email_user = os.getenv('EMAIL_USER')
         self.email_password = os.getenv('EMAIL_PASSWORD')
         self.from_name = os.getenv('FROM_NAME', 'Sistema POS Sabrositas')
+        self.use_tls = os.getenv('SMTP_USE_TLS', 'true').lower() == 'true'
+        self.smtp_timeout = int(os.getenv('SMTP_TIMEOUT', '30'))
+        self._local = threading.local()
+    
+    @contextmanager
+    def persistent_connection(self):
+        """Reutilizar una sola conexión SMTP para todos los envíos del bloque (por thread)"""
+        self._local.reuse = True
+        try:
+            yield
+        finally:
+            self._local.reuse = False
+            self._close_connection()
+    
+    def _get_connection(self) -> smtplib.SMTP:
+        """Obtener conexión SMTP, reutilizando la del thread si hay una abierta"""
+        server = getattr(self._local, 'server', None)
+        if server is not None:
+            return server
+        
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.smtp_timeout)
+        if self.use_tls:
+            server.starttls(context=ssl.create_default_context())
+        server.ehlo_or_helo_if_needed()
+        # Servidores locales de prueba no anuncian AUTH
+        if self.email_user and self.email_password and server.has_extn('auth'):
+            server.login(self.email_user, self.email_password)
+        
+        if getattr(self._local, 'reuse', False):
+            self._local.server = server
+        return server
+    
+    def _close_connection(self, server: Optional[smtplib.SMTP] = None) -> None:
+        """Cerrar la conexión indicada o la conexión persistente del thread"""
+        if server is None:
+            server = getattr(self._local, 'server', None)
+            self._local.server = None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
         
     def send_email(self, to_email: str, subject: str, body: str, 
-                   is_html: bool = False, attachments: List[str] = None) -> bool:
-        """Enviar email"""
+                   is_html: bool = False, attachments: List[Any] = None) -> bool:
+        """Enviar email (adjuntos como ruta o como tupla (ruta, nombre del adjunto))"""
         try:
             # Crear mensaje
             message = MIMEMultipart('alternative')
@@ -46,24 +91,34 @@ class EmailService:
             
             # Agregar archivos adjuntos
             if attachments:
-                for attachment_path in attachments:
-                    self._attach_file(message, attachment_path)
+                for attachment in attachments:
+                    if isinstance(attachment, (tuple, list)):
+                        self._attach_file(message, *attachment)
+                    else:
+                        self._attach_file(message, attachment)
             
-            # Crear conexión segura y enviar email
-            context = ssl.create_default_context()
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls(context=context)
-                server.login(self.email_user, self.email_password)
+            # Enviar por la conexión persistente del thread o por una nueva
+            server = self._get_connection()
+            try:
+                server.sendmail(self.email_user, to_email, message.as_string())
+            except smtplib.SMTPServerDisconnected:
+                # La conexión reutilizada expiró: reconectar una vez
+                self._local.server = None
+                server = self._get_connection()
                 server.sendmail(self.email_user, to_email, message.as_string())
             
+            if not getattr(self._local, 'reuse', False):
+                self._close_connection(server)
+            
             logger.info(f"Email enviado exitosamente a {to_email}")
             return True
             
         except Exception as e:
             logger.error(f"Error enviando email: {str(e)}")
+            self._close_connection()
             return False
     
-    def _attach_file(self, message: MIMEMultipart, file_path: str):
+    def _attach_file(self, message: MIMEMultipart, file_path: str, filename: Optional[str] = None):
         """Agregar archivo adjunto al mensaje"""
         try:
             with open(file_path, "rb") as attachment:
@@ -73,7 +128,7 @@ class EmailService:
             encoders.encode_base64(part)
             part.add_header(
                 'Content-Disposition',
-                f'attachment; filename= {os.path.basename(file_path)}'
+                f'attachment; filename= {filename or os.path.basename(file_path)}'
             )
             message.attach(part)
             
@@ -293,6 +348,24 @@ class EmailService:
             logger.error(f"Error en send_sale_invoice: {str(e)}")
             return False
     
+    def send_scheduled_report(self, to_email: str, report_name: str,
+                              file_path: str, filename: str) -> bool:
+        """Enviar un reporte programado como adjunto"""
+        subject = f"Reporte programado: {report_name}"
+        
+        body = f"""
+        Reporte programado - Sistema POS Sabrositas
+        
+        Reporte: {report_name}
+        Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        
+        Encontrará el archivo {filename} adjunto a este mensaje.
+        
+        Esta es una notificación automática del sistema.
+        """
+        
+        return self.send_email(to_email, subject, body, attachments=[(file_path, filename)])
+    
     def send_system_notification(self, admin_emails: List[str], 
                                notification_type: str, message: str) -> bool:
         """Enviar notificación del sistema a administradores"""
@@ -0,0 +1,238 @@
+"""
+Outbox Service - Sistema POS O'Data
+==================================
+Bandeja de salida transaccional: los efectos secundarios de una venta se
+registran como eventos en la misma transacción y un pool de workers en
+segundo plano los entrega con reintentos y backoff exponencial.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import update, or_, and_
+
+from app import db
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Handler: recibe el payload y retorna True si el efecto se entregó
+OutboxHandler = Callable[[Dict[str, Any]], bool]
+
+
+class OutboxService:
+    """Registro y entrega de eventos de la bandeja de salida"""
+
+    def __init__(self):
+        self.handlers: Dict[str, OutboxHandler] = {}
+        self.batch_size = int(os.getenv('OUTBOX_BATCH_SIZE', '20'))
+        self.base_backoff_seconds = float(os.getenv('OUTBOX_BACKOFF_SECONDS', '5'))
+        self.max_backoff_seconds = float(os.getenv('OUTBOX_MAX_BACKOFF_SECONDS', '900'))
+        self.lock_timeout = timedelta(seconds=int(os.getenv('OUTBOX_LOCK_TIMEOUT_SECONDS', '300')))
+        # Una señal pendiente y notify() de a un worker: una venta despierta a
+        # un solo thread, no a todo el pool
+        self._wakeup = threading.Condition()
+        self._signalled = False
+
+    def register_handler(self, event_type: str, handler: OutboxHandler) -> None:
+        """Registrar handler para un tipo de evento"""
+        self.handlers[event_type] = handler
+
+    def enqueue(self, event_type: str, payload: Dict[str, Any], max_attempts: int = 5) -> OutboxEvent:
+        """Agregar evento a la sesión actual; se confirma con la transacción del llamador"""
+        event = OutboxEvent(event_type=event_type, payload=payload, max_attempts=max_attempts)
+        db.session.add(event)
+        return event
+
+    def notify(self) -> None:
+        """Despertar a un worker tras confirmar una transacción con eventos nuevos
+
+        Un worker ocupado sigue drenando hasta vaciar la bandeja, así que basta
+        una señal pendiente aunque lleguen varias notificaciones seguidas.
+        """
+        with self._wakeup:
+            self._signalled = True
+            self._wakeup.notify()
+
+    def notify_all(self) -> None:
+        """Despertar a todos los workers (detención del pool)"""
+        with self._wakeup:
+            self._signalled = True
+            self._wakeup.notify_all()
+
+    def wait_for_work(self, timeout: float) -> None:
+        """Esperar hasta el próximo sondeo o hasta una notificación"""
+        with self._wakeup:
+            if not self._signalled:
+                self._wakeup.wait(timeout)
+            self._signalled = False
+
+    def process_pending(self, worker_id: str = 'inline', limit: Optional[int] = None) -> Dict[str, int]:
+        """Reclamar y entregar un lote de eventos listos"""
+        stats = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+
+        for event_id in self._claim_batch(worker_id, limit or self.batch_size):
+            stats['claimed'] += 1
+            event = OutboxEvent.query.get(event_id)
+            outcome = self._deliver(event)
+            stats[outcome] += 1
+
+        return stats
+
+    def _claim_batch(self, worker_id: str, limit: int) -> List[int]:
+        """Reclamar eventos con UPDATE condicional para que un solo worker procese cada uno"""
+        now = datetime.utcnow()
+        stale_before = now - self.lock_timeout
+
+        candidates = db.session.query(OutboxEvent.id).filter(
+            or_(
+                and_(OutboxEvent.status == 'pending', OutboxEvent.next_attempt_at <= now),
+                # Eventos de un worker caído
+                and_(OutboxEvent.status == 'processing', OutboxEvent.locked_at < stale_before)
+            )
+        ).order_by(OutboxEvent.next_attempt_at).limit(limit).all()
+
+        claimed = []
+        for (event_id,) in candidates:
+            result = db.session.execute(
+                update(OutboxEvent).where(
+                    OutboxEvent.id == event_id,
+                    or_(
+                        OutboxEvent.status == 'pending',
+                        and_(OutboxEvent.status == 'processing', OutboxEvent.locked_at < stale_before)
+                    )
+                ).values(status='processing', locked_by=worker_id, locked_at=now),
+                execution_options={'synchronize_session': False}
+            )
+            if result.rowcount == 1:
+                claimed.append(event_id)
+
+        db.session.commit()
+        return claimed
+
+    def _deliver(self, event: OutboxEvent) -> str:
+        """Ejecutar el handler del evento y registrar el resultado"""
+        handler = self.handlers.get(event.event_type)
+        error = None
+
+        try:
+            if handler is None:
+                error = f"No handler registered for {event.event_type}"
+            elif not handler(event.payload):
+                error = "Handler reported delivery failure"
+        except Exception as e:
+            error = str(e)
+
+        event.attempts += 1
+        event.locked_by = None
+        event.locked_at = None
+
+        if error is None:
+            event.status = 'sent'
+            event.processed_at = datetime.utcnow()
+            outcome = 'sent'
+        elif event.attempts >= event.max_attempts:
+            event.status = 'failed'
+            event.last_error = error
+            outcome = 'failed'
+            logger.error(f"Outbox event {event.id} ({event.event_type}) failed permanently: {error}")
+        else:
+            event.status = 'pending'
+            event.last_error = error
+            event.next_attempt_at = datetime.utcnow() + timedelta(seconds=self._backoff(event.attempts))
+            outcome = 'retried'
+            logger.warning(f"Outbox event {event.id} ({event.event_type}) retry {event.attempts}: {error}")
+
+        db.session.commit()
+        return outcome
+
+    def _backoff(self, attempts: int) -> float:
+        """Backoff exponencial con jitter"""
+        delay = min(self.max_backoff_seconds, self.base_backoff_seconds * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Conteo de eventos por estado"""
+        from sqlalchemy import func
+
+        rows = db.session.query(OutboxEvent.status, func.count(OutboxEvent.id)).group_by(OutboxEvent.status).all()
+        return {status: count for status, count in rows}
+
+
+class OutboxWorkerPool:
+    """Pool de threads que drena la bandeja de salida en segundo plano"""
+
+    def __init__(self, app, service: OutboxService, workers: int = 2, poll_interval: float = 2.0):
+        self.app = app
+        self.service = service
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Iniciar los workers como threads daemon"""
+        host = socket.gethostname()
+        for index in range(self.workers):
+            worker_id = f"{host}:{os.getpid()}:{index}"
+            thread = threading.Thread(target=self._run, args=(worker_id,), name=f"outbox-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Outbox worker pool started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detener los workers"""
+        self._stop.set()
+        self.service.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self, worker_id: str) -> None:
+        """Bucle del worker: drenar mientras haya eventos, luego esperar"""
+        from app.services.email_service import email_service
+
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    # Una sola conexión SMTP por lote en lugar de una por email
+                    with email_service.persistent_connection():
+                        stats = self.service.process_pending(worker_id)
+                    db.session.remove()
+                if stats['claimed']:
+                    continue
+            except Exception as e:
+                logger.error(f"Outbox worker {worker_id} error: {e}")
+            self.service.wait_for_work(self.poll_interval)
+
+
+def _send_sale_invoice(payload: Dict[str, Any]) -> bool:
+    """Handler de factura de venta por email"""
+    from app.services.email_service import email_service
+    return email_service.send_sale_invoice(payload)
+
+
+# Instancia global del servicio
+outbox_service = OutboxService()
+outbox_service.register_handler('sale.invoice_email', _send_sale_invoice)
+
+
+def start_outbox_workers(app) -> Optional[OutboxWorkerPool]:
+    """Iniciar workers de la bandeja de salida según configuración (OUTBOX_WORKERS=0 los desactiva)"""
+    workers = int(os.getenv('OUTBOX_WORKERS', '2'))
+    if workers <= 0:
+        app.logger.info("Outbox workers disabled")
+        return None
+
+    pool = OutboxWorkerPool(
+        app,
+        outbox_service,
+        workers=workers,
+        poll_interval=float(os.getenv('OUTBOX_POLL_INTERVAL', '2'))
+    )
+    pool.start()
+    return pool
@@ -0,0 +1,137 @@
+"""
+Payroll Calculator - Sistema POS Sabrositas
+==========================================
+Liquidación vectorizada de nómina sobre arrays de NumPy: una posición por
+empleado y las mismas reglas de Payroll.calculate_payroll (salario
+proporcional, horas extras, salud, pensión y retención en la fuente) aplicadas
+a toda la planta en una sola pasada.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Entradas por empleado (float64); las salidas se redondean a centavos
+PAYROLL_INPUTS = (
+    'monthly_salary', 'hours_per_day', 'days_worked', 'overtime_hours',
+    'overtime_pay', 'bonuses', 'commissions', 'other_deductions'
+)
+PAYROLL_OUTPUTS = (
+    'days_worked', 'base_salary', 'overtime_pay', 'bonuses', 'commissions',
+    'gross_salary', 'health_deduction', 'pension_deduction', 'income_tax',
+    'other_deductions', 'total_deductions', 'net_salary'
+)
+SUMMARY_FIELDS = (
+    'base_salary', 'overtime_pay', 'gross_salary', 'health_deduction', 'pension_deduction',
+    'income_tax', 'total_deductions', 'net_salary'
+)
+CONFIG_FIELDS = ('health_percentage', 'pension_percentage', 'overtime_multiplier', 'tax_free_annual_amount')
+
+# Tabla de retenciones simplificada (misma que Payroll._calculate_income_tax):
+# (tope bruto anual, tarifa); por encima del último tope aplica TOP_TAX_RATE
+TAX_BRACKETS = ((36000000, 0.19), (54000000, 0.28))
+TOP_TAX_RATE = 0.33
+
+
+def config_values(config: Any, overrides: Dict[str, Any] = None) -> Dict[str, float]:
+    """Parámetros numéricos de una PayrollConfig, con variaciones opcionales"""
+    values = {field: float(getattr(config, field) or 0) for field in CONFIG_FIELDS}
+    for field, value in (overrides or {}).items():
+        if field in values and value is not None:
+            values[field] = float(value)
+    return values
+
+
+def build_inputs(rows: Iterable[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Columnas de entrada a partir de filas (dicts) por empleado"""
+    rows = list(rows)
+    return {
+        name: np.fromiter((float(row.get(name) or 0) for row in rows), dtype=np.float64, count=len(rows))
+        for name in PAYROLL_INPUTS
+    }
+
+
+def with_salary_increase(inputs: Dict[str, np.ndarray], percentages: List[float]) -> Dict[str, np.ndarray]:
+    """Copia de las entradas con el salario mensual ajustado por posición (en %)"""
+    scenario = dict(inputs)
+    scenario['monthly_salary'] = inputs['monthly_salary'] * (1 + np.asarray(percentages, dtype=np.float64) / 100)
+    return scenario
+
+
+def compute_payroll(inputs: Dict[str, np.ndarray], config: Dict[str, float], days_in_month: int) -> Dict[str, np.ndarray]:
+    """Liquidar todas las posiciones a la vez
+
+    Los cálculos intermedios van sin redondear, como en el cálculo fila a fila
+    con Decimal; solo el resultado se lleva a centavos.
+    """
+    days_worked = np.minimum(inputs['days_worked'], days_in_month)
+    daily_salary = inputs['monthly_salary'] / days_in_month
+    base_salary = daily_salary * days_worked
+
+    # Horas extras: sin horas reportadas se conserva el valor ya registrado
+    hourly_rate = np.divide(daily_salary, inputs['hours_per_day'],
+                            out=np.zeros_like(daily_salary), where=inputs['hours_per_day'] > 0)
+    overtime_pay = np.where(
+        inputs['overtime_hours'] > 0,
+        inputs['overtime_hours'] * hourly_rate * config['overtime_multiplier'],
+        inputs['overtime_pay']
+    )
+
+    gross_salary = base_salary + overtime_pay + inputs['bonuses'] + inputs['commissions']
+
+    health_deduction = base_salary * config['health_percentage'] / 100
+    pension_deduction = base_salary * config['pension_percentage'] / 100
+
+    # Retención en la fuente por tramos de ingreso bruto anual
+    annual_gross = gross_salary * 12
+    tax_free = config['tax_free_annual_amount']
+    rate = np.select(
+        [annual_gross <= limit for limit, _ in TAX_BRACKETS],
+        [tax_rate for _, tax_rate in TAX_BRACKETS],
+        default=TOP_TAX_RATE
+    )
+    income_tax = np.where(annual_gross <= tax_free, 0.0, (annual_gross - tax_free) * rate / 12)
+
+    total_deductions = health_deduction + pension_deduction + income_tax + inputs['other_deductions']
+    net_salary = gross_salary - total_deductions
+
+    results = {
+        'days_worked': days_worked,
+        'base_salary': base_salary,
+        'overtime_pay': overtime_pay,
+        'bonuses': inputs['bonuses'],
+        'commissions': inputs['commissions'],
+        'gross_salary': gross_salary,
+        'health_deduction': health_deduction,
+        'pension_deduction': pension_deduction,
+        'income_tax': income_tax,
+        'other_deductions': inputs['other_deductions'],
+        'total_deductions': total_deductions,
+        'net_salary': net_salary
+    }
+    return {name: np.round(values, 2) for name, values in results.items()}
+
+
+def output_rows(results: Dict[str, np.ndarray]) -> List[Dict[str, float]]:
+    """Resultados por posición como dicts de floats nativos"""
+    columns = {name: results[name].tolist() for name in PAYROLL_OUTPUTS}
+    size = len(columns['net_salary'])
+    return [{name: columns[name][index] for name in PAYROLL_OUTPUTS} for index in range(size)]
+
+
+def summarize(results: Dict[str, np.ndarray], labels: List[Any]) -> Tuple[Dict[str, float], Dict[Any, Dict[str, float]]]:
+    """Totales generales y por etiqueta (p. ej. departamento) con np.bincount"""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(label, len(index)) for label in labels), dtype=np.int64, count=len(labels))
+    counts = np.bincount(codes, minlength=len(index))
+
+    totals = {'employees': len(labels)}
+    totals.update({name: round(float(results[name].sum()), 2) for name in SUMMARY_FIELDS})
+
+    grouped = {name: np.bincount(codes, weights=results[name], minlength=len(index)) for name in SUMMARY_FIELDS}
+    by_label = {
+        label: {'employees': int(counts[position]),
+                **{name: round(float(grouped[name][position]), 2) for name in SUMMARY_FIELDS}}
+        for label, position in index.items()
+    }
+    return totals, by_label
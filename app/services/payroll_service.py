@@ -8,16 +8,39 @@ from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, date
 from decimal import Decimal
 import logging
+import time
+
+from sqlalchemy import insert, update, delete, func
 
 from app import db
 from app.models.payroll import Employee, PayrollPeriod, Payroll, PayrollItem, PayrollConfig
+from app.services.payroll_calculator import (
+    CONFIG_FIELDS, SUMMARY_FIELDS, build_inputs, compute_payroll, config_values, output_rows, summarize,
+    with_salary_increase
+)
 from app.exceptions import BusinessLogicError, ValidationError
 
 logger = logging.getLogger(__name__)
 
+# Valores de la nómina que alimentan los conceptos de payroll_items
+PAYROLL_ITEM_FIELDS = (
+    'base_salary', 'overtime_hours', 'overtime_pay', 'bonuses', 'commissions', 'gross_salary',
+    'health_deduction', 'pension_deduction', 'income_tax', 'other_deductions'
+)
+
+# Novedades del período que se pueden informar por empleado en una liquidación masiva
+PAYROLL_RUN_INPUTS = ('days_worked', 'hours_worked', 'overtime_hours', 'bonuses', 'commissions', 'other_deductions')
+
+# Estados de nómina que una liquidación puede (re)calcular
+RECALCULABLE_STATUSES = ('draft', 'calculated')
+
 class PayrollService:
     """Servicio para gestión de nómina"""
     
+    # Liquidación masiva: nóminas por transacción y días por defecto sin novedades
+    RUN_CHUNK_SIZE = 200
+    DEFAULT_DAYS_WORKED = 30
+    
     def __init__(self):
         self.logger = logger
     
@@ -240,123 +263,379 @@ class PayrollService:
             self.logger.error(f"Error calculando nómina: {str(e)}")
             raise BusinessLogicError(f"Error calculando nómina: {str(e)}")
     
+    def run_period(
+        self,
+        period_id: int,
+        employee_ids: List[int] = None,
+        inputs: Dict[int, Dict[str, Any]] = None,
+        chunk_size: int = None
+    ) -> Dict[str, Any]:
+        """Liquidar el período completo en una pasada
+        
+        Carga empleados, nóminas existentes y configuración una sola vez,
+        calcula todas las nóminas vectorizadas y escribe nóminas e items con
+        inserciones/actualizaciones masivas en transacciones por lotes. Los
+        errores se informan por empleado sin abortar la liquidación.
+        
+        inputs: novedades por employee_id (días, horas, horas extras,
+        bonificaciones, comisiones, otras deducciones); sin novedades se
+        conservan las de la nómina existente o se liquida el mes completo.
+        """
+        period = self.get_payroll_period(period_id)
+        if not period:
+            raise ValidationError("Período de nómina no encontrado", field='period_id', value=period_id)
+        if period.is_locked:
+            raise ValidationError("Período de nómina bloqueado", field='period_id', value=period_id)
+        
+        config = self.get_default_payroll_config()
+        if not config:
+            raise ValidationError("Configuración de nómina no encontrada")
+        
+        chunk_size = max(int(chunk_size or self.RUN_CHUNK_SIZE), 1)
+        positions, errors, skipped = self._load_positions(period, employee_ids, inputs)
+        days_in_month = (period.end_date - period.start_date).days + 1
+        
+        # Cálculo vectorizado de toda la planta
+        if positions:
+            computed = output_rows(compute_payroll(build_inputs(positions), config_values(config), days_in_month))
+        else:
+            computed = []
+        
+        results: List[Dict[str, Any]] = []
+        next_number = self._next_payroll_sequence()
+        for start in range(0, len(positions), chunk_size):
+            chunk = list(zip(positions[start:start + chunk_size], computed[start:start + chunk_size]))
+            try:
+                chunk_results, next_number = self._write_run_chunk(period_id, chunk, config, next_number)
+                db.session.commit()
+                results.extend(chunk_results)
+            except Exception as e:
+                db.session.rollback()
+                self.logger.error(f"Error liquidando lote de nómina {period.period_code}: {str(e)}")
+                errors.extend(
+                    {'employee_id': position['employee_id'], 'employee_code': position['employee_code'], 'error': str(e)}
+                    for position, _ in chunk
+                )
+        
+        self._refresh_period_totals(period)
+        
+        self.logger.info(
+            f"Período liquidado: {period.period_code} ({len(results)} nóminas, {len(errors)} errores)"
+        )
+        return {
+            'period': period.to_dict(),
+            'results': results,
+            'errors': errors,
+            'skipped': skipped,
+            'total_processed': len(results),
+            'total_errors': len(errors)
+        }
+    
+    def _load_positions(
+        self,
+        period: PayrollPeriod,
+        employee_ids: List[int] = None,
+        inputs: Dict[int, Dict[str, Any]] = None,
+        department: str = None,
+        include_closed: bool = False
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Entradas de liquidación de los empleados vigentes en el período
+        
+        Dos consultas proyectadas (empleados y nóminas del período). Devuelve
+        (posiciones, errores, omitidas); las nóminas aprobadas o pagadas se
+        omiten salvo con include_closed.
+        """
+        inputs = {int(key): value for key, value in (inputs or {}).items()}
+        
+        query = db.session.query(
+            Employee.id, Employee.employee_code, Employee.department,
+            Employee.base_salary, Employee.work_hours_per_day
+        ).filter(
+            Employee.is_active.is_(True),
+            Employee.status == 'active',
+            Employee.hire_date <= period.end_date
+        )
+        if employee_ids:
+            query = query.filter(Employee.id.in_([int(employee_id) for employee_id in employee_ids]))
+        if department:
+            query = query.filter(Employee.department == department)
+        employees = query.order_by(Employee.id).all()
+        
+        existing = {
+            row.employee_id: row for row in db.session.query(
+                Payroll.id, Payroll.employee_id, Payroll.payroll_number, Payroll.status,
+                Payroll.days_worked, Payroll.hours_worked, Payroll.overtime_hours, Payroll.overtime_pay,
+                Payroll.bonuses, Payroll.commissions, Payroll.other_deductions
+            ).filter(Payroll.period_id == period.id).all()
+        }
+        
+        positions: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+        skipped: List[Dict[str, Any]] = []
+        
+        for employee in employees:
+            current = existing.get(employee.id)
+            if current is not None and current.status not in RECALCULABLE_STATUSES and not include_closed:
+                skipped.append({'employee_id': employee.id, 'employee_code': employee.employee_code,
+                                'payroll_id': current.id, 'status': current.status})
+                continue
+            try:
+                positions.append(self._run_position(employee, current, inputs.get(employee.id) or {}))
+            except ValidationError as e:
+                errors.append({'employee_id': employee.id, 'employee_code': employee.employee_code, 'error': e.message})
+        
+        return positions, errors, skipped
+    
+    def _run_position(self, employee: Any, current: Any, novelties: Dict[str, Any]) -> Dict[str, Any]:
+        """Entradas de liquidación de un empleado: nómina existente + novedades"""
+        base_salary = float(employee.base_salary or 0)
+        if base_salary <= 0:
+            raise ValidationError("Salario base inválido", field='base_salary', value=base_salary)
+        hours_per_day = float(employee.work_hours_per_day or 0)
+        if hours_per_day <= 0:
+            raise ValidationError("Horas por día inválidas", field='work_hours_per_day', value=hours_per_day)
+        
+        values = {
+            'days_worked': self.DEFAULT_DAYS_WORKED,
+            'hours_worked': None,
+            'overtime_hours': 0,
+            'bonuses': 0,
+            'commissions': 0,
+            'other_deductions': 0
+        }
+        overtime_pay = 0.0
+        if current is not None:
+            values.update({field: getattr(current, field) for field in PAYROLL_RUN_INPUTS})
+            overtime_pay = float(current.overtime_pay or 0)
+        
+        for field in PAYROLL_RUN_INPUTS:
+            if field in novelties:
+                values[field] = novelties[field]
+        
+        for field in PAYROLL_RUN_INPUTS:
+            if field == 'hours_worked' and values[field] is None:
+                continue
+            try:
+                values[field] = float(values[field] or 0)
+            except (TypeError, ValueError):
+                raise ValidationError(f"Valor inválido para {field}", field=field, value=values[field])
+            if values[field] < 0:
+                raise ValidationError(f"{field} no puede ser negativo", field=field, value=values[field])
+        
+        if values['hours_worked'] is None:
+            values['hours_worked'] = hours_per_day * values['days_worked']
+        
+        return {
+            'employee_id': employee.id,
+            'employee_code': employee.employee_code,
+            'department': employee.department,
+            'payroll_id': current.id if current is not None else None,
+            'payroll_number': current.payroll_number if current is not None else None,
+            'monthly_salary': base_salary,
+            'hours_per_day': hours_per_day,
+            'overtime_pay': overtime_pay,
+            **values
+        }
+    
+    def _write_run_chunk(
+        self,
+        period_id: int,
+        chunk: List[Tuple[Dict[str, Any], Dict[str, float]]],
+        config: PayrollConfig,
+        next_number: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Escribir un lote: UPDATE/INSERT masivos de nóminas y reemplazo de sus items"""
+        now = datetime.utcnow()
+        prefix = self._payroll_number_prefix(now)
+        updates, inserts, rows = [], [], []
+        
+        for position, values in chunk:
+            row = {
+                'employee_id': position['employee_id'],
+                'period_id': period_id,
+                'hours_worked': position['hours_worked'],
+                'overtime_hours': position['overtime_hours'],
+                **values,
+                'status': 'calculated',
+                'calculated_at': now,
+                'updated_at': now
+            }
+            if position['payroll_id'] is not None:
+                row['id'] = position['payroll_id']
+                row['payroll_number'] = position['payroll_number']
+                updates.append(row)
+            else:
+                row['payroll_number'] = f"{prefix}{next_number:04d}"
+                row['created_at'] = now
+                next_number += 1
+                inserts.append(row)
+            rows.append(row)
+        
+        if updates:
+            db.session.execute(update(Payroll), updates)
+        if inserts:
+            db.session.execute(insert(Payroll), inserts)
+            created = dict(db.session.query(Payroll.employee_id, Payroll.id).filter(
+                Payroll.period_id == period_id,
+                Payroll.employee_id.in_([row['employee_id'] for row in inserts])
+            ).all())
+            for row in inserts:
+                row['id'] = created[row['employee_id']]
+        
+        # Items: se reemplazan completos para las nóminas del lote
+        payroll_ids = [row['id'] for row in rows]
+        db.session.execute(
+            delete(PayrollItem).where(PayrollItem.payroll_id.in_(payroll_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        item_rows = []
+        for row in rows:
+            item_rows.extend(self._payroll_item_rows(
+                row['id'], row['employee_id'], row, config.health_percentage, config.pension_percentage
+            ))
+        if item_rows:
+            db.session.execute(insert(PayrollItem), item_rows)
+        
+        results = [{
+            'id': row['id'],
+            'payroll_number': row['payroll_number'],
+            'employee_id': row['employee_id'],
+            'period_id': period_id,
+            'days_worked': row['days_worked'],
+            'hours_worked': row['hours_worked'],
+            'overtime_hours': row['overtime_hours'],
+            'base_salary': row['base_salary'],
+            'overtime_pay': row['overtime_pay'],
+            'bonuses': row['bonuses'],
+            'commissions': row['commissions'],
+            'gross_salary': row['gross_salary'],
+            'health_deduction': row['health_deduction'],
+            'pension_deduction': row['pension_deduction'],
+            'income_tax': row['income_tax'],
+            'other_deductions': row['other_deductions'],
+            'total_deductions': row['total_deductions'],
+            'net_salary': row['net_salary'],
+            'status': row['status'],
+            'calculated_at': now.isoformat()
+        } for row in rows]
+        return results, next_number
+    
+    def _payroll_number_prefix(self, now: datetime) -> str:
+        """Prefijo de numeración de nóminas (mismo formato que Payroll._generate_payroll_number)"""
+        return f"NOM{now.year}{now.month:02d}"
+    
+    def _next_payroll_sequence(self) -> int:
+        """Siguiente consecutivo de la serie del mes, reservado para la liquidación"""
+        prefix = self._payroll_number_prefix(datetime.utcnow())
+        last_number = db.session.query(func.max(Payroll.payroll_number)).filter(
+            Payroll.payroll_number.like(f"{prefix}%")
+        ).scalar()
+        return int(last_number[-4:]) + 1 if last_number else 1
+    
+    def _period_totals(self, period_id: int) -> Dict[str, Any]:
+        """Totales persistidos del período (nóminas no anuladas) en una consulta agregada"""
+        totals = db.session.query(
+            func.count(Payroll.id),
+            func.coalesce(func.sum(Payroll.gross_salary), 0),
+            func.coalesce(func.sum(Payroll.total_deductions), 0),
+            func.coalesce(func.sum(Payroll.net_salary), 0)
+        ).filter(Payroll.period_id == period_id, Payroll.status != 'cancelled').one()
+        
+        return {
+            'employees': int(totals[0] or 0),
+            'gross_salary': float(totals[1] or 0),
+            'total_deductions': float(totals[2] or 0),
+            'net_salary': float(totals[3] or 0)
+        }
+    
+    def _refresh_period_totals(self, period: PayrollPeriod) -> None:
+        """Recalcular los totales del período con una consulta agregada"""
+        try:
+            totals = self._period_totals(period.id)
+            period.total_employees = totals['employees']
+            period.total_gross_salary = totals['gross_salary']
+            period.total_deductions = totals['total_deductions']
+            period.total_net_salary = totals['net_salary']
+            period.processed_at = datetime.utcnow()
+            period.updated_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Error actualizando totales del período {period.period_code}: {str(e)}")
+    
     def _create_payroll_items(self, payroll: Payroll, config: PayrollConfig) -> None:
         """Crear items de nómina"""
         # Limpiar items existentes
         PayrollItem.query.filter_by(payroll_id=payroll.id).delete()
         
+        values = {field: getattr(payroll, field) for field in PAYROLL_ITEM_FIELDS}
+        db.session.execute(insert(PayrollItem), self._payroll_item_rows(
+            payroll.id, payroll.employee_id, values, config.health_percentage, config.pension_percentage
+        ))
+    
+    def _payroll_item_rows(
+        self,
+        payroll_id: int,
+        employee_id: int,
+        values: Dict[str, Any],
+        health_percentage: Any,
+        pension_percentage: Any
+    ) -> List[Dict[str, Any]]:
+        """Conceptos de una nómina liquidada como filas de payroll_items"""
+        def item(concept_code, concept_name, concept_type, category, base_amount, amount, is_mandatory, percentage=None):
+            return {
+                'payroll_id': payroll_id,
+                'employee_id': employee_id,
+                'concept_code': concept_code,
+                'concept_name': concept_name,
+                'concept_type': concept_type,
+                'category': category,
+                'base_amount': base_amount,
+                'percentage': percentage,
+                'calculated_amount': amount,
+                'is_mandatory': is_mandatory
+            }
+        
         # Salario base
-        PayrollItem(
-            payroll_id=payroll.id,
-            employee_id=payroll.employee_id,
-            concept_code='SAL001',
-            concept_name='Salario Base',
-            concept_type='earning',
-            category='salary',
-            base_amount=payroll.base_salary,
-            calculated_amount=payroll.base_salary,
-            is_mandatory=True
-        )
+        rows = [item('SAL001', 'Salario Base', 'earning', 'salary',
+                     values['base_salary'], values['base_salary'], True)]
         
         # Horas extras
-        if payroll.overtime_pay > 0:
-            PayrollItem(
-                payroll_id=payroll.id,
-                employee_id=payroll.employee_id,
-                concept_code='HOR001',
-                concept_name='Horas Extras',
-                concept_type='earning',
-                category='overtime',
-                base_amount=payroll.overtime_hours,
-                calculated_amount=payroll.overtime_pay,
-                is_mandatory=False
-            )
+        if values['overtime_pay'] > 0:
+            rows.append(item('HOR001', 'Horas Extras', 'earning', 'overtime',
+                             values['overtime_hours'], values['overtime_pay'], False))
         
         # Bonificaciones
-        if payroll.bonuses > 0:
-            PayrollItem(
-                payroll_id=payroll.id,
-                employee_id=payroll.employee_id,
-                concept_code='BON001',
-                concept_name='Bonificaciones',
-                concept_type='earning',
-                category='bonus',
-                base_amount=payroll.bonuses,
-                calculated_amount=payroll.bonuses,
-                is_mandatory=False
-            )
+        if values['bonuses'] > 0:
+            rows.append(item('BON001', 'Bonificaciones', 'earning', 'bonus',
+                             values['bonuses'], values['bonuses'], False))
         
         # Comisiones
-        if payroll.commissions > 0:
-            PayrollItem(
-                payroll_id=payroll.id,
-                employee_id=payroll.employee_id,
-                concept_code='COM001',
-                concept_name='Comisiones',
-                concept_type='earning',
-                category='commission',
-                base_amount=payroll.commissions,
-                calculated_amount=payroll.commissions,
-                is_mandatory=False
-            )
+        if values['commissions'] > 0:
+            rows.append(item('COM001', 'Comisiones', 'earning', 'commission',
+                             values['commissions'], values['commissions'], False))
         
         # Deducción salud
-        if payroll.health_deduction > 0:
-            PayrollItem(
-                payroll_id=payroll.id,
-                employee_id=payroll.employee_id,
-                concept_code='DES001',
-                concept_name='Deducción Salud',
-                concept_type='deduction',
-                category='health',
-                base_amount=payroll.base_salary,
-                percentage=config.health_percentage,
-                calculated_amount=payroll.health_deduction,
-                is_mandatory=True
-            )
+        if values['health_deduction'] > 0:
+            rows.append(item('DES001', 'Deducción Salud', 'deduction', 'health',
+                             values['base_salary'], values['health_deduction'], True, health_percentage))
         
         # Deducción pensión
-        if payroll.pension_deduction > 0:
-            PayrollItem(
-                payroll_id=payroll.id,
-                employee_id=payroll.employee_id,
-                concept_code='DES002',
-                concept_name='Deducción Pensión',
-                concept_type='deduction',
-                category='pension',
-                base_amount=payroll.base_salary,
-                percentage=config.pension_percentage,
-                calculated_amount=payroll.pension_deduction,
-                is_mandatory=True
-            )
+        if values['pension_deduction'] > 0:
+            rows.append(item('DES002', 'Deducción Pensión', 'deduction', 'pension',
+                             values['base_salary'], values['pension_deduction'], True, pension_percentage))
         
         # Retención en la fuente
-        if payroll.income_tax > 0:
-            PayrollItem(
-                payroll_id=payroll.id,
-                employee_id=payroll.employee_id,
-                concept_code='DES003',
-                concept_name='Retención en la Fuente',
-                concept_type='deduction',
-                category='tax',
-                base_amount=payroll.gross_salary,
-                calculated_amount=payroll.income_tax,
-                is_mandatory=True
-            )
+        if values['income_tax'] > 0:
+            rows.append(item('DES003', 'Retención en la Fuente', 'deduction', 'tax',
+                             values['gross_salary'], values['income_tax'], True))
         
         # Otras deducciones
-        if payroll.other_deductions > 0:
-            PayrollItem(
-                payroll_id=payroll.id,
-                employee_id=payroll.employee_id,
-                concept_code='DES004',
-                concept_name='Otras Deducciones',
-                concept_type='deduction',
-                category='other',
-                base_amount=payroll.other_deductions,
-                calculated_amount=payroll.other_deductions,
-                is_mandatory=False
-            )
+        if values['other_deductions'] > 0:
+            rows.append(item('DES004', 'Otras Deducciones', 'deduction', 'other',
+                             values['other_deductions'], values['other_deductions'], False))
+        
+        return rows
     
     def get_payroll(self, payroll_id: int) -> Optional[Payroll]:
         """Obtener nómina por ID"""
@@ -472,6 +751,120 @@ class PayrollService:
             self.logger.error(f"Error generando resumen: {str(e)}")
             raise BusinessLogicError(f"Error generando resumen: {str(e)}")
     
+    def simulate_period(
+        self,
+        period_id: int,
+        salary_increase_pct: float = 0,
+        department_increases: Dict[str, float] = None,
+        config_id: int = None,
+        config_overrides: Dict[str, Any] = None,
+        department: str = None
+    ) -> Dict[str, Any]:
+        """Simular el período con salarios y/o configuración alternativos
+        
+        Carga las posiciones del período una vez (mismas entradas que
+        run_period, incluidas las nóminas ya aprobadas o pagadas) y liquida
+        en arrays el escenario base (configuración por defecto) y el
+        escenario propuesto. No escribe nada: devuelve totales y diferencias
+        generales y por departamento junto a los totales persistidos.
+        """
+        started = time.perf_counter()
+        
+        period = self.get_payroll_period(period_id)
+        if not period:
+            raise ValidationError("Período de nómina no encontrado", field='period_id', value=period_id)
+        
+        base_config = self.get_default_payroll_config()
+        if not base_config:
+            raise ValidationError("Configuración de nómina no encontrada")
+        
+        variant_config = base_config
+        if config_id:
+            variant_config = PayrollConfig.query.get(config_id)
+            if not variant_config:
+                raise ValidationError("Configuración de nómina no encontrada", field='config_id', value=config_id)
+        
+        salary_increase_pct = self._simulation_percentage('salary_increase_pct', salary_increase_pct)
+        department_increases = {
+            str(name): self._simulation_percentage('department_increases', value)
+            for name, value in (department_increases or {}).items()
+        }
+        scenario_config = config_values(variant_config, self._simulation_overrides(config_overrides))
+        
+        positions, errors, _ = self._load_positions(period, department=department, include_closed=True)
+        days_in_month = (period.end_date - period.start_date).days + 1
+        departments = [position['department'] for position in positions]
+        
+        inputs = build_inputs(positions)
+        baseline = compute_payroll(inputs, config_values(base_config), days_in_month)
+        
+        # Aumento por posición: general, o el del departamento si se indicó
+        increases = [department_increases.get(name, salary_increase_pct) for name in departments]
+        simulated = compute_payroll(with_salary_increase(inputs, increases), scenario_config, days_in_month)
+        
+        baseline_totals, baseline_departments = summarize(baseline, departments)
+        simulated_totals, simulated_departments = summarize(simulated, departments)
+        
+        return {
+            'period': period.to_dict(),
+            'scenario': {
+                'salary_increase_pct': salary_increase_pct,
+                'department_increases': department_increases,
+                'config_id': variant_config.id,
+                'config': scenario_config,
+                'department': department
+            },
+            'persisted': self._period_totals(period.id),
+            'baseline': baseline_totals,
+            'simulated': simulated_totals,
+            'delta': self._simulation_delta(baseline_totals, simulated_totals),
+            'departments': [
+                {
+                    'department': name,
+                    'employees': baseline_departments[name]['employees'],
+                    'baseline': baseline_departments[name],
+                    'simulated': simulated_departments[name],
+                    'delta': self._simulation_delta(baseline_departments[name], simulated_departments[name])
+                }
+                for name in sorted(baseline_departments)
+            ],
+            'errors': errors,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+    
+    def _simulation_percentage(self, field: str, value: Any) -> float:
+        """Validar un porcentaje de aumento (se admiten rebajas hasta -100%)"""
+        try:
+            value = float(value or 0)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Porcentaje inválido para {field}", field=field, value=value)
+        if value < -100 or value > 1000:
+            raise ValidationError(f"Porcentaje fuera de rango para {field}", field=field, value=value)
+        return value
+    
+    def _simulation_overrides(self, overrides: Dict[str, Any]) -> Dict[str, float]:
+        """Validar las variaciones de configuración de un escenario"""
+        values = {}
+        for field, value in (overrides or {}).items():
+            if field not in CONFIG_FIELDS:
+                raise ValidationError(f"Parámetro de configuración no simulable: {field}", field=field)
+            try:
+                values[field] = float(value)
+            except (TypeError, ValueError):
+                raise ValidationError(f"Valor inválido para {field}", field=field, value=value)
+            if values[field] < 0 or (field.endswith('_percentage') and values[field] > 100):
+                raise ValidationError(f"Valor fuera de rango para {field}", field=field, value=value)
+        return values
+    
+    def _simulation_delta(self, baseline: Dict[str, Any], simulated: Dict[str, Any]) -> Dict[str, Any]:
+        """Diferencia absoluta y porcentual entre escenarios"""
+        delta = {}
+        for name in SUMMARY_FIELDS:
+            difference = round(simulated[name] - baseline[name], 2)
+            delta[name] = difference
+            delta[f'{name}_pct'] = round(difference / baseline[name] * 100, 2) if baseline[name] else None
+        return delta
+    
     def get_employee_payroll_history(self, employee_id: int, year: int = None) -> Dict[str, Any]:
         """Obtener historial de nómina de empleado"""
         try:
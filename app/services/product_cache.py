@@ -0,0 +1,104 @@
+"""
+Product Cache - Sistema POS O'Data
+=================================
+Cache en proceso de productos activos ya serializados (product.to_dict())
+para hidratar resultados de IA: búsqueda semántica y recomendaciones solo
+necesitan los pocos productos ganadores, y los más consultados se repiten.
+
+LRU con vigencia corta: el stock y el precio pueden quedar desfasados a lo
+sumo PRODUCT_CACHE_TTL_SECONDS; un producto desactivado deja de servirse al
+vencer su entrada.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Límite de parámetros por consulta IN (...) compatible con SQLite
+IN_CLAUSE_CHUNK = 500
+
+
+class ProductCache:
+    """LRU de productos activos serializados por id"""
+
+    def __init__(self):
+        self.max_entries = int(os.getenv('PRODUCT_CACHE_MAX_ENTRIES', '5000'))
+        self.ttl_seconds = float(os.getenv('PRODUCT_CACHE_TTL_SECONDS', '60'))
+
+        self._entries: 'OrderedDict[int, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_many(self, product_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Productos activos por id; los que faltan se cargan en una consulta"""
+        product_ids = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+        found: Dict[int, Dict[str, Any]] = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for product_id in product_ids:
+                entry = self._entries.get(product_id)
+                if entry is not None and now - entry[0] < self.ttl_seconds:
+                    self._entries.move_to_end(product_id)
+                    found[product_id] = entry[1]
+            self._hits += len(found)
+            self._misses += len(product_ids) - len(found)
+
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        if missing:
+            loaded = self._load(missing)
+            found.update(loaded)
+            with self._lock:
+                for product_id in missing:
+                    if product_id in loaded:
+                        self._entries[product_id] = (now, loaded[product_id])
+                        self._entries.move_to_end(product_id)
+                    else:
+                        self._entries.pop(product_id, None)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return found
+
+    def _load(self, product_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        from app.models.product import Product
+
+        product_ids = list(product_ids)
+        loaded: Dict[int, Dict[str, Any]] = {}
+        for start in range(0, len(product_ids), IN_CLAUSE_CHUNK):
+            for product in Product.query.filter(
+                Product.id.in_(product_ids[start:start + IN_CLAUSE_CHUNK]),
+                Product.is_active == True
+            ).all():
+                loaded[product.id] = product.to_dict()
+        return loaded
+
+    def invalidate(self, *product_ids: int) -> None:
+        """Descartar productos concretos, o todo el cache sin argumentos"""
+        with self._lock:
+            if not product_ids:
+                self._entries.clear()
+            for product_id in product_ids:
+                self._entries.pop(int(product_id), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Instancia global del cache
+product_cache = ProductCache()
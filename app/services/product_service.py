@@ -58,26 +58,61 @@ class ProductService:
         product = self.product_repository.get_by_id_or_404(product_id)
         return product.to_dict()
     
-    def get_products(self, page: int = 1, per_page: int = 20, **filters) -> Dict[str, Any]:
-        """Obtener productos con filtros"""
-        result = self.product_repository.get_all(page=page, per_page=per_page, **filters)
+    def get_products(self, page: int = 1, per_page: int = 20, fields: Optional[str] = None,
+                     **filters) -> Dict[str, Any]:
+        """Obtener productos con filtros, serializados desde filas (?fields=)"""
+        plan = self._listing_plan(fields)
+        result = self.product_repository.get_all(page=page, per_page=per_page, plan=plan, **filters)
         return {
-            'products': [product.to_dict() for product in result['items']],
+            'products': plan.dump(result['items']),
+            'pagination': result['pagination']
+        }
+    
+    def search_products(self, search_term: str, page: int = 1, per_page: int = 20,
+                        fields: Optional[str] = None, cursor: Optional[str] = None,
+                        include_total: bool = True) -> Dict[str, Any]:
+        """Buscar productos, serializados desde filas (?fields=)"""
+        plan = self._listing_plan(fields)
+        result = self.product_repository.search_products(
+            search_term, page=page, per_page=per_page, cursor=cursor,
+            include_total=include_total, plan=plan
+        )
+        return {
+            'products': plan.dump(result['items']),
             'pagination': result['pagination']
         }
     
+    def _listing_plan(self, fields: Optional[str]):
+        """Plan de columnas para listados, incluyendo la clave del cursor"""
+        from app.models.product import Product
+        from app.schemas.row_serializers import PRODUCT_SERIALIZER
+        
+        names, _ = PRODUCT_SERIALIZER.parse_fields(fields)
+        key_columns = [getattr(Product, name) for name in self.product_repository.cursor_columns]
+        return PRODUCT_SERIALIZER.plan(names, extra_columns=key_columns)
+    
     def update_product(self, product_id: int, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """Actualizar producto"""
+        from app.services.product_cache import product_cache
+        
         product = self.product_repository.update(product_id, **product_data)
+        product_cache.invalidate(product_id)
         return product.to_dict()
     
     def delete_product(self, product_id: int) -> bool:
         """Eliminar producto físicamente"""
-        return self.product_repository.delete(product_id)
+        from app.services.product_cache import product_cache
+        
+        deleted = self.product_repository.delete(product_id)
+        product_cache.invalidate(product_id)
+        return deleted
     
-    def get_low_stock_products(self, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def get_low_stock_products(self, page: int = 1, per_page: int = 20, cursor: Optional[str] = None,
+                               include_total: bool = True) -> Dict[str, Any]:
         """Obtener productos con stock bajo"""
-        result = self.product_repository.get_low_stock_products(page=page, per_page=per_page)
+        result = self.product_repository.get_low_stock_products(
+            page=page, per_page=per_page, cursor=cursor, include_total=include_total
+        )
         return {
             'products': [product.to_dict() for product in result['items']],
             'pagination': result['pagination']
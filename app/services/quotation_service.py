@@ -14,6 +14,8 @@ from app.models.quotation import Quotation, QuotationItem, QuotationApproval, Qu
 from app.models.accounts_receivable import Customer
 from app.models.sale import Sale, SaleItem
 from app.exceptions import BusinessLogicError, ValidationError
+from app.repositories.base_repository import unit_of_work
+from app.services.sales_rollup_service import sales_rollup_service
 
 logger = logging.getLogger(__name__)
 
@@ -317,54 +319,57 @@ class QuotationService:
 
     def convert_to_sale(self, quotation_id: int, user_id: int) -> Sale:
         """Convertir cotización a venta"""
-        try:
-            quotation = self.get_quotation(quotation_id)
-            if not quotation:
-                raise ValidationError("Cotización no encontrada")
-
-            if not quotation.can_be_converted:
-                raise ValidationError("La cotización no puede ser convertida a venta")
-
-            # Crear venta
-            sale = Sale(
-                user_id=user_id,
-                customer_id=quotation.customer_id,
-                total_amount=quotation.total_amount,
-                notes=f"Convertida desde cotización {quotation.quotation_number}",
-                status='completed'
-            )
-
-            db.session.add(sale)
-            db.session.flush()  # Para obtener el ID
+        from app.container import container
+        from app.services.sale_service import SaleService
 
-            # Crear items de la venta
-            for quotation_item in quotation.items:
-                sale_item = SaleItem(
-                    sale_id=sale.id,
-                    product_id=quotation_item.product_id,
-                    product_name=quotation_item.product_name,
-                    product_code=quotation_item.product_code,
-                    quantity=quotation_item.quantity,
-                    unit_price=quotation_item.unit_price,
-                    total_amount=quotation_item.total_amount
-                )
-
-                db.session.add(sale_item)
-
-            # Marcar cotización como convertida
-            quotation.converted_to_sale = True
-            quotation.sale_id = sale.id
-            quotation.converted_at = datetime.utcnow()
-            quotation.status = 'converted'
-            quotation.updated_at = datetime.utcnow()
-
-            db.session.commit()
+        try:
+            # Venta, stock, movimientos y estado de la cotización en un solo commit
+            with unit_of_work():
+                quotation = self.get_quotation(quotation_id)
+                if not quotation:
+                    raise ValidationError("Cotización no encontrada")
+
+                if not quotation.can_be_converted:
+                    raise ValidationError("La cotización no puede ser convertida a venta")
+
+                if any(item.product_id is None for item in quotation.items):
+                    raise ValidationError("Solo se pueden convertir cotizaciones con productos del catálogo")
+
+                # Crear venta con el mismo flujo transaccional del POS
+                sale_service = container.get(SaleService)
+                sale, _ = sale_service.record_sale(user_id, {
+                    'items': [
+                        {
+                            'product_id': quotation_item.product_id,
+                            'quantity': int(quotation_item.quantity),
+                            # Precio neto del item: conserva descuentos por línea
+                            'unit_price': float(quotation_item.total_amount / quotation_item.quantity)
+                        }
+                        for quotation_item in quotation.items
+                    ],
+                    'customer_id': quotation.customer_id,
+                    'notes': f"Convertida desde cotización {quotation.quotation_number}"
+                })
+
+                # Impuestos y descuento global tal como fueron cotizados; record_sale ya
+                # sumó la venta a los agregados, se resta esa versión y se suma la final
+                sales_rollup_service.apply([sale_service._rollup_fact(sale)], sign=-1)
+                sale.tax_amount = quotation.tax_amount or Decimal('0')
+                sale.discount_amount = quotation.discount_amount or Decimal('0')
+                sale._recalculate_totals()
+                sales_rollup_service.apply([sale_service._rollup_fact(sale)])
+
+                # Marcar cotización como convertida
+                quotation.converted_to_sale = True
+                quotation.sale_id = sale.id
+                quotation.converted_at = datetime.utcnow()
+                quotation.status = 'converted'
+                quotation.updated_at = datetime.utcnow()
 
             self.logger.info(f"Cotización convertida a venta: {quotation.quotation_number} -> {sale.id}")
             return sale
 
         except Exception as e:
-            db.session.rollback()
             self.logger.error(f"Error convirtiendo cotización a venta: {str(e)}")
             raise BusinessLogicError(f"Error convirtiendo cotización a venta: {str(e)}")
 
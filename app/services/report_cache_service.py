@@ -0,0 +1,408 @@
+"""
+Report Cache Service - Sistema POS O'Data
+========================================
+Cache de resultados de reportes y dashboards. La clave es el nombre del
+reporte más sus parámetros normalizados; cada entrada guarda la versión de
+los datos de los que depende (ventas, inventario, transferencias), que se
+incrementa al confirmar cualquier escritura sobre esas tablas.
+
+- Nivel 1: LRU en proceso. Nivel 2 (opcional): Redis, compartido entre
+  workers, que también guarda los contadores de versión.
+- Single-flight: peticiones idénticas concurrentes calculan una sola vez.
+- Stale-while-revalidate: una entrada vencida o de una versión anterior se
+  sirve mientras se recalcula en segundo plano, dentro de la ventana stale.
+- Precálculo: los reportes registrados (register_report) pueden calcularse
+  por adelantado (warm_report) con una vigencia propia, p. ej. los
+  dashboards de la mañana desde el planificador de reportes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'report_cache:'
+
+# Tablas cuya escritura invalida cada dominio de datos
+DOMAIN_TABLES = {
+    'sales': ('sales', 'sale_items', 'multi_payments', 'payment_details',
+              'sales_rollup_hourly', 'sales_rollup_product_daily'),
+    'inventory': ('products', 'store_products', 'inventory_movements'),
+    'transfers': ('inventory_transfers', 'inventory_transfer_items'),
+}
+TABLE_DOMAINS = {table: domain for domain, tables in DOMAIN_TABLES.items() for table in tables}
+
+
+class _Entry:
+    __slots__ = ('value', 'version', 'computed_at', 'fresh_for')
+
+    def __init__(self, value: Any, version: str, computed_at: float, fresh_for: Optional[float] = None):
+        self.value = value
+        self.version = version
+        self.computed_at = computed_at
+        self.fresh_for = fresh_for  # vigencia propia de las entradas precalculadas
+
+
+class _Flight:
+    """Cálculo en curso de una clave: el líder deja el resultado o el error para los que esperan"""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class CachedReport(NamedTuple):
+    """Reporte registrado: build(**kwargs) lo calcula y params(**kwargs) da los parámetros de su clave"""
+    build: Callable[..., Any]
+    params: Callable[..., Dict[str, Any]]
+    domains: Tuple[str, ...]
+
+
+class ReportCacheService:
+    """Cache versionado de reportes con LRU local y Redis opcional"""
+
+    def __init__(self):
+        self.max_entries = int(os.getenv('REPORT_CACHE_MAX_ENTRIES', '256'))
+        self.fresh_seconds = float(os.getenv('REPORT_CACHE_FRESH_SECONDS', '30'))
+        self.stale_seconds = float(os.getenv('REPORT_CACHE_STALE_SECONDS', '300'))
+        self.wait_timeout = float(os.getenv('REPORT_CACHE_WAIT_SECONDS', '60'))
+        self.use_redis = os.getenv('REPORT_CACHE_REDIS', 'true').lower() == 'true'
+        self.enabled = os.getenv('REPORT_CACHE_ENABLED', 'true').lower() == 'true'
+
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._reports: Dict[str, CachedReport] = {}
+        self._inflight: Dict[str, _Flight] = {}
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._metrics: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Claves y versiones
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(name: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Nombre del reporte más hash de los parámetros normalizados (orden y None irrelevantes)"""
+        normalized = {key: value for key, value in (params or {}).items() if value is not None}
+        digest = hashlib.sha1(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()[:20]
+        return f"{name}:{digest}"
+
+    def _redis(self) -> Any:
+        if not self.use_redis:
+            return None
+        try:
+            from app.config.redis_config import get_redis_client
+            return get_redis_client()
+        except Exception:
+            return None
+
+    def is_shared(self) -> bool:
+        """Las entradas se comparten entre procesos (nivel Redis disponible)"""
+        return self._redis() is not None
+
+    def current_version(self, domains: Iterable[str]) -> str:
+        """Versión combinada de los dominios de datos (Redis si está disponible)"""
+        domains = tuple(domains)
+        client = self._redis()
+        if client is not None:
+            try:
+                values = client.mget([f"{KEY_PREFIX}version:{domain}" for domain in domains])
+                return 'r' + ':'.join(value or '0' for value in values)
+            except Exception as e:
+                self._count('redis_errors')
+                logger.debug(f"Report cache version read failed: {e}")
+
+        with self._lock:
+            return 'l' + ':'.join(str(self._versions[domain]) for domain in domains)
+
+    def bump(self, *domains: str) -> None:
+        """Incrementar la versión de los dominios (invalidación por escritura)"""
+        if not domains:
+            return
+        with self._lock:
+            for domain in domains:
+                self._versions[domain] += 1
+            self._metrics['invalidations'] += len(domains)
+
+        client = self._redis()
+        if client is not None:
+            try:
+                pipeline = client.pipeline()
+                for domain in domains:
+                    pipeline.incr(f"{KEY_PREFIX}version:{domain}")
+                pipeline.execute()
+            except Exception as e:
+                self._count('redis_errors')
+                logger.debug(f"Report cache version bump failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Lectura / escritura
+    # ------------------------------------------------------------------
+
+    def get_or_compute(self, name: str, params: Optional[Dict[str, Any]], compute: Callable[[], Any],
+                       domains: Tuple[str, ...] = ('sales',), fresh_seconds: Optional[float] = None) -> Any:
+        """Devolver el reporte cacheado o calcularlo
+
+        compute no debe depender del contexto de la petición (request, g):
+        puede ejecutarse en un hilo de segundo plano con solo el contexto de
+        la aplicación. El resultado debe ser serializable a JSON para el
+        nivel Redis.
+        """
+        if not self.enabled:
+            return compute()
+
+        key = self.make_key(name, params)
+        version = self.current_version(domains)
+        fresh_seconds = self.fresh_seconds if fresh_seconds is None else fresh_seconds
+
+        entry = self._lookup(key, version)
+        if entry is not None:
+            age = time.time() - entry.computed_at
+            if entry.fresh_for is not None:
+                fresh_seconds = max(fresh_seconds, entry.fresh_for)
+            if entry.version == version and age < fresh_seconds:
+                self._count('hits')
+                return entry.value
+            if age < max(self.stale_seconds, entry.fresh_for or 0):
+                self._count('stale_hits')
+                self._refresh_in_background(key, version, compute)
+                return entry.value
+
+        self._count('misses')
+        return self._compute(key, version, compute)
+
+    def _lookup(self, key: str, version: str) -> Optional[_Entry]:
+        """Entrada local; si falta o es de otra versión, se consulta Redis (otro worker pudo recalcularla)"""
+        with self._lock:
+            local = self._entries.get(key)
+            if local is not None:
+                self._entries.move_to_end(key)
+                if local.version == version:
+                    return local
+
+        client = self._redis()
+        if client is None:
+            return local
+        try:
+            raw = client.get(KEY_PREFIX + key)
+        except Exception as e:
+            self._count('redis_errors')
+            logger.debug(f"Report cache read failed: {e}")
+            return local
+        if not raw:
+            return local
+
+        payload = json.loads(raw)
+        shared = _Entry(payload['d'], payload['v'], payload['t'], payload.get('f'))
+        if local is not None and local.computed_at >= shared.computed_at:
+            return local
+        self._count('redis_hits')
+        self._store_local(key, shared)
+        return shared
+
+    def _store_local(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics['evictions'] += 1
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        self._store_local(key, entry)
+
+        client = self._redis()
+        if client is not None:
+            try:
+                client.setex(
+                    KEY_PREFIX + key, int(max(self.stale_seconds, entry.fresh_for or 0)),
+                    json.dumps({'d': entry.value, 'v': entry.version, 't': entry.computed_at, 'f': entry.fresh_for},
+                               default=str)
+                )
+            except Exception as e:
+                self._count('redis_errors')
+                logger.debug(f"Report cache write failed: {e}")
+
+    def _compute(self, key: str, version: str, compute: Callable[[], Any]) -> Any:
+        """Calcular con single-flight: el primero calcula, los demás reciben su resultado"""
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            self._count('coalesced')
+            if flight.done.wait(self.wait_timeout) and flight.error is None:
+                return flight.value
+            # El cálculo líder falló o expiró la espera: calcular sin coordinación
+            self._count('coalesced_fallbacks')
+            return compute()
+
+        try:
+            started = time.time()
+            flight.value = compute()
+            self._count('computations')
+            self._store(key, _Entry(flight.value, version, started))
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def _refresh_in_background(self, key: str, version: str, compute: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._inflight:
+                return
+
+        app = current_app._get_current_object()
+
+        def refresh():
+            with app.app_context():
+                try:
+                    self._compute(key, version, compute)
+                    self._count('background_refreshes')
+                except Exception as e:
+                    self._count('refresh_errors')
+                    logger.warning(f"Report cache background refresh failed for {key}: {e}")
+
+        threading.Thread(target=refresh, name='report-cache-refresh', daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # Reportes registrados y precálculo
+    # ------------------------------------------------------------------
+
+    def register_report(self, name: str, build: Callable[..., Any],
+                        params: Optional[Callable[..., Dict[str, Any]]] = None,
+                        domains: Tuple[str, ...] = ('sales',)) -> None:
+        """Registrar un reporte cacheable por nombre (lo usan los endpoints y el precálculo)"""
+        self._reports[name] = CachedReport(build, params or (lambda **kwargs: kwargs), tuple(domains))
+
+    def registered_reports(self) -> List[str]:
+        """Nombres de los reportes registrados"""
+        return sorted(self._reports)
+
+    def get_report(self, name: str, **kwargs: Any) -> Any:
+        """Obtener un reporte registrado desde el cache (o calcularlo)"""
+        report = self._reports[name]
+        return self.get_or_compute(name, report.params(**kwargs), lambda: report.build(**kwargs),
+                                   domains=report.domains)
+
+    def warm_report(self, name: str, fresh_for: float, **kwargs: Any) -> Any:
+        """Calcular ahora un reporte registrado y guardarlo vigente por fresh_for segundos
+
+        La entrada sigue invalidándose por versión: tras una escritura se
+        sirve como stale (hasta fresh_for) mientras se recalcula. Sin Redis
+        solo queda en el LRU del proceso que la calcula.
+        """
+        report = self._reports[name]
+        key = self.make_key(name, report.params(**kwargs))
+        version = self.current_version(report.domains)
+        started = time.time()
+        value = report.build(**kwargs)
+        self._store(key, _Entry(value, version, started, fresh_for))
+        self._count('warmups')
+        return value
+
+    # ------------------------------------------------------------------
+    # Administración y métricas
+    # ------------------------------------------------------------------
+
+    def _count(self, metric: str) -> None:
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def clear(self) -> None:
+        """Vaciar el nivel local (Redis expira por TTL)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de aciertos/fallos y estado del cache"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            entries = len(self._entries)
+            versions = dict(self._versions)
+
+        lookups = metrics.get('hits', 0) + metrics.get('stale_hits', 0) + metrics.get('misses', 0)
+        served = metrics.get('hits', 0) + metrics.get('stale_hits', 0)
+        return {
+            'enabled': self.enabled,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'fresh_seconds': self.fresh_seconds,
+            'stale_seconds': self.stale_seconds,
+            'redis_enabled': self.is_shared(),
+            'hit_ratio': round(served / lookups, 4) if lookups else 0.0,
+            'local_versions': versions,
+            'metrics': metrics
+        }
+
+
+# Instancia global del servicio
+report_cache_service = ReportCacheService()
+
+
+# ----------------------------------------------------------------------
+# Invalidación por escritura (eventos de sesión SQLAlchemy)
+# ----------------------------------------------------------------------
+
+_INFO_KEY = 'report_cache_domains'
+_listeners_registered = False
+
+
+def _touched(session: Session) -> set:
+    return session.info.setdefault(_INFO_KEY, set())
+
+
+def _on_after_flush(session: Session, flush_context: Any) -> None:
+    touched = _touched(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(getattr(obj, '__table__', None), 'name', None)
+        if table in TABLE_DOMAINS:
+            touched.add(TABLE_DOMAINS[table])
+
+
+def _on_orm_execute(state: Any) -> None:
+    # INSERT/UPDATE/DELETE masivos (insert(Model), query.update()) no pasan por el flush
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(getattr(state.statement, 'table', None), 'name', None)
+        if table in TABLE_DOMAINS:
+            _touched(state.session).add(TABLE_DOMAINS[table])
+
+
+def _on_after_commit(session: Session) -> None:
+    domains = session.info.pop(_INFO_KEY, None)
+    if domains:
+        report_cache_service.bump(*sorted(domains))
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_INFO_KEY, None)
+
+
+def register_invalidation_listeners() -> None:
+    """Registrar (una vez por proceso) los eventos que incrementan las versiones tras cada commit"""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(Session, 'after_flush', _on_after_flush)
+    event.listen(Session, 'do_orm_execute', _on_orm_execute)
+    event.listen(Session, 'after_commit', _on_after_commit)
+    event.listen(Session, 'after_rollback', _on_after_rollback)
+    _listeners_registered = True
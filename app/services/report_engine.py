@@ -0,0 +1,474 @@
+"""
+Report Engine - Sistema POS O'Data
+=================================
+Motor único de consultas para los módulos de reportes (simple_reports,
+reports_final, reports_enhanced y RobustReportsService).
+
+Cada sujeto (ventas, líneas de venta, inventario) declara sus métricas
+(expresiones agregadas), dimensiones (claves de agrupación, con los joins
+que necesitan) y filtros. Un reporte pide métricas y desgloses y el motor
+los compila a una sola sentencia: el resumen y cada desglose son ramas
+GROUP BY de un UNION ALL. Los rankings y las filas de detalle son una
+sentencia más cada uno. Los agregados pasan por report_cache_service con
+invalidación por dominio.
+
+Formato de resultado común:
+    {'summary': {métrica: valor},
+     'breakdowns': {dimensión: [{'key': clave, métrica: valor, ...}]}}
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, case, cast, desc, func, literal, null, or_, select, union_all
+from sqlalchemy.orm import join as orm_join
+
+from app import db
+from app.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_STOCK = 5
+OVERSTOCK_FACTOR = 3
+UNCATEGORIZED = 'Sin categoría'
+DEFAULT_PAYMENT_METHOD = 'Efectivo'
+UNKNOWN_SELLER = 'Desconocido'
+
+TIME_GRAINS = ('day', 'hour', 'week', 'month')
+STOCK_STATUSES = ('out_of_stock', 'low_stock', 'overstock', 'normal')
+
+# Formatos de las claves temporales por dialecto (día 2024-01-31, hora 13:00,
+# semana 2024-W05, mes 2024-01). La semana es ISO en PostgreSQL y MySQL y
+# con inicio en lunes en SQLite.
+TIME_FORMATS = {
+    'postgresql': {'day': 'YYYY-MM-DD', 'hour': 'HH24:00', 'week': 'IYYY-"W"IW', 'month': 'YYYY-MM'},
+    'mysql': {'day': '%Y-%m-%d', 'hour': '%H:00', 'week': '%x-W%v', 'month': '%Y-%m'},
+    'sqlite': {'day': '%Y-%m-%d', 'hour': '%H:00', 'week': '%Y-W%W', 'month': '%Y-%m'},
+}
+
+
+# ===============================================
+# UTILIDADES COMUNES DE LOS MÓDULOS DE REPORTES
+# ===============================================
+
+
+def safe_execute_query(query_func, default_value=None):
+    """Ejecutar consulta de forma segura con manejo de errores"""
+    try:
+        return query_func()
+    except Exception as e:
+        logger.error(f"Error en consulta: {str(e)}")
+        return default_value
+
+
+def format_currency(amount):
+    """Formatear cantidad como moneda"""
+    return float(amount) if amount is not None else 0.0
+
+
+def get_date_range(start_date_str=None, end_date_str=None, default_days=30):
+    """Obtener rango de fechas [inicio, fin) con valores por defecto
+
+    Sin fecha final el rango termina en el minuto en curso (inclusive): la
+    clave de cache del rango por defecto es estable durante ese minuto.
+    """
+    if not end_date_str:
+        end_date = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    else:
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1)
+
+    if not start_date_str:
+        start_date = end_date - timedelta(days=default_days)
+    else:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+
+    return start_date, end_date
+
+
+def percentage(part: float, total: float, digits: int = 1) -> float:
+    """Participación porcentual (0 si el total es 0)"""
+    return round(part / total * 100, digits) if total else 0
+
+
+# ===============================================
+# DEFINICIONES DECLARATIVAS
+# ===============================================
+
+
+class Metric(NamedTuple):
+    """Expresión agregada y tipo del valor (int, money o float)"""
+    expression: Any
+    kind: str = 'money'
+
+
+class Dimension(NamedTuple):
+    """Clave de agrupación
+
+    key(dialecto) devuelve la expresión; joins son los del sujeto que
+    necesita; attributes son columnas descriptivas que acompañan a la clave
+    en los rankings; convert restaura el tipo de la clave en los desgloses
+    (allí viaja como texto para poder unir ramas).
+    """
+    key: Callable[[str], Any]
+    joins: Tuple[str, ...] = ()
+    attributes: Tuple[Tuple[str, Any], ...] = ()
+    convert: Callable[[Any], Any] = lambda value: value
+
+
+class Filter(NamedTuple):
+    """Condición parametrizada: condition(valor) y joins que requiere"""
+    condition: Callable[[Any], Any]
+    joins: Tuple[str, ...] = ()
+
+
+class Subject(NamedTuple):
+    """Tabla de hechos con sus métricas, dimensiones, filtros y campos de detalle"""
+    source: Any
+    joins: Dict[str, Callable[[Any], Any]]
+    base: Callable[[], List[Any]]
+    metrics: Dict[str, Metric]
+    dimensions: Dict[str, Dimension]
+    filters: Dict[str, Filter]
+    fields: Dict[str, Tuple[Any, Tuple[str, ...]]]
+    domains: Tuple[str, ...]
+
+
+def _const(value: Any) -> Any:
+    """Constante renderizada en el SQL: la misma clave en SELECT y GROUP BY"""
+    return literal(value, literal_execute=True)
+
+
+def _time_bucket(column: Any, grain: str) -> Callable[[str], Any]:
+    def build(dialect: str) -> Any:
+        if dialect == 'postgresql':
+            return func.to_char(column, _const(TIME_FORMATS['postgresql'][grain]))
+        if dialect in ('mysql', 'mariadb'):
+            return func.date_format(column, _const(TIME_FORMATS['mysql'][grain]))
+        return func.strftime(_const(TIME_FORMATS['sqlite'][grain]), column)
+    return build
+
+
+def _optional_int(value: Any) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+def _not_cancelled(sale_model: Any) -> Any:
+    return or_(sale_model.status.is_(None), sale_model.status != 'cancelled')
+
+
+def _sales_subject() -> Subject:
+    from app.models.sale import Sale, SaleItem
+    from app.models.user import User
+
+    items_count = select(func.count(SaleItem.id)).where(SaleItem.sale_id == Sale.id).scalar_subquery()
+    dimensions = {
+        'payment_method': Dimension(lambda d: func.coalesce(Sale.payment_method, _const(DEFAULT_PAYMENT_METHOD))),
+        'seller': Dimension(lambda d: func.coalesce(User.username, _const(UNKNOWN_SELLER)), joins=('user',)),
+        'seller_id': Dimension(lambda d: Sale.user_id, convert=_optional_int),
+        'store_id': Dimension(lambda d: User.assigned_store_id, joins=('user',), convert=_optional_int),
+        'status': Dimension(lambda d: Sale.status),
+    }
+    dimensions.update({grain: Dimension(_time_bucket(Sale.created_at, grain)) for grain in TIME_GRAINS})
+
+    return Subject(
+        source=Sale,
+        joins={'user': lambda stmt: stmt.outerjoin(User, User.id == Sale.user_id)},
+        base=lambda: [_not_cancelled(Sale)],
+        metrics={
+            'sales': Metric(func.count(Sale.id), 'int'),
+            'revenue': Metric(func.coalesce(func.sum(Sale.total_amount), 0)),
+            'average_sale': Metric(func.coalesce(func.avg(Sale.total_amount), 0)),
+            'subtotal': Metric(func.coalesce(func.sum(Sale.subtotal), 0)),
+            'tax_amount': Metric(func.coalesce(func.sum(Sale.tax_amount), 0)),
+            'discount_amount': Metric(func.coalesce(func.sum(Sale.discount_amount), 0)),
+        },
+        dimensions=dimensions,
+        filters={
+            'start': Filter(lambda value: Sale.created_at >= value),
+            'end': Filter(lambda value: Sale.created_at < value),
+            'seller_id': Filter(lambda value: Sale.user_id == value),
+            'store_id': Filter(lambda value: User.assigned_store_id == value, joins=('user',)),
+            'payment_method': Filter(lambda value: Sale.payment_method == value),
+        },
+        fields={
+            'id': (Sale.id, ()),
+            'created_at': (Sale.created_at, ()),
+            'total_amount': (Sale.total_amount, ()),
+            'payment_method': (Sale.payment_method, ()),
+            'status': (Sale.status, ()),
+            'seller': (User.username, ('user',)),
+            'items_count': (items_count, ()),
+        },
+        domains=('sales',)
+    )
+
+
+def _sale_lines_subject() -> Subject:
+    from app.models.sale import Sale, SaleItem
+    from app.models.product import Product
+
+    return Subject(
+        source=orm_join(SaleItem, Sale, SaleItem.sale_id == Sale.id).join(Product, Product.id == SaleItem.product_id),
+        joins={},
+        base=lambda: [_not_cancelled(Sale)],
+        metrics={
+            'quantity_sold': Metric(func.coalesce(func.sum(SaleItem.quantity), 0), 'int'),
+            'revenue': Metric(func.coalesce(func.sum(SaleItem.total_price), 0)),
+            'transactions': Metric(func.count(func.distinct(Sale.id)), 'int'),
+            'lines': Metric(func.count(SaleItem.id), 'int'),
+        },
+        dimensions={
+            'product': Dimension(
+                lambda d: Product.id,
+                attributes=(('name', Product.name), ('category', Product.category),
+                            ('price', Product.price), ('stock', Product.stock)),
+                convert=_optional_int
+            ),
+            'category': Dimension(lambda d: func.coalesce(Product.category, _const(UNCATEGORIZED))),
+        },
+        filters={
+            'start': Filter(lambda value: Sale.created_at >= value),
+            'end': Filter(lambda value: Sale.created_at < value),
+            'category': Filter(lambda value: Product.category == value),
+            'active_products': Filter(lambda value: Product.is_active.is_(bool(value))),
+        },
+        fields={},
+        domains=('sales', 'inventory')
+    )
+
+
+def _inventory_subject() -> Subject:
+    from app.models.product import Product
+
+    min_stock = func.coalesce(Product.min_stock, _const(DEFAULT_MIN_STOCK))
+    stock_status = case(
+        (Product.stock <= _const(0), _const('out_of_stock')),
+        (Product.stock <= min_stock, _const('low_stock')),
+        (Product.stock > min_stock * _const(OVERSTOCK_FACTOR), _const('overstock')),
+        else_=_const('normal')
+    )
+
+    def count_if(condition: Any) -> Metric:
+        return Metric(func.coalesce(func.sum(case((condition, 1), else_=0)), 0), 'int')
+
+    return Subject(
+        source=Product,
+        joins={},
+        base=lambda: [Product.is_active.is_(True)],
+        metrics={
+            'product_count': Metric(func.count(Product.id), 'int'),
+            'stock_units': Metric(func.coalesce(func.sum(Product.stock), 0), 'int'),
+            'inventory_value': Metric(func.coalesce(func.sum(Product.price * Product.stock), 0)),
+            'low_stock': count_if(Product.stock <= min_stock),  # incluye los agotados
+            'low_stock_in_stock': count_if(and_(Product.stock > 0, Product.stock <= min_stock)),
+            'out_of_stock': count_if(Product.stock <= 0),
+            'overstock': count_if(and_(Product.stock > 0, Product.stock > min_stock * OVERSTOCK_FACTOR)),
+        },
+        dimensions={
+            'category': Dimension(lambda d: func.coalesce(Product.category, _const(UNCATEGORIZED))),
+            'stock_status': Dimension(lambda d: stock_status),
+        },
+        filters={
+            'category': Filter(lambda value: Product.category == value),
+            'stock_status': Filter(lambda values: stock_status.in_(list(values))),
+        },
+        fields={
+            'id': (Product.id, ()),
+            'name': (Product.name, ()),
+            'sku': (Product.sku, ()),
+            'category': (Product.category, ()),
+            'price': (Product.price, ()),
+            'stock': (Product.stock, ()),
+            'min_stock': (min_stock, ()),
+            'stock_status': (stock_status, ()),
+        },
+        domains=('inventory',)
+    )
+
+
+SUBJECT_BUILDERS = {
+    'sales': _sales_subject,
+    'sale_lines': _sale_lines_subject,
+    'inventory': _inventory_subject,
+}
+
+
+# ===============================================
+# MOTOR
+# ===============================================
+
+
+class ReportEngine:
+    """Compila reportes declarativos a sentencias agregadas únicas"""
+
+    def __init__(self):
+        self._subjects: Dict[str, Subject] = {}
+
+    def subject(self, name: str) -> Subject:
+        """Definición del sujeto (se construye al primer uso, con los modelos ya cargados)"""
+        if name not in SUBJECT_BUILDERS:
+            raise ValidationError(f"Unknown report subject '{name}'", field='subject', value=name)
+        if name not in self._subjects:
+            self._subjects[name] = SUBJECT_BUILDERS[name]()
+        return self._subjects[name]
+
+    @staticmethod
+    def _dialect() -> str:
+        return db.session.get_bind().dialect.name
+
+    @staticmethod
+    def _pick(catalog: Dict[str, Any], names: Iterable[str], kind: str) -> List[str]:
+        names = list(names)
+        unknown = [name for name in names if name not in catalog]
+        if unknown:
+            raise ValidationError(f"Unknown report {kind}: {', '.join(unknown)}", field=kind, value=unknown)
+        return names
+
+    def _where(self, stmt: Any, subject: Subject, filters: Optional[Dict[str, Any]],
+               joins: Iterable[str] = ()) -> Any:
+        """Aplicar joins requeridos, condiciones base y filtros (los None se ignoran)"""
+        active = {name: value for name, value in (filters or {}).items() if value is not None}
+        self._pick(subject.filters, active, 'filter')
+
+        needed = list(dict.fromkeys(list(joins) + [join for name in active for join in subject.filters[name].joins]))
+        for join in needed:
+            stmt = subject.joins[join](stmt)
+
+        conditions = subject.base() + [subject.filters[name].condition(value) for name, value in active.items()]
+        return stmt.where(*conditions) if conditions else stmt
+
+    @staticmethod
+    def _value(metric: Metric, value: Any) -> Any:
+        if metric.kind == 'int':
+            return int(value or 0)
+        return float(value or 0)
+
+    def _cached(self, kind: str, subject_name: str, params: Dict[str, Any], compute: Callable[[], Any],
+                use_cache: bool) -> Any:
+        if not use_cache:
+            return compute()
+        from app.services.report_cache_service import report_cache_service
+        return report_cache_service.get_or_compute(
+            f'report_engine.{subject_name}.{kind}', params, compute, domains=self.subject(subject_name).domains
+        )
+
+    # ------------------------------------------------------------------
+    # Resumen y desgloses
+    # ------------------------------------------------------------------
+
+    def aggregate(self, subject_name: str, metrics: Sequence[str], breakdowns: Sequence[str] = (),
+                  filters: Optional[Dict[str, Any]] = None, use_cache: bool = True) -> Dict[str, Any]:
+        """Resumen y desgloses de las métricas en una sola sentencia
+
+        Cada desglose es una rama GROUP BY del UNION ALL (la del resumen no
+        agrupa); la clave viaja como texto y se restaura con la dimensión.
+        Los desgloses se devuelven ordenados por clave.
+        """
+        subject = self.subject(subject_name)
+        metrics = self._pick(subject.metrics, metrics, 'metric')
+        breakdowns = self._pick(subject.dimensions, breakdowns, 'dimension')
+
+        def compute():
+            dialect = self._dialect()
+            branches = []
+            for name in [None] + breakdowns:
+                dimension = subject.dimensions[name] if name else None
+                key = dimension.key(dialect) if dimension else None
+                stmt = select(
+                    _const(name or '').label('breakdown'),
+                    (cast(key, String) if key is not None else cast(null(), String)).label('key'),
+                    *[subject.metrics[metric].expression.label(metric) for metric in metrics]
+                ).select_from(subject.source)
+                stmt = self._where(stmt, subject, filters, dimension.joins if dimension else ())
+                branches.append(stmt.group_by(key) if key is not None else stmt)
+
+            rows = db.session.execute(union_all(*branches) if len(branches) > 1 else branches[0]).all()
+
+            result = {'summary': {}, 'breakdowns': {name: [] for name in breakdowns}}
+            for row in rows:
+                values = {metric: self._value(subject.metrics[metric], getattr(row, metric)) for metric in metrics}
+                if not row.breakdown:
+                    result['summary'] = values
+                else:
+                    key = subject.dimensions[row.breakdown].convert(row.key)
+                    result['breakdowns'][row.breakdown].append(dict(key=key, **values))
+
+            for name in breakdowns:
+                result['breakdowns'][name].sort(key=lambda item: (item['key'] is None, item['key']))
+            return result
+
+        params = {'metrics': metrics, 'breakdowns': breakdowns, 'filters': filters}
+        return self._cached('aggregate', subject_name, params, compute, use_cache)
+
+    # ------------------------------------------------------------------
+    # Rankings
+    # ------------------------------------------------------------------
+
+    def ranking(self, subject_name: str, dimension: str, metrics: Sequence[str], order_by: str,
+                filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = 10,
+                use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Primeros `limit` valores de la dimensión por la métrica order_by (descendente)
+
+        La clave conserva su tipo y se devuelven los atributos de la dimensión.
+        """
+        subject = self.subject(subject_name)
+        metrics = self._pick(subject.metrics, metrics, 'metric')
+        self._pick(subject.dimensions, [dimension], 'dimension')
+        self._pick(subject.metrics, [order_by], 'metric')
+        definition = subject.dimensions[dimension]
+
+        def compute():
+            key = definition.key(self._dialect())
+            attributes = [column.label(name) for name, column in definition.attributes]
+            order_expression = subject.metrics[order_by].expression
+            stmt = select(
+                key.label('key'), *attributes,
+                *[subject.metrics[metric].expression.label(metric) for metric in metrics]
+            ).select_from(subject.source)
+            stmt = self._where(stmt, subject, filters, definition.joins)
+            stmt = stmt.group_by(key, *[column for _, column in definition.attributes]).order_by(desc(order_expression))
+            if limit:
+                stmt = stmt.limit(limit)
+
+            ranked = []
+            for row in db.session.execute(stmt).all():
+                item = {'key': row.key}
+                for name, _ in definition.attributes:
+                    value = getattr(row, name)
+                    item[name] = float(value) if name == 'price' and value is not None else value
+                item.update({metric: self._value(subject.metrics[metric], getattr(row, metric)) for metric in metrics})
+                ranked.append(item)
+            return ranked
+
+        params = {'dimension': dimension, 'metrics': metrics, 'order_by': order_by, 'filters': filters, 'limit': limit}
+        return self._cached('ranking', subject_name, params, compute, use_cache)
+
+    # ------------------------------------------------------------------
+    # Filas de detalle
+    # ------------------------------------------------------------------
+
+    def rows(self, subject_name: str, fields: Sequence[str], filters: Optional[Dict[str, Any]] = None,
+             order_by: Sequence[Tuple[str, bool]] = (), limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Filas de detalle con los campos pedidos (una sentencia; sin cache)
+
+        order_by: [(campo, descendente)].
+        """
+        subject = self.subject(subject_name)
+        fields = self._pick(subject.fields, fields, 'field')
+        self._pick(subject.fields, [name for name, _ in order_by], 'field')
+
+        joins = [join for name in fields for join in subject.fields[name][1]]
+        stmt = select(*[subject.fields[name][0].label(name) for name in fields]).select_from(subject.source)
+        stmt = self._where(stmt, subject, filters, joins)
+        for name, descending in order_by:
+            column = subject.fields[name][0]
+            stmt = stmt.order_by(desc(column) if descending else column)
+        if limit:
+            stmt = stmt.limit(limit)
+
+        return [dict(row._mapping) for row in db.session.execute(stmt).all()]
+
+
+# Instancia global del motor
+report_engine = ReportEngine()
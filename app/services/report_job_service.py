@@ -0,0 +1,535 @@
+"""
+Report Job Service - Sistema POS O'Data
+======================================
+Generación de reportes pesados fuera del hilo de la petición: cada trabajo
+se registra en report_jobs y se ejecuta en un pool acotado de procesos
+(spawn, con prioridad de CPU reducida y su propia conexión a la base), de
+modo que los workers HTTP nunca esperan a un reporte.
+
+- Progreso: el proceso del trabajo actualiza progress/message por una
+  conexión propia (independiente de la sesión que lee los datos).
+- Cancelación cooperativa: cancel_requested se consulta en cada reporte de
+  progreso; un trabajo aún en cola se cancela sin ejecutarse.
+- Retención: el artefacto queda en REPORT_JOB_DIR hasta expires_at; los
+  vencidos se eliminan al encolar nuevos trabajos o con purge_expired().
+- Huérfanos: un reinicio pierde el pool del proceso; los trabajos que se
+  quedan en cola o en ejecución más de REPORT_JOB_STALE_MINUTES se marcan
+  como fallidos (al iniciar la app y al encolar) para que no ocupen cupo.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, update
+
+from app import db
+from app.exceptions import BusinessLogicError, NotFoundError, ValidationError
+from app.models.report_job import ReportJob
+from app.utils.streaming_export import XLSX_MIMETYPE
+
+logger = logging.getLogger(__name__)
+
+JSON_MIMETYPE = 'application/json'
+CSV_MIMETYPE = 'text/csv'  # send_file agrega charset=utf-8
+PDF_MIMETYPE = 'application/pdf'
+
+
+class ReportJobCancelled(Exception):
+    """El trabajo fue cancelado mientras se ejecutaba"""
+
+
+class JobProgress:
+    """Reporte de progreso de un trabajo; lanza ReportJobCancelled si se pidió cancelarlo
+
+    Las escrituras se limitan a una cada interval segundos (salvo cambios de
+    mensaje), así que la latencia de cancelación es como máximo ese intervalo
+    más lo que tarde el siguiente punto de control.
+    """
+
+    def __init__(self, job_id: str, interval: float = 1.0):
+        self.job_id = job_id
+        self.interval = interval
+        self._last_write = 0.0
+        self._message: Optional[str] = None
+
+    def __call__(self, percent: float, message: Optional[str] = None) -> None:
+        now = time.monotonic()
+        if (message is None or message == self._message) and now - self._last_write < self.interval:
+            return
+        self._last_write = now
+        if message is not None:
+            self._message = message
+
+        table = ReportJob.__table__
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(table).where(table.c.id == self.job_id)
+                    .values(progress=max(0, min(int(percent), 99)), message=self._message)
+                )
+                cancelled = connection.execute(
+                    select(table.c.cancel_requested).where(table.c.id == self.job_id)
+                ).scalar()
+        except Exception as e:
+            logger.debug(f"Report job {self.job_id} progress update failed: {e}")
+            return
+
+        if cancelled:
+            raise ReportJobCancelled()
+
+    def track(self, rows: Iterable[Any], total: int, start: float, end: float,
+              message: Optional[str] = None) -> Iterator[Any]:
+        """Iterar filas reportando el avance entre start y end (porcentajes)"""
+        self(start, message)
+        step = max(total // 100, 200)
+        for done, row in enumerate(rows, 1):
+            if done % step == 0 and total:
+                self(start + (end - start) * min(done / total, 1.0))
+            yield row
+        self(end)
+
+
+# ----------------------------------------------------------------------
+# Tipos de reporte: validación (en el proceso web) y ejecución (en el pool)
+# ----------------------------------------------------------------------
+
+def _parse_day(params: Dict[str, Any], field: str) -> Optional[str]:
+    value = params.get(field)
+    if value in (None, ''):
+        return None
+    try:
+        datetime.strptime(str(value), '%Y-%m-%d')
+    except ValueError:
+        raise ValidationError(f"{field} debe tener formato YYYY-MM-DD", field=field, value=value)
+    return str(value)
+
+
+def _validate_consolidated_sales(params: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.sales_columnar_engine import GROUP_BY_MODES
+
+    start_date = _parse_day(params, 'start_date')
+    end_date = _parse_day(params, 'end_date')
+    if not start_date or not end_date:
+        raise ValidationError("start_date y end_date son requeridos", field='start_date')
+    if start_date > end_date:
+        raise ValidationError("start_date debe ser menor o igual que end_date", field='start_date')
+
+    group_by = params.get('group_by', 'store')
+    if group_by not in GROUP_BY_MODES:
+        raise ValidationError(f"group_by debe ser uno de: {', '.join(GROUP_BY_MODES)}", field='group_by',
+                              value=group_by)
+
+    format_type = params.get('format', 'json')
+    if format_type not in ('json', 'csv', 'excel'):
+        raise ValidationError("format debe ser uno de: json, csv, excel", field='format', value=format_type)
+
+    store_ids = params.get('store_ids') or None
+    if store_ids is not None:
+        try:
+            store_ids = sorted({int(store_id) for store_id in store_ids})
+        except (TypeError, ValueError):
+            raise ValidationError("store_ids debe ser una lista de enteros", field='store_ids', value=store_ids)
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'store_ids': store_ids,
+        'group_by': group_by,
+        'include_details': bool(params.get('include_details', False)),
+        'format': format_type
+    }
+
+
+def _run_consolidated_sales(params: Dict[str, Any], progress: JobProgress, path: str) -> Tuple[str, str]:
+    from app.services.consolidated_reporting_service import ConsolidatedReportingService
+
+    service = ConsolidatedReportingService()
+    start_date = datetime.strptime(params['start_date'], '%Y-%m-%d')
+    end_date = datetime.strptime(params['end_date'], '%Y-%m-%d') + timedelta(days=1, microseconds=-1)
+
+    progress(5, 'Calculando reporte de ventas')
+    report = service._build_sales_report(
+        start_date, end_date, params.get('store_ids'), params['group_by'], params['include_details']
+    )
+
+    progress(70, 'Escribiendo archivo')
+    base_name = f"ventas_consolidado_{params['start_date'].replace('-', '')}_{params['end_date'].replace('-', '')}"
+    format_type = params['format']
+    if format_type == 'json':
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(report, output, default=str)
+        return f'{base_name}.json', JSON_MIMETYPE
+
+    if format_type == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            for chunk in service.export_report(report, 'csv'):
+                output.write(chunk)
+        return f'{base_name}.csv', CSV_MIMETYPE
+
+    with service.export_report(report, 'excel') as workbook_file, open(path, 'wb') as output:
+        shutil.copyfileobj(workbook_file, output)
+    return f'{base_name}.xlsx', XLSX_MIMETYPE
+
+
+def _validate_sales_excel(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {'start_date': _parse_day(params, 'start_date'), 'end_date': _parse_day(params, 'end_date')}
+
+
+def _run_sales_excel(params: Dict[str, Any], progress: JobProgress, path: str) -> Tuple[str, str]:
+    from app.api.v1.reports_enhanced import build_sales_workbook, get_date_range
+
+    start_date, end_date = get_date_range(params.get('start_date'), params.get('end_date'))
+    progress(5, 'Calculando resumen de ventas')
+    workbook, filename = build_sales_workbook(
+        start_date, end_date,
+        track=lambda rows, total: progress.track(rows, total, 10, 90, 'Escribiendo detalle de ventas')
+    )
+    progress(95, 'Guardando archivo')
+    workbook.save(path)
+    return filename, XLSX_MIMETYPE
+
+
+def _validate_inventory_excel(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {'category': params.get('category') or None}
+
+
+def _run_inventory_excel(params: Dict[str, Any], progress: JobProgress, path: str) -> Tuple[str, str]:
+    from app.api.v1.reports_enhanced import build_inventory_workbook
+
+    progress(5, 'Calculando resumen de inventario')
+    workbook, filename = build_inventory_workbook(
+        params.get('category'),
+        track=lambda rows, total: progress.track(rows, total, 10, 90, 'Escribiendo detalle de productos')
+    )
+    progress(95, 'Guardando archivo')
+    workbook.save(path)
+    return filename, XLSX_MIMETYPE
+
+
+def _validate_dashboard_pdf(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {'type': str(params.get('type') or 'dashboard')}
+
+
+def _run_dashboard_pdf(params: Dict[str, Any], progress: JobProgress, path: str) -> Tuple[str, str]:
+    from app.api.v1.reports_enhanced import build_dashboard_pdf
+
+    progress(10, 'Calculando dashboard')
+    buffer, filename = build_dashboard_pdf(params['type'])
+    if buffer is None:
+        raise RuntimeError('No se pudo generar el PDF (reportlab no disponible o error de renderizado)')
+
+    progress(90, 'Guardando archivo')
+    with open(path, 'wb') as output:
+        shutil.copyfileobj(buffer, output)
+    return filename, PDF_MIMETYPE
+
+
+# tipo -> (validar parámetros, ejecutar); ejecutar escribe en la ruta dada y
+# devuelve (nombre de descarga, content type)
+REPORT_JOB_TYPES: Dict[str, Tuple[Callable[[Dict[str, Any]], Dict[str, Any]],
+                                  Callable[[Dict[str, Any], JobProgress, str], Tuple[str, str]]]] = {
+    'consolidated_sales': (_validate_consolidated_sales, _run_consolidated_sales),
+    'sales_excel': (_validate_sales_excel, _run_sales_excel),
+    'inventory_excel': (_validate_inventory_excel, _run_inventory_excel),
+    'dashboard_pdf': (_validate_dashboard_pdf, _run_dashboard_pdf),
+}
+
+
+# ----------------------------------------------------------------------
+# Proceso del pool
+# ----------------------------------------------------------------------
+
+_worker_app = None
+
+
+def _init_worker(database_uri: str, nice: int) -> None:
+    """Inicializar un proceso del pool: app mínima (sin blueprints ni hilos de fondo)"""
+    global _worker_app
+
+    if nice and hasattr(os, 'nice'):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+
+    from flask import Flask
+    from app import configure_app
+
+    # Registrar todos los modelos (app.models y role): sin blueprints nadie
+    # importa app.models.role y User no puede configurar su relación con UserRole
+    from app.models import role  # noqa: F401
+
+    app = Flask('app')
+    configure_app(app, 'production')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    if not database_uri.startswith('sqlite'):
+        # Una conexión por proceso: los reportes no compiten por el pool de la web
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 1, 'max_overflow': 1, 'pool_pre_ping': True}
+    db.init_app(app)
+    _worker_app = app
+
+
+def _execute_job(job_id: str) -> str:
+    """Punto de entrada en el proceso del pool"""
+    with _worker_app.app_context():
+        try:
+            return report_job_service.execute(job_id)
+        finally:
+            db.session.remove()
+
+
+class ReportJobService:
+    """Encolado, ejecución y consulta de trabajos de reporte"""
+
+    def __init__(self):
+        self.workers = int(os.getenv('REPORT_JOB_WORKERS', str(max(1, (os.cpu_count() or 2) // 4))))
+        self.max_pending = int(os.getenv('REPORT_JOB_MAX_PENDING', '20'))
+        self.retention = timedelta(hours=float(os.getenv('REPORT_JOB_RETENTION_HOURS', '24')))
+        self.nice = int(os.getenv('REPORT_JOB_NICE', '10'))
+        self.stale_after = timedelta(minutes=float(os.getenv('REPORT_JOB_STALE_MINUTES', '120')))
+        self.artifact_dir = os.path.abspath(os.getenv('REPORT_JOB_DIR', os.path.join('instance', 'report_jobs')))
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lado web
+    # ------------------------------------------------------------------
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Pool creado al primer trabajo (spawn: no hereda hilos ni conexiones del proceso web)"""
+        with self._lock:
+            if self._executor is None:
+                from flask import current_app
+
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(current_app.config['SQLALCHEMY_DATABASE_URI'], self.nice)
+                )
+            return self._executor
+
+    def submit(self, report_type: str, params: Optional[Dict[str, Any]], created_by: Optional[int] = None,
+               schedule_id: Optional[int] = None) -> ReportJob:
+        """Validar, registrar y encolar un trabajo"""
+        if report_type not in REPORT_JOB_TYPES:
+            raise ValidationError(f"report_type debe ser uno de: {', '.join(REPORT_JOB_TYPES)}",
+                                  field='report_type', value=report_type)
+        validate, _ = REPORT_JOB_TYPES[report_type]
+        params = validate(params or {})
+
+        self.purge_expired()
+        self.fail_orphaned()
+
+        pending = self.pending_count()
+        if pending >= self.max_pending:
+            raise BusinessLogicError(
+                f"Hay {pending} reportes en cola; intente de nuevo más tarde", operation='report_job_submit'
+            )
+
+        job = ReportJob(report_type=report_type, params=params, created_by=created_by, schedule_id=schedule_id,
+                        message='En cola')
+        db.session.add(job)
+        db.session.commit()
+
+        from flask import current_app
+
+        app = current_app._get_current_object()
+        future = self._get_executor().submit(_execute_job, job.id)
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda done, job_id=job.id: self._on_done(app, job_id, done))
+
+        logger.info(f"Report job queued: {job.id} ({report_type})")
+        return job
+
+    def _on_done(self, app: Any, job_id: str, future: Future) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+        if future.cancelled():
+            # Cancelado en el pool sin ejecutarse (cancel() o shutdown con trabajos en cola)
+            status, message, error = 'cancelled', 'Cancelado antes de iniciar', None
+        elif future.exception() is not None:
+            # El proceso del pool murió (p. ej. sin memoria): el trabajo no pudo registrar su fin
+            logger.error(f"Report job {job_id} crashed in pool: {future.exception()}")
+            status, message, error = 'failed', 'Error', str(future.exception())
+        else:
+            return
+
+        with app.app_context():
+            try:
+                job = db.session.get(ReportJob, job_id)
+                if job is not None and not job.is_finished:
+                    self._finish(job, status, message=message, error=error)
+                    db.session.commit()
+            except Exception as e:
+                logger.error(f"Could not mark report job {job_id} as {status}: {e}")
+            finally:
+                db.session.remove()
+
+    def get(self, job_id: str) -> ReportJob:
+        """Obtener un trabajo o lanzar NotFoundError"""
+        job = db.session.get(ReportJob, job_id)
+        if job is None:
+            raise NotFoundError('ReportJob', job_id)
+        return job
+
+    def pending_count(self) -> int:
+        """Trabajos en cola o en ejecución (los que cuentan para max_pending)"""
+        return ReportJob.query.filter(ReportJob.status.in_(('queued', 'running'))).count()
+
+    def cancel(self, job_id: str) -> ReportJob:
+        """Solicitar la cancelación; si aún no empezó en este proceso se cancela de inmediato"""
+        job = self.get(job_id)
+        if job.is_finished:
+            return job
+
+        job.cancel_requested = True
+        with self._lock:
+            future = self._futures.get(job_id)
+        if job.status == 'queued' and future is not None and future.cancel():
+            self._finish(job, 'cancelled', message='Cancelado antes de iniciar')
+        db.session.commit()
+        return job
+
+    def artifact(self, job_id: str) -> ReportJob:
+        """Trabajo completado cuyo artefacto sigue en disco"""
+        job = self.get(job_id)
+        if job.status != 'completed':
+            raise BusinessLogicError(f"El reporte no está disponible (estado: {job.status})",
+                                     operation='report_job_download')
+        if not job.artifact_path or not os.path.exists(job.artifact_path):
+            raise BusinessLogicError("El archivo del reporte ya no está disponible", operation='report_job_download')
+        return job
+
+    def purge_expired(self) -> int:
+        """Eliminar artefactos vencidos y marcar sus trabajos como expirados"""
+        now = datetime.utcnow()
+        expired = ReportJob.query.filter(
+            ReportJob.status == 'completed', ReportJob.expires_at < now
+        ).limit(200).all()
+        for job in expired:
+            self._remove_artifact(job.artifact_path)
+            job.status = 'expired'
+            job.artifact_path = None
+        if expired:
+            db.session.commit()
+        return len(expired)
+
+    def fail_orphaned(self) -> int:
+        """Marcar como fallidos los trabajos en cola o en ejecución desde hace más de stale_after
+
+        Son trabajos de un proceso que se detuvo (su pool y sus futures se
+        perdieron): nunca terminarían y seguirían contando para max_pending.
+        Los que este proceso sigue ejecutando no se tocan.
+        """
+        cutoff = datetime.utcnow() - self.stale_after
+        candidates = ReportJob.query.filter(or_(
+            and_(ReportJob.status == 'queued', ReportJob.created_at < cutoff),
+            and_(ReportJob.status == 'running', ReportJob.started_at < cutoff)
+        )).limit(200).all()
+
+        with self._lock:
+            tracked = set(self._futures)
+        orphaned = [job for job in candidates if job.id not in tracked]
+        for job in orphaned:
+            self._finish(job, 'failed', message='Error',
+                         error='Trabajo interrumpido: el proceso que lo ejecutaba se detuvo')
+        if orphaned:
+            db.session.commit()
+            logger.warning(f"Marked {len(orphaned)} orphaned report jobs as failed")
+        return len(orphaned)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Detener el pool (los trabajos en cola se cancelan y se marcan como cancelados)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Lado pool
+    # ------------------------------------------------------------------
+
+    def execute(self, job_id: str) -> str:
+        """Ejecutar un trabajo encolado y registrar su resultado; devuelve el estado final"""
+        job = db.session.get(ReportJob, job_id)
+        if job is None:
+            return 'missing'
+        if job.status != 'queued':
+            return job.status
+        if job.cancel_requested:
+            self._finish(job, 'cancelled', message='Cancelado antes de iniciar')
+            db.session.commit()
+            return job.status
+
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        job.message = 'Iniciando'
+        db.session.commit()
+
+        _, run = REPORT_JOB_TYPES[job.report_type]
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        # Se escribe en .part y se renombra al terminar: nunca se sirve un archivo a medias
+        partial_path = os.path.join(self.artifact_dir, f'{job.id}.part')
+        params = dict(job.params)
+
+        try:
+            artifact_name, content_type = run(params, JobProgress(job.id), partial_path)
+        except ReportJobCancelled:
+            db.session.rollback()
+            self._remove_artifact(partial_path)
+            job = self.get(job_id)
+            self._finish(job, 'cancelled', message='Cancelado')
+        except Exception as e:
+            logger.error(f"Report job {job_id} failed: {e}")
+            db.session.rollback()
+            self._remove_artifact(partial_path)
+            job = self.get(job_id)
+            self._finish(job, 'failed', message='Error', error=str(e))
+        else:
+            path = os.path.join(self.artifact_dir, job_id + os.path.splitext(artifact_name)[1])
+            os.replace(partial_path, path)
+            job = self.get(job_id)
+            job.artifact_path = path
+            job.artifact_name = artifact_name
+            job.content_type = content_type
+            job.artifact_size = os.path.getsize(path)
+            job.expires_at = datetime.utcnow() + self.retention
+            self._finish(job, 'completed', message='Completado', progress=100)
+
+        db.session.commit()
+        return job.status
+
+    @staticmethod
+    def _finish(job: ReportJob, status: str, message: str, error: Optional[str] = None,
+                progress: Optional[int] = None) -> None:
+        job.status = status
+        job.message = message
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        if progress is not None:
+            job.progress = progress
+
+    @staticmethod
+    def _remove_artifact(path: Optional[str]) -> None:
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove report artifact {path}: {e}")
+
+
+# Instancia global del servicio
+report_job_service = ReportJobService()
@@ -0,0 +1,485 @@
+"""
+Report Scheduler Service - Sistema POS O'Data
+============================================
+Planificador persistente de reportes: cada programación (report_schedules)
+tiene una expresión cron en hora local del servidor. Un thread por proceso
+sondea las programaciones vencidas, las reclama con UPDATE condicional (una
+sola instancia ejecuta cada disparo) y:
+
+- Reportes con archivo: encola un ReportJob por disparo (pool de procesos)
+  con el período relativo resuelto a la fecha del disparo; al completarse,
+  el envío a cada destinatario se registra en la bandeja de salida (email
+  con reintentos).
+- cache_warmup: precalcula los dashboards registrados en el cache de
+  reportes (p. ej. antes de la apertura), de modo que las consultas de la
+  mañana se sirven sin recalcular. Requiere el nivel Redis del cache: sin
+  él solo se precalcula el LRU del proceso que ejecuta el planificador y
+  los demás workers calculan en su primera consulta.
+- ar_aging_snapshot: guarda la foto diaria de antigüedad de cartera para
+  los gráficos de tendencia (programarla al cierre del día).
+- ai_recommendations: recalcula la tabla de recomendaciones por contenido
+  (params.top_k opcional; programarla fuera de horario).
+- Recuperación tras caída: los disparos perdidos se ejecutan al volver
+  (hasta REPORT_SCHEDULER_MAX_CATCH_UP por programación) si catch_up está
+  activo; si no, se registran como omitidos. Solo se encolan los que caben
+  en la cola de trabajos (REPORT_JOB_MAX_PENDING); los demás, y los que
+  fallan al encolarse, quedan en next_run_at para los próximos sondeos.
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import update, or_
+
+from app import db
+from app.exceptions import BusinessLogicError, NotFoundError, ValidationError
+from app.models.report_job import ReportJob
+from app.models.report_schedule import ReportSchedule
+from app.services.outbox_service import outbox_service
+from app.services.report_job_service import REPORT_JOB_TYPES, report_job_service
+from app.utils.cron import CronExpression
+
+logger = logging.getLogger(__name__)
+
+CACHE_WARMUP = 'cache_warmup'
+AR_AGING_SNAPSHOT = 'ar_aging_snapshot'
+AI_RECOMMENDATIONS = 'ai_recommendations'
+# Tareas que se ejecutan en el propio planificador (solo el disparo más reciente)
+INLINE_TYPES = (CACHE_WARMUP, AR_AGING_SNAPSHOT, AI_RECOMMENDATIONS)
+FREQUENCIES = ('hourly', 'daily', 'weekly', 'monthly')
+PERIODS = ('previous_day', 'previous_week', 'previous_month', 'last_7_days', 'last_30_days', 'month_to_date')
+
+
+def build_cron(schedule_config: Dict[str, Any]) -> str:
+    """Expresión cron a partir de la configuración: 'cron' explícito o frequency + time
+
+    frequency: hourly (usa solo los minutos de time), daily, weekly
+    (day_of_week 0=domingo, por defecto lunes) o monthly (day_of_month,
+    por defecto 1). time es HH:MM en hora local; por defecto fuera de horario.
+    """
+    expression = schedule_config.get('cron')
+    if not expression:
+        frequency = schedule_config.get('frequency', 'daily')
+        time_text = str(schedule_config.get('time') or os.getenv('REPORT_SCHEDULER_DEFAULT_TIME', '05:00'))
+        try:
+            hour, minute = (int(part) for part in time_text.split(':', 1))
+        except ValueError:
+            raise ValidationError("time debe tener formato HH:MM", field='time', value=time_text)
+
+        if frequency == 'hourly':
+            expression = f"{minute} * * * *"
+        elif frequency == 'daily':
+            expression = f"{minute} {hour} * * *"
+        elif frequency == 'weekly':
+            expression = f"{minute} {hour} * * {int(schedule_config.get('day_of_week', 1))}"
+        elif frequency == 'monthly':
+            expression = f"{minute} {hour} {int(schedule_config.get('day_of_month', 1))} * *"
+        else:
+            raise ValidationError(f"frequency debe ser uno de: {', '.join(FREQUENCIES)}", field='frequency',
+                                  value=frequency)
+
+    CronExpression(expression)  # validar
+    return expression
+
+
+def resolve_period(params: Dict[str, Any], run_at: datetime) -> Dict[str, Any]:
+    """Reemplazar 'period' (relativo al disparo) por start_date/end_date (YYYY-MM-DD, inclusivos)"""
+    period = params.get('period')
+    if not period:
+        return dict(params)
+    if period not in PERIODS:
+        raise ValidationError(f"period debe ser uno de: {', '.join(PERIODS)}", field='period', value=period)
+
+    today = run_at.date()
+    if period == 'previous_day':
+        start = end = today - timedelta(days=1)
+    elif period == 'previous_week':
+        start = today - timedelta(days=today.weekday() + 7)
+        end = start + timedelta(days=6)
+    elif period == 'previous_month':
+        end = today.replace(day=1) - timedelta(days=1)
+        start = end.replace(day=1)
+    elif period == 'last_7_days':
+        start, end = today - timedelta(days=7), today - timedelta(days=1)
+    elif period == 'last_30_days':
+        start, end = today - timedelta(days=30), today - timedelta(days=1)
+    else:
+        start, end = today.replace(day=1), today
+
+    resolved = {key: value for key, value in params.items() if key != 'period'}
+    resolved.update(start_date=start.isoformat(), end_date=end.isoformat())
+    return resolved
+
+
+class ReportSchedulerService:
+    """Alta de programaciones y ejecución de los disparos vencidos"""
+
+    def __init__(self):
+        self.batch_size = int(os.getenv('REPORT_SCHEDULER_BATCH_SIZE', '20'))
+        self.grace = timedelta(seconds=int(os.getenv('REPORT_SCHEDULER_GRACE_SECONDS', '300')))
+        self.max_catch_up = int(os.getenv('REPORT_SCHEDULER_MAX_CATCH_UP', '7'))
+        self.lock_timeout = timedelta(seconds=int(os.getenv('REPORT_SCHEDULER_LOCK_TIMEOUT_SECONDS', '600')))
+        self.warm_fresh_seconds = float(os.getenv('REPORT_SCHEDULER_WARM_SECONDS', str(6 * 3600)))
+
+    # ------------------------------------------------------------------
+    # Administración de programaciones
+    # ------------------------------------------------------------------
+
+    def create_schedule(self, name: str, report_type: str, schedule_config: Dict[str, Any],
+                        params: Optional[Dict[str, Any]] = None, recipients: Optional[List[str]] = None,
+                        created_by: Optional[int] = None, catch_up: bool = True) -> ReportSchedule:
+        """Validar y registrar una programación; la primera ejecución es la próxima ocurrencia"""
+        if report_type not in INLINE_TYPES and report_type not in REPORT_JOB_TYPES:
+            raise ValidationError(
+                f"report_type debe ser uno de: {', '.join([*INLINE_TYPES, *REPORT_JOB_TYPES])}",
+                field='report_type', value=report_type
+            )
+
+        params = dict(params or {})
+        now = datetime.now()
+        if report_type == CACHE_WARMUP:
+            from app.services.report_cache_service import report_cache_service
+
+            unknown = set(params.get('reports') or ()) - set(report_cache_service.registered_reports())
+            if unknown:
+                raise ValidationError(f"Reportes no registrados: {', '.join(sorted(unknown))}", field='reports')
+        elif report_type == AR_AGING_SNAPSHOT:
+            params = {}
+        elif report_type == AI_RECOMMENDATIONS:
+            from app.services.ai_recommendation_service import MAX_TOP_K
+
+            params = {'top_k': params['top_k']} if params.get('top_k') is not None else {}
+            if params and not (isinstance(params['top_k'], int) and 1 <= params['top_k'] <= MAX_TOP_K):
+                raise ValidationError(f"top_k debe estar entre 1 y {MAX_TOP_K}", field='top_k',
+                                      value=params['top_k'])
+        else:
+            # Validar los parámetros tal como quedarían en un disparo
+            validate, _ = REPORT_JOB_TYPES[report_type]
+            validate(resolve_period(params, now))
+
+        recipients = [str(email).strip() for email in (recipients or []) if str(email).strip()]
+        invalid = [email for email in recipients if '@' not in email]
+        if invalid:
+            raise ValidationError(f"Destinatarios inválidos: {', '.join(invalid)}", field='recipients')
+
+        cron = build_cron(schedule_config)
+        schedule = ReportSchedule(
+            name=name or report_type,
+            report_type=report_type,
+            cron=cron,
+            next_run_at=CronExpression(cron).next_after(now),
+            params=params,
+            recipients=recipients,
+            created_by=created_by
+        )
+        schedule.catch_up = catch_up
+        db.session.add(schedule)
+        db.session.commit()
+
+        logger.info(f"Report schedule created: {schedule.id} {schedule.name} ({cron})")
+        return schedule
+
+    def get_schedule(self, schedule_id: int) -> ReportSchedule:
+        """Obtener una programación o lanzar NotFoundError"""
+        schedule = db.session.get(ReportSchedule, schedule_id)
+        if schedule is None:
+            raise NotFoundError('ReportSchedule', schedule_id)
+        return schedule
+
+    def list_schedules(self, include_inactive: bool = False) -> List[ReportSchedule]:
+        """Programaciones ordenadas por próxima ejecución"""
+        query = ReportSchedule.query
+        if not include_inactive:
+            query = query.filter(ReportSchedule.is_active.is_(True))
+        return query.order_by(ReportSchedule.next_run_at).all()
+
+    def deactivate(self, schedule_id: int) -> ReportSchedule:
+        """Desactivar una programación (se conserva el historial de trabajos)"""
+        schedule = self.get_schedule(schedule_id)
+        schedule.is_active = False
+        db.session.commit()
+        return schedule
+
+    def run_now(self, schedule_id: int) -> ReportSchedule:
+        """Adelantar el próximo disparo al próximo sondeo del planificador"""
+        schedule = self.get_schedule(schedule_id)
+        if not schedule.is_active:
+            raise BusinessLogicError("La programación está inactiva", operation='report_schedule_run')
+        schedule.next_run_at = datetime.now()
+        db.session.commit()
+        return schedule
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def run_due(self, worker_id: str = 'inline') -> Dict[str, int]:
+        """Ejecutar las programaciones vencidas y despachar los reportes terminados"""
+        stats = {'fired': 0, 'jobs': 0, 'skipped': 0, 'deferred': 0, 'failed': 0, 'delivered': 0}
+
+        for schedule_id in self._claim_due(worker_id):
+            schedule = db.session.get(ReportSchedule, schedule_id)
+            outcome = self._fire(schedule, datetime.now())
+            stats['fired'] += 1
+            for key, value in outcome.items():
+                stats[key] += value
+
+        stats['delivered'] = self.dispatch_finished_jobs()
+        return stats
+
+    def _claim_due(self, worker_id: str) -> List[int]:
+        """Reclamar programaciones vencidas con UPDATE condicional (como la bandeja de salida)"""
+        now = datetime.now()
+        stale_before = now - self.lock_timeout
+        unlocked = or_(ReportSchedule.locked_at.is_(None), ReportSchedule.locked_at < stale_before)
+
+        candidates = db.session.query(ReportSchedule.id).filter(
+            ReportSchedule.is_active.is_(True),
+            ReportSchedule.next_run_at <= now,
+            unlocked
+        ).order_by(ReportSchedule.next_run_at).limit(self.batch_size).all()
+
+        claimed = []
+        for (schedule_id,) in candidates:
+            result = db.session.execute(
+                update(ReportSchedule).where(
+                    ReportSchedule.id == schedule_id,
+                    ReportSchedule.next_run_at <= now,
+                    unlocked
+                ).values(locked_by=worker_id, locked_at=now),
+                execution_options={'synchronize_session': False}
+            )
+            if result.rowcount == 1:
+                claimed.append(schedule_id)
+
+        db.session.commit()
+        return claimed
+
+    def _occurrences(self, schedule: ReportSchedule, cron: CronExpression, now: datetime) -> List[datetime]:
+        """Disparos pendientes hasta ahora: el programado más los perdidos (los más recientes)"""
+        occurrences = [schedule.next_run_at]
+        candidate = schedule.next_run_at
+        while True:
+            candidate = cron.next_after(candidate)
+            if candidate > now:
+                break
+            occurrences.append(candidate)
+            if len(occurrences) > self.max_catch_up:
+                occurrences.pop(0)
+        return occurrences
+
+    def _fire(self, schedule: ReportSchedule, now: datetime) -> Dict[str, int]:
+        """Ejecutar los disparos pendientes de una programación y calcular el siguiente
+
+        next_run_at queda en el primer disparo de reporte que no se encoló
+        (sin lugar en la cola o con error), así no se pierden disparos.
+        """
+        outcome = {'jobs': 0, 'skipped': 0, 'deferred': 0, 'failed': 0}
+        cron = CronExpression(schedule.cron)
+        unfired: List[datetime] = []
+
+        try:
+            occurrences = self._occurrences(schedule, cron, now)
+            on_time = [run_at for run_at in occurrences if now - run_at <= self.grace]
+            if schedule.catch_up:
+                pending = occurrences
+            else:
+                pending = on_time
+                if len(on_time) < len(occurrences):
+                    logger.warning(f"Report schedule {schedule.id}: {len(occurrences) - len(on_time)} "
+                                   f"missed runs skipped (catch_up disabled)")
+            # Un precálculo de cache o una foto del estado actual solo tienen
+            # sentido para el disparo más reciente
+            if schedule.report_type in INLINE_TYPES:
+                pending = pending[-1:]
+            else:
+                # Los disparos en orden, solo los que caben en la cola de trabajos
+                unfired = list(pending)
+                capacity = max(report_job_service.max_pending - report_job_service.pending_count(), 0)
+                pending = pending[:capacity]
+                outcome['deferred'] += len(unfired) - len(pending)
+                if not pending and unfired:
+                    logger.warning(f"Report schedule {schedule.id}: job queue full, "
+                                   f"{len(unfired)} runs deferred")
+
+            if not pending and not unfired:
+                schedule.last_status = 'skipped'
+                outcome['skipped'] += 1
+
+            for run_at in pending:
+                if schedule.report_type in INLINE_TYPES:
+                    if schedule.report_type == CACHE_WARMUP:
+                        self._warm_cache(schedule)
+                    elif schedule.report_type == AI_RECOMMENDATIONS:
+                        self._rebuild_ai_recommendations(schedule)
+                    else:
+                        self._snapshot_ar_aging(schedule)
+                    schedule.last_status = 'completed'
+                    schedule.last_error = None
+                else:
+                    job = report_job_service.submit(
+                        schedule.report_type,
+                        resolve_period(schedule.params or {}, run_at),
+                        created_by=schedule.created_by,
+                        schedule_id=schedule.id
+                    )
+                    unfired.pop(0)
+                    schedule.last_job_id = job.id
+                    schedule.last_status = 'queued'
+                    schedule.last_error = None
+                    outcome['jobs'] += 1
+
+        except Exception as e:
+            logger.error(f"Report schedule {schedule.id} failed: {e}")
+            db.session.rollback()
+            schedule = db.session.get(ReportSchedule, schedule.id)
+            schedule.last_status = 'failed'
+            schedule.last_error = str(e)
+            outcome['failed'] += 1
+
+        schedule.last_run_at = now
+        schedule.next_run_at = unfired[0] if unfired else cron.next_after(now)
+        schedule.locked_by = None
+        schedule.locked_at = None
+        db.session.commit()
+        return outcome
+
+    def _warm_cache(self, schedule: ReportSchedule) -> None:
+        """Precalcular los reportes registrados del cache (todos si no se indican)"""
+        from app.services.report_cache_service import report_cache_service
+
+        if not report_cache_service.is_shared():
+            logger.warning(f"Report schedule {schedule.id}: report cache has no Redis, "
+                           f"warmup only reaches this process")
+        names = (schedule.params or {}).get('reports') or report_cache_service.registered_reports()
+        fresh_for = float((schedule.params or {}).get('fresh_seconds') or self.warm_fresh_seconds)
+        for name in names:
+            report_cache_service.warm_report(name, fresh_for)
+        logger.info(f"Report schedule {schedule.id}: warmed {len(names)} cached reports")
+
+    def _snapshot_ar_aging(self, schedule: ReportSchedule) -> None:
+        """Guardar la foto diaria de antigüedad de cartera"""
+        from app.services.accounts_receivable_service import AccountsReceivableService
+
+        snapshot = AccountsReceivableService().take_aging_snapshot()
+        logger.info(f"Report schedule {schedule.id}: AR aging snapshot {snapshot.snapshot_date}")
+
+    def _rebuild_ai_recommendations(self, schedule: ReportSchedule) -> None:
+        """Recalcular la tabla de recomendaciones por contenido"""
+        from app.services.ai_recommendation_service import ai_recommendation_service
+
+        result = ai_recommendation_service.rebuild(top_k=(schedule.params or {}).get('top_k'))
+        logger.info(f"Report schedule {schedule.id}: {result['recommendations']} AI recommendations "
+                    f"for {result['source_products']} products")
+
+    def dispatch_finished_jobs(self) -> int:
+        """Registrar el resultado de los trabajos programados terminados y encolar sus envíos"""
+        finished = db.session.query(ReportJob.id).filter(
+            ReportJob.schedule_id.isnot(None),
+            ReportJob.delivered_at.is_(None),
+            ReportJob.status.in_(ReportJob.FINAL_STATUSES)
+        ).limit(self.batch_size).all()
+
+        emails = 0
+        for (job_id,) in finished:
+            # Reclamar el envío: una sola instancia lo despacha
+            result = db.session.execute(
+                update(ReportJob).where(ReportJob.id == job_id, ReportJob.delivered_at.is_(None))
+                .values(delivered_at=datetime.utcnow()),
+                execution_options={'synchronize_session': False}
+            )
+            if result.rowcount != 1:
+                continue
+
+            job = db.session.get(ReportJob, job_id)
+            schedule = db.session.get(ReportSchedule, job.schedule_id)
+            if schedule is None:
+                continue
+            if schedule.last_job_id == job.id:
+                schedule.last_status = job.status
+                schedule.last_error = job.error
+
+            if job.status == 'completed':
+                for recipient in schedule.recipient_list:
+                    outbox_service.enqueue('report.scheduled_email', {
+                        'job_id': job.id,
+                        'schedule_name': schedule.name,
+                        'to_email': recipient
+                    })
+                    emails += 1
+
+        db.session.commit()
+        if emails:
+            outbox_service.notify()
+        return emails
+
+
+class ReportSchedulerThread:
+    """Thread que sondea las programaciones vencidas en segundo plano"""
+
+    def __init__(self, app, service: ReportSchedulerService, poll_interval: float = 30.0):
+        self.app = app
+        self.service = service
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Iniciar el thread daemon"""
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:scheduler"
+        self._thread = threading.Thread(target=self._run, args=(worker_id,), name='report-scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"Report scheduler started (poll every {self.poll_interval}s)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detener el thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.service.run_due(worker_id)
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Report scheduler error: {e}")
+            self._stop.wait(self.poll_interval)
+
+
+def start_report_scheduler(app) -> Optional[ReportSchedulerThread]:
+    """Iniciar el planificador según configuración (REPORT_SCHEDULER_ENABLED=false lo desactiva)"""
+    if os.getenv('REPORT_SCHEDULER_ENABLED', 'true').lower() != 'true':
+        app.logger.info("Report scheduler disabled")
+        return None
+
+    scheduler = ReportSchedulerThread(
+        app,
+        report_scheduler_service,
+        poll_interval=float(os.getenv('REPORT_SCHEDULER_POLL_INTERVAL', '30'))
+    )
+    scheduler.start()
+    return scheduler
+
+
+def _send_scheduled_report(payload: Dict[str, Any]) -> bool:
+    """Handler de envío de un reporte programado por email"""
+    from app.services.email_service import email_service
+
+    job = db.session.get(ReportJob, payload['job_id'])
+    if job is None or job.status != 'completed' or not job.artifact_path or not os.path.exists(job.artifact_path):
+        raise RuntimeError(f"El archivo del reporte {payload['job_id']} ya no está disponible")
+
+    return email_service.send_scheduled_report(
+        payload['to_email'], payload['schedule_name'], job.artifact_path, job.artifact_name
+    )
+
+
+# Instancia global del servicio
+report_scheduler_service = ReportSchedulerService()
+outbox_service.register_handler('report.scheduled_email', _send_scheduled_report)
@@ -1,18 +1,17 @@
 """
 Servicio de Reportes Robusto - Sistema POS Sabrositas
 Implementación robusta que funciona con la infraestructura existente
+(adaptador sobre el motor de reportes)
 """
 
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any
-from sqlalchemy import func, and_, desc
 import csv
 import io
 
-from app import db
-from app.models.sale import Sale, SaleItem
-from app.models.product import Product
+from app.services.report_engine import report_engine
+from app.services.sales_rollup_service import sales_rollup_service
 
 logger = logging.getLogger(__name__)
 
@@ -25,65 +24,23 @@ class RobustReportsService:
         Generar reporte de ventas robusto
         """
         try:
-            # Consulta base de ventas
-            sales = Sale.query.filter(
-                and_(Sale.created_at >= start_date, Sale.created_at <= end_date)
-            ).order_by(desc(Sale.created_at)).all()
-
-            # Estadísticas básicas
-            total_sales = len(sales)
-            total_revenue = sum(float(sale.total_amount) for sale in sales)
-            average_sale = total_revenue / total_sales if total_sales > 0 else 0
-
-            # Ventas por método de pago
-            payment_methods = {}
-            for sale in sales:
-                method = sale.payment_method or 'unknown'
-                if method not in payment_methods:
-                    payment_methods[method] = {'count': 0, 'total': 0}
-                payment_methods[method]['count'] += 1
-                payment_methods[method]['total'] += float(sale.total_amount)
-
-            # Ventas por día
-            daily_sales = {}
-            for sale in sales:
-                if sale.created_at:
-                    date_key = sale.created_at.date().isoformat()
-                    if date_key not in daily_sales:
-                        daily_sales[date_key] = {'sales': 0, 'revenue': 0}
-                    daily_sales[date_key]['sales'] += 1
-                    daily_sales[date_key]['revenue'] += float(sale.total_amount)
-
-            # Productos más vendidos
-            product_sales = {}
-            for sale in sales:
-                for item in sale.items:
-                    product_id = item.product_id
-                    if product_id not in product_sales:
-                        product_sales[product_id] = {
-                            'name': 'Producto Desconocido',
-                            'quantity': 0,
-                            'revenue': 0
-                        }
-
-                    # Obtener nombre del producto
-                    try:
-                        product = Product.query.get(product_id)
-                        if product:
-                            product_sales[product_id]['name'] = product.name
-                    except Exception:
-                        # Si falla la obtención del producto, continuar sin interrumpir el reporte
-                        pass
-
-                    product_sales[product_id]['quantity'] += item.quantity
-                    product_sales[product_id]['revenue'] += float(item.quantity * item.unit_price)
-
-            # Ordenar productos por cantidad vendida
-            top_products = sorted(
-                [{'id': pid, **data} for pid, data in product_sales.items()],
-                key=lambda x: x['quantity'],
-                reverse=True
-            )[:10]
+            # Rango inclusivo de los llamadores -> [inicio, fin) del motor
+            filters = {'start': start_date, 'end': end_date + timedelta(microseconds=1)}
+
+            report = report_engine.aggregate('sales', ['sales', 'revenue', 'average_sale'],
+                                             ['payment_method', 'day'], filters)
+            summary = report['summary']
+            total_revenue = summary['revenue']
+
+            # Productos más vendidos (nombre en la misma consulta)
+            top_products = report_engine.ranking(
+                'sale_lines', 'product', ['quantity_sold', 'revenue'], 'quantity_sold', filters, limit=10
+            )
+
+            sales = report_engine.rows(
+                'sales', ['id', 'created_at', 'total_amount', 'payment_method', 'items_count'],
+                filters, order_by=[('created_at', True)], limit=50  # Limitar para performance
+            )
 
             return {
                 'report_info': {
@@ -94,40 +51,48 @@ class RobustReportsService:
                     'period_days': (end_date - start_date).days + 1
                 },
                 'summary': {
-                    'total_sales': total_sales,
+                    'total_sales': summary['sales'],
                     'total_revenue': total_revenue,
-                    'average_sale': average_sale,
+                    'average_sale': summary['average_sale'],
                     'growth_rate': self._calculate_growth_rate(start_date, end_date)
                 },
                 'sales_detail': [
                     {
-                        'id': sale.id,
-                        'date': sale.created_at.isoformat() if sale.created_at else None,
-                        'total_amount': float(sale.total_amount),
-                        'payment_method': sale.payment_method,
-                        'customer_name': getattr(sale, 'customer_name', None),
-                        'items_count': len(sale.items)
+                        'id': sale['id'],
+                        'date': sale['created_at'].isoformat() if sale['created_at'] else None,
+                        'total_amount': float(sale['total_amount']),
+                        'payment_method': sale['payment_method'],
+                        'customer_name': None,
+                        'items_count': sale['items_count']
                     }
-                    for sale in sales[:50]  # Limitar para performance
+                    for sale in sales
                 ],
                 'payment_methods': [
                     {
-                        'method': method,
-                        'count': data['count'],
-                        'total': data['total'],
-                        'percentage': (data['total'] / total_revenue * 100) if total_revenue > 0 else 0
+                        'method': row['key'],
+                        'count': row['sales'],
+                        'total': row['revenue'],
+                        'percentage': (row['revenue'] / total_revenue * 100) if total_revenue > 0 else 0
                     }
-                    for method, data in payment_methods.items()
+                    for row in report['breakdowns']['payment_method']
                 ],
                 'daily_sales': [
                     {
-                        'date': date,
-                        'sales': data['sales'],
-                        'revenue': data['revenue']
+                        'date': row['key'],
+                        'sales': row['sales'],
+                        'revenue': row['revenue']
                     }
-                    for date, data in sorted(daily_sales.items())
+                    for row in report['breakdowns']['day']
                 ],
-                'top_products': top_products
+                'top_products': [
+                    {
+                        'id': product['key'],
+                        'name': product['name'],
+                        'quantity': product['quantity_sold'],
+                        'revenue': product['revenue']
+                    }
+                    for product in top_products
+                ]
             }
 
         except Exception as e:
@@ -139,46 +104,31 @@ class RobustReportsService:
         Generar reporte de inventario robusto
         """
         try:
-            # Obtener productos activos
-            products = Product.query.filter(Product.is_active.is_(True)).all()
-
-            total_products = len(products)
-            low_stock_count = 0
-            out_of_stock_count = 0
-            total_inventory_value = 0
+            summary = report_engine.aggregate(
+                'inventory', ['product_count', 'low_stock_in_stock', 'out_of_stock', 'inventory_value']
+            )['summary']
+            products = report_engine.rows(
+                'inventory', ['id', 'name', 'sku', 'category', 'price', 'stock', 'min_stock', 'stock_status']
+            )
 
             products_data = []
-
             for product in products:
-                # Obtener stock de forma segura
-                current_stock = getattr(product, 'stock', 0)
-                min_stock = getattr(product, 'min_stock', 0)
-                price = float(product.price)
-
-                # Calcular estado del stock
-                if current_stock == 0:
-                    status = 'out_of_stock'
-                    out_of_stock_count += 1
-                elif current_stock <= min_stock:
-                    status = 'low_stock'
-                    low_stock_count += 1
-                else:
-                    status = 'good_stock'
-
-                inventory_value = current_stock * price
-                total_inventory_value += inventory_value
+                current_stock = product['stock'] or 0
+                price = float(product['price'])
+                status = product['stock_status'] if product['stock_status'] in ('out_of_stock', 'low_stock') \
+                    else 'good_stock'
 
                 products_data.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'sku': getattr(product, 'sku', ''),
-                    'category': product.category,
+                    'id': product['id'],
+                    'name': product['name'],
+                    'sku': product['sku'] or '',
+                    'category': product['category'],
                     'current_stock': current_stock,
-                    'min_stock': min_stock,
+                    'min_stock': product['min_stock'],
                     'price': price,
-                    'inventory_value': inventory_value,
+                    'inventory_value': current_stock * price,
                     'status': status,
-                    'needs_reorder': current_stock <= min_stock
+                    'needs_reorder': current_stock <= product['min_stock']
                 })
 
             return {
@@ -187,10 +137,10 @@ class RobustReportsService:
                     'generated_at': datetime.utcnow().isoformat()
                 },
                 'summary': {
-                    'total_products': total_products,
-                    'low_stock_count': low_stock_count,
-                    'out_of_stock_count': out_of_stock_count,
-                    'total_inventory_value': total_inventory_value
+                    'total_products': summary['product_count'],
+                    'low_stock_count': summary['low_stock_in_stock'],
+                    'out_of_stock_count': summary['out_of_stock'],
+                    'total_inventory_value': summary['inventory_value']
                 },
                 'products': products_data,
                 'low_stock_alerts': [
@@ -207,29 +157,11 @@ class RobustReportsService:
         Generar reporte de flujo de caja robusto
         """
         try:
-            # Ingresos por ventas
-            sales = Sale.query.filter(
-                and_(Sale.created_at >= start_date, Sale.created_at <= end_date)
-            ).all()
-
-            total_income = sum(float(sale.total_amount) for sale in sales)
-
-            # Agrupar por día
-            daily_income = {}
-            for sale in sales:
-                if sale.created_at:
-                    date_key = sale.created_at.date().isoformat()
-                    if date_key not in daily_income:
-                        daily_income[date_key] = 0
-                    daily_income[date_key] += float(sale.total_amount)
-
-            # Ingresos por método de pago
-            income_by_method = {}
-            for sale in sales:
-                method = sale.payment_method or 'unknown'
-                if method not in income_by_method:
-                    income_by_method[method] = 0
-                income_by_method[method] += float(sale.total_amount)
+            report = report_engine.aggregate(
+                'sales', ['revenue'], ['payment_method', 'day'],
+                {'start': start_date, 'end': end_date + timedelta(microseconds=1)}
+            )
+            total_income = report['summary']['revenue']
 
             return {
                 'report_info': {
@@ -245,18 +177,18 @@ class RobustReportsService:
                 },
                 'income_by_method': [
                     {
-                        'method': method,
-                        'total': amount,
-                        'percentage': (amount / total_income * 100) if total_income > 0 else 0
+                        'method': row['key'],
+                        'total': row['revenue'],
+                        'percentage': (row['revenue'] / total_income * 100) if total_income > 0 else 0
                     }
-                    for method, amount in income_by_method.items()
+                    for row in report['breakdowns']['payment_method']
                 ],
                 'daily_flow': [
                     {
-                        'date': date,
-                        'income': amount
+                        'date': row['key'],
+                        'income': row['revenue']
                     }
-                    for date, amount in sorted(daily_income.items())
+                    for row in report['breakdowns']['day']
                 ]
             }
 
@@ -272,23 +204,10 @@ class RobustReportsService:
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(days=days)
 
-            # Productos más vendidos usando consulta SQL optimizada
-            top_products_query = db.session.query(
-                Product.id,
-                Product.name,
-                Product.category,
-                Product.price,
-                func.sum(SaleItem.quantity).label('total_sold'),
-                func.sum(SaleItem.quantity * SaleItem.unit_price).label('total_revenue'),
-                func.count(Sale.id.distinct()).label('times_ordered')
-            ).join(SaleItem, Product.id == SaleItem.product_id)\
-             .join(Sale, SaleItem.sale_id == Sale.id)\
-             .filter(and_(Sale.created_at >= start_date, Sale.created_at <= end_date))\
-             .group_by(Product.id, Product.name, Product.category, Product.price)\
-             .order_by(desc(func.sum(SaleItem.quantity)))\
-             .limit(limit)
-
-            top_products = top_products_query.all()
+            top_products = report_engine.ranking(
+                'sale_lines', 'product', ['quantity_sold', 'revenue', 'transactions'], 'quantity_sold',
+                {'start': start_date, 'end': end_date}, limit=limit
+            )
 
             return {
                 'period': {
@@ -298,13 +217,13 @@ class RobustReportsService:
                 },
                 'top_products': [
                     {
-                        'id': tp.id,
-                        'name': tp.name,
-                        'category': tp.category,
-                        'price': float(tp.price),
-                        'total_sold': tp.total_sold or 0,
-                        'total_revenue': float(tp.total_revenue or 0),
-                        'times_ordered': tp.times_ordered or 0
+                        'id': tp['key'],
+                        'name': tp['name'],
+                        'category': tp['category'],
+                        'price': tp['price'],
+                        'total_sold': tp['quantity_sold'],
+                        'total_revenue': tp['revenue'],
+                        'times_ordered': tp['transactions']
                     }
                     for tp in top_products
                 ]
@@ -322,47 +241,30 @@ class RobustReportsService:
             today = datetime.now().date()
             yesterday = today - timedelta(days=1)
 
-            # Ventas de hoy
-            today_start = datetime.combine(today, datetime.min.time())
-            today_end = datetime.combine(today, datetime.max.time())
-
-            today_sales = Sale.query.filter(
-                and_(Sale.created_at >= today_start, Sale.created_at <= today_end)
-            ).all()
-
-            # Ventas de ayer
-            yesterday_start = datetime.combine(yesterday, datetime.min.time())
-            yesterday_end = datetime.combine(yesterday, datetime.max.time())
-
-            yesterday_sales = Sale.query.filter(
-                and_(Sale.created_at >= yesterday_start, Sale.created_at <= yesterday_end)
-            ).all()
-
-            # Calcular totales
-            today_revenue = sum(float(s.total_amount) for s in today_sales)
-            yesterday_revenue = sum(float(s.total_amount) for s in yesterday_sales)
+            # Hoy y ayer desde los agregados en una consulta
+            windows = sales_rollup_service.get_window_totals({
+                'today': (today, today),
+                'yesterday': (yesterday, yesterday)
+            })
 
-            # Productos con stock bajo (si el campo existe)
+            # Productos con stock bajo
             low_stock_count = 0
             total_products = 0
             try:
-                products = Product.query.filter(Product.is_active.is_(True)).all()
-                total_products = len(products)
-                for p in products:
-                    if hasattr(p, 'stock') and hasattr(p, 'min_stock'):
-                        if p.stock <= p.min_stock:
-                            low_stock_count += 1
+                inventory = report_engine.aggregate('inventory', ['product_count', 'low_stock'])['summary']
+                total_products = inventory['product_count']
+                low_stock_count = inventory['low_stock']
             except Exception as e:
                 logger.warning(f"Error calculating stock alerts: {str(e)}")
 
             return {
                 'today': {
-                    'total_sales': len(today_sales),
-                    'total_revenue': today_revenue
+                    'total_sales': windows['today']['sales'],
+                    'total_revenue': windows['today']['revenue']
                 },
                 'yesterday': {
-                    'total_sales': len(yesterday_sales),
-                    'total_revenue': yesterday_revenue
+                    'total_sales': windows['yesterday']['sales'],
+                    'total_revenue': windows['yesterday']['revenue']
                 },
                 'inventory_alerts': {
                     'low_stock_products': low_stock_count,
@@ -419,17 +321,13 @@ class RobustReportsService:
             prev_start = start_date - timedelta(days=period_days)
             prev_end = start_date - timedelta(days=1)
 
-            # Ventas del período actual
-            current_sales = Sale.query.filter(
-                and_(Sale.created_at >= start_date, Sale.created_at <= end_date)
-            ).all()
-            current_revenue = sum(float(s.total_amount) for s in current_sales)
-
-            # Ventas del período anterior
-            previous_sales = Sale.query.filter(
-                and_(Sale.created_at >= prev_start, Sale.created_at <= prev_end)
-            ).all()
-            previous_revenue = sum(float(s.total_amount) for s in previous_sales)
+            # Período actual y anterior en una consulta
+            totals = sales_rollup_service.get_sales_window_totals({
+                'current': (start_date, end_date),
+                'previous': (prev_start, prev_end)
+            })
+            current_revenue = totals['current']['revenue']
+            previous_revenue = totals['previous']['revenue']
 
             if previous_revenue == 0:
                 return 100.0 if current_revenue > 0 else 0.0
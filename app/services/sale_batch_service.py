@@ -0,0 +1,400 @@
+"""
+Sale Batch Service - Sistema POS O'Data
+======================================
+Ingesta masiva de ventas registradas offline por los terminales: validación
+contra un mapa de productos precargado, deltas de stock agregados por producto
+e inserciones en bloque por lotes transaccionales, idempotente por UUID del cliente.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+import logging
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.sale import Sale, SaleItem, SaleClientKey
+from app.models.inventory import InventoryMovement
+from app.repositories.base_repository import unit_of_work
+from app.repositories.sale_repository import SaleRepository
+from app.repositories.product_repository import ProductRepository
+from app.repositories.user_repository import UserRepository
+from app.services.sales_rollup_service import sales_rollup_service
+from app.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Límite de parámetros por consulta IN (...) compatible con SQLite
+IN_CLAUSE_CHUNK = 500
+
+
+class StockConflictError(Exception):
+    """Otra transacción consumió el stock entre la validación y la reserva del lote"""
+
+
+class SaleBatchService:
+    """Servicio de ingesta masiva de ventas offline"""
+
+    MAX_BATCH_SIZE = 5000
+    DEFAULT_CHUNK_SIZE = 250
+    MAX_CHUNK_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        sale_repository: SaleRepository,
+        product_repository: ProductRepository,
+        user_repository: UserRepository
+    ):
+        self.sale_repository = sale_repository
+        self.product_repository = product_repository
+        self.user_repository = user_repository
+
+    def ingest(
+        self,
+        user_id: int,
+        sales: List[Dict[str, Any]],
+        terminal_id: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Dict[str, Any]:
+        """Registrar un lote de ventas y devolver el resultado por venta"""
+        if not sales:
+            raise ValidationError("Batch must contain at least one sale", field="sales")
+        if len(sales) > self.MAX_BATCH_SIZE:
+            raise ValidationError(
+                f"Batch cannot contain more than {self.MAX_BATCH_SIZE} sales", field="sales"
+            )
+
+        user = self.user_repository.get_by_id_or_404(user_id)
+        if not user.is_active:
+            raise ValidationError("User is not active", field="user_id")
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(sales)
+        pending: List[int] = []
+        seen_uuids = set()
+
+        # Validación estructural y duplicados dentro del mismo lote
+        for index, sale_data in enumerate(sales):
+            client_uuid = str(sale_data.get('client_uuid') or '').strip() if isinstance(sale_data, dict) else ''
+            if not client_uuid or len(client_uuid) > 36:
+                results[index] = self._rejected(client_uuid, "VALIDATION_ERROR", "client_uuid is required")
+            elif client_uuid in seen_uuids:
+                results[index] = {'client_uuid': client_uuid, 'status': 'duplicate', 'sale_id': None}
+            elif not self._valid_items_payload(sale_data.get('items')):
+                results[index] = self._rejected(client_uuid, "VALIDATION_ERROR", "Sale must have at least one item")
+            else:
+                seen_uuids.add(client_uuid)
+                pending.append(index)
+
+        # Mapa de productos precargado una sola vez para todo el lote
+        product_ids = {
+            self._normalize_id(item.get('product_id'))
+            for index in pending
+            for item in sales[index]['items']
+        }
+        products = self._load_products(product_ids)
+
+        for start in range(0, len(pending), max(chunk_size, 1)):
+            chunk = pending[start:start + chunk_size]
+            for attempt in range(1, self.MAX_CHUNK_ATTEMPTS + 1):
+                try:
+                    chunk_results = self._ingest_chunk(user_id, sales, chunk, products, terminal_id)
+                    break
+                except (StockConflictError, IntegrityError) as e:
+                    # Venta concurrente o UUID registrado por otro request: revalidar el lote
+                    logger.warning(f"Retrying sale batch chunk (attempt {attempt}): {type(e).__name__}")
+                    if attempt == self.MAX_CHUNK_ATTEMPTS:
+                        raise
+            for index, result in chunk_results.items():
+                results[index] = result
+
+        summary = {'created': 0, 'duplicate': 0, 'rejected': 0}
+        for result in results:
+            summary[result['status']] += 1
+
+        return {'summary': summary, 'results': results}
+
+    def _ingest_chunk(
+        self,
+        user_id: int,
+        sales: List[Dict[str, Any]],
+        chunk: List[int],
+        products: Dict[int, Any],
+        terminal_id: Optional[str]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Procesar un lote en una sola transacción"""
+        results: Dict[int, Dict[str, Any]] = {}
+
+        with unit_of_work():
+            # Idempotencia: ventas ya registradas en lotes anteriores
+            existing = self._existing_keys([sales[index]['client_uuid'] for index in chunk])
+
+            # Bloquear y refrescar el stock de los productos del lote
+            chunk_product_ids = {
+                self._normalize_id(item.get('product_id'))
+                for index in chunk
+                for item in sales[index]['items']
+            }
+            self.product_repository.get_many_for_update(
+                [product_id for product_id in chunk_product_ids if product_id in products]
+            )
+            available = {product_id: products[product_id].stock for product_id in chunk_product_ids if product_id in products}
+
+            accepted: List[Tuple[int, Dict[str, Any], List[Dict[str, Any]]]] = []
+            for index in chunk:
+                sale_data = sales[index]
+                client_uuid = str(sale_data['client_uuid']).strip()
+
+                if client_uuid in existing:
+                    results[index] = {'client_uuid': client_uuid, 'status': 'duplicate', 'sale_id': existing[client_uuid]}
+                    continue
+
+                try:
+                    lines = self._validate_items(sale_data['items'], products, available)
+                    header = self._build_header(user_id, sale_data, lines)
+                except ValidationError as e:
+                    results[index] = self._rejected(client_uuid, e.error_code, e.message)
+                    continue
+
+                # Descontar del stock disponible para las ventas siguientes del lote
+                for line in lines:
+                    available[line['product_id']] -= line['quantity']
+                accepted.append((index, header, lines))
+
+            if accepted:
+                self._write_chunk(accepted, sales, products, terminal_id, results)
+
+        return results
+
+    def _write_chunk(
+        self,
+        accepted: List[Tuple[int, Dict[str, Any], List[Dict[str, Any]]]],
+        sales: List[Dict[str, Any]],
+        products: Dict[int, Any],
+        terminal_id: Optional[str],
+        results: Dict[int, Dict[str, Any]]
+    ) -> None:
+        """Insertar encabezados, items, movimientos y claves; aplicar deltas de stock agregados"""
+        # Encabezados con sus IDs, en el orden del lote
+        headers = [header for _, header, _ in accepted]
+        sale_objects = [
+            SimpleNamespace(id=sale_id, **header)
+            for sale_id, header in zip(self._insert_headers(headers), headers)
+        ]
+
+        # Deltas de stock agregados por producto (un UPDATE condicional por bloque de productos)
+        deltas: Dict[int, int] = {}
+        for _, _, lines in accepted:
+            for line in lines:
+                deltas[line['product_id']] = deltas.get(line['product_id'], 0) + line['quantity']
+
+        running_stock = {product_id: products[product_id].stock for product_id in deltas}
+        delta_ids = sorted(deltas)
+        for start in range(0, len(delta_ids), IN_CLAUSE_CHUNK):
+            block = {product_id: deltas[product_id] for product_id in delta_ids[start:start + IN_CLAUSE_CHUNK]}
+            if not self.product_repository.decrement_stock_many(products, block):
+                raise StockConflictError(sorted(block))
+
+        item_rows, movement_rows, key_rows, rollup_facts = [], [], [], []
+        seller = self.user_repository.get_by_id(sale_objects[0].user_id) if sale_objects else None
+        store_id = seller.assigned_store_id if seller else None
+        
+        for (index, _, lines), sale in zip(accepted, sale_objects):
+            client_uuid = str(sales[index]['client_uuid']).strip()
+            first_item = len(item_rows)
+            for line in lines:
+                product_id = line['product_id']
+                previous_stock = running_stock[product_id]
+                running_stock[product_id] = previous_stock - line['quantity']
+
+                item_rows.append({
+                    'sale_id': sale.id,
+                    'product_id': product_id,
+                    'quantity': line['quantity'],
+                    'unit_price': line['unit_price'],
+                    'total_price': line['quantity'] * line['unit_price'],
+                    'created_at': sale.created_at
+                })
+                movement_rows.append({
+                    'product_id': product_id,
+                    'user_id': sale.user_id,
+                    'movement_type': 'sale',
+                    'quantity': -line['quantity'],
+                    'reason': f'Sale #{sale.id}',
+                    'reference_id': sale.id,
+                    'reference_type': 'sale',
+                    'previous_stock': previous_stock,
+                    'new_stock': running_stock[product_id],
+                    'created_at': sale.created_at
+                })
+
+            rollup_facts.append(sales_rollup_service.sale_fact(sale, item_rows[first_item:], store_id))
+            key_rows.append({'client_uuid': client_uuid, 'sale_id': sale.id, 'terminal_id': terminal_id})
+            results[index] = {'client_uuid': client_uuid, 'status': 'created', 'sale_id': sale.id}
+
+        db.session.execute(insert(SaleItem), item_rows)
+        db.session.execute(insert(InventoryMovement), movement_rows)
+        db.session.execute(insert(SaleClientKey), key_rows)
+
+        # Agregados de todo el chunk en un upsert por tabla
+        sales_rollup_service.apply(rollup_facts)
+
+    @staticmethod
+    def _insert_headers(headers: List[Dict[str, Any]]) -> List[int]:
+        """Insertar encabezados y devolver sus IDs en el mismo orden"""
+        if db.session.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+            # Un INSERT masivo con RETURNING ordenado, sin instanciar objetos del ORM
+            return list(db.session.execute(
+                insert(Sale).returning(Sale.id, sort_by_parameter_order=True), headers
+            ).scalars())
+
+        # Sin RETURNING (MySQL): el flush agrupa los INSERT y devuelve los IDs
+        sale_objects = [Sale(items=[], **header) for header in headers]
+        db.session.add_all(sale_objects)
+        db.session.flush()
+        return [sale.id for sale in sale_objects]
+
+    def _validate_items(
+        self,
+        items: List[Dict[str, Any]],
+        products: Dict[int, Any],
+        available: Dict[int, int]
+    ) -> List[Dict[str, Any]]:
+        """Validar líneas contra el mapa de productos y el stock disponible del lote"""
+        lines = []
+        requested: Dict[int, int] = {}
+
+        for item_data in items:
+            product_id = self._normalize_id(item_data.get('product_id'))
+            product = products.get(product_id)
+            if product is None:
+                raise ValidationError(f"Product not found with ID: {item_data.get('product_id')}", field="product_id")
+            if not product.is_active:
+                raise ValidationError(f"Product {product.name} is not active", field="product_id")
+
+            try:
+                quantity = int(item_data.get('quantity', 1))
+            except (TypeError, ValueError):
+                raise ValidationError("Quantity must be an integer", field="quantity")
+            if quantity <= 0:
+                raise ValidationError("Quantity must be greater than 0", field="quantity")
+
+            requested[product_id] = requested.get(product_id, 0) + quantity
+            if requested[product_id] > available[product_id]:
+                raise ValidationError(
+                    f"Insufficient stock for product {product_id}. "
+                    f"Requested: {requested[product_id]}, Available: {available[product_id]}",
+                    field="quantity"
+                )
+
+            unit_price = item_data.get('unit_price')
+            lines.append({
+                'product_id': product_id,
+                'quantity': quantity,
+                'unit_price': Decimal(str(unit_price if unit_price is not None else product.price))
+            })
+
+        return lines
+
+    def _build_header(self, user_id: int, sale_data: Dict[str, Any], lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Calcular totales con las mismas reglas que Sale.apply_tax / apply_discount"""
+        subtotal = sum((line['quantity'] * line['unit_price'] for line in lines), Decimal('0.00'))
+
+        tax_amount = Decimal('0.00')
+        if 'tax_rate' in sale_data:
+            tax_amount = subtotal * Decimal(str(sale_data['tax_rate'])) / 100
+
+        discount_amount = Decimal('0.00')
+        if 'discount_amount' in sale_data:
+            if sale_data.get('discount_type', 'fixed') == 'percentage':
+                discount_amount = subtotal * Decimal(str(sale_data['discount_amount'])) / 100
+            else:
+                discount_amount = Decimal(str(sale_data['discount_amount']))
+
+        total_amount = subtotal + tax_amount - discount_amount
+        payment_method = sale_data.get('payment_method', 'cash')
+
+        change_amount = Decimal('0.00')
+        if payment_method == 'cash' and 'amount_paid' in sale_data:
+            amount_paid = Decimal(str(sale_data['amount_paid']))
+            if amount_paid < total_amount:
+                raise ValidationError("Amount paid is less than total amount", field="amount_paid")
+            change_amount = amount_paid - total_amount
+
+        created_at = self._parse_timestamp(sale_data.get('created_at'))
+
+        return {
+            'user_id': user_id,
+            'customer_id': sale_data.get('customer_id'),
+            'subtotal': subtotal,
+            'tax_amount': tax_amount,
+            'discount_amount': discount_amount,
+            'total_amount': total_amount,
+            'payment_method': payment_method,
+            'payment_reference': sale_data.get('payment_reference'),
+            'change_amount': change_amount,
+            'status': 'completed',
+            'notes': sale_data.get('notes'),
+            'created_at': created_at,
+            'updated_at': created_at
+        }
+
+    def _load_products(self, product_ids) -> Dict[int, Any]:
+        """Cargar el mapa de productos del lote en consultas IN (...) por bloques"""
+        from app.models.product import Product
+
+        ids = sorted(product_id for product_id in product_ids if product_id is not None)
+        products = {}
+        for start in range(0, len(ids), IN_CLAUSE_CHUNK):
+            for product in Product.query.filter(Product.id.in_(ids[start:start + IN_CLAUSE_CHUNK])).all():
+                products[product.id] = product
+        return products
+
+    def _existing_keys(self, client_uuids: List[str]) -> Dict[str, int]:
+        """UUIDs de cliente ya registrados y su venta"""
+        uuids = [str(client_uuid).strip() for client_uuid in client_uuids]
+        existing = {}
+        for start in range(0, len(uuids), IN_CLAUSE_CHUNK):
+            rows = db.session.query(SaleClientKey.client_uuid, SaleClientKey.sale_id).filter(
+                SaleClientKey.client_uuid.in_(uuids[start:start + IN_CLAUSE_CHUNK])
+            ).all()
+            existing.update({client_uuid: sale_id for client_uuid, sale_id in rows})
+        return existing
+
+    @staticmethod
+    def _parse_timestamp(value: Any) -> datetime:
+        """Hora de la venta en el terminal (ISO 8601) o la hora actual"""
+        if not value:
+            return datetime.utcnow()
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            raise ValidationError("created_at must be an ISO 8601 timestamp", field="created_at")
+        if parsed.tzinfo is not None:
+            parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+        return parsed
+
+    @staticmethod
+    def _valid_items_payload(items: Any) -> bool:
+        """Verificar que la venta traiga una lista no vacía de items"""
+        return isinstance(items, list) and bool(items) and all(isinstance(item, dict) for item in items)
+
+    @staticmethod
+    def _normalize_id(value: Any) -> Optional[int]:
+        """Normalizar IDs recibidos en el payload"""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _rejected(client_uuid: str, code: str, message: str) -> Dict[str, Any]:
+        """Resultado de una venta rechazada"""
+        return {
+            'client_uuid': client_uuid or None,
+            'status': 'rejected',
+            'sale_id': None,
+            'error': {'code': code, 'message': message}
+        }
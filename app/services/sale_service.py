@@ -4,13 +4,15 @@ Sale Service - Sistema POS O'Data
 Servicio de ventas con lógica de negocio enterprise.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from decimal import Decimal
 import logging
+from app.repositories.base_repository import unit_of_work
 from app.repositories.sale_repository import SaleRepository
 from app.repositories.product_repository import ProductRepository
 from app.repositories.user_repository import UserRepository
-from app.exceptions import ValidationError, InsufficientStockError, BusinessLogicError
+from app.services.sales_rollup_service import sales_rollup_service
+from app.exceptions import ValidationError, InsufficientStockError, BusinessLogicError, NotFoundError
 from app import db
 
 logger = logging.getLogger(__name__)
@@ -30,6 +32,59 @@ class SaleService:
     
     def create_sale(self, user_id: int, sale_data: Dict[str, Any]) -> Dict[str, Any]:
         """Crear nueva venta con validaciones enterprise"""
+        from app.services.outbox_service import outbox_service
+        
+        # Encabezado, items, stock, movimientos, impuestos y descuentos en un solo commit
+        with unit_of_work():
+            sale, validated_items = self.record_sale(user_id, sale_data)
+            
+            # Serializar dentro de la transacción: evita recargar la venta tras el commit
+            sale_dict = sale.to_dict()
+            
+            # Factura por email vía outbox: se escribe en la misma transacción que la venta
+            invoice_queued = bool(sale_data.get('customer_email'))
+            if invoice_queued:
+                outbox_service.enqueue('sale.invoice_email', self._build_invoice_payload(
+                    sale_dict, sale_data, validated_items
+                ))
+        
+        # Un worker entrega el email; la venta no espera al servidor SMTP
+        if invoice_queued:
+            outbox_service.notify()
+        
+        # IA: sugerencias precalculadas de productos relacionados (best-effort)
+        sale_dict['ai_recommendations'] = self._get_ai_recommendations(validated_items)
+        
+        return sale_dict
+    
+    @staticmethod
+    def _build_invoice_payload(
+        sale_dict: Dict[str, Any],
+        sale_data: Dict[str, Any],
+        validated_items: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Preparar datos de la factura a partir de la venta ya serializada"""
+        invoice_data = dict(sale_dict)
+        
+        # Agregar datos del cliente
+        invoice_data['customer_email'] = sale_data.get('customer_email')
+        invoice_data['customer_name'] = sale_data.get('customer_name', 'Cliente')
+        
+        # Agregar items con nombres de productos
+        invoice_data['items'] = [
+            {
+                'name': item['product_name'],
+                'quantity': item['quantity'],
+                'unit_price': float(item['unit_price']),
+                'total': float(item['quantity'] * item['unit_price'])
+            }
+            for item in validated_items
+        ]
+        
+        return invoice_data
+    
+    def record_sale(self, user_id: int, sale_data: Dict[str, Any]) -> Tuple[Any, List[Dict[str, Any]]]:
+        """Registrar venta, items, stock y movimientos dentro de la unidad de trabajo del llamador"""
         # Validar usuario
         user = self.user_repository.get_by_id_or_404(user_id)
         if not user.is_active:
@@ -40,10 +95,13 @@ class SaleService:
         if not items:
             raise ValidationError("Sale must have at least one item", field="items")
         
-        # Validar y procesar items
+        # Validar y procesar items (una sola consulta IN con bloqueo de fila)
         validated_items = self._validate_and_process_items(items)
         
-        # Crear venta
+        # Reservar stock con UPDATE condicional antes de registrar la venta
+        stock_levels = self._reserve_stock(validated_items)
+        
+        # Crear venta (flush: obtiene el ID sin confirmar la transacción)
         sale = self.sale_repository.create(
             user_id=user_id,
             items=validated_items,
@@ -53,8 +111,8 @@ class SaleService:
             notes=sale_data.get('notes')
         )
         
-        # Procesar items y actualizar stock
-        self._process_sale_items(sale, validated_items)
+        # Insertar items y movimientos de inventario en bloque
+        sale_item_rows = self._process_sale_items(sale, validated_items, stock_levels)
         
         # Aplicar impuestos y descuentos si se especifican
         if 'tax_rate' in sale_data:
@@ -70,64 +128,40 @@ class SaleService:
                 raise ValidationError("Amount paid is less than total amount", field="amount_paid")
             sale.change_amount = amount_paid - sale.total_amount
         
-        db.session.commit()
-        
-        # IA: sugerencias de productos relacionados (best-effort)
-        sale_dict = sale.to_dict()
-        sale_dict['ai_recommendations'] = self._get_ai_recommendations(validated_items)
-
-        # Enviar factura por email si se proporciona email del cliente
-        try:
-            from app.services.email_service import email_service
-            
-            if sale_data.get('customer_email'):
-                # Preparar datos para la factura
-                sale_dict = sale.to_dict()
-                
-                # Agregar datos del cliente
-                sale_dict['customer_email'] = sale_data.get('customer_email')
-                sale_dict['customer_name'] = sale_data.get('customer_name', 'Cliente')
-                
-                # Agregar items con nombres de productos
-                sale_dict['items'] = [
-                    {
-                        'name': item['product_name'],
-                        'quantity': item['quantity'],
-                        'unit_price': float(item['unit_price']),
-                        'total': float(item['quantity'] * item['unit_price'])
-                    }
-                    for item in validated_items
-                ]
-                
-                # Enviar factura por email
-                email_sent = email_service.send_sale_invoice(sale_dict)
-                if email_sent:
-                    logger.info(f"Factura enviada por email para venta {sale.id}")
-                else:
-                    logger.warning(f"No se pudo enviar factura por email para venta {sale.id}")
-        except Exception as e:
-            logger.error(f"Error enviando factura por email: {str(e)}")
-            # No fallar la venta si el email falla
+        # Agregados de dashboards/reportes en la misma transacción
+        sales_rollup_service.apply([
+            sales_rollup_service.sale_fact(sale, sale_item_rows, user.assigned_store_id)
+        ])
         
-        return sale_dict
+        db.session.flush()
+        return sale, validated_items
     
     def _validate_and_process_items(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Validar y procesar items de venta"""
         validated_items = []
         
+        # Cargar todos los productos de la canasta en una sola consulta
+        products = self.product_repository.get_many_for_update(
+            [self._normalize_product_id(item_data.get('product_id')) for item_data in items]
+        )
+        requested: Dict[int, int] = {}
+        
         for item_data in items:
-            product_id = item_data.get('product_id')
+            product_id = self._normalize_product_id(item_data.get('product_id'))
             quantity = item_data.get('quantity', 1)
             unit_price = item_data.get('unit_price')
             
             # Validar producto
-            product = self.product_repository.get_by_id_or_404(product_id)
+            product = products.get(product_id)
+            if not product:
+                raise NotFoundError("Product", item_data.get('product_id'))
             if not product.is_active:
                 raise ValidationError(f"Product {product.name} is not active", field="product_id")
             
-            # Validar stock
-            if product.stock < quantity:
-                raise InsufficientStockError(product_id, quantity, product.stock)
+            # Validar stock (acumulado si el producto se repite en varias líneas)
+            requested[product_id] = requested.get(product_id, 0) + quantity
+            if product.stock < requested[product_id]:
+                raise InsufficientStockError(product_id, requested[product_id], product.stock)
             
             # Usar precio del producto si no se especifica
             if unit_price is None:
@@ -142,44 +176,77 @@ class SaleService:
         
         return validated_items
     
-    def _process_sale_items(self, sale, items: List[Dict[str, Any]]) -> None:
-        """Procesar items de venta y actualizar stock"""
+    @staticmethod
+    def _normalize_product_id(product_id: Any) -> Optional[int]:
+        """Normalizar el ID de producto recibido en el payload"""
+        try:
+            return int(product_id)
+        except (TypeError, ValueError):
+            return None
+    
+    def _reserve_stock(self, items: List[Dict[str, Any]]) -> Dict[int, int]:
+        """Descontar stock por producto con UPDATE condicional y devolver el stock resultante"""
+        quantities: Dict[int, int] = {}
+        for item_data in items:
+            product_id = item_data['product_id']
+            quantities[product_id] = quantities.get(product_id, 0) + item_data['quantity']
+        
+        stock_levels = {}
+        
+        for product_id, quantity in quantities.items():
+            # Ya cargado y bloqueado en la validación: se resuelve desde el identity map
+            product = self.product_repository.get_by_id(product_id)
+            if not self.product_repository.decrement_stock_if_available(product, quantity):
+                # Otra terminal vendió el stock entre la validación y la reserva
+                raise InsufficientStockError(product_id, quantity, product.stock)
+            stock_levels[product_id] = product.stock
+        
+        return stock_levels
+    
+    def _process_sale_items(self, sale, items: List[Dict[str, Any]], stock_levels: Dict[int, int]) -> List[Dict[str, Any]]:
+        """Insertar items de venta y movimientos de inventario en bloque (retorna las filas de items)"""
+        from sqlalchemy import insert
         from app.models.sale import SaleItem
         from app.models.inventory import InventoryMovement
         
+        # Stock previo a la venta, para reconstruir el movimiento línea por línea
+        running_stock = dict(stock_levels)
+        for item_data in items:
+            running_stock[item_data['product_id']] += item_data['quantity']
+        
+        sale_item_rows = []
+        movement_rows = []
+        
         for item_data in items:
             product_id = item_data['product_id']
             quantity = item_data['quantity']
-            unit_price = item_data['unit_price']
-            
-            # Crear item de venta
-            sale_item = SaleItem(
-                sale_id=sale.id,
-                product_id=product_id,
-                quantity=quantity,
-                unit_price=Decimal(str(unit_price))
-            )
+            unit_price = Decimal(str(item_data['unit_price']))
             
-            db.session.add(sale_item)
-            
-            # Actualizar stock del producto
-            product = self.product_repository.get_by_id(product_id)
-            old_stock = product.stock
-            product.stock -= quantity
+            sale_item_rows.append({
+                'sale_id': sale.id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'total_price': quantity * unit_price
+            })
             
-            # Crear movimiento de inventario
-            movement = InventoryMovement(
-                product_id=product_id,
-                movement_type='sale',
-                quantity=-quantity,  # Negativo para salida
-                reason=f'Sale #{sale.id}',
-                reference_id=sale.id,
-                reference_type='sale',
-                previous_stock=old_stock,
-                new_stock=product.stock
-            )
+            previous_stock = running_stock[product_id]
+            running_stock[product_id] = previous_stock - quantity
             
-            db.session.add(movement)
+            movement_rows.append({
+                'product_id': product_id,
+                'movement_type': 'sale',
+                'quantity': -quantity,  # Negativo para salida
+                'reason': f'Sale #{sale.id}',
+                'reference_id': sale.id,
+                'reference_type': 'sale',
+                'previous_stock': previous_stock,
+                'new_stock': running_stock[product_id]
+            })
+        
+        db.session.execute(insert(SaleItem), sale_item_rows)
+        db.session.execute(insert(InventoryMovement), movement_rows)
+        return sale_item_rows
     
     def get_sale(self, sale_id: int) -> Dict[str, Any]:
         """Obtener venta por ID"""
@@ -190,127 +257,185 @@ class SaleService:
         """Obtener ventas con filtros"""
         return self.sale_repository.get_all(page=page, per_page=per_page, **filters)
     
+    def get_sales_listing(self, fields: Optional[str] = None, page: int = 1, per_page: int = 20,
+                          cursor: Optional[str] = None, include_total: bool = True,
+                          **filters) -> Dict[str, Any]:
+        """Listado de ventas serializado desde filas, con campos dispersos (?fields=)
+        
+        Selecciona solo las columnas pedidas y carga los items de toda la página
+        en una única consulta adicional, sin hidratar objetos ORM.
+        """
+        from app.models.sale import Sale, SaleItem
+        from app.schemas.row_serializers import SALE_SERIALIZER, SALE_ITEM_SERIALIZER
+        
+        names, nested = SALE_SERIALIZER.parse_fields(fields)
+        key_columns = [getattr(Sale, name) for name in self.sale_repository.cursor_columns]
+        plan = SALE_SERIALIZER.plan(names, extra_columns=key_columns + [Sale.id])
+        
+        result = self.sale_repository.get_all(
+            page=page, per_page=per_page, cursor=cursor, include_total=include_total,
+            plan=plan, **filters
+        )
+        rows = result['items']
+        sales = plan.dump(rows)
+        
+        if 'items' in nested:
+            item_plan = SALE_ITEM_SERIALIZER.plan(nested['items'], extra_columns=[SaleItem.sale_id])
+            items_by_sale = self.sale_repository.get_item_rows(
+                [plan.value(row, 'id') for row in rows], item_plan
+            )
+            for sale, row in zip(sales, rows):
+                sale['items'] = item_plan.dump(items_by_sale[plan.value(row, 'id')])
+        
+        return {
+            'sales': sales,
+            'pagination': result['pagination']
+        }
+    
     def get_sales_by_user(self, user_id: int, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
         """Obtener ventas por usuario"""
         return self.sale_repository.get_all(page=page, per_page=per_page, user_id=user_id)
     
     def cancel_sale(self, sale_id: int, reason: str = "Cancelled by user") -> Dict[str, Any]:
         """Cancelar venta y revertir stock"""
-        sale = self.sale_repository.get_by_id_or_404(sale_id)
-        
-        if sale.status == 'cancelled':
-            raise BusinessLogicError("Sale is already cancelled", operation="cancel_sale")
+        from sqlalchemy import insert
+        from app.models.inventory import InventoryMovement
         
-        # Revertir stock para cada item
-        for item in sale.items:
-            product = self.product_repository.get_by_id(item.product_id)
-            product.stock += item.quantity
+        with unit_of_work():
+            sale = self.sale_repository.get_by_id_or_404(sale_id)
+            
+            if sale.status == 'cancelled':
+                raise BusinessLogicError("Sale is already cancelled", operation="cancel_sale")
             
-            # Crear movimiento de inventario de reversión
-            from app.models.inventory import InventoryMovement
-            movement = InventoryMovement(
-                product_id=item.product_id,
-                movement_type='adjustment',
-                quantity=item.quantity,
-                reason=f'Sale cancellation - {reason}',
-                reference_id=sale.id,
-                reference_type='sale_cancellation',
-                previous_stock=product.stock - item.quantity,
-                new_stock=product.stock
+            # Cargar y bloquear todos los productos de la venta en una sola consulta
+            products = self.product_repository.get_many_for_update(
+                [item.product_id for item in sale.items]
             )
+            movement_rows = []
             
-            db.session.add(movement)
-        
-        # Actualizar estado de la venta
-        sale.status = 'cancelled'
-        sale.notes = f"{sale.notes or ''}\nCancelled: {reason}".strip()
-        
-        db.session.commit()
+            # Revertir stock para cada item
+            for item in sale.items:
+                product = products[item.product_id]
+                previous_stock = product.stock
+                product.stock += item.quantity
+                
+                # Movimiento de inventario de reversión
+                movement_rows.append({
+                    'product_id': item.product_id,
+                    'movement_type': 'adjustment',
+                    'quantity': item.quantity,
+                    'reason': f'Sale cancellation - {reason}',
+                    'reference_id': sale.id,
+                    'reference_type': 'sale_cancellation',
+                    'previous_stock': previous_stock,
+                    'new_stock': product.stock
+                })
+            
+            if movement_rows:
+                db.session.execute(insert(InventoryMovement), movement_rows)
+            
+            # Descontar la venta de los agregados antes de marcarla cancelada
+            sales_rollup_service.apply([self._rollup_fact(sale)], sign=-1)
+            
+            # Actualizar estado de la venta
+            sale.status = 'cancelled'
+            sale.notes = f"{sale.notes or ''}\nCancelled: {reason}".strip()
+            
+            db.session.flush()
+            sale_dict = sale.to_dict()
         
-        return sale.to_dict()
+        return sale_dict
 
     def update_sale(self, sale_id: int, updates: Dict[str, Any]) -> Dict[str, Any]:
         """Actualizar metadatos de la venta (estado, notas, método de pago, impuestos/discount)"""
-        sale = self.sale_repository.get_by_id_or_404(sale_id)
+        with unit_of_work():
+            sale = self.sale_repository.get_by_id_or_404(sale_id)
 
-        # Estado con control de transición
-        new_status = updates.get('status')
-        if new_status:
-            allowed_status = {'completed', 'pending', 'refunded', 'cancelled'}
-            if new_status not in allowed_status:
-                raise ValidationError(f"Invalid status '{new_status}'", field="status")
-            if new_status == 'cancelled' and sale.status != 'cancelled':
-                # Reusar lógica de cancelación para stock
-                return self.cancel_sale(sale_id, reason=updates.get('reason', 'Updated via API'))
-            sale.status = new_status
+            # Estado con control de transición
+            new_status = updates.get('status')
+            if new_status:
+                allowed_status = {'completed', 'pending', 'refunded', 'cancelled'}
+                if new_status not in allowed_status:
+                    raise ValidationError(f"Invalid status '{new_status}'", field="status")
+                if new_status == 'cancelled' and sale.status != 'cancelled':
+                    # Reusar lógica de cancelación para stock
+                    return self.cancel_sale(sale_id, reason=updates.get('reason', 'Updated via API'))
 
-        if 'notes' in updates:
-            sale.notes = updates.get('notes')
+            # Método de pago, impuestos y descuentos cambian los agregados: se resta
+            # la versión anterior de la venta y se suma la nueva
+            affects_rollups = sale.status != 'cancelled' and any(
+                key in updates for key in ('payment_method', 'discount_amount', 'tax_rate')
+            )
+            if affects_rollups:
+                sales_rollup_service.apply([self._rollup_fact(sale)], sign=-1)
 
-        if 'payment_method' in updates:
-            sale.payment_method = updates.get('payment_method') or sale.payment_method
+            if new_status:
+                sale.status = new_status
 
-        if 'payment_reference' in updates:
-            sale.payment_reference = updates.get('payment_reference')
+            if 'notes' in updates:
+                sale.notes = updates.get('notes')
 
-        if 'discount_amount' in updates:
-            sale.apply_discount(updates.get('discount_amount', 0))
+            if 'payment_method' in updates:
+                sale.payment_method = updates.get('payment_method') or sale.payment_method
 
-        if 'tax_rate' in updates:
-            sale.apply_tax(updates.get('tax_rate', 0))
+            if 'payment_reference' in updates:
+                sale.payment_reference = updates.get('payment_reference')
 
-        db.session.commit()
-        return sale.to_dict()
+            if 'discount_amount' in updates:
+                sale.apply_discount(updates.get('discount_amount', 0))
+
+            if 'tax_rate' in updates:
+                sale.apply_tax(updates.get('tax_rate', 0))
+
+            if affects_rollups:
+                sales_rollup_service.apply([self._rollup_fact(sale)])
+
+            db.session.flush()
+            return sale.to_dict()
+    
+    def _rollup_fact(self, sale) -> Dict[str, Any]:
+        """Describir una venta persistida (con sus items ORM) para los agregados"""
+        seller = self.user_repository.get_by_id(sale.user_id)
+        return sales_rollup_service.sale_fact(
+            sale,
+            [
+                {'product_id': item.product_id, 'quantity': item.quantity, 'total_price': item.total_price}
+                for item in sale.items
+            ],
+            seller.assigned_store_id if seller else None
+        )
     
     def get_sales_stats(self, user_id: Optional[int] = None) -> Dict[str, Any]:
-        """Obtener estadísticas de ventas"""
-        from sqlalchemy import func, desc
-        from app.models.sale import Sale
-        
-        query = Sale.query
-        
-        if user_id:
-            query = query.filter_by(user_id=user_id)
+        """Obtener estadísticas de ventas (desde los agregados, sin recorrer sales)"""
+        from datetime import date
         
-        # Estadísticas básicas
-        total_sales = query.count()
-        total_amount = query.with_entities(func.sum(Sale.total_amount)).scalar() or 0
+        totals = sales_rollup_service.get_totals(seller_id=user_id)
         
         # Ventas del día
-        from datetime import datetime, date
         today = date.today()
-        today_sales = query.filter(
-            func.date(Sale.created_at) == today
-        ).count()
-        
-        today_amount = query.filter(
-            func.date(Sale.created_at) == today
-        ).with_entities(func.sum(Sale.total_amount)).scalar() or 0
-        
-        # Promedio por venta
-        avg_sale_amount = float(total_amount / total_sales) if total_sales > 0 else 0
+        today_totals = sales_rollup_service.get_totals(today, today, seller_id=user_id)
         
         return {
-            'total_sales': total_sales,
-            'total_amount': float(total_amount),
-            'today_sales': today_sales,
-            'today_amount': float(today_amount),
-            'average_sale_amount': avg_sale_amount
+            'total_sales': totals['sales'],
+            'total_amount': totals['revenue'],
+            'today_sales': today_totals['sales'],
+            'today_amount': today_totals['revenue'],
+            'average_sale_amount': totals['average_sale']
         }
 
     def _get_ai_recommendations(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Obtener recomendaciones de productos basadas en el primer item (mejor esfuerzo)"""
+        """Obtener recomendaciones precalculadas para el primer item (mejor esfuerzo)"""
         try:
             if not items:
                 return []
-            from app.services.ai_service import AIService
+            from app.services.ai_recommendation_service import ai_recommendation_service
 
             first_product_id = items[0].get('product_id')
             if not first_product_id:
                 return []
 
-            ai_service = AIService()
-            return ai_service.get_recommendations(first_product_id, limit=5) or []
+            # Tabla precalculada vía cache en proceso: sin entrenar modelos ni consultar el catálogo
+            return ai_recommendation_service.get_recommendations(first_product_id, limit=5)
         except Exception as e:  # pragma: no cover - IA opcional
             logger.warning(f"AI recommendations unavailable: {e}")
             return []
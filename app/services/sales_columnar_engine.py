@@ -0,0 +1,333 @@
+"""
+Sales Columnar Engine - Sistema POS O'Data
+=========================================
+Carga un período de ventas como arrays tipados de NumPy (una fila por venta y
+una por línea) con dos consultas proyectadas y calcula los agrupamientos de
+los reportes consolidados con group-by vectorizado (np.unique + np.bincount),
+sin instanciar objetos ORM ni recorrer relaciones lazy.
+
+Las consultas se ejecutan en la conexión Core de la sesión (sin la capa ORM
+de resultados); los importes Numeric se leen con CAST a Float y las fechas
+sin el procesador de DateTime, así que no se crea un Decimal ni se analiza
+un texto en Python por valor.
+"""
+
+import gc
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Float, String, cast, select, func, or_, type_coerce
+
+from app import db
+from app.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY_MODES = ('store', 'product', 'category', 'user', 'day', 'hour')
+LINE_GROUP_MODES = ('product', 'category')
+
+
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+@contextmanager
+def _gc_paused():
+    """Pausar el recolector cíclico durante la lectura masiva
+
+    Cada partición crea cientos de miles de filas y tuplas de vida corta; con
+    el recolector activo se disparan recolecciones completas que recorren
+    todos los objetos del proceso (app, modelos de IA) y duplican el tiempo
+    de carga. Las filas no forman ciclos, así que no hay nada que recolectar.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _datetime64(values: Tuple[Any, ...]) -> np.ndarray:
+    """Fechas a datetime64[s]: texto ISO (SQLite) o datetime naive (PostgreSQL/MySQL)
+
+    El texto lo interpreta NumPy; los datetime se convierten por segundos
+    enteros (np.array sobre objetos datetime es ~10x más lento).
+    """
+    if values and isinstance(values[0], str):
+        return np.array(values, dtype='datetime64[us]').astype('datetime64[s]')
+    seconds = np.fromiter(
+        ((value.toordinal() - _EPOCH_ORDINAL) * 86400 + value.hour * 3600 + value.minute * 60 + value.second
+         for value in values),
+        dtype=np.int64, count=len(values)
+    )
+    return seconds.view('datetime64[s]')
+
+
+def _factorize(values: List[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """Códigos enteros para valores categóricos de baja cardinalidad"""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int32, count=len(values))
+    return codes, list(index)
+
+
+class SalesColumns:
+    """Período de ventas en columnas tipadas
+
+    Ventas (ordenadas por id): sale_id, user_id, store_id (0 = vendedor sin
+    tienda), customer_id (-1 = sin cliente), payment_code, created_at
+    (datetime64[s]), subtotal, tax, total e items (unidades por venta).
+    Líneas: line_sale (índice de la venta), product_id, category_code,
+    quantity, line_total.
+    """
+
+    SALE_CHUNK = 20000
+
+    def __init__(self):
+        self.sale_id = np.empty(0, dtype=np.int64)
+        self.user_id = np.empty(0, dtype=np.int64)
+        self.store_id = np.empty(0, dtype=np.int64)
+        self.customer_id = np.empty(0, dtype=np.int64)
+        self.payment_code = np.empty(0, dtype=np.int32)
+        self.created_at = np.empty(0, dtype='datetime64[s]')
+        self.subtotal = np.empty(0, dtype=np.float64)
+        self.tax = np.empty(0, dtype=np.float64)
+        self.total = np.empty(0, dtype=np.float64)
+        self.items = np.empty(0, dtype=np.int64)
+
+        self.line_sale = np.empty(0, dtype=np.int64)
+        self.product_id = np.empty(0, dtype=np.int64)
+        self.category_code = np.empty(0, dtype=np.int32)
+        self.quantity = np.empty(0, dtype=np.int64)
+        self.line_total = np.empty(0, dtype=np.float64)
+
+        self.payment_methods: List[str] = []
+        self.categories: List[str] = []
+        self.product_names: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.sale_id)
+
+    @classmethod
+    def load(cls, start_date: datetime, end_date: datetime, store_ids: Optional[List[int]] = None,
+             chunk_size: int = None) -> 'SalesColumns':
+        """Cargar ventas y líneas del período [start_date, end_date] (excluye anuladas)
+
+        Las filas se leen en particiones de chunk_size y se convierten a arrays
+        por columna; la memoria pico es la de los arrays más una partición.
+        """
+        with _gc_paused():
+            return cls._load(start_date, end_date, store_ids, chunk_size or cls.SALE_CHUNK)
+
+    @classmethod
+    def _load(cls, start_date: datetime, end_date: datetime, store_ids: Optional[List[int]],
+              chunk_size: int) -> 'SalesColumns':
+        from app.models.sale import Sale, SaleItem
+        from app.models.user import User
+        from app.models.product import Product
+
+        columns = cls()
+
+        conditions = [
+            Sale.created_at >= start_date,
+            Sale.created_at <= end_date,
+            or_(Sale.status.is_(None), Sale.status != 'cancelled')
+        ]
+        # Las ventas no guardan tienda: se usa la tienda asignada al vendedor
+        if store_ids:
+            conditions.append(User.assigned_store_id.in_(store_ids))
+
+        sales_stmt = select(
+            Sale.id, Sale.user_id, func.coalesce(User.assigned_store_id, 0), func.coalesce(Sale.customer_id, -1),
+            Sale.payment_method, type_coerce(Sale.created_at, String), cast(Sale.subtotal, Float),
+            cast(func.coalesce(Sale.tax_amount, 0), Float), cast(Sale.total_amount, Float)
+        ).join(User, User.id == Sale.user_id).where(*conditions)
+
+        # Ambas consultas en la conexión (y transacción) de la sesión
+        connection = db.session.connection()
+
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in (
+            'sale_id', 'user_id', 'store_id', 'customer_id', 'created_at', 'subtotal', 'tax', 'total'
+        )}
+        payment_methods: List[str] = []
+        for chunk in connection.execute(sales_stmt.execution_options(yield_per=chunk_size)).partitions():
+            ids, users, stores, customers, methods, created, subtotals, taxes, totals = zip(*chunk)
+            parts['sale_id'].append(np.fromiter(ids, dtype=np.int64, count=len(chunk)))
+            parts['user_id'].append(np.fromiter(users, dtype=np.int64, count=len(chunk)))
+            parts['store_id'].append(np.fromiter(stores, dtype=np.int64, count=len(chunk)))
+            parts['customer_id'].append(np.fromiter(customers, dtype=np.int64, count=len(chunk)))
+            parts['created_at'].append(_datetime64(created))
+            parts['subtotal'].append(np.fromiter(subtotals, dtype=np.float64, count=len(chunk)))
+            parts['tax'].append(np.fromiter(taxes, dtype=np.float64, count=len(chunk)))
+            parts['total'].append(np.fromiter(totals, dtype=np.float64, count=len(chunk)))
+            payment_methods.extend(method or '' for method in methods)
+
+        if not parts['sale_id']:
+            return columns
+
+        for name, chunks in parts.items():
+            setattr(columns, name, np.concatenate(chunks))
+        columns.payment_code, columns.payment_methods = _factorize(payment_methods)
+
+        # Orden por id en NumPy (un ORDER BY obliga a la base a ordenar en un B-tree temporal)
+        order = np.argsort(columns.sale_id, kind='stable')
+        for name in (*parts, 'payment_code'):
+            setattr(columns, name, getattr(columns, name)[order])
+
+        lines_stmt = select(
+            SaleItem.sale_id, SaleItem.product_id, SaleItem.quantity, cast(SaleItem.total_price, Float)
+        ).join(Sale, Sale.id == SaleItem.sale_id)
+        if store_ids:
+            lines_stmt = lines_stmt.join(User, User.id == Sale.user_id)
+        lines_stmt = lines_stmt.where(*conditions)
+
+        line_parts: Dict[str, List[np.ndarray]] = {name: [] for name in (
+            'line_sale', 'product_id', 'quantity', 'line_total'
+        )}
+        for chunk in connection.execute(lines_stmt.execution_options(yield_per=chunk_size * 4)).partitions():
+            sale_ids, products, quantities, totals = zip(*chunk)
+            line_parts['line_sale'].append(np.fromiter(sale_ids, dtype=np.int64, count=len(chunk)))
+            line_parts['product_id'].append(np.fromiter(products, dtype=np.int64, count=len(chunk)))
+            line_parts['quantity'].append(np.fromiter(quantities, dtype=np.int64, count=len(chunk)))
+            line_parts['line_total'].append(np.fromiter(totals, dtype=np.float64, count=len(chunk)))
+
+        if line_parts['line_sale']:
+            line_columns = {name: np.concatenate(chunks) for name, chunks in line_parts.items()}
+            # sale_id -> posición en los arrays de ventas (ordenados por id). Con
+            # READ COMMITTED la segunda consulta puede ver ventas confirmadas (o
+            # anuladas) después de la primera: se descartan las líneas cuya venta
+            # no está en el período cargado en lugar de atribuirlas a otra
+            positions = np.minimum(np.searchsorted(columns.sale_id, line_columns['line_sale']), len(columns) - 1)
+            loaded = columns.sale_id[positions] == line_columns['line_sale']
+            if not loaded.all():
+                positions = positions[loaded]
+                line_columns = {name: values[loaded] for name, values in line_columns.items()}
+            for name, values in line_columns.items():
+                setattr(columns, name, values)
+            columns.line_sale = positions
+
+        if len(columns.line_sale):
+            columns.items = np.bincount(columns.line_sale, weights=columns.quantity,
+                                        minlength=len(columns)).astype(np.int64)
+
+            product_ids = np.unique(columns.product_id)
+            category_by_product: Dict[int, str] = {}
+            for product_id, name, category in db.session.query(Product.id, Product.name, Product.category).filter(
+                Product.id.in_(product_ids.tolist())
+            ):
+                columns.product_names[product_id] = name
+                category_by_product[product_id] = category or ''
+            product_codes, columns.categories = _factorize(
+                [category_by_product.get(int(product_id), '') for product_id in product_ids]
+            )
+            columns.category_code = product_codes[np.searchsorted(product_ids, columns.product_id)]
+        else:
+            columns.items = np.zeros(len(columns), dtype=np.int64)
+
+        return columns
+
+    # ------------------------------------------------------------------
+    # Agregaciones
+    # ------------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        """Totales del período"""
+        total_sales = len(self)
+        total_revenue = float(self.total.sum())
+        return {
+            'total_sales': total_sales,
+            'total_revenue': round(total_revenue, 2),
+            'total_tax': round(float(self.tax.sum()), 2),
+            'average_sale_value': round(total_revenue / total_sales, 2) if total_sales else 0,
+            'stores_involved': int(np.unique(self.store_id).size),
+            'unique_customers': int(np.unique(self.customer_id[self.customer_id >= 0]).size)
+        }
+
+    def _sale_keys(self, group_by: str) -> np.ndarray:
+        if group_by == 'store':
+            return self.store_id
+        if group_by == 'user':
+            return self.user_id
+        if group_by == 'day':
+            return self.created_at.astype('datetime64[D]')
+        return self.created_at.astype('datetime64[h]')
+
+    def group(self, group_by: str) -> Dict[str, np.ndarray]:
+        """Agrupar el período: claves, ventas, ingresos, impuestos e items por grupo
+
+        Para producto y categoría los ingresos son los de las líneas del grupo,
+        el impuesto se prorratea por la participación de la línea en el
+        subtotal y las ventas cuentan una vez por grupo. Devuelve además
+        'group_index' (grupo por venta o por línea) para los detalles.
+        """
+        if group_by not in GROUP_BY_MODES:
+            raise ValidationError(f"group_by debe ser uno de: {', '.join(GROUP_BY_MODES)}", field='group_by',
+                                  value=group_by)
+
+        if group_by in LINE_GROUP_MODES:
+            line_keys = self.product_id if group_by == 'product' else self.category_code
+            keys, inverse = np.unique(line_keys, return_inverse=True)
+            groups = len(keys)
+
+            sale_subtotal = self.subtotal[self.line_sale]
+            share = np.divide(self.line_total, sale_subtotal, out=np.zeros_like(self.line_total),
+                              where=sale_subtotal != 0)
+
+            # Ventas distintas por grupo: pares (grupo, venta) únicos
+            pairs = np.unique(inverse.astype(np.int64) * max(len(self), 1) + self.line_sale)
+            sales = np.bincount(pairs // max(len(self), 1), minlength=groups)
+
+            return {
+                'keys': keys,
+                'sales': sales,
+                'revenue': np.bincount(inverse, weights=self.line_total, minlength=groups),
+                'tax': np.bincount(inverse, weights=share * self.tax[self.line_sale], minlength=groups),
+                'items': np.bincount(inverse, weights=self.quantity, minlength=groups).astype(np.int64),
+                'group_index': inverse
+            }
+
+        keys, inverse = np.unique(self._sale_keys(group_by), return_inverse=True)
+        groups = len(keys)
+        return {
+            'keys': keys,
+            'sales': np.bincount(inverse, minlength=groups),
+            'revenue': np.bincount(inverse, weights=self.total, minlength=groups),
+            'tax': np.bincount(inverse, weights=self.tax, minlength=groups),
+            'items': np.bincount(inverse, weights=self.items, minlength=groups).astype(np.int64),
+            'group_index': inverse
+        }
+
+    def group_sale_positions(self, group_by: str, grouped: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        """Posiciones de las ventas de cada grupo (solo para include_details)"""
+        group_index = grouped['group_index']
+        if group_by in LINE_GROUP_MODES:
+            pairs = np.unique(np.stack([group_index, self.line_sale], axis=1), axis=0)
+            group_index, positions = pairs[:, 0], pairs[:, 1]
+        else:
+            positions = np.arange(len(self))
+        order = np.argsort(group_index, kind='stable')
+        bounds = np.searchsorted(group_index[order], np.arange(len(grouped['keys']) + 1))
+        return [positions[order[bounds[i]:bounds[i + 1]]] for i in range(len(grouped['keys']))]
+
+    def sale_details(self, positions: np.ndarray) -> List[Dict[str, Any]]:
+        """Detalle de ventas para las posiciones dadas"""
+        return [
+            {
+                'sale_id': int(self.sale_id[i]),
+                'sale_number': int(self.sale_id[i]),
+                'total': round(float(self.total[i]), 2),
+                'tax_amount': round(float(self.tax[i]), 2),
+                'created_at': self.created_at[i].item().isoformat(),
+                'customer_id': int(self.customer_id[i]) if self.customer_id[i] >= 0 else None,
+                'payment_method': self.payment_methods[self.payment_code[i]]
+            }
+            for i in positions.tolist()
+        ]
+
+    def daily_series(self) -> Dict[str, np.ndarray]:
+        """Ventas e ingresos por día (claves datetime64[D] ordenadas)"""
+        grouped = self.group('day')
+        return {'days': grouped['keys'], 'sales': grouped['sales'], 'revenue': grouped['revenue']}
@@ -0,0 +1,504 @@
+"""
+Sales Rollup Service - Sistema POS O'Data
+========================================
+Mantiene los agregados de ventas (hora/día × tienda × vendedor × método de
+pago, y día × tienda × producto) dentro de la transacción de cada venta o
+anulación, y ofrece las consultas que usan dashboards y reportes.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import func, desc, and_, or_, case
+
+from app import db
+from app.exceptions import ValidationError
+from app.models.sales_rollup import SalesHourlyRollup, ProductDailyRollup
+
+logger = logging.getLogger(__name__)
+
+DateLike = Union[date, datetime, None]
+
+HOURLY_KEYS = ('bucket_date', 'bucket_hour', 'store_id', 'seller_id', 'payment_method')
+HOURLY_MEASURES = ('sale_count', 'items_sold', 'subtotal', 'tax_amount', 'discount_amount', 'total_amount')
+PRODUCT_KEYS = ('bucket_date', 'store_id', 'product_id')
+PRODUCT_MEASURES = ('quantity', 'revenue', 'line_count')
+
+BREAKDOWN_DIMENSIONS = ('payment_method', 'seller_id', 'store_id')
+
+
+def _decimal(value: Any) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value or 0))
+
+
+def _as_date(value: DateLike) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class SalesRollupService:
+    """Escritura incremental y lectura de los agregados de ventas"""
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def sale_fact(sale: Any, items: Iterable[Dict[str, Any]], store_id: Optional[int]) -> Dict[str, Any]:
+        """Describir una venta para los agregados (items con product_id, quantity, total_price)"""
+        return {
+            'created_at': sale.created_at,
+            'store_id': store_id,
+            'seller_id': sale.user_id,
+            'payment_method': sale.payment_method,
+            'subtotal': sale.subtotal,
+            'tax_amount': sale.tax_amount,
+            'discount_amount': sale.discount_amount,
+            'total_amount': sale.total_amount,
+            'items': [
+                {
+                    'product_id': item['product_id'],
+                    'quantity': item['quantity'],
+                    'total_price': item['total_price']
+                }
+                for item in items
+            ]
+        }
+
+    def apply(self, sales: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+        """Sumar (sign=1) o restar (sign=-1, anulación) ventas a los agregados
+
+        Se ejecuta en la transacción del llamador: las ventas de un lote se
+        agregan en memoria y se escriben con un upsert por tabla.
+        """
+        now = datetime.utcnow()
+        hourly: Dict[Tuple, Dict[str, Any]] = {}
+        products: Dict[Tuple, Dict[str, Any]] = {}
+
+        for fact in sales:
+            created_at = fact.get('created_at') or now
+            day = created_at.date()
+            store_id = fact.get('store_id') or 0
+
+            key = (day, created_at.hour, store_id, fact['seller_id'], fact.get('payment_method') or '')
+            bucket = hourly.get(key)
+            if bucket is None:
+                bucket = hourly[key] = {
+                    'sale_count': 0, 'items_sold': 0, 'subtotal': Decimal('0'),
+                    'tax_amount': Decimal('0'), 'discount_amount': Decimal('0'), 'total_amount': Decimal('0')
+                }
+            bucket['sale_count'] += sign
+            for measure in ('subtotal', 'tax_amount', 'discount_amount', 'total_amount'):
+                bucket[measure] += sign * _decimal(fact.get(measure))
+
+            for item in fact['items']:
+                bucket['items_sold'] += sign * item['quantity']
+
+                product_key = (day, store_id, item['product_id'])
+                product_bucket = products.get(product_key)
+                if product_bucket is None:
+                    product_bucket = products[product_key] = {
+                        'quantity': 0, 'revenue': Decimal('0'), 'line_count': 0
+                    }
+                product_bucket['quantity'] += sign * item['quantity']
+                product_bucket['revenue'] += sign * _decimal(item['total_price'])
+                product_bucket['line_count'] += sign
+
+        self._upsert(SalesHourlyRollup, HOURLY_KEYS, HOURLY_MEASURES, [
+            dict(zip(HOURLY_KEYS, key), updated_at=now, **measures) for key, measures in hourly.items()
+        ])
+        self._upsert(ProductDailyRollup, PRODUCT_KEYS, PRODUCT_MEASURES, [
+            dict(zip(PRODUCT_KEYS, key), updated_at=now, **measures) for key, measures in products.items()
+        ])
+
+    def _upsert(self, model: Any, keys: Tuple[str, ...], measures: Tuple[str, ...],
+                rows: List[Dict[str, Any]]) -> None:
+        """Insertar filas de agregados o sumar sus medidas si la clave ya existe"""
+        if not rows:
+            return
+
+        table = model.__table__
+        dialect = db.session.get_bind().dialect.name
+
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+            statement = dialect_insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={
+                    **{name: table.c[name] + statement.excluded[name] for name in measures},
+                    'updated_at': statement.excluded.updated_at
+                }
+            )
+            db.session.execute(statement, rows)
+        elif dialect in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import insert as dialect_insert
+
+            statement = dialect_insert(table)
+            statement = statement.on_duplicate_key_update({
+                **{name: table.c[name] + statement.inserted[name] for name in measures},
+                'updated_at': statement.inserted.updated_at
+            })
+            db.session.execute(statement, rows)
+        else:
+            # Sin upsert nativo: UPDATE y, si no existía la clave, INSERT
+            for row in rows:
+                result = db.session.execute(
+                    table.update().where(and_(*[table.c[name] == row[name] for name in keys])).values(
+                        **{name: table.c[name] + row[name] for name in measures},
+                        updated_at=row['updated_at']
+                    )
+                )
+                if result.rowcount == 0:
+                    db.session.execute(table.insert(), row)
+
+    def rebuild(self, start_date: DateLike = None, end_date: DateLike = None, chunk_size: int = 2000) -> Dict[str, Any]:
+        """Reconstruir los agregados desde sales/sale_items para un rango de días (inclusivo)
+
+        Pensado para el backfill inicial o para corregir un rango; conviene
+        ejecutarlo fuera de horario porque no coordina con ventas concurrentes.
+        """
+        from app.models.sale import Sale, SaleItem
+        from app.models.user import User
+        from app.repositories.base_repository import unit_of_work
+
+        start_day, end_day = _as_date(start_date), _as_date(end_date)
+        processed = 0
+
+        with unit_of_work():
+            for model in (SalesHourlyRollup, ProductDailyRollup):
+                query = model.query
+                if start_day:
+                    query = query.filter(model.bucket_date >= start_day)
+                if end_day:
+                    query = query.filter(model.bucket_date <= end_day)
+                query.delete(synchronize_session=False)
+
+            store_by_seller = dict(db.session.query(User.id, User.assigned_store_id).all())
+
+            sales_query = db.session.query(
+                Sale.id, Sale.created_at, Sale.user_id, Sale.payment_method, Sale.subtotal,
+                Sale.tax_amount, Sale.discount_amount, Sale.total_amount
+            ).filter(or_(Sale.status.is_(None), Sale.status != 'cancelled'))
+            if start_day:
+                sales_query = sales_query.filter(Sale.created_at >= datetime.combine(start_day, datetime.min.time()))
+            if end_day:
+                sales_query = sales_query.filter(
+                    Sale.created_at < datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+                )
+
+            last_id = 0
+            while True:
+                chunk = sales_query.filter(Sale.id > last_id).order_by(Sale.id).limit(chunk_size).all()
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+
+                items_by_sale: Dict[int, List[Dict[str, Any]]] = {row.id: [] for row in chunk}
+                for item in db.session.query(
+                    SaleItem.sale_id, SaleItem.product_id, SaleItem.quantity, SaleItem.total_price
+                ).filter(SaleItem.sale_id.in_(list(items_by_sale))):
+                    items_by_sale[item.sale_id].append({
+                        'product_id': item.product_id,
+                        'quantity': item.quantity,
+                        'total_price': item.total_price
+                    })
+
+                self.apply([
+                    {
+                        'created_at': row.created_at,
+                        'store_id': store_by_seller.get(row.user_id),
+                        'seller_id': row.user_id,
+                        'payment_method': row.payment_method,
+                        'subtotal': row.subtotal,
+                        'tax_amount': row.tax_amount,
+                        'discount_amount': row.discount_amount,
+                        'total_amount': row.total_amount,
+                        'items': items_by_sale[row.id]
+                    }
+                    for row in chunk
+                ])
+                processed += len(chunk)
+                db.session.flush()
+
+        logger.info(f"Sales rollups rebuilt: {processed} sales ({start_day} - {end_day})")
+        return {
+            'sales_processed': processed,
+            'start_date': start_day.isoformat() if start_day else None,
+            'end_date': end_day.isoformat() if end_day else None
+        }
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _filter_range(query: Any, model: Any, start_date: DateLike, end_date: DateLike,
+                      store_id: Optional[int], seller_id: Optional[int] = None) -> Any:
+        """Filtrar por rango de días inclusivo, tienda y vendedor"""
+        start_day, end_day = _as_date(start_date), _as_date(end_date)
+        if start_day:
+            query = query.filter(model.bucket_date >= start_day)
+        if end_day:
+            query = query.filter(model.bucket_date <= end_day)
+        if store_id is not None:
+            query = query.filter(model.store_id == store_id)
+        if seller_id is not None:
+            query = query.filter(model.seller_id == seller_id)
+        return query
+
+    def get_totals(self, start_date: DateLike = None, end_date: DateLike = None,
+                   store_id: Optional[int] = None, seller_id: Optional[int] = None) -> Dict[str, Any]:
+        """Totales del rango: ventas, ingresos, unidades y promedio por venta"""
+        row = self._filter_range(db.session.query(
+            func.coalesce(func.sum(SalesHourlyRollup.sale_count), 0),
+            func.coalesce(func.sum(SalesHourlyRollup.total_amount), 0),
+            func.coalesce(func.sum(SalesHourlyRollup.items_sold), 0),
+            func.coalesce(func.sum(SalesHourlyRollup.subtotal), 0),
+            func.coalesce(func.sum(SalesHourlyRollup.tax_amount), 0),
+            func.coalesce(func.sum(SalesHourlyRollup.discount_amount), 0)
+        ), SalesHourlyRollup, start_date, end_date, store_id, seller_id).one()
+
+        sales, revenue = int(row[0]), float(row[1])
+        return {
+            'sales': sales,
+            'revenue': revenue,
+            'items_sold': int(row[2]),
+            'subtotal': float(row[3]),
+            'tax_amount': float(row[4]),
+            'discount_amount': float(row[5]),
+            'average_sale': revenue / sales if sales else 0.0
+        }
+
+    def get_daily_series(self, start_date: DateLike = None, end_date: DateLike = None,
+                         store_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Serie diaria de ventas e ingresos"""
+        rows = self._filter_range(db.session.query(
+            SalesHourlyRollup.bucket_date,
+            func.sum(SalesHourlyRollup.sale_count),
+            func.sum(SalesHourlyRollup.total_amount),
+            func.sum(SalesHourlyRollup.items_sold)
+        ), SalesHourlyRollup, start_date, end_date, store_id).group_by(
+            SalesHourlyRollup.bucket_date
+        ).order_by(SalesHourlyRollup.bucket_date).all()
+
+        return [
+            {
+                'date': bucket_date.isoformat(),
+                'sales': int(sales or 0),
+                'revenue': float(revenue or 0),
+                'items_sold': int(items_sold or 0)
+            }
+            for bucket_date, sales, revenue, items_sold in rows
+        ]
+
+    def get_hourly_series(self, start_date: DateLike, end_date: DateLike = None,
+                          store_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ventas e ingresos por hora del día (un día o el acumulado de un rango)"""
+        rows = self._filter_range(db.session.query(
+            SalesHourlyRollup.bucket_hour,
+            func.sum(SalesHourlyRollup.sale_count),
+            func.sum(SalesHourlyRollup.total_amount)
+        ), SalesHourlyRollup, start_date, end_date or start_date, store_id).group_by(
+            SalesHourlyRollup.bucket_hour
+        ).order_by(SalesHourlyRollup.bucket_hour).all()
+
+        return [
+            {'hour': hour, 'sales': int(sales or 0), 'revenue': float(revenue or 0)}
+            for hour, sales, revenue in rows
+        ]
+
+    def get_breakdown(self, dimension: str, start_date: DateLike = None, end_date: DateLike = None,
+                      store_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ventas e ingresos agrupados por método de pago, vendedor o tienda"""
+        if dimension not in BREAKDOWN_DIMENSIONS:
+            raise ValidationError(f"Unsupported rollup dimension '{dimension}'", field='dimension', value=dimension)
+
+        column = getattr(SalesHourlyRollup, dimension)
+        revenue = func.sum(SalesHourlyRollup.total_amount)
+        rows = self._filter_range(db.session.query(
+            column, func.sum(SalesHourlyRollup.sale_count), revenue
+        ), SalesHourlyRollup, start_date, end_date, store_id).group_by(column).order_by(desc(revenue)).all()
+
+        return [
+            {'key': key, 'sales': int(sales or 0), 'revenue': float(total or 0)}
+            for key, sales, total in rows
+        ]
+
+    def get_category_breakdown(self, start_date: DateLike = None, end_date: DateLike = None,
+                               store_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Unidades e ingresos por categoría de producto"""
+        from app.models.product import Product
+
+        revenue = func.sum(ProductDailyRollup.revenue)
+        rows = self._filter_range(db.session.query(
+            Product.category,
+            func.sum(ProductDailyRollup.quantity),
+            revenue,
+            func.count(func.distinct(Product.id))
+        ).join(
+            Product, Product.id == ProductDailyRollup.product_id
+        ), ProductDailyRollup, start_date, end_date, store_id).group_by(
+            Product.category
+        ).order_by(desc(revenue)).all()
+
+        return [
+            {
+                'category': category,
+                'quantity_sold': int(sold or 0),
+                'revenue': float(total or 0),
+                'unique_products': int(unique or 0)
+            }
+            for category, sold, total, unique in rows
+        ]
+
+    def get_top_products(self, start_date: DateLike = None, end_date: DateLike = None, limit: int = 10,
+                         store_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Productos más vendidos por unidades en el rango"""
+        from app.models.product import Product
+
+        quantity = func.sum(ProductDailyRollup.quantity)
+        rows = self._filter_range(db.session.query(
+            Product.id, Product.name, Product.category, Product.price,
+            quantity, func.sum(ProductDailyRollup.revenue), func.sum(ProductDailyRollup.line_count)
+        ).join(
+            Product, Product.id == ProductDailyRollup.product_id
+        ), ProductDailyRollup, start_date, end_date, store_id).group_by(
+            Product.id, Product.name, Product.category, Product.price
+        ).having(quantity > 0).order_by(desc(quantity)).limit(limit).all()
+
+        return [
+            {
+                'product_id': product_id,
+                'name': name,
+                'category': category,
+                'price': float(price or 0),
+                'quantity_sold': int(sold or 0),
+                'revenue': float(revenue or 0),
+                'times_sold': int(lines or 0)
+            }
+            for product_id, name, category, price, sold, revenue, lines in rows
+        ]
+
+    # ------------------------------------------------------------------
+    # Comparación de períodos (sumas condicionales en una sola sentencia)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _window_totals(row: Tuple[Any, ...], names: List[str], measures: int = 3) -> Dict[str, Dict[str, Any]]:
+        totals = {}
+        for index, name in enumerate(names):
+            values = row[index * measures:(index + 1) * measures]
+            sales, revenue = int(values[0] or 0), float(values[1] or 0)
+            totals[name] = {
+                'sales': sales,
+                'revenue': revenue,
+                'average_sale': revenue / sales if sales else 0.0
+            }
+            if measures > 2:
+                totals[name]['items_sold'] = int(values[2] or 0)
+        return totals
+
+    def get_window_totals(self, windows: Dict[str, Tuple[DateLike, DateLike]],
+                          store_id: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Totales de varias ventanas de días (inclusivas) con una sola consulta
+
+        windows: {'nombre': (primer_día, último_día)}. Cada ventana es un
+        SUM(CASE ...) sobre los agregados; el WHERE cubre la unión de rangos.
+        """
+        if not windows:
+            return {}
+
+        names = list(windows)
+        bounds = {name: (_as_date(start), _as_date(end)) for name, (start, end) in windows.items()}
+        columns = []
+        for name in names:
+            start, end = bounds[name]
+            in_window = SalesHourlyRollup.bucket_date.between(start, end)
+            columns.extend(
+                func.coalesce(func.sum(case((in_window, measure), else_=0)), 0)
+                for measure in (SalesHourlyRollup.sale_count, SalesHourlyRollup.total_amount,
+                                SalesHourlyRollup.items_sold)
+            )
+
+        row = self._filter_range(
+            db.session.query(*columns), SalesHourlyRollup,
+            min(start for start, _ in bounds.values()), max(end for _, end in bounds.values()), store_id
+        ).one()
+        return self._window_totals(tuple(row), names)
+
+    def get_sales_window_totals(self, windows: Dict[str, Tuple[datetime, datetime]],
+                                store_ids: Optional[List[int]] = None) -> Dict[str, Dict[str, Any]]:
+        """Ventas e ingresos de varias ventanas de fecha y hora (inclusivas) sobre sales
+
+        Para períodos que no se alinean a días (reportes consolidados). La
+        tienda es la asignada al vendedor; las ventas anuladas no cuentan.
+        """
+        from app.models.sale import Sale
+        from app.models.user import User
+
+        if not windows:
+            return {}
+
+        names = list(windows)
+        columns = []
+        for name in names:
+            start, end = windows[name]
+            in_window = and_(Sale.created_at >= start, Sale.created_at <= end)
+            columns.extend((
+                func.coalesce(func.sum(case((in_window, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((in_window, Sale.total_amount), else_=0)), 0)
+            ))
+
+        query = db.session.query(*columns).select_from(Sale).filter(
+            Sale.created_at >= min(start for start, _ in windows.values()),
+            Sale.created_at <= max(end for _, end in windows.values()),
+            or_(Sale.status.is_(None), Sale.status != 'cancelled')
+        )
+        if store_ids:
+            query = query.join(User, User.id == Sale.user_id).filter(User.assigned_store_id.in_(store_ids))
+
+        return self._window_totals(tuple(query.one()), names, measures=2)
+
+    @staticmethod
+    def percentage_change(previous: float, current: float) -> float:
+        """Variación porcentual (0 si no hay base de comparación)"""
+        return round((current - previous) / previous * 100, 2) if previous else 0.0
+
+    def compare_periods(self, start_date: DateLike, end_date: DateLike,
+                        previous_start: DateLike = None, previous_end: DateLike = None,
+                        store_id: Optional[int] = None) -> Dict[str, Any]:
+        """Período actual contra el anterior de igual duración, en una consulta
+
+        Si no se indica el período anterior se toman los días inmediatamente
+        previos con la misma cantidad de días que el actual.
+        """
+        start_day, end_day = _as_date(start_date), _as_date(end_date)
+        if previous_start is None or previous_end is None:
+            previous_end = start_day - timedelta(days=1)
+            previous_start = previous_end - (end_day - start_day)
+
+        totals = self.get_window_totals({
+            'current': (start_day, end_day),
+            'previous': (previous_start, previous_end)
+        }, store_id)
+        current, previous = totals['current'], totals['previous']
+        return {
+            'current': current,
+            'previous': previous,
+            'changes': {
+                'sales_change_percentage': self.percentage_change(previous['sales'], current['sales']),
+                'revenue_change_percentage': self.percentage_change(previous['revenue'], current['revenue'])
+            }
+        }
+
+
+# Instancia global del servicio
+sales_rollup_service = SalesRollupService()
@@ -4,7 +4,7 @@ User Service - Sistema POS O'Data
 Servicio de usuarios con lógica de negocio enterprise.
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from app.repositories.user_repository import UserRepository
 from app.exceptions import ValidationError, AuthenticationError, AuthorizationError
 from app import db
@@ -39,6 +39,26 @@ class UserService:
             'pagination': result['pagination']
         }
     
+    def get_users_paginated(self, page: int = 1, per_page: int = 20, search: str = '',
+                            role: str = '', fields: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Obtener usuarios paginados serializados desde filas (?fields=)"""
+        from app.schemas.row_serializers import USER_SERIALIZER
+        
+        names, _ = USER_SERIALIZER.parse_fields(fields)
+        plan = USER_SERIALIZER.plan(names)
+        
+        if search:
+            result = self.user_repository.search(
+                search, ['username', 'email', 'first_name', 'last_name'],
+                page=page, per_page=per_page, plan=plan
+            )
+        else:
+            result = self.user_repository.get_all(
+                page=page, per_page=per_page, plan=plan, role=role or None
+            )
+        
+        return plan.dump(result['items']), result['pagination']['total']
+    
     def update_user(self, user_id: int, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Actualizar usuario"""
         user = self.user_repository.update(user_id, **user_data)
@@ -0,0 +1,128 @@
+"""
+Expresiones Cron - Sistema POS O'Data
+====================================
+Intérprete mínimo de expresiones cron de 5 campos (minuto, hora, día del
+mes, mes, día de la semana) para el planificador de reportes. Soporta `*`,
+listas, rangos, pasos (`*/15`, `1-5/2`) y los alias @hourly, @daily,
+@weekly y @monthly. El día de la semana va de 0 (domingo) a 6; 7 también
+es domingo.
+"""
+
+from datetime import datetime, timedelta
+from typing import FrozenSet, Optional, Tuple
+
+from app.exceptions import ValidationError
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+FIELDS: Tuple[Tuple[str, int, int], ...] = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day_of_month', 1, 31),
+    ('month', 1, 12),
+    ('day_of_week', 0, 7),
+)
+
+# Límite de búsqueda de la próxima ocurrencia (p. ej. 30 de febrero nunca ocurre)
+MAX_SEARCH_DAYS = 366 * 5
+
+
+def _parse_field(text: str, name: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in text.split(','):
+        range_text, _, step_text = part.partition('/')
+        try:
+            step = int(step_text) if step_text else 1
+            if range_text == '*':
+                start, end = low, high
+            elif '-' in range_text:
+                start, end = (int(bound) for bound in range_text.split('-', 1))
+            else:
+                start = int(range_text)
+                end = high if step_text else start
+        except ValueError:
+            raise ValidationError(f"Campo cron inválido ({name}): {part}", field='cron', value=text)
+
+        if step < 1 or start < low or end > high or start > end:
+            raise ValidationError(f"Campo cron fuera de rango ({name}): {part}", field='cron', value=text)
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpression:
+    """Expresión cron evaluada en hora local (naive) con resolución de minutos"""
+
+    def __init__(self, expression: str):
+        self.expression = ALIASES.get(expression.strip(), expression.strip())
+        parts = self.expression.split()
+        if len(parts) != len(FIELDS):
+            raise ValidationError("La expresión cron debe tener 5 campos: minuto hora día mes día_semana",
+                                  field='cron', value=expression)
+
+        parsed = [_parse_field(part, name, low, high) for part, (name, low, high) in zip(parts, FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._sorted_minutes = sorted(self.minutes)
+        self._sorted_hours = sorted(self.hours)
+        # Semántica cron: si se restringen día del mes y día de la semana, basta con uno
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    def _day_matches(self, moment: datetime) -> bool:
+        if moment.month not in self.months:
+            return False
+        day_match = moment.day in self.days
+        weekday_match = moment.isoweekday() % 7 in self.weekdays
+        if self._any_day and self._any_weekday:
+            return True
+        if self._any_day:
+            return weekday_match
+        if self._any_weekday:
+            return day_match
+        return day_match or weekday_match
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Primera ocurrencia estrictamente posterior a moment"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=MAX_SEARCH_DAYS)
+
+        while candidate < limit:
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+
+            hour = next((h for h in self._sorted_hours if h >= candidate.hour), None)
+            if hour is None:
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if hour != candidate.hour:
+                candidate = candidate.replace(hour=hour, minute=0)
+
+            minute = next((m for m in self._sorted_minutes if m >= candidate.minute), None)
+            if minute is None:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            return candidate.replace(minute=minute)
+
+        raise ValidationError("La expresión cron no tiene ocurrencias", field='cron', value=self.expression)
+
+    def last_until(self, start: datetime, moment: datetime, max_steps: int = 100000) -> Optional[datetime]:
+        """Última ocurrencia en [start, moment] (None si no hay ninguna)"""
+        if start > moment:
+            return None
+        last = None
+        candidate = start - timedelta(minutes=1)
+        for _ in range(max_steps):
+            candidate = self.next_after(candidate)
+            if candidate > moment:
+                break
+            last = candidate
+        return last
+
+    def __repr__(self) -> str:
+        return f'<CronExpression {self.expression}>'
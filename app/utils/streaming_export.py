@@ -0,0 +1,165 @@
+"""
+Exportaciones en Streaming - Sistema POS O'Data
+==============================================
+Utilidades para exportar listados grandes con memoria constante: las filas
+se leen de la base con yield_per y se escriben por bloques, ya sea como CSV
+en una respuesta generada por chunks o como XLSX en modo write-only de
+openpyxl (estilos con NamedStyle, sin recorrer celdas después de escribir).
+"""
+
+import csv
+import io
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from flask import Response, send_file, stream_with_context
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+    EXCEL_AVAILABLE = True
+except ImportError:
+    EXCEL_AVAILABLE = False
+
+EXPORT_CHUNK_SIZE = 2000
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def iter_query_rows(query: Any, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Any]:
+    """Iterar una consulta por bloques (yield_per) sin materializarla"""
+    yield from query.yield_per(chunk_size)
+
+
+def _attachment(filename: str) -> Dict[str, str]:
+    return {
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Access-Control-Expose-Headers': 'Content-Disposition',
+        'X-Accel-Buffering': 'no'
+    }
+
+
+# ------------------------------------------------------------------
+# CSV
+# ------------------------------------------------------------------
+
+def iter_csv(header: Sequence[str], rows: Iterable[Sequence[Any]], chunk_rows: int = 500) -> Iterator[str]:
+    """Generar CSV por bloques de chunk_rows filas"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    tail = buffer.getvalue()
+    if tail:
+        yield tail
+
+
+def csv_response(filename: str, header: Sequence[str], rows: Iterable[Sequence[Any]]) -> Response:
+    """Respuesta CSV en streaming (chunked); la sesión sigue abierta mientras se genera"""
+    return Response(
+        stream_with_context(iter_csv(header, rows)),
+        mimetype='text/csv',  # Werkzeug agrega charset=utf-8
+        headers=_attachment(filename)
+    )
+
+
+# ------------------------------------------------------------------
+# XLSX (openpyxl write-only)
+# ------------------------------------------------------------------
+
+class StreamingWorkbook:
+    """Workbook write-only con estilos nombrados de los reportes
+
+    Cada hoja se escribe en orden y fila por fila; openpyxl vuelca las filas
+    a un archivo temporal, por lo que la memoria no crece con el volumen.
+    """
+
+    def __init__(self):
+        if not EXCEL_AVAILABLE:
+            raise RuntimeError("openpyxl no está disponible")
+
+        self.workbook = Workbook(write_only=True)
+        thin = Side(style='thin')
+        border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+        styles = [
+            NamedStyle(name='report_title', font=Font(bold=True, size=16)),
+            NamedStyle(name='report_label', font=Font(bold=True)),
+            NamedStyle(
+                name='report_header',
+                font=Font(bold=True, color='FFFFFF'),
+                fill=PatternFill(start_color='366092', end_color='366092', fill_type='solid'),
+                alignment=Alignment(horizontal='center', vertical='center'),
+                border=border
+            ),
+            NamedStyle(name='report_money', number_format='"$"#,##0.00')
+        ]
+        for style in styles:
+            self.workbook.add_named_style(style)
+
+    def _cell(self, sheet: Any, value: Any, style: str) -> Any:
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.style = style
+        return cell
+
+    def add_summary_sheet(self, title: str, heading: str, items: List[Sequence[Any]]) -> None:
+        """Hoja de resumen: título y pares etiqueta/valor"""
+        sheet = self.workbook.create_sheet(title)
+        sheet.column_dimensions['A'].width = 30
+        sheet.column_dimensions['B'].width = 30
+        sheet.append([self._cell(sheet, heading, 'report_title')])
+        sheet.append([])
+        for label, value in items:
+            sheet.append([self._cell(sheet, label, 'report_label'), value])
+
+    def add_table_sheet(self, title: str, headers: Sequence[str], rows: Iterable[Sequence[Any]],
+                        widths: Optional[Sequence[int]] = None, money_columns: Sequence[int] = ()) -> int:
+        """Hoja tabular escrita fila por fila; devuelve la cantidad de filas de datos
+
+        Los anchos de columna se fijan de antemano (no se recorren las celdas
+        para autoajustar). Solo las columnas de money_columns (índices base 0)
+        llevan estilo; el resto se escribe como valores planos.
+        """
+        sheet = self.workbook.create_sheet(title)
+        for index, width in enumerate(widths or [18] * len(headers), 1):
+            sheet.column_dimensions[get_column_letter(index)].width = width
+
+        sheet.append([self._cell(sheet, header, 'report_header') for header in headers])
+
+        money = set(money_columns)
+        count = 0
+        for row in rows:
+            if money:
+                row = [self._cell(sheet, value, 'report_money') if index in money else value
+                       for index, value in enumerate(row)]
+            sheet.append(row)
+            count += 1
+        return count
+
+    def save(self, path: str) -> None:
+        """Guardar en una ruta de disco (artefactos de trabajos en segundo plano)"""
+        self.workbook.save(path)
+
+    def to_file(self) -> Any:
+        """Guardar en un archivo temporal (se elimina al cerrarlo) posicionado al inicio"""
+        output = tempfile.TemporaryFile()
+        self.workbook.save(output)
+        output.seek(0)
+        return output
+
+    def response(self, filename: str) -> Response:
+        """Enviar el workbook como descarga, leyendo el archivo temporal por bloques"""
+        response = send_file(self.to_file(), mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
+        response.headers['Access-Control-Expose-Headers'] = 'Content-Disposition'
+        return response
@@ -182,17 +182,16 @@ export const ReportsEnhanced: React.FC = () => {
       })
       
       const response = await fetch(`http://localhost:8000/api/v1/reports-enhanced/export/${type}/excel?${params}`)
-      const data = await response.json()
       
-      if (data.success) {
-        // Crear y descargar archivo
-        const blob = new Blob([data.data.file_content], { 
-          type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' 
-        })
+      if (response.ok) {
+        // El backend envía el archivo en streaming
+        const blob = await response.blob()
+        const disposition = response.headers.get('Content-Disposition') || ''
+        const match = disposition.match(/filename="?([^"]+)"?/)
         const url = window.URL.createObjectURL(blob)
         const a = document.createElement('a')
         a.href = url
-        a.download = data.data.filename
+        a.download = match ? match[1] : `${type}.xlsx`
         document.body.appendChild(a)
         a.click()
         window.URL.revokeObjectURL(url)
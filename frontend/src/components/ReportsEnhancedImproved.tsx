@@ -262,11 +262,20 @@ export const ReportsEnhancedImproved: React.FC = () => {
       })
       
       const response = await fetch(`http://localhost:8000/api/v1/reports-enhanced/export/${type}/excel?${params}`)
-      const data = await response.json()
       
-      if (data.success) {
-        // Simular descarga (en un caso real, el backend enviaría el archivo)
-        alert(`Archivo Excel generado: ${data.data.filename}`)
+      if (response.ok) {
+        // El backend envía el archivo en streaming
+        const blob = await response.blob()
+        const disposition = response.headers.get('Content-Disposition') || ''
+        const match = disposition.match(/filename="?([^"]+)"?/)
+        const url = window.URL.createObjectURL(blob)
+        const a = document.createElement('a')
+        a.href = url
+        a.download = match ? match[1] : `${type}.xlsx`
+        document.body.appendChild(a)
+        a.click()
+        window.URL.revokeObjectURL(url)
+        document.body.removeChild(a)
       } else {
         setError('Error exportando archivo')
       }
@@ -111,23 +111,20 @@ const ReportsManagementFixed: React.FC = () => {
       const response = await fetch(`${API_BASE}/export/sales?start_date=${startDate}&end_date=${endDate}`);
       
       if (response.ok) {
-        const result = await response.json();
-        if (result.success && result.data.csv_content) {
-          // Crear blob con el contenido CSV
-          const blob = new Blob([result.data.csv_content], { type: 'text/csv;charset=utf-8;' });
-          const url = window.URL.createObjectURL(blob);
-          const a = document.createElement('a');
-          a.style.display = 'none';
-          a.href = url;
-          a.download = result.data.filename || `reporte_${format(new Date(), 'yyyy-MM-dd')}.csv`;
-          document.body.appendChild(a);
-          a.click();
-          window.URL.revokeObjectURL(url);
-          document.body.removeChild(a);
-          toast.success(`✅ Exportado: ${result.data.records_count} registros`);
-        } else {
-          toast.error('Error en el formato de exportación');
-        }
+        // El backend envía el CSV en streaming
+        const blob = await response.blob();
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename="?([^"]+)"?/);
+        const url = window.URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.style.display = 'none';
+        a.href = url;
+        a.download = match ? match[1] : `reporte_${format(new Date(), 'yyyy-MM-dd')}.csv`;
+        document.body.appendChild(a);
+        a.click();
+        window.URL.revokeObjectURL(url);
+        document.body.removeChild(a);
+        toast.success('✅ Reporte exportado');
       } else {
         toast.error('Error exportando reporte');
       }
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+AI Preprocessing Benchmark - Sistema POS O'Data
+===============================================
+Compara el preprocesamiento anterior (regex, word_tokenize, stop words y
+SnowballStemmer por llamada, y otra vez por cada resultado de búsqueda)
+contra el pipeline memoizado y por lotes: entrenamiento del catálogo
+completo y búsquedas con términos coincidentes.
+
+Uso:
+    python scripts/benchmark_ai_preprocessing.py --products 50000 --workers 4
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark_common import create_benchmark_app, latency_summary
+from benchmark_ai_search import FILLINGS, FOODS, STYLES, seed_catalog
+
+
+def legacy_preprocess(text: str) -> str:
+    """Implementación anterior de AIService.preprocess_text"""
+    from nltk.tokenize import word_tokenize
+    from app.services.ai_text_pipeline import load_nltk_resources
+
+    if not text:
+        return ""
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    try:
+        tokens = word_tokenize(text, language='spanish')
+    except LookupError:
+        tokens = text.split()
+    stop_words, stemmer = load_nltk_resources()
+    tokens = [token for token in tokens if token not in stop_words and len(token) > 2]
+    if stemmer:
+        tokens = [stemmer.stem(token) for token in tokens]
+    return ' '.join(tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Preprocesamiento por llamada vs pipeline memoizado')
+    parser.add_argument('--products', type=int, default=50000, help='Productos del catálogo')
+    parser.add_argument('--queries', type=int, default=200, help='Búsquedas medidas')
+    parser.add_argument('--workers', type=int, default=0, help='Procesos para el lote de entrenamiento')
+    args = parser.parse_args()
+
+    # Artefactos del modelo fuera del directorio instance/ del proyecto
+    os.environ.setdefault('AI_MODEL_DIR', tempfile.mkdtemp(prefix='pos_ai_models_'))
+
+    app = create_benchmark_app('ai_preprocessing.db')
+
+    with app.app_context():
+        from app.models.product import Product
+        from app.services.ai_service import ai_service
+        from app.services.ai_text_pipeline import load_nltk_resources, text_pipeline
+
+        seed_catalog(args.products)
+        load_nltk_resources(download=True)
+        products = Product.query.filter(Product.is_active == True).order_by(Product.id).all()
+        raw_texts = [ai_service._product_text_item(product)[1] for product in products]
+
+        started = time.perf_counter()
+        legacy_texts = [legacy_preprocess(text) for text in raw_texts]
+        legacy_seconds = time.perf_counter() - started
+
+        text_pipeline.clear()
+        started = time.perf_counter()
+        batch_texts = text_pipeline.process_many(raw_texts, workers=args.workers)
+        batch_seconds = time.perf_counter() - started
+
+        # Entrenamiento completo (textos ya memoizados por versión de producto)
+        text_pipeline.clear()
+        started = time.perf_counter()
+        ai_service._fit_tfidf(products)
+        fit_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        ai_service._fit_tfidf(products)
+        refit_seconds = time.perf_counter() - started
+
+        if not ai_service.load_or_train():
+            raise SystemExit('No se pudo entrenar el modelo TF-IDF')
+
+        rng = random.Random(7)
+        queries = [f'{rng.choice(FOODS)} de {rng.choice(FILLINGS)} {rng.choice(STYLES)}'
+                   for _ in range(args.queries)]
+
+        def legacy_matched_terms(query, results):
+            """Anterior: consulta y texto de cada resultado preprocesados otra vez"""
+            for item in results:
+                query_terms = set(legacy_preprocess(query).split())
+                product = item['product']
+                product_terms = set(legacy_preprocess(f"{product['name']} {product.get('description', '')}").split())
+                query_terms.intersection(product_terms)
+
+        results = []
+        for label, memoized in (('Búsqueda + términos (anterior)', False), ('Búsqueda + términos (memoizado)', True)):
+            samples = []
+            for query in queries:
+                started = time.perf_counter()
+                found = ai_service.semantic_search(query, limit=10)
+                if not memoized:
+                    legacy_preprocess(query)
+                    legacy_matched_terms(query, found)
+                samples.append(time.perf_counter() - started)
+            results.append((label, latency_summary(samples)))
+
+        stats = text_pipeline.get_stats()
+
+    print('=' * 60)
+    print(f'{args.products} productos')
+    print(f'Preprocesamiento por llamada: {legacy_seconds:.2f}s')
+    print(f'Pipeline por lotes ({args.workers or 1} proceso(s)): {batch_seconds:.2f}s '
+          f'(mismo resultado: {"sí" if batch_texts == legacy_texts else "NO"})')
+    print(f'Ajuste TF-IDF: {fit_seconds:.2f}s en frío, {refit_seconds:.2f}s con textos memoizados')
+    for label, stats_ms in results:
+        print(f'{label}: p50 {stats_ms["p50_ms"]} ms, p95 {stats_ms["p95_ms"]} ms')
+    print(f'Cache de raíces: {stats["stem_cache_size"]} tokens, '
+          f'{stats["stem_cache_hits"]} aciertos / {stats["stem_cache_misses"]} fallos')
+    print(f'Generado: {datetime.now().isoformat(timespec="seconds")}')
+
+
+if __name__ == '__main__':
+    main()
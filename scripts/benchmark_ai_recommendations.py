@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+AI Recommendations Benchmark - Sistema POS O'Data
+=================================================
+Mide el lote de recomendaciones precalculadas (multiplicación dispersa por
+bloques y escritura masiva de ai_recommendations) y compara la consulta
+anterior (todo el catálogo, búsqueda lineal del índice y fila de coseno
+por llamada) contra la lectura desde la tabla con cache en proceso, como
+en el checkout.
+
+Uso:
+    python scripts/benchmark_ai_recommendations.py --products 50000 --lookups 1000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark_common import create_benchmark_app, latency_summary
+from benchmark_ai_search import seed_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recomendaciones: cálculo por llamada vs tabla precalculada')
+    parser.add_argument('--products', type=int, default=50000, help='Productos del catálogo')
+    parser.add_argument('--lookups', type=int, default=1000, help='Consultas de recomendaciones')
+    parser.add_argument('--top-k', type=int, default=10, help='Vecinos por producto')
+    args = parser.parse_args()
+
+    # Artefactos del modelo fuera del directorio instance/ del proyecto
+    os.environ.setdefault('AI_MODEL_DIR', tempfile.mkdtemp(prefix='pos_ai_models_'))
+
+    app = create_benchmark_app('ai_recommendations.db')
+
+    with app.app_context():
+        from sklearn.metrics.pairwise import cosine_similarity  # type: ignore[import]
+        from app import db
+        from app.models.product import Product
+        from app.services.ai_service import ai_service
+        from app.services.ai_recommendation_service import ai_recommendation_service
+
+        seed_catalog(args.products)
+        if not ai_service.initialize_ai_system():
+            raise SystemExit('No se pudo entrenar el modelo TF-IDF')
+
+        rebuild = ai_recommendation_service.rebuild(top_k=args.top_k)
+
+        product_ids = ai_service.product_ids.tolist()
+        rng = random.Random(7)
+        # Productos populares: el checkout repite los mismos pocos cientos
+        popular = rng.sample(product_ids, min(300, len(product_ids)))
+        lookups = [rng.choice(popular) for _ in range(args.lookups)]
+
+        def legacy_recommendations(product_id):
+            """Implementación anterior: catálogo completo y fila de coseno por llamada"""
+            model = ai_service.registry.current()
+            products = Product.query.filter(Product.is_active == True).all()
+            index = next(i for i, p in enumerate(products) if p.id == product_id)
+            similarities = cosine_similarity(model.matrix[index:index + 1], model.matrix).flatten()
+            results = [(float(score), products[i].to_dict()) for i, score in enumerate(similarities)
+                       if i != index and score > 0.1]
+            results.sort(key=lambda x: x[0], reverse=True)
+            db.session.expunge_all()
+            return results[:5]
+
+        def table_recommendations(product_id):
+            return ai_recommendation_service.get_recommendations(product_id, limit=5)
+
+        results = []
+        for label, run, sample in (('Anterior (cálculo por llamada)', legacy_recommendations, lookups[:10]),
+                                   ('Tabla + cache en proceso', table_recommendations, lookups)):
+            samples = []
+            for product_id in sample:
+                started = time.perf_counter()
+                run(product_id)
+                samples.append(time.perf_counter() - started)
+            results.append((label, latency_summary(samples)))
+
+        cache_stats = ai_recommendation_service.get_stats()
+
+    print('=' * 60)
+    print(f'{args.products} productos, top {args.top_k}: lote en {rebuild["elapsed_ms"] / 1000:.1f}s '
+          f'({rebuild["recommendations"]} filas para {rebuild["source_products"]} productos; '
+          f'escritura {rebuild["write_ms"] / 1000:.1f}s)')
+    for label, stats in results:
+        print(f'{label}: {stats["count"]} consultas, p50 {stats["p50_ms"]} ms, '
+              f'p95 {stats["p95_ms"]} ms, máx {stats["max_ms"]} ms')
+    print(f'Cache de recomendaciones: acierto {cache_stats["hit_rate"]:.0%}')
+    print(f'Generado: {datetime.now().isoformat(timespec="seconds")}')
+
+
+if __name__ == '__main__':
+    main()
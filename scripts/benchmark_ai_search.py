@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+AI Search Benchmark - Sistema POS O'Data
+========================================
+Compara la búsqueda semántica anterior (coseno contra toda la matriz,
+Product.query.all() y serialización de todo el catálogo por consulta)
+contra el top-K con np.argpartition que hidrata solo los K ganadores desde
+el cache de productos.
+
+Uso:
+    python scripts/benchmark_ai_search.py --products 50000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark_common import create_benchmark_app, latency_summary
+
+# Vocabulario del catálogo sintético (nombres y descripciones variados)
+FOODS = ['arepa', 'empanada', 'buñuelo', 'pandebono', 'almojábana', 'tamal', 'chorizo',
+         'morcilla', 'chicharrón', 'patacón', 'hamburguesa', 'perro', 'salchipapa', 'pizza',
+         'sandwich', 'jugo', 'limonada', 'gaseosa', 'café', 'chocolate', 'avena', 'malteada']
+FILLINGS = ['queso', 'pollo', 'carne', 'cerdo', 'jamón', 'huevo', 'maíz', 'guayaba',
+            'arequipe', 'mora', 'lulo', 'maracuyá', 'mango', 'fresa', 'tocineta', 'champiñones']
+STYLES = ['asado', 'frito', 'horneado', 'gratinado', 'picante', 'dulce', 'tradicional',
+          'especial', 'familiar', 'mini', 'doble', 'light', 'artesanal', 'campesino']
+CATEGORIES = ['Sencillas', 'Especiales', 'Bebidas', 'Postres', 'Combos', 'Desayunos']
+
+
+def seed_catalog(count: int, seed: int = 42) -> None:
+    """Insertar productos activos con nombres combinados (bulk insert)"""
+    from sqlalchemy import insert
+    from app import db
+    from app.models.product import Product
+
+    rng = random.Random(seed)
+    batch_size = 5000
+    for start in range(0, count, batch_size):
+        rows = []
+        for index in range(start, min(start + batch_size, count)):
+            food, filling, style = rng.choice(FOODS), rng.choice(FILLINGS), rng.choice(STYLES)
+            rows.append({
+                'name': f'{food.capitalize()} de {filling} {style} {index}',
+                'description': f'{food} {style} con {filling} y {rng.choice(FILLINGS)}',
+                'sku': f'AIS-{index:06d}',
+                'price': 1000 + rng.randint(0, 30000),
+                'cost': 600,
+                'stock': 100,
+                'category': rng.choice(CATEGORIES),
+                'is_active': True
+            })
+        db.session.execute(insert(Product), rows)
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Búsqueda semántica: catálogo completo vs top-K')
+    parser.add_argument('--products', type=int, default=50000, help='Productos del catálogo')
+    parser.add_argument('--queries', type=int, default=200, help='Consultas por variante')
+    parser.add_argument('--limit', type=int, default=10, help='Resultados por consulta')
+    args = parser.parse_args()
+
+    # Artefactos del modelo fuera del directorio instance/ del proyecto
+    os.environ.setdefault('AI_MODEL_DIR', tempfile.mkdtemp(prefix='pos_ai_models_'))
+
+    app = create_benchmark_app('ai_search.db')
+
+    with app.app_context():
+        from sklearn.metrics.pairwise import cosine_similarity  # type: ignore[import]
+        from app import db
+        from app.models.product import Product
+        from app.services.ai_service import ai_service
+        from app.services.product_cache import product_cache
+
+        started = time.perf_counter()
+        seed_catalog(args.products)
+        seed_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if not ai_service.initialize_ai_system():
+            raise SystemExit('No se pudo entrenar el modelo TF-IDF')
+        train_seconds = time.perf_counter() - started
+
+        rng = random.Random(7)
+        queries = [f'{rng.choice(FOODS)} de {rng.choice(FILLINGS)} {rng.choice(STYLES)}'
+                   for _ in range(args.queries)]
+
+        def legacy_search(query):
+            """Implementación anterior: todo el catálogo por consulta"""
+            model = ai_service.registry.current()
+            processed_query = ai_service.preprocess_text(query)
+            query_vector = model.vectorizer.transform([processed_query])
+            similarities = cosine_similarity(query_vector, model.matrix).flatten()
+            products = Product.query.filter(Product.is_active == True).all()
+            query_terms = set(processed_query.split())
+            results = []
+            for i, product in enumerate(products):
+                if i < len(similarities) and similarities[i] > 0.1:
+                    product_dict = product.to_dict()
+                    results.append({
+                        'product': product_dict,
+                        'similarity_score': float(similarities[i]),
+                        'matched_terms': ai_service._get_matched_terms(query_terms, product_dict)
+                    })
+            results.sort(key=lambda x: x['similarity_score'], reverse=True)
+            db.session.expunge_all()
+            return results[:args.limit]
+
+        def topk_search(query):
+            return ai_service.semantic_search(query, limit=args.limit)
+
+        results = []
+        legacy_queries = queries[:max(1, args.queries // 10)]
+        for label, run, sample in (('Anterior (catálogo completo)', legacy_search, legacy_queries),
+                                   ('Top-K (argpartition + cache)', topk_search, queries)):
+            samples = []
+            for query in sample:
+                started = time.perf_counter()
+                run(query)
+                samples.append(time.perf_counter() - started)
+            results.append((label, latency_summary(samples)))
+
+        # Ambas implementaciones deben devolver los mismos puntajes (los empates
+        # en el corte pueden resolverse con otro producto del mismo puntaje)
+        matches = sum(
+            [round(item['similarity_score'], 6) for item in legacy_search(query)]
+            == [round(item['similarity_score'], 6) for item in topk_search(query)]
+            for query in legacy_queries
+        )
+        cache_stats = product_cache.get_stats()
+
+    print('=' * 60)
+    print(f'{args.products} productos (semilla en {seed_seconds:.1f}s, modelo en {train_seconds:.1f}s)')
+    for label, stats in results:
+        print(f'{label}: {stats["count"]} consultas, p50 {stats["p50_ms"]} ms, '
+              f'p95 {stats["p95_ms"]} ms, máx {stats["max_ms"]} ms')
+    print(f'Mismos resultados en {matches}/{len(legacy_queries)} consultas')
+    print(f'Cache de productos: {cache_stats["entries"]} entradas, acierto {cache_stats["hit_rate"]:.0%}')
+    print(f'Generado: {datetime.now().isoformat(timespec="seconds")}')
+
+
+if __name__ == '__main__':
+    main()
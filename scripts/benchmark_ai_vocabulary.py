@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+AI Vocabulary Benchmark - Sistema POS O'Data
+============================================
+Compara el guardado anterior del vocabulario (una consulta filter_by(term)
+por término e inserción o actualización individual) contra el upsert
+masivo de AIService._save_vocabulary, con la tabla vacía y con todos los
+términos ya existentes (reentrenamiento).
+
+Uso:
+    python scripts/benchmark_ai_vocabulary.py --products 10000
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from benchmark_common import create_benchmark_app
+from benchmark_ai_search import seed_catalog
+
+
+def legacy_save_vocabulary(vectorizer) -> None:
+    """Implementación anterior: una consulta y una escritura por término"""
+    from app import db
+    from app.models.ai_models import AIVocabulary
+
+    idf_scores = vectorizer.idf_
+    for term, term_id in vectorizer.vocabulary_.items():
+        existing = AIVocabulary.query.filter_by(term=term).first()
+        if existing:
+            existing.term_frequency += 1
+            existing.tfidf_score = float(idf_scores[term_id])
+            existing.updated_at = datetime.utcnow()
+        else:
+            db.session.add(AIVocabulary(
+                term=term,
+                term_frequency=1,
+                document_frequency=1,
+                tfidf_score=float(idf_scores[term_id]),
+                term_type='word' if ' ' not in term else 'bigram',
+                language='es'
+            ))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vocabulario: término a término vs upsert masivo')
+    parser.add_argument('--products', type=int, default=10000, help='Productos para ajustar el vectorizador')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('ai_vocabulary.db')
+
+    with app.app_context():
+        from app import db
+        from app.models.ai_models import AIVocabulary
+        from app.models.product import Product
+        from app.services.ai_service import ai_service
+
+        seed_catalog(args.products)
+        products = Product.query.filter(Product.is_active == True).order_by(Product.id).all()
+        vectorizer, _, _ = ai_service._fit_tfidf(products)
+        terms = len(vectorizer.vocabulary_)
+
+        results = []
+        for label, save in (('Anterior (término a término)', legacy_save_vocabulary),
+                            ('Upsert masivo', ai_service._save_vocabulary)):
+            AIVocabulary.query.delete()
+            db.session.commit()
+            timings = []
+            for _ in range(2):  # tabla vacía y reentrenamiento
+                started = time.perf_counter()
+                save(vectorizer)
+                timings.append((time.perf_counter() - started) * 1000)
+            frequencies = {row.term_frequency for row in AIVocabulary.query.all()}
+            results.append((label, timings, frequencies))
+
+    print('=' * 60)
+    print(f'{terms} términos ({args.products} productos)')
+    for label, (first_ms, second_ms), frequencies in results:
+        print(f'{label}: {first_ms:.1f} ms tabla vacía, {second_ms:.1f} ms reentrenamiento '
+              f'(term_frequency final: {sorted(frequencies)})')
+    print(f'Generado: {datetime.now().isoformat(timespec="seconds")}')
+
+
+if __name__ == '__main__':
+    main()
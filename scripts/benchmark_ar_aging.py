@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+AR Aging Benchmark - Sistema POS O'Data
+=======================================
+Compara los reportes de cartera calculados en Python (todas las facturas con
+.all(), sumas con float e is_overdue por fila) contra las consultas
+agregadas con tramos CASE del servicio de cuentas por cobrar.
+
+Uso:
+    python scripts/benchmark_ar_aging.py --invoices 100000 --customers 20000
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from benchmark_common import create_benchmark_app, seed_user, latency_summary
+
+
+def seed_receivables(user_id: int, customers: int, invoices: int, seed: int = 42) -> None:
+    """Insertar clientes y facturas con vencimientos y pagos repartidos (bulk insert)"""
+    from sqlalchemy import insert
+    from app import db
+    from app.models.accounts_receivable import Customer, Invoice
+
+    rng = random.Random(seed)
+    today = date.today()
+    batch_size = 5000
+
+    for start in range(0, customers, batch_size):
+        db.session.execute(insert(Customer), [
+            {
+                'customer_code': f'CLIB{index:07d}',
+                'name': f'Cliente {index}',
+                'document_type': 'CC',
+                'document_number': f'{10000000 + index}',
+                'payment_terms': 30
+            }
+            for index in range(start, min(start + batch_size, customers))
+        ])
+        db.session.commit()
+    customer_ids = [row[0] for row in db.session.query(Customer.id).all()]
+
+    statuses = ['pending', 'partial', 'paid', 'overdue']
+    for start in range(0, invoices, batch_size):
+        rows = []
+        for index in range(start, min(start + batch_size, invoices)):
+            invoice_date = today - timedelta(days=rng.randint(0, 240))
+            total = float(rng.randint(50, 5000) * 1000)
+            status = rng.choice(statuses)
+            paid = total if status == 'paid' else (total * rng.random() if status == 'partial' else 0.0)
+            rows.append({
+                'invoice_number': f'FACB{index:08d}',
+                'customer_id': rng.choice(customer_ids),
+                'user_id': user_id,
+                'invoice_date': invoice_date,
+                'due_date': invoice_date + timedelta(days=30),
+                'payment_terms': 30,
+                'subtotal': total,
+                'total_amount': total,
+                'paid_amount': paid,
+                'balance_amount': total - paid,
+                'status': status
+            })
+        db.session.execute(insert(Invoice), rows)
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cartera en Python vs agregados SQL')
+    parser.add_argument('--invoices', type=int, default=100000, help='Facturas de cartera')
+    parser.add_argument('--customers', type=int, default=20000, help='Clientes con crédito')
+    parser.add_argument('--repeat', type=int, default=5, help='Mediciones por variante')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('ar_aging.db')
+
+    with app.app_context():
+        from app import db
+        from app.models.accounts_receivable import Invoice
+        from app.services.accounts_receivable_service import AccountsReceivableService
+
+        service = AccountsReceivableService()
+        user_id = seed_user()
+
+        started = time.perf_counter()
+        seed_receivables(user_id, args.customers, args.invoices)
+        seed_seconds = time.perf_counter() - started
+
+        period_end = date.today()
+        period_start = period_end - timedelta(days=90)
+
+        def python_reports():
+            """Implementación anterior: cargar facturas y agregar fila a fila"""
+            today = date.today()
+            buckets = {'current': 0, '31_60': 0, '61_90': 0, 'over_90': 0}
+            for invoice in Invoice.query.filter(Invoice.balance_amount > 0).all():
+                days_overdue = (today - invoice.due_date).days
+                key = ('current' if days_overdue <= 30 else '31_60' if days_overdue <= 60
+                       else '61_90' if days_overdue <= 90 else 'over_90')
+                buckets[key] += float(invoice.balance_amount)
+
+            invoices = Invoice.query.all()
+            summary = (sum(float(inv.total_amount) for inv in invoices),
+                       sum(float(inv.balance_amount) for inv in invoices if inv.is_overdue))
+
+            issued = Invoice.query.filter(Invoice.invoice_date >= period_start,
+                                          Invoice.invoice_date <= period_end).all()
+            efficiency = (sum(float(inv.total_amount) for inv in issued),
+                          sum(float(inv.balance_amount) for inv in issued if inv.is_overdue))
+            db.session.expunge_all()
+            return buckets, summary, efficiency
+
+        def sql_reports():
+            return (service.get_aging_report(),
+                    service.get_invoices_summary(),
+                    service.get_collection_efficiency(period_start, period_end))
+
+        def customer_matrix():
+            return service.get_customer_aging(limit=50)
+
+        results = []
+        for label, run in (('Python (.all() + bucles)', python_reports),
+                           ('SQL (CASE + agregados)', sql_reports),
+                           ('Matriz por cliente (top 50)', customer_matrix)):
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                run()
+                samples.append(time.perf_counter() - started)
+            results.append((label, latency_summary(samples)))
+
+        started = time.perf_counter()
+        snapshot = service.take_aging_snapshot()
+        snapshot_seconds = time.perf_counter() - started
+
+        # Los totales deben coincidir entre ambas implementaciones
+        python_buckets = python_reports()[0]
+        sql_buckets = service.get_aging_report()['aging_buckets']
+        matches = all(abs(python_buckets[key] - sql_buckets[key]) < 0.01 * max(1.0, python_buckets[key])
+                      for key in python_buckets)
+
+    print('=' * 60)
+    print(f'{args.invoices} facturas de {args.customers} clientes (semilla en {seed_seconds:.1f}s)')
+    for label, stats in results:
+        print(f'{label}: p50 {stats["p50_ms"]} ms, p95 {stats["p95_ms"]} ms')
+    print(f'Foto diaria de antigüedad: {snapshot_seconds * 1000:.1f} ms '
+          f'(total {float(snapshot.total_outstanding):,.0f}, {snapshot.customers_with_balance} clientes)')
+    print(f'Tramos iguales en ambas implementaciones: {"sí" if matches else "NO"}')
+    print(f'Generado: {datetime.now().isoformat(timespec="seconds")}')
+
+
+if __name__ == '__main__':
+    main()
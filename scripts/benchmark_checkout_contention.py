@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Checkout Contention Benchmark - Sistema POS O'Data
+==================================================
+Ejecuta N checkouts concurrentes contra un conjunto pequeño de productos
+"calientes" y verifica que el stock nunca quede negativo ni se sobrevenda.
+
+Uso:
+    python scripts/benchmark_checkout_contention.py --workers 16 --checkouts 40
+"""
+
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products, latency_summary
+
+
+def run_worker(app, user_id, product_ids, checkouts, lines, results, latencies, lock):
+    """Ejecutar checkouts secuenciales dentro de un contexto de aplicación propio"""
+    from app.container import container
+    from app.services.sale_service import SaleService
+    from app.repositories.sale_repository import SaleRepository
+    from app.repositories.product_repository import ProductRepository
+    from app.repositories.user_repository import UserRepository
+    from app.exceptions import InsufficientStockError
+    from app import db
+
+    rng = random.Random()
+
+    with app.app_context():
+        sale_service = SaleService(
+            container.get(SaleRepository),
+            container.get(ProductRepository),
+            container.get(UserRepository)
+        )
+
+        for _ in range(checkouts):
+            items = [
+                {'product_id': rng.choice(product_ids), 'quantity': rng.randint(1, 3)}
+                for _ in range(lines)
+            ]
+            started = time.perf_counter()
+            try:
+                sale_service.create_sale(user_id, {'items': items, 'payment_method': 'cash'})
+                outcome = 'completed'
+            except InsufficientStockError:
+                outcome = 'insufficient_stock'
+            except Exception as e:
+                db.session.rollback()
+                outcome = f'error: {type(e).__name__}'
+            elapsed = time.perf_counter() - started
+
+            with lock:
+                results[outcome] += 1
+                latencies.append(elapsed)
+
+
+def verify_stock(product_ids, initial_stock):
+    """Verificar que stock final + unidades vendidas == stock inicial"""
+    from sqlalchemy import func
+    from app import db
+    from app.models.product import Product
+    from app.models.sale import SaleItem
+
+    sold = dict(
+        db.session.query(SaleItem.product_id, func.sum(SaleItem.quantity))
+        .filter(SaleItem.product_id.in_(product_ids))
+        .group_by(SaleItem.product_id)
+        .all()
+    )
+    problems = []
+    for product in Product.query.filter(Product.id.in_(product_ids)).all():
+        units_sold = int(sold.get(product.id) or 0)
+        if product.stock < 0:
+            problems.append(f'{product.sku}: stock negativo ({product.stock})')
+        if product.stock + units_sold != initial_stock:
+            problems.append(
+                f'{product.sku}: stock {product.stock} + vendido {units_sold} != inicial {initial_stock}'
+            )
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de contención en checkout')
+    parser.add_argument('--workers', type=int, default=8, help='Terminales concurrentes')
+    parser.add_argument('--checkouts', type=int, default=25, help='Checkouts por terminal')
+    parser.add_argument('--hot-skus', type=int, default=3, help='Productos compartidos')
+    parser.add_argument('--lines', type=int, default=5, help='Líneas por canasta')
+    parser.add_argument('--stock', type=int, default=200, help='Stock inicial por producto')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('checkout_contention.db')
+    with app.app_context():
+        user_id = seed_user()
+        product_ids = seed_products(args.hot_skus, args.stock, prefix='HOT')
+
+    results = Counter()
+    latencies = []
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=run_worker,
+            args=(app, user_id, product_ids, args.checkouts, args.lines, results, latencies, lock)
+        )
+        for _ in range(args.workers)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        problems = verify_stock(product_ids, args.stock)
+
+    total = sum(results.values())
+    print('=' * 60)
+    print(f'Checkouts: {total} en {elapsed:.2f}s ({total / elapsed:.1f}/s)')
+    for outcome, count in sorted(results.items()):
+        print(f'  {outcome}: {count}')
+    print(f'Latencia: {latency_summary(latencies)}')
+    if problems:
+        print('❌ Inconsistencias de stock:')
+        for problem in problems:
+            print(f'   {problem}')
+        raise SystemExit(1)
+    print('✅ Stock consistente: sin sobreventa ni stock negativo')
+
+
+if __name__ == '__main__':
+    main()
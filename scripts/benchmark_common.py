@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark Common - Sistema POS O'Data
+=====================================
+Utilidades compartidas por los scripts de benchmark: aplicación sobre una
+base SQLite temporal, datos semilla y estadísticas de latencia.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def create_benchmark_app(db_name: str = 'benchmark.db'):
+    """Crear aplicación apuntando a una base SQLite temporal"""
+    workdir = Path(tempfile.mkdtemp(prefix='pos_benchmark_'))
+    os.environ['DATABASE_URL'] = f"sqlite:///{workdir / db_name}"
+
+    # configure_logging escribe en logs/app.log relativo al directorio actual
+    os.makedirs('logs', exist_ok=True)
+
+    from app import create_app
+    return create_app('production')
+
+
+def seed_user(username: str = 'benchmark'):
+    """Crear usuario cajero para las ventas del benchmark"""
+    from app import db
+    from app.models.user import User
+
+    user = User(
+        username=username,
+        email=f'{username}@benchmark.local',
+        password='benchmark-password',
+        role='cashier'
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def seed_products(count: int, stock: int, prefix: str = 'BENCH') -> List[int]:
+    """Crear productos activos con stock inicial"""
+    from app import db
+    from app.models.product import Product
+
+    products = [
+        Product(
+            name=f'Producto {prefix} {index}',
+            sku=f'{prefix}-{index:06d}',
+            price=1000 + index,
+            cost=600,
+            stock=stock,
+            category='Benchmark'
+        )
+        for index in range(count)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return [product.id for product in products]
+
+
+def seed_sales(user_id: int, product_ids: List[int], count: int, days: int = 365,
+               lines: int = 2, seed: int = 42) -> int:
+    """Insertar historial de ventas repartido en los últimos días (bulk insert)"""
+    import random
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app import db
+    from app.models.sale import Sale, SaleItem
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    batch_size = 5000
+    next_id = (db.session.query(db.func.max(Sale.id)).scalar() or 0) + 1
+    payment_methods = ['cash', 'card', 'nequi', 'daviplata']
+
+    for start in range(0, count, batch_size):
+        sale_rows, item_rows = [], []
+        for sale_id in range(next_id + start, next_id + min(start + batch_size, count)):
+            subtotal = 0.0
+            for _ in range(lines):
+                quantity = rng.randint(1, 3)
+                unit_price = float(rng.randint(1000, 50000))
+                subtotal += quantity * unit_price
+                item_rows.append({
+                    'sale_id': sale_id,
+                    'product_id': rng.choice(product_ids),
+                    'quantity': quantity,
+                    'unit_price': unit_price,
+                    'total_price': quantity * unit_price
+                })
+            sale_rows.append({
+                'id': sale_id,
+                'user_id': user_id,
+                'subtotal': subtotal,
+                'tax_amount': 0,
+                'discount_amount': 0,
+                'total_amount': subtotal,
+                'payment_method': rng.choice(payment_methods),
+                'status': 'completed',
+                'created_at': now - timedelta(seconds=rng.randint(0, days * 86400))
+            })
+        db.session.execute(insert(Sale), sale_rows)
+        db.session.execute(insert(SaleItem), item_rows)
+        db.session.commit()
+
+    return count
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Resumen de latencias en milisegundos"""
+    if not samples:
+        return {'count': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+    return {
+        'count': len(ordered),
+        'p50_ms': round(percentile(0.50), 2),
+        'p95_ms': round(percentile(0.95), 2),
+        'max_ms': round(ordered[-1] * 1000, 2)
+    }
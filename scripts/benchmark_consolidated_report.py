@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Consolidated Report Benchmark - Sistema POS O'Data
+==================================================
+Mide ConsolidatedReportingService.generate_sales_report (motor columnar
+NumPy) sobre un año de ventas multi-sede para cada modo de group_by, con la
+memoria pico de Python (tracemalloc). El cache de reportes se desactiva
+durante esas mediciones para que cada llamada ejecute el motor; al final se
+mide aparte una lectura desde el cache.
+
+Uso:
+    python scripts/benchmark_consolidated_report.py --stores 10 --sales-per-store 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products, seed_sales, latency_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reporte consolidado de ventas por group_by')
+    parser.add_argument('--stores', type=int, default=10, help='Tiendas (un vendedor por tienda)')
+    parser.add_argument('--sales-per-store', type=int, default=20000, help='Ventas por tienda en el año')
+    parser.add_argument('--repeat', type=int, default=3, help='Mediciones por modo')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('consolidated.db')
+
+    with app.app_context():
+        from app import db
+        from app.models.user import User
+        from app.services.consolidated_reporting_service import ConsolidatedReportingService
+        from app.services.report_cache_service import report_cache_service
+        from app.services.sales_columnar_engine import GROUP_BY_MODES
+
+        product_ids = seed_products(300, stock=1000)
+        for store_id in range(1, args.stores + 1):
+            user_id = seed_user(f'benchmark_store_{store_id}')
+            User.query.filter_by(id=user_id).update({'assigned_store_id': store_id})
+            db.session.commit()
+            seed_sales(user_id, product_ids, args.sales_per_store, days=365, lines=3, seed=store_id)
+
+        service = ConsolidatedReportingService()
+        end = datetime.utcnow()
+        start = end - timedelta(days=365)
+
+        # Medir el motor, no el cache
+        report_cache_service.enabled = False
+        rows = []
+        for group_by in GROUP_BY_MODES:
+            samples = []
+            for _ in range(args.repeat):
+                db.session.expunge_all()
+                started = time.perf_counter()
+                report = service.generate_sales_report(start, end, group_by=group_by)
+                samples.append(time.perf_counter() - started)
+
+            tracemalloc.start()
+            service.generate_sales_report(start, end, group_by=group_by)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append((group_by, latency_summary(samples), len(report['grouped_data']), peak))
+
+        report_cache_service.enabled = True
+        report_cache_service.clear()
+        service.generate_sales_report(start, end)
+        cached = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            service.generate_sales_report(start, end)
+            cached.append(time.perf_counter() - started)
+
+    print('=' * 60)
+    print(f'{args.stores} tiendas x {args.sales_per_store} ventas (3 líneas por venta), 365 días')
+    for group_by, stats, groups, peak in rows:
+        print(f'group_by={group_by}: p50 {stats["p50_ms"]} ms, {groups} grupos, pico {peak / 2**20:.1f} MiB')
+    print(f'Desde el cache (group_by=store): p50 {latency_summary(cached)["p50_ms"]} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Listing Serialization Benchmark - Sistema POS O'Data
+====================================================
+Compara una página de 1.000 ventas serializada con Sale.to_dict() (ORM con
+items lazy, N+1 consultas) contra el serializador por filas, y el tamaño del
+payload con campos dispersos (?fields=).
+
+Uso:
+    python scripts/benchmark_listing_serialization.py --sales 20000 --per-page 1000
+"""
+
+import argparse
+import json
+import time
+
+from sqlalchemy import event
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products, seed_sales, latency_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serialización de listados ORM vs filas')
+    parser.add_argument('--sales', type=int, default=20000, help='Ventas en el historial')
+    parser.add_argument('--per-page', type=int, default=1000, help='Ventas por página')
+    parser.add_argument('--repeat', type=int, default=5, help='Mediciones por variante')
+    parser.add_argument('--fields', default='id,total_amount,created_at,items.product_id,items.quantity',
+                        help='Campos dispersos para la tercera variante')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('listing.db')
+
+    with app.app_context():
+        from app import db
+        from app.container import container
+        from app.services.sale_service import SaleService
+        from app.repositories.sale_repository import SaleRepository
+        from app.repositories.product_repository import ProductRepository
+        from app.repositories.user_repository import UserRepository
+
+        user_id = seed_user()
+        product_ids = seed_products(100, stock=1000)
+        seed_sales(user_id, product_ids, args.sales, lines=3)
+
+        repository = container.get(SaleRepository)
+        service = SaleService(repository, container.get(ProductRepository), container.get(UserRepository))
+
+        statements = {'count': 0}
+
+        def count_statement(*_):
+            statements['count'] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+        def orm_page():
+            result = repository.get_all(page=1, per_page=args.per_page)
+            return {'sales': [sale.to_dict() for sale in result['items']], 'pagination': result['pagination']}
+
+        variants = [
+            ('ORM to_dict()', orm_page),
+            ('Filas', lambda: service.get_sales_listing(page=1, per_page=args.per_page)),
+            (f'Filas ?fields={args.fields}',
+             lambda: service.get_sales_listing(fields=args.fields, page=1, per_page=args.per_page))
+        ]
+
+        rows = []
+        for label, run in variants:
+            samples = []
+            for _ in range(args.repeat):
+                # Sesión limpia: sin objetos cacheados en el identity map
+                db.session.expunge_all()
+                statements['count'] = 0
+                started = time.perf_counter()
+                payload = run()
+                samples.append(time.perf_counter() - started)
+            size = len(json.dumps(payload, default=str))
+            rows.append((label, latency_summary(samples), statements['count'], size))
+
+        event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+    print('=' * 60)
+    print(f'Página de {args.per_page} ventas (3 items por venta)')
+    for label, stats, count, size in rows:
+        print(f'{label}: p50 {stats["p50_ms"]} ms, {count} consultas, payload {size / 1024:.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Pagination Benchmark - Sistema POS O'Data
+=========================================
+Mide la latencia de una página del historial de ventas a distintas
+profundidades con paginación OFFSET (con COUNT) y por cursor (sin COUNT).
+
+Uso:
+    python scripts/benchmark_pagination.py --sales 200000 --per-page 50
+"""
+
+import argparse
+import time
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products, seed_sales, latency_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia de paginación OFFSET vs cursor')
+    parser.add_argument('--sales', type=int, default=100000, help='Ventas en el historial')
+    parser.add_argument('--per-page', type=int, default=50, help='Ventas por página')
+    parser.add_argument('--repeat', type=int, default=5, help='Mediciones por profundidad')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('pagination.db')
+
+    with app.app_context():
+        from app.container import container
+        from app.models.sale import Sale
+        from app.repositories.base_repository import encode_cursor
+        from app.repositories.sale_repository import SaleRepository
+
+        user_id = seed_user()
+        product_ids = seed_products(50, stock=1000)
+        seed_sales(user_id, product_ids, args.sales)
+        repository = container.get(SaleRepository)
+
+        pages = args.sales // args.per_page
+        depths = sorted({1, max(1, pages // 10), max(1, pages // 2), max(1, pages - 1)})
+        rows = []
+
+        for page in depths:
+            # Cursor equivalente: la clave de la última venta de la página anterior
+            anchor = Sale.query.order_by(Sale.created_at.desc(), Sale.id.desc()).offset(
+                (page - 1) * args.per_page - 1
+            ).first() if page > 1 else None
+            cursor = encode_cursor([anchor.created_at, anchor.id], 'next') if anchor else ''
+
+            offset_samples, cursor_samples = [], []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                repository.get_all(page=page, per_page=args.per_page)
+                offset_samples.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                repository.get_all(per_page=args.per_page, cursor=cursor, include_total=False)
+                cursor_samples.append(time.perf_counter() - started)
+
+            rows.append((page, latency_summary(offset_samples), latency_summary(cursor_samples)))
+
+    print('=' * 60)
+    print(f'{args.sales} ventas, {args.per_page} por página')
+    for page, offset_stats, cursor_stats in rows:
+        print(f'Página {page:>6}: OFFSET p50 {offset_stats["p50_ms"]:>8} ms | '
+              f'cursor p50 {cursor_stats["p50_ms"]:>8} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Sale Batch Benchmark - Sistema POS O'Data
+=========================================
+Compara el throughput de SaleService.create_sale (una venta por request) con
+SaleBatchService.ingest (lote de ventas offline) sobre SQLite, y verifica que
+reenviar el mismo lote sea idempotente.
+
+Uso:
+    python scripts/benchmark_sale_batch.py --sales 2000 --lines 4
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products
+
+
+def build_sales(count, lines, product_ids, rng):
+    """Generar ventas offline con UUID de cliente"""
+    return [
+        {
+            'client_uuid': str(uuid.uuid4()),
+            'payment_method': 'cash',
+            'tax_rate': 19,
+            'items': [
+                {'product_id': rng.choice(product_ids), 'quantity': rng.randint(1, 3)}
+                for _ in range(lines)
+            ]
+        }
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput de ingesta masiva de ventas')
+    parser.add_argument('--sales', type=int, default=1000, help='Ventas en el lote')
+    parser.add_argument('--single-sales', type=int, default=200, help='Ventas por el endpoint individual')
+    parser.add_argument('--lines', type=int, default=4, help='Líneas por venta')
+    parser.add_argument('--products', type=int, default=200, help='Productos en catálogo')
+    parser.add_argument('--chunk-size', type=int, default=250, help='Ventas por transacción')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('sale_batch.db')
+    rng = random.Random(7)
+
+    with app.app_context():
+        from app.container import container
+        from app.services.sale_service import SaleService
+        from app.services.sale_batch_service import SaleBatchService
+        from app.repositories.sale_repository import SaleRepository
+        from app.repositories.product_repository import ProductRepository
+        from app.repositories.user_repository import UserRepository
+
+        repositories = (
+            container.get(SaleRepository),
+            container.get(ProductRepository),
+            container.get(UserRepository)
+        )
+        sale_service = SaleService(*repositories)
+        batch_service = SaleBatchService(*repositories)
+
+        user_id = seed_user()
+        product_ids = seed_products(args.products, stock=10 ** 7)
+
+        single_sales = build_sales(args.single_sales, args.lines, product_ids, rng)
+        started = time.perf_counter()
+        for sale_data in single_sales:
+            sale_service.create_sale(user_id, sale_data)
+        single_rate = len(single_sales) / (time.perf_counter() - started)
+
+        batch = build_sales(args.sales, args.lines, product_ids, rng)
+        started = time.perf_counter()
+        result = batch_service.ingest(user_id, batch, terminal_id='bench', chunk_size=args.chunk_size)
+        batch_rate = len(batch) / (time.perf_counter() - started)
+
+        replay = batch_service.ingest(user_id, batch, terminal_id='bench', chunk_size=args.chunk_size)
+
+    print('=' * 60)
+    print(f'Individual: {single_rate:.1f} ventas/s ({args.single_sales} ventas)')
+    print(f'Lote:       {batch_rate:.1f} ventas/s ({args.sales} ventas, chunk {args.chunk_size})')
+    print(f'Aceleración: {batch_rate / single_rate:.1f}x')
+    print(f'Resultado del lote: {result["summary"]}')
+    print(f'Reenvío del lote:   {replay["summary"]}')
+
+    if replay['summary']['created'] != 0:
+        print('❌ El reenvío creó ventas duplicadas')
+        raise SystemExit(1)
+    print('✅ Reenvío idempotente')
+
+
+if __name__ == '__main__':
+    main()
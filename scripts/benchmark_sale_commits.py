@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Sale Commit Benchmark - Sistema POS O'Data
+==========================================
+Mide commits, sentencias SQL y fsyncs estimadas por venta y por cancelación.
+
+En SQLite cada commit fuerza sincronizaciones a disco; el número de fsyncs
+por commit depende de journal_mode/synchronous y se estima a partir de ellos.
+Para comparar antes/después ejecutar el script sobre cada revisión.
+
+Uso:
+    python scripts/benchmark_sale_commits.py --sales 200 --lines 5
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import event, text
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products, latency_summary
+
+# fsyncs aproximadas por commit según el modo de journal de SQLite
+FSYNCS_PER_COMMIT = {
+    ('delete', 'full'): 3,
+    ('delete', 'normal'): 2,
+    ('truncate', 'full'): 3,
+    ('truncate', 'normal'): 2,
+    ('persist', 'full'): 3,
+    ('persist', 'normal'): 2,
+    ('wal', 'full'): 1,
+    ('wal', 'normal'): 0,
+}
+SYNCHRONOUS_NAMES = {0: 'off', 1: 'normal', 2: 'full', 3: 'extra'}
+
+
+class SQLCounter:
+    """Contador de commits y sentencias emitidas por el engine"""
+
+    def __init__(self, engine):
+        self.commits = 0
+        self.statements = 0
+        event.listen(engine, 'commit', self._on_commit)
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+    def snapshot(self):
+        return self.commits, self.statements
+
+
+def fsyncs_per_commit(db):
+    """Estimar fsyncs por commit a partir de los PRAGMA de SQLite"""
+    journal_mode = db.session.execute(text('PRAGMA journal_mode')).scalar().lower()
+    synchronous = SYNCHRONOUS_NAMES.get(db.session.execute(text('PRAGMA synchronous')).scalar(), 'full')
+    return journal_mode, synchronous, FSYNCS_PER_COMMIT.get((journal_mode, synchronous), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Commits y fsyncs por venta')
+    parser.add_argument('--sales', type=int, default=100, help='Ventas a registrar')
+    parser.add_argument('--lines', type=int, default=5, help='Líneas por venta')
+    parser.add_argument('--products', type=int, default=50, help='Productos en catálogo')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('sale_commits.db')
+
+    with app.app_context():
+        from app import db
+        from app.container import container
+        from app.services.sale_service import SaleService
+        from app.repositories.sale_repository import SaleRepository
+        from app.repositories.product_repository import ProductRepository
+        from app.repositories.user_repository import UserRepository
+
+        user_id = seed_user()
+        product_ids = seed_products(args.products, stock=args.sales * args.lines * 10)
+        journal_mode, synchronous, fsyncs = fsyncs_per_commit(db)
+
+        sale_service = SaleService(
+            container.get(SaleRepository),
+            container.get(ProductRepository),
+            container.get(UserRepository)
+        )
+        counter = SQLCounter(db.engine)
+        rng = random.Random(42)
+
+        def measure(operation, runs):
+            commits_before, statements_before = counter.snapshot()
+            latencies = []
+            for run in runs:
+                started = time.perf_counter()
+                operation(run)
+                latencies.append(time.perf_counter() - started)
+            commits_after, statements_after = counter.snapshot()
+            count = max(len(latencies), 1)
+            commits = (commits_after - commits_before) / count
+            return {
+                'commits': round(commits, 2),
+                'statements': round((statements_after - statements_before) / count, 2),
+                'fsyncs_estimadas': round(commits * fsyncs, 2),
+                'latencia': latency_summary(latencies)
+            }
+
+        sale_ids = []
+
+        def create(_):
+            items = [
+                {'product_id': rng.choice(product_ids), 'quantity': rng.randint(1, 3)}
+                for _ in range(args.lines)
+            ]
+            sale = sale_service.create_sale(user_id, {'items': items, 'tax_rate': 19})
+            sale_ids.append(sale['id'])
+
+        def cancel(sale_id):
+            sale_service.cancel_sale(sale_id, reason='benchmark')
+
+        create_stats = measure(create, range(args.sales))
+        cancel_stats = measure(cancel, list(sale_ids))
+
+    print('=' * 60)
+    print(f'SQLite journal_mode={journal_mode} synchronous={synchronous} (~{fsyncs} fsyncs/commit)')
+    print(f'Por venta ({args.lines} líneas):  {create_stats}')
+    print(f'Por cancelación:          {cancel_stats}')
+
+
+if __name__ == '__main__':
+    main()
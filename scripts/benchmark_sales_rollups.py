@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Sales Rollups Benchmark - Sistema POS O'Data
+============================================
+Compara las consultas del dashboard sobre sales/sale_items (escaneo de todo el
+rango) contra las mismas métricas leídas de los agregados incrementales.
+
+Uso:
+    python scripts/benchmark_sales_rollups.py --sales 50000 --days 365
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products, seed_sales, latency_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dashboard sobre ventas vs agregados')
+    parser.add_argument('--sales', type=int, default=50000, help='Ventas en el historial')
+    parser.add_argument('--days', type=int, default=365, help='Días cubiertos por el historial')
+    parser.add_argument('--repeat', type=int, default=10, help='Mediciones por variante')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('rollups.db')
+
+    with app.app_context():
+        from sqlalchemy import func, desc
+        from app import db
+        from app.models.sale import Sale, SaleItem
+        from app.models.product import Product
+        from app.services.sales_rollup_service import sales_rollup_service
+
+        user_id = seed_user()
+        product_ids = seed_products(200, stock=1000)
+        seed_sales(user_id, product_ids, args.sales, days=args.days, lines=3)
+
+        started = time.perf_counter()
+        rebuilt = sales_rollup_service.rebuild()
+        rebuild_seconds = time.perf_counter() - started
+
+        end = datetime.utcnow()
+        start = end - timedelta(days=30)
+
+        def scan_dashboard():
+            totals = db.session.query(
+                func.count(Sale.id), func.sum(Sale.total_amount)
+            ).filter(Sale.created_at >= start, Sale.status != 'cancelled').first()
+            top = db.session.query(
+                Product.id, func.sum(SaleItem.quantity).label('qty')
+            ).join(SaleItem).join(Sale).filter(
+                Sale.created_at >= start, Sale.status != 'cancelled'
+            ).group_by(Product.id).order_by(desc('qty')).limit(10).all()
+            return totals, top
+
+        def rollup_dashboard():
+            return (sales_rollup_service.get_totals(start.date(), end.date()),
+                    sales_rollup_service.get_top_products(start.date(), end.date(), limit=10))
+
+        rows = []
+        for label, run in (('Escaneo de ventas', scan_dashboard), ('Agregados', rollup_dashboard)):
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                run()
+                samples.append(time.perf_counter() - started)
+            rows.append((label, latency_summary(samples)))
+
+    print('=' * 60)
+    print(f'{args.sales} ventas en {args.days} días; rebuild de {rebuilt["sales_processed"]} '
+          f'ventas en {rebuild_seconds:.1f}s')
+    for label, stats in rows:
+        print(f'{label}: p50 {stats["p50_ms"]} ms, p95 {stats["p95_ms"]} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Streaming Export Benchmark - Sistema POS O'Data
+===============================================
+Exporta el detalle de ventas a CSV y XLSX con las utilidades de streaming
+(yield_per + generador CSV / openpyxl write-only) y reporta tiempo y memoria
+pico de Python para distintos volúmenes: la memoria debe mantenerse plana.
+
+Uso:
+    python scripts/benchmark_streaming_export.py --sizes 10000,100000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products, seed_sales
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exportación CSV/XLSX en streaming')
+    parser.add_argument('--sizes', default='10000,100000', help='Volúmenes de ventas separados por coma')
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    app = create_benchmark_app('export.db')
+
+    rows = []
+    with app.app_context():
+        from app import db
+        from app.models.sale import Sale
+        from app.models.user import User
+        from app.utils.streaming_export import StreamingWorkbook, iter_csv, iter_query_rows
+
+        user_id = seed_user()
+        product_ids = seed_products(100, stock=1000)
+
+        seeded = 0
+        for size in sizes:
+            seed_sales(user_id, product_ids, size - seeded, seed=size)
+            seeded = size
+
+            def sales_rows():
+                query = db.session.query(
+                    Sale.id, Sale.created_at, Sale.total_amount, Sale.payment_method, Sale.status, User.username
+                ).join(User, Sale.user_id == User.id).order_by(Sale.created_at)
+                return (
+                    (sale.id, sale.created_at.strftime('%Y-%m-%d'), sale.created_at.strftime('%H:%M:%S'),
+                     float(sale.total_amount), sale.payment_method, sale.status, sale.username)
+                    for sale in iter_query_rows(query)
+                )
+
+            headers = ['ID Venta', 'Fecha', 'Hora', 'Total', 'Método de Pago', 'Estado', 'Vendedor']
+
+            def export_csv():
+                return sum(len(chunk) for chunk in iter_csv(headers, sales_rows()))
+
+            def export_xlsx():
+                workbook = StreamingWorkbook()
+                workbook.add_table_sheet('Detalle de Ventas', headers, sales_rows(), money_columns=(3,))
+                output = workbook.to_file()
+                output.seek(0, 2)
+                size_bytes = output.tell()
+                output.close()
+                return size_bytes
+
+            for label, run in (('CSV', export_csv), ('XLSX', export_xlsx)):
+                db.session.expunge_all()
+                tracemalloc.start()
+                started = time.perf_counter()
+                size_bytes = run()
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                rows.append((size, label, elapsed, peak, size_bytes))
+
+    print('=' * 60)
+    for size, label, elapsed, peak, size_bytes in rows:
+        print(f'{size} ventas {label}: {elapsed:.2f}s, pico {peak / 2**20:.1f} MiB, archivo {size_bytes / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Outbox SMTP Check - Sistema POS O'Data
+======================================
+Verifica la bandeja de salida transaccional contra un servidor SMTP local de
+prueba: la venta se confirma sin tocar SMTP, el evento queda pendiente y el
+worker lo entrega (con reintentos si el servidor rechaza los primeros envíos).
+
+Uso:
+    python scripts/outbox_smtp_check.py --sales 5 --fail-first 2
+"""
+
+import argparse
+import os
+import socketserver
+import threading
+import time
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products, latency_summary
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Servidor SMTP mínimo que acepta mensajes y los guarda en memoria"""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 localhost SMTP stand-in')
+        data_lines = None
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+
+            if data_lines is not None:
+                if line.rstrip(b'\r\n') == b'.':
+                    if self.server.should_fail():
+                        self.reply('451 Temporary failure (simulada)')
+                    else:
+                        self.server.messages.append(b''.join(data_lines).decode('utf-8', 'replace'))
+                        self.reply('250 OK')
+                    data_lines = None
+                else:
+                    data_lines.append(line)
+                continue
+
+            command = line.decode('utf-8', 'replace').strip().upper()
+            if command.startswith('EHLO') or command.startswith('HELO'):
+                self.reply('250 localhost')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data_lines = []
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Servidor SMTP local con fallos inyectables"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, fail_first: int = 0):
+        super().__init__(('127.0.0.1', 0), SMTPStandInHandler)
+        self.messages = []
+        self.connections = 0
+        self._failures_left = fail_first
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            if self._failures_left > 0:
+                self._failures_left -= 1
+                return True
+            return False
+
+    def verify_request(self, request, client_address):
+        self.connections += 1
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verificación del outbox con SMTP local')
+    parser.add_argument('--sales', type=int, default=5, help='Ventas con factura por email')
+    parser.add_argument('--fail-first', type=int, default=2, help='Envíos rechazados al inicio')
+    parser.add_argument('--smtp-delay', type=float, default=0.5, help='Segundos que tarda el SMTP simulado')
+    args = parser.parse_args()
+
+    smtp = SMTPStandIn(fail_first=args.fail_first)
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+
+    # Configuración antes de importar la aplicación
+    os.environ.update({
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': str(smtp.server_address[1]),
+        'SMTP_USE_TLS': 'false',
+        'EMAIL_USER': 'pos@localhost',
+        'EMAIL_PASSWORD': 'local-stand-in',
+        'OUTBOX_WORKERS': '0',
+        'OUTBOX_BACKOFF_SECONDS': '0',
+    })
+
+    app = create_benchmark_app('outbox_check.db')
+
+    with app.app_context():
+        from app.container import container
+        from app.models.outbox import OutboxEvent
+        from app.services.email_service import email_service
+        from app.services.outbox_service import outbox_service
+        from app.services.sale_service import SaleService
+        from app.repositories.sale_repository import SaleRepository
+        from app.repositories.product_repository import ProductRepository
+        from app.repositories.user_repository import UserRepository
+
+        user_id = seed_user()
+        product_ids = seed_products(3, stock=1000)
+        sale_service = SaleService(
+            container.get(SaleRepository),
+            container.get(ProductRepository),
+            container.get(UserRepository)
+        )
+
+        # Un SMTP lento no debe afectar la latencia del checkout
+        original_handle = SMTPStandInHandler.handle
+
+        def slow_handle(handler):
+            time.sleep(args.smtp_delay)
+            original_handle(handler)
+
+        SMTPStandInHandler.handle = slow_handle
+
+        latencies = []
+        for index in range(args.sales):
+            started = time.perf_counter()
+            sale_service.create_sale(user_id, {
+                'items': [{'product_id': product_ids[index % len(product_ids)], 'quantity': 1}],
+                'customer_email': f'cliente{index}@example.com',
+                'customer_name': f'Cliente {index}'
+            })
+            latencies.append(time.perf_counter() - started)
+
+        pending = OutboxEvent.query.filter_by(status='pending').count()
+
+        # Drenar como lo haría un worker, con una conexión SMTP por lote
+        started = time.perf_counter()
+        rounds = 0
+        while outbox_service.get_stats().get('pending', 0) and rounds < args.fail_first + 5:
+            with email_service.persistent_connection():
+                outbox_service.process_pending('check')
+            rounds += 1
+        drain_seconds = time.perf_counter() - started
+        stats = outbox_service.get_stats()
+
+    print('=' * 60)
+    print(f'Checkout con email: {latency_summary(latencies)} (SMTP tarda {args.smtp_delay}s por conexión)')
+    print(f'Eventos pendientes tras las ventas: {pending}')
+    print(f'Drenado en {rounds} rondas, {drain_seconds:.2f}s; conexiones SMTP: {smtp.connections}')
+    print(f'Mensajes recibidos: {len(smtp.messages)}; estado outbox: {stats}')
+
+    smtp.shutdown()
+    if len(smtp.messages) != args.sales or stats.get('pending') or stats.get('failed'):
+        print('❌ El outbox no entregó todos los emails')
+        raise SystemExit(1)
+    print('✅ Todas las facturas entregadas fuera del request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Rebuild Sales Rollups - Sistema POS O'Data
+==========================================
+Backfill o reconstrucción de los agregados de ventas (sales_rollup_hourly y
+sales_rollup_product_daily) a partir de sales/sale_items.
+
+Uso:
+    python scripts/rebuild_sales_rollups.py                       # todo el historial
+    python scripts/rebuild_sales_rollups.py --start 2025-01-01 --end 2025-01-31
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app
+from app.services.sales_rollup_service import sales_rollup_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstruir agregados de ventas')
+    parser.add_argument('--start', type=date.fromisoformat, help='Primer día (YYYY-MM-DD, inclusivo)')
+    parser.add_argument('--end', type=date.fromisoformat, help='Último día (YYYY-MM-DD, inclusivo)')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='Ventas procesadas por lote')
+    args = parser.parse_args()
+
+    app = create_app('production')
+
+    with app.app_context():
+        print("🔄 Reconstruyendo agregados de ventas...")
+        started = time.perf_counter()
+        result = sales_rollup_service.rebuild(args.start, args.end, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+
+    print(f"✅ {result['sales_processed']} ventas agregadas en {elapsed:.1f}s "
+          f"(rango: {result['start_date'] or 'inicio'} - {result['end_date'] or 'hoy'})")
+
+
+if __name__ == '__main__':
+    main()
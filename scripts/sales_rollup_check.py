@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Sales Rollup Check - Sistema POS O'Data
+=======================================
+Verifica que los agregados incrementales (ventas, conversión de cotizaciones
+con impuesto y descuento y anulación) coinciden con los que produce
+sales_rollup_service.rebuild() desde sales/sale_items.
+
+Uso:
+    python scripts/sales_rollup_check.py --sales 20
+"""
+
+import argparse
+from decimal import Decimal
+
+from benchmark_common import create_benchmark_app, seed_user, seed_products
+
+
+def rollup_rows():
+    """Filas de los agregados como tuplas comparables (sin ids, timestamps ni filas en cero)"""
+    from app.models.sales_rollup import SalesHourlyRollup, ProductDailyRollup
+
+    hourly = sorted(
+        (row.bucket_date, row.bucket_hour, row.store_id, row.seller_id, row.payment_method, row.sale_count,
+         row.items_sold, Decimal(row.subtotal), Decimal(row.tax_amount), Decimal(row.discount_amount),
+         Decimal(row.total_amount))
+        for row in SalesHourlyRollup.query.all()
+        if row.sale_count
+    )
+    products = sorted(
+        (row.bucket_date, row.store_id, row.product_id, row.quantity, row.line_count, Decimal(row.revenue))
+        for row in ProductDailyRollup.query.all()
+        if row.line_count
+    )
+    return hourly, products
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Agregados incrementales vs rebuild')
+    parser.add_argument('--sales', type=int, default=20, help='Ventas del POS antes de la conversión')
+    args = parser.parse_args()
+
+    app = create_benchmark_app('rollup_check.db')
+
+    with app.app_context():
+        from app import db
+        from app.container import container
+        from app.models.accounts_receivable import Customer
+        from app.models.quotation import Quotation, QuotationItem
+        from app.services.quotation_service import QuotationService
+        from app.services.sale_service import SaleService
+        from app.services.sales_rollup_service import sales_rollup_service
+
+        user_id = seed_user()
+        product_ids = seed_products(5, stock=1000)
+        sale_service = container.get(SaleService)
+
+        for index in range(args.sales):
+            sale_service.create_sale(user_id, {
+                'items': [{'product_id': product_ids[index % len(product_ids)], 'quantity': 1 + index % 3}],
+                'tax_rate': 19 if index % 2 else 0
+            })
+
+        customer = Customer(name='Cliente cotización', document_type='CC', document_number='900100200')
+        db.session.add(customer)
+        db.session.commit()
+
+        def matches_rebuild() -> bool:
+            """Comparar los agregados actuales contra rebuild() del mismo estado"""
+            incremental = rollup_rows()
+            sales_rollup_service.rebuild()
+            return incremental == rollup_rows()
+
+        # Cotización aprobada con dos líneas (subtotal 3000), impuesto 570 y descuento 70
+        quotation = Quotation(customer_id=customer.id, user_id=user_id, title='Pedido corporativo',
+                              subtotal=Decimal('3000'), tax_amount=Decimal('570'), discount_amount=Decimal('70'),
+                              total_amount=Decimal('3500'), status='approved')
+        db.session.add(quotation)
+        db.session.flush()
+        for product_id, quantity in ((product_ids[0], 2), (product_ids[1], 1)):
+            db.session.add(QuotationItem(quotation.id, product_id=product_id, product_name=f'Producto {product_id}',
+                                         quantity=Decimal(quantity), unit_price=Decimal('1000'),
+                                         discount_amount=Decimal('0'), total_amount=Decimal(quantity * 1000)))
+        db.session.commit()
+        sale = QuotationService().convert_to_sale(quotation.id, user_id)
+
+        results = [('Conversión de cotización (impuesto 570, descuento 70)', matches_rebuild())]
+        sale_service.cancel_sale(sale.id, reason='Verificación de agregados')
+        results.append(('Anulación de la venta convertida', matches_rebuild()))
+
+    print('=' * 60)
+    for label, ok in results:
+        print(f'{label}: {"coincide" if ok else "NO coincide"} con rebuild()')
+    if not all(ok for _, ok in results):
+        print('❌ Los agregados incrementales difieren de rebuild()')
+        raise SystemExit(1)
+    print('✅ Agregados incrementales consistentes')
+
+
+if __name__ == '__main__':
+    main()